@@ -14,7 +14,7 @@ from ..data.models import StyleAnalysis, AttributeAnalysis
 from ..data.interfaces import StyleAnalysisProtocol, AttributeAnalysisProtocol, CacheManagerProtocol
 from ..services.gemini import GeminiService
 from ..utils.errors import GeminiAPIError, ImageError, async_with_error_handling
-from ..utils.cache_decorators import cacheable
+from ..utils.cache_decorators import cacheable, content_cache_key
 
 
 class ImageAnalyzer:
@@ -38,8 +38,27 @@ class ImageAnalyzer:
         self.gemini_service = gemini_service
         self.cache_manager = cache_manager
         self.use_cache = use_cache
+        # バッチ分析で先に取得した分析結果（画像パス → (スタイル分析結果, 属性分析結果)）
+        self._prefetched: Dict[Path, Tuple[Optional[StyleAnalysisProtocol], Optional[AttributeAnalysisProtocol]]] = {}
     
-    @cacheable(lambda self, image_path, *args, **kwargs: f"style_analysis:{image_path.name}")
+    def get_cache_context(self) -> List[str]:
+        """
+        キャッシュキーに含める分析コンテキストを取得します。
+        
+        Returns:
+            [モデル名, プロンプトバージョン] のリスト
+        """
+        return [self.gemini_service.config.model, self.gemini_service.prompt_version]
+    
+    def _style_cache_key(self, image_path: Path, categories: List[str]) -> str:
+        """スタイル分析結果のキャッシュキーを生成します。"""
+        return content_cache_key("style_analysis", image_path, *self.get_cache_context(), sorted(categories))
+    
+    def _attribute_cache_key(self, image_path: Path) -> str:
+        """属性分析結果のキャッシュキーを生成します。"""
+        return content_cache_key("attribute_analysis", image_path, *self.get_cache_context())
+    
+    @cacheable(lambda self, image_path, categories, *args, **kwargs: self._style_cache_key(image_path, categories))
     @async_with_error_handling(GeminiAPIError, "画像分析に失敗しました")
     async def analyze_image(self, image_path: Path, categories: List[str]) -> Optional[StyleAnalysisProtocol]:
         """
@@ -71,7 +90,7 @@ class ImageAnalyzer:
             self.logger.error(f"予期しないエラー: {str(e)}")
             return None
     
-    @cacheable(lambda self, image_path, *args, **kwargs: f"attribute_analysis:{image_path.name}")
+    @cacheable(lambda self, image_path, *args, **kwargs: self._attribute_cache_key(image_path))
     @async_with_error_handling(GeminiAPIError, "属性分析に失敗しました")
     async def analyze_attributes(self, image_path: Path) -> Optional[AttributeAnalysisProtocol]:
         """
@@ -119,9 +138,18 @@ class ImageAnalyzer:
         # キャッシュを使用するかどうかの判定
         should_use_cache = self.use_cache if use_cache is None else use_cache
         
+        # バッチ分析で取得済みの場合はその結果を使用（失敗した画像はバッチ分析内で個別に分析済み）
+        prefetched = self._prefetched.pop(image_path, None)
+        if prefetched is not None:
+            self.logger.debug(f"バッチ分析の結果を使用します: {image_path.name}")
+            style_result, attribute_result = prefetched
+            if should_use_cache and self.cache_manager:
+                self._store_in_cache(image_path, categories, style_result, attribute_result)
+            return style_result, attribute_result
+        
         # 並列で両方の分析を実行
-        style_task = self.analyze_image(image_path, categories)
-        attribute_task = self.analyze_attributes(image_path)
+        style_task = self.analyze_image(image_path, categories, use_cache=should_use_cache)
+        attribute_task = self.analyze_attributes(image_path, use_cache=should_use_cache)
         
         # 両方の結果を待機
         results = await asyncio.gather(style_task, attribute_task, return_exceptions=True)
@@ -132,36 +160,91 @@ class ImageAnalyzer:
         
         if not isinstance(results[0], Exception):
             style_result = results[0]
-            # 辞書型の場合はStyleAnalysisに変換
-            if isinstance(style_result, dict):
-                try:
-                    from ..data.models import StyleAnalysis, StyleFeatures
-                    features = StyleFeatures(**style_result.get('features', {}))
-                    style_result = StyleAnalysis(
-                        category=style_result.get('category', ''),
-                        features=features,
-                        keywords=style_result.get('keywords', [])
-                    )
-                except Exception as e:
-                    self.logger.error(f"スタイル分析結果の変換に失敗しました: {e}")
-                    style_result = None
         else:
             self.logger.error(f"スタイル分析エラー: {str(results[0])}")
         
         if not isinstance(results[1], Exception):
             attribute_result = results[1]
-            # 辞書型の場合はAttributeAnalysisに変換
-            if isinstance(attribute_result, dict):
-                try:
-                    from ..data.models import AttributeAnalysis
-                    attribute_result = AttributeAnalysis(
-                        sex=attribute_result.get('sex', ''),
-                        length=attribute_result.get('length', '')
-                    )
-                except Exception as e:
-                    self.logger.error(f"属性分析結果の変換に失敗しました: {e}")
-                    attribute_result = None
         else:
             self.logger.error(f"属性分析エラー: {str(results[1])}")
         
         return style_result, attribute_result
+    
+    async def analyze_batch(self, image_paths: List[Path], categories: List[str]) -> List[Tuple[Optional[StyleAnalysisProtocol], Optional[AttributeAnalysisProtocol]]]:
+        """
+        複数の画像のスタイル分析と属性分析を、設定の画像数ごとにまとめたリクエストで行います。
+        
+        Args:
+            image_paths: 画像ファイルのパスのリスト
+            categories: カテゴリリスト
+            
+        Returns:
+            画像の順の(スタイル分析結果, 属性分析結果)のリスト（分析できなかった項目はNone）
+        """
+        batch_size = self.gemini_service.config.batch_analysis.batch_size
+        chunks = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+        
+        # 各リクエストの同時実行数はGeminiServiceのレートリミッターが制御する
+        chunk_results = await asyncio.gather(*[
+            self.gemini_service.analyze_images_batch(chunk, categories) for chunk in chunks
+        ])
+        return [analyses for results in chunk_results for analyses in results]
+    
+    async def prefetch(self, image_paths: List[Path], categories: List[str], use_cache: Optional[bool] = None) -> None:
+        """
+        バッチ分析が有効な場合に、複数の画像の分析をまとめて先に行います。
+        
+        結果は保持され、以降のanalyze_fullの呼び出しで使用されます。
+        キャッシュを使用する場合、スタイル・属性の両方がキャッシュ済みの画像は対象外です。
+        
+        Args:
+            image_paths: 画像ファイルのパスのリスト
+            categories: カテゴリリスト
+            use_cache: キャッシュを使用するかどうか（Noneの場合はインスタンスの設定を使用）
+        """
+        config = self.gemini_service.config.batch_analysis
+        if not config.enabled or config.batch_size < 2:
+            return
+        
+        should_use_cache = self.use_cache if use_cache is None else use_cache
+        pending = [
+            image_path for image_path in image_paths
+            if image_path not in self._prefetched and not (should_use_cache and self._is_cached(image_path, categories))
+        ]
+        if len(pending) < 2:
+            return
+        
+        self.logger.info(f"バッチ分析開始: {len(pending)}枚（1リクエストあたり{config.batch_size}枚）")
+        for image_path, analyses in zip(pending, await self.analyze_batch(pending, categories)):
+            self._prefetched[image_path] = analyses
+    
+    def clear_prefetched(self) -> None:
+        """バッチ分析で先に取得した分析結果のうち、使用されなかったものを破棄します。"""
+        self._prefetched.clear()
+    
+    def _is_cached(self, image_path: Path, categories: List[str]) -> bool:
+        """スタイル分析・属性分析の両方がキャッシュ済みかどうかを判定します。"""
+        if not self.cache_manager:
+            return False
+        try:
+            return (self.cache_manager.get(self._style_cache_key(image_path, categories)) is not None
+                    and self.cache_manager.get(self._attribute_cache_key(image_path)) is not None)
+        except Exception:
+            # キーを生成できない画像は個別の分析でエラーとして扱う
+            return False
+    
+    def _store_in_cache(
+        self,
+        image_path: Path,
+        categories: List[str],
+        style_result: Optional[StyleAnalysisProtocol],
+        attribute_result: Optional[AttributeAnalysisProtocol]
+    ) -> None:
+        """バッチ分析の結果を個別の分析と同じキーでキャッシュに保存します。"""
+        try:
+            if style_result is not None:
+                self.cache_manager.set(self._style_cache_key(image_path, categories), style_result)
+            if attribute_result is not None:
+                self.cache_manager.set(self._attribute_cache_key(image_path), attribute_result)
+        except Exception as e:
+            self.logger.warning(f"バッチ分析の結果をキャッシュに保存できませんでした: {image_path.name} - {str(e)}")
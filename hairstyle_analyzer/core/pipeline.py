@@ -0,0 +1,304 @@
+"""
+段階パイプラインモジュール
+
+このモジュールでは、複数の項目を段階（ステージ）ごとに並行して処理するパイプラインと、
+1つの項目の依存関係のある処理を並行して実行するタスクグラフを提供します。
+各段階は独自の同時実行数を持ち、段階の間は長さに上限のあるキューで接続されます。
+処理の遅い項目があっても、他の項目は空いている段階で処理が進むため、全体の処理時間は
+最も遅い段階（通常はAPIの呼び出し）の処理能力に近づきます。
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..utils.async_context import CancellationToken
+
+
+# キューの終端を表す値
+_END = object()
+
+
+class PipelineStage:
+    """パイプラインの段階
+
+    handlerは項目ごとに呼び出されます。batch_sizeが2以上の場合、ワーカーはキューに届いている項目を
+    最大batch_size件までまとめて取り出し、before_batchで一括の前処理（複数の項目をまとめたリクエスト等）を
+    行ってから、各項目のhandlerを並行して呼び出します。
+
+    ワーカーは最初の項目が届いた時点で取り出すため、前の段階から項目が1件ずつ届く場合はバッチが小さくなります。
+    batch_waitを指定すると、最初の項目を取り出してから最大batch_wait秒まで後続の項目を待ってバッチを満たします。
+    取り出しは段階内で1ワーカーずつ行うため、待機中の項目が他のワーカーに分散することはありません。
+    待機する分だけ各項目の処理の開始は遅れますが、一括の前処理の回数（APIのリクエスト数等）は減ります。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[None]],
+        concurrency: int = 1,
+        batch_size: int = 1,
+        before_batch: Optional[Callable[[List[Any]], Awaitable[None]]] = None,
+        batch_wait: float = 0.0
+    ):
+        """
+        初期化
+
+        Args:
+            name: 段階の名前（ログ出力に使用）
+            handler: 項目を処理する関数（例外を送出した項目は失敗として以降の段階をスキップ）
+            concurrency: 同時実行数（ワーカー数）
+            batch_size: ワーカーが一度に取り出す最大の項目数
+            before_batch: 取り出した項目に対する一括の前処理（オプション）
+            batch_wait: バッチを満たすために後続の項目を待機する最大時間（秒）
+        """
+        if concurrency < 1 or batch_size < 1:
+            raise ValueError("同時実行数とバッチサイズは1以上である必要があります")
+        if batch_wait < 0:
+            raise ValueError("バッチの待機時間は0以上である必要があります")
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.before_batch = before_batch
+        self.batch_wait = batch_wait
+
+
+class StagePipeline:
+    """段階パイプラインクラス
+
+    項目は全ての段階を順に通過し、完了した順に(項目, 例外)の形式で出力されます。
+    いずれかの段階で例外が発生した項目や、skipが真を返す項目（結果が確定した項目）は、
+    以降の段階を実行せずに出力されます。
+    キューの長さに上限があるため、出力を受け取る側が処理を止めると、入力の読み込みも止まります。
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[PipelineStage],
+        queue_size: int = 8,
+        skip: Optional[Callable[[Any], bool]] = None
+    ):
+        """
+        初期化
+
+        Args:
+            stages: 段階のリスト（処理順）
+            queue_size: 段階間のキューの最大長
+            skip: 以降の段階を実行しない項目を判定する関数（オプション）
+        """
+        if not stages:
+            raise ValueError("パイプラインには1つ以上の段階が必要です")
+        self.logger = logging.getLogger(__name__)
+        self.stages = list(stages)
+        self.queue_size = max(1, queue_size)
+        self.skip = skip or (lambda item: False)
+
+    async def run(
+        self,
+        items: Iterable[Any],
+        cancel_token: Optional[CancellationToken] = None
+    ) -> AsyncIterator[Tuple[Any, Optional[BaseException]]]:
+        """
+        項目をパイプラインで処理し、完了した項目を順に返します。
+
+        出力の受け取りを途中でやめる場合は、ジェネレーターを閉じる（aclose()を呼び出す）と
+        処理中の項目をキャンセルします。cancel_tokenがキャンセルされた場合も、処理中の項目をキャンセルして
+        出力を終了します（それまでに完了した項目は出力済みです）。
+
+        Args:
+            items: 処理する項目
+            cancel_token: キャンセルトークン（オプション）
+
+        Yields:
+            (項目, 例外)のタプル（正常に完了した項目の例外はNone）
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        output: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        tasks = [asyncio.ensure_future(self._feed(items, queues[0]))]
+        for index, stage in enumerate(self.stages):
+            downstream = queues[index + 1] if index + 1 < len(self.stages) else output
+            downstream_workers = self.stages[index + 1].concurrency if index + 1 < len(self.stages) else 1
+            remaining = [stage.concurrency]
+            # バッチの取り出しは段階内で1ワーカーずつ行う（待機中の項目が他のワーカーに分散しないように）
+            take_lock = asyncio.Lock()
+            for _ in range(stage.concurrency):
+                tasks.append(asyncio.ensure_future(
+                    self._work(stage, queues[index], downstream, output, remaining, downstream_workers, take_lock)
+                ))
+
+        cancelled = asyncio.ensure_future(cancel_token.wait()) if cancel_token is not None else None
+        if cancelled is not None:
+            tasks.append(cancelled)
+
+        try:
+            while True:
+                if cancelled is None:
+                    entry = await output.get()
+                else:
+                    getter = asyncio.ensure_future(output.get())
+                    try:
+                        await asyncio.wait([getter, cancelled], return_when=asyncio.FIRST_COMPLETED)
+                    except BaseException:
+                        getter.cancel()
+                        raise
+                    if not getter.done():
+                        getter.cancel()
+                        self.logger.info(f"パイプラインの処理をキャンセルしました: {cancel_token.reason}")
+                        break
+                    entry = getter.result()
+                if entry is _END:
+                    break
+                yield entry
+            # 内部のエラーで終了したワーカーがあれば送出する
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _feed(self, items: Iterable[Any], queue: asyncio.Queue) -> None:
+        """入力の項目を最初の段階のキューに投入し、終端を送ります。"""
+        for item in items:
+            await queue.put(item)
+        for _ in range(self.stages[0].concurrency):
+            await queue.put(_END)
+
+    async def _work(
+        self,
+        stage: PipelineStage,
+        queue: asyncio.Queue,
+        downstream: asyncio.Queue,
+        output: asyncio.Queue,
+        remaining: List[int],
+        downstream_workers: int,
+        take_lock: asyncio.Lock
+    ) -> None:
+        """段階のワーカー: キューから項目を取り出して処理し、次の段階に渡します。"""
+        finished = False
+        while not finished:
+            async with take_lock:
+                batch = await self._take_batch(stage, queue)
+            if batch[-1] is _END:
+                batch.pop()
+                finished = True
+
+            active = []
+            for item in batch:
+                if self.skip(item):
+                    await output.put((item, None))
+                else:
+                    active.append(item)
+            if not active:
+                continue
+
+            if stage.before_batch is not None:
+                try:
+                    await stage.before_batch(active)
+                except Exception as e:
+                    self.logger.warning(f"段階「{stage.name}」の一括処理でエラーが発生しました: {str(e)}")
+
+            outcomes = await asyncio.gather(*[stage.handler(item) for item in active], return_exceptions=True)
+            for item, outcome in zip(active, outcomes):
+                if isinstance(outcome, asyncio.CancelledError):
+                    raise outcome
+                if isinstance(outcome, BaseException):
+                    await output.put((item, outcome))
+                elif downstream is output:
+                    await output.put((item, None))
+                else:
+                    await downstream.put(item)
+
+        # 段階の最後のワーカーが、次の段階のワーカー数だけ終端を送る
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            for _ in range(downstream_workers):
+                await downstream.put(_END)
+
+    async def _take_batch(self, stage: PipelineStage, queue: asyncio.Queue) -> List[Any]:
+        """キューから最大batch_size件の項目を取り出します（終端を取り出した場合はそこで終わります）。"""
+        batch = [await queue.get()]
+        deadline = asyncio.get_running_loop().time() + stage.batch_wait
+        while len(batch) < stage.batch_size and batch[-1] is not _END:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            # 取り出しが完了する前にキャンセルした場合、項目はキューに残る
+            getter = asyncio.ensure_future(queue.get())
+            try:
+                await asyncio.wait([getter], timeout=timeout)
+            except BaseException:
+                getter.cancel()
+                raise
+            if not getter.done():
+                getter.cancel()
+                break
+            batch.append(getter.result())
+        return batch
+
+
+class TaskGraph:
+    """依存関係のある非同期処理のグラフ
+
+    各処理は、依存する処理が全て完了した時点で開始されます。互いに依存しない処理は並行して実行されるため、
+    全体の所要時間は依存関係の最も長い経路の処理時間になります。
+    いずれかの処理で例外が発生した場合は、実行中の他の処理をキャンセルして例外を送出します。
+    """
+
+    def __init__(self):
+        """初期化"""
+        self._nodes: Dict[str, Tuple[Tuple[str, ...], Callable[[], Awaitable[Any]]]] = {}
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]], depends_on: Sequence[str] = ()) -> "TaskGraph":
+        """
+        処理を追加します。依存する処理は先に追加されている必要があります（そのため循環は生じません）。
+
+        Args:
+            name: 処理の名前
+            func: 処理を行う関数
+            depends_on: 依存する処理の名前
+
+        Returns:
+            このグラフ（メソッドチェーン用）
+
+        Raises:
+            ValueError: 名前が重複している場合、または依存する処理が追加されていない場合
+        """
+        if name in self._nodes:
+            raise ValueError(f"処理の名前が重複しています: {name}")
+        missing = [dependency for dependency in depends_on if dependency not in self._nodes]
+        if missing:
+            raise ValueError(f"依存する処理が追加されていません: {', '.join(missing)}")
+        self._nodes[name] = (tuple(depends_on), func)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        全ての処理を依存関係の順に実行します。
+
+        Returns:
+            処理の名前から結果への辞書
+        """
+        tasks: Dict[str, asyncio.Future] = {}
+
+        async def run_node(depends_on: Tuple[str, ...], func: Callable[[], Awaitable[Any]]) -> Any:
+            if depends_on:
+                await asyncio.gather(*[tasks[dependency] for dependency in depends_on])
+            return await func()
+
+        for name, (depends_on, func) in self._nodes.items():
+            tasks[name] = asyncio.ensure_future(run_node(depends_on, func))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return {name: task.result() for name, task in tasks.items()}
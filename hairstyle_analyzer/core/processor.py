@@ -10,29 +10,78 @@ import asyncio
 import logging
 import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple, Set, Union
+from typing import List, Dict, Any, Optional, Tuple, Set, Union, Callable, AsyncIterator, Awaitable
 from datetime import datetime
 
 import tqdm.asyncio
 from tqdm import tqdm
 
-from ..data.models import ProcessResult, StyleAnalysis, AttributeAnalysis
+from ..data.models import ProcessResult, StyleAnalysis, AttributeAnalysis, Template, PipelineConfig, CombinedAnalysis, ProcessEvent
 from ..data.interfaces import (
     ProcessResultProtocol, MainProcessorProtocol, CacheManagerProtocol,
-    StyleAnalysisProtocol, AttributeAnalysisProtocol, StylistInfoProtocol, CouponInfoProtocol
+    StyleAnalysisProtocol, AttributeAnalysisProtocol, StylistInfoProtocol, CouponInfoProtocol,
+    BatchJobBackendProtocol
 )
 from ..utils.errors import (
     AppError, ProcessingError, ImageError, GeminiAPIError, 
-    ScraperError, TemplateError, ValidationError
+    ScraperError, TemplateError, ValidationError, DeadlineExceededError
 )
 from ..utils.system_utils import calculate_optimal_batch_size
-from ..utils.cache_decorators import cacheable
-from ..utils.async_context import progress_tracker
+from ..utils.cache_decorators import cacheable, content_cache_key
+from ..utils.async_context import progress_tracker, CancellationToken
 from .image_analyzer import ImageAnalyzer
 from .template_matcher import TemplateMatcher
 from .style_matching import StyleMatchingService
 from .excel_exporter import ExcelExporter
 from .text_exporter import TextExporter
+from .pipeline import PipelineStage, StagePipeline, TaskGraph
+from ..services.gemini.batch_jobs import BatchJobRunner, GenAIBatchBackend
+from ..data.run_journal import RunJournal
+
+
+class _ImageJob:
+    """
+    パイプラインで処理する1枚の画像の処理状態
+    
+    各段階の処理結果を保持し、次の段階に引き渡します。resultが設定された時点で処理は完了し、
+    以降の段階は実行されません。
+    """
+    
+    def __init__(
+        self,
+        image_path: Path,
+        index: int = 0,
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3,
+        use_cache: Optional[bool] = None
+    ):
+        self.image_path = image_path
+        self.index = index
+        self.stylists = stylists
+        self.coupons = coupons
+        self.template_count = template_count
+        self.use_cache = use_cache
+        
+        # 処理結果のキャッシュ・実行ジャーナルのキー
+        self.cache_key: Optional[str] = None
+        # 実行ジャーナルから復元した場合・キャッシュから取得した場合はTrue
+        self.restored = False
+        self.cached = False
+        # 画像の処理の期限（イベントループの時刻、制限時間が設定されている場合）
+        self.deadline: Optional[float] = None
+        
+        self.combined: Optional[CombinedAnalysis] = None
+        self.style_analysis: Optional[StyleAnalysisProtocol] = None
+        self.attribute_analysis: Optional[AttributeAnalysisProtocol] = None
+        self.template: Optional[Template] = None
+        self.template_reason: Optional[str] = None
+        self.template_candidates: List[Tuple[Template, str, float]] = []
+        self.stylist: Optional[StylistInfoProtocol] = None
+        self.stylist_reason: Optional[str] = None
+        self.coupon: Optional[CouponInfoProtocol] = None
+        self.coupon_reason: Optional[str] = None
+        self.result: Optional[ProcessResultProtocol] = None
 
 
 class MainProcessor(MainProcessorProtocol):
@@ -56,7 +105,11 @@ class MainProcessor(MainProcessorProtocol):
         max_retries: int = 3,
         retry_delay: float = 1.0,
         use_cache: bool = False,
-        filename_mapping: Dict[str, str] = None
+        filename_mapping: Dict[str, str] = None,
+        journal_dir: Optional[Union[str, Path]] = None,
+        pipeline_config: Optional[PipelineConfig] = None,
+        image_timeout_seconds: Optional[float] = None,
+        run_timeout_seconds: Optional[float] = None
     ):
         """
         初期化
@@ -68,12 +121,16 @@ class MainProcessor(MainProcessorProtocol):
             excel_exporter: Excel出力クラス
             text_exporter: テキスト出力クラス
             cache_manager: キャッシュマネージャー（オプション）
-            batch_size: バッチサイズ
-            api_delay: API呼び出し間の遅延（秒）
+            batch_size: 同時に処理中とする画像数の目安（パイプラインの段階間のキューの長さ）
+            api_delay: API呼び出し間の遅延（秒）（非推奨: 使用されません。レート制限はGeminiConfigのrequests_per_minute等で設定します）
             max_retries: 最大リトライ回数
             retry_delay: リトライ間隔（秒）
             use_cache: キャッシュを使用するかどうか
             filename_mapping: ファイル名のマッピング辞書（オプション）
+            journal_dir: 実行ジャーナルを保存するディレクトリ（オプション、指定時はprocess_imagesの結果を記録して再開可能にする）
+            pipeline_config: パイプラインの段階ごとの同時実行数の設定（オプション）
+            image_timeout_seconds: 1画像の処理の制限時間（秒）（オプション、超過した画像は中断して失敗とする）
+            run_timeout_seconds: 複数画像処理の1回の実行の制限時間（秒）（オプション、超過時は処理中の画像を中断する）
         """
         self.logger = logging.getLogger(__name__)
         self.image_analyzer = image_analyzer
@@ -90,10 +147,22 @@ class MainProcessor(MainProcessorProtocol):
         self.retry_delay = retry_delay
         self.use_cache = use_cache
         self.filename_mapping = filename_mapping or {}
+        self.journal_dir = Path(journal_dir) if journal_dir is not None else None
+        self.pipeline_config = pipeline_config or PipelineConfig()
+        self.image_timeout_seconds = image_timeout_seconds
+        self.run_timeout_seconds = run_timeout_seconds
+        
+        # 直近のprocess_imagesの実行ID（実行ジャーナルが有効な場合）
+        self.run_id: Optional[str] = None
         
         # 画像アナライザーにキャッシュ設定を反映
         self.image_analyzer.use_cache = use_cache
         
+        # テンプレートの再読み込み時に、コンテキストキャッシュに登録したテンプレート一覧を破棄する
+        add_reload_listener = getattr(self.template_matcher.template_manager, "add_reload_listener", None)
+        if add_reload_listener is not None:
+            add_reload_listener(self.image_analyzer.gemini_service.invalidate_context_caches)
+        
         # 処理結果
         self.results: List[ProcessResult] = []
         
@@ -138,11 +207,78 @@ class MainProcessor(MainProcessorProtocol):
         if hasattr(self.text_exporter, 'filename_mapping'):
             self.text_exporter.filename_mapping = mapping
     
-    @cacheable(lambda self, image_path, *args, **kwargs: f"process_result:{image_path.name}")
-    async def process_single_image(self, image_path: Path, stylists=None, coupons=None, template_count: int = 3) -> Optional[ProcessResultProtocol]:
+    def _process_result_cache_key(self, image_path: Path, stylists=None, coupons=None, template_count: int = 3) -> str:
+        """
+        処理結果のキャッシュキーを生成します。
+        
+        画像の内容ハッシュに、モデル名・プロンプトバージョン・カテゴリリスト・テンプレート一覧の内容ハッシュ、
+        および選択対象のスタイリスト・クーポンの全項目を組み合わせます。テンプレートCSVの編集や再読み込み、
+        スタイリスト・クーポン情報の変更の後は別のキーになるため、古い選択結果は返されません。
+        
+        Args:
+            image_path: 画像ファイルのパス
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数
+            
+        Returns:
+            キャッシュキー
+        """
+        gemini_service = self.image_analyzer.gemini_service
+        return content_cache_key(
+            "process_result",
+            image_path,
+            *self.image_analyzer.get_cache_context(),
+            sorted(self.template_matcher.template_manager.get_all_categories()),
+            self.template_matcher.template_manager.get_catalog_hash(),
+            [stylist.model_dump() for stylist in stylists or []],
+            [coupon.model_dump() for coupon in coupons or []],
+            template_count,
+            gemini_service.config.fused_analysis
+        )
+    
+    async def process_single_image(self, image_path: Path, stylists=None, coupons=None, template_count: int = 3, use_cache: Optional[bool] = None) -> Optional[ProcessResultProtocol]:
         """
         単一の画像を処理します。
         
+        Args:
+            image_path: 画像ファイルのパス
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数（デフォルト: 3）
+            use_cache: キャッシュを使用するかどうか（Noneの場合はインスタンスの設定を使用）
+            
+        Returns:
+            処理結果、またはエラー時はNone
+            
+        Raises:
+            ProcessingError: 処理中にエラーが発生した場合
+            ImageError: 画像が無効な場合
+            DeadlineExceededError: 処理が制限時間を超えた場合
+        """
+        try:
+            result = await self._run_with_deadline(
+                _ImageJob(image_path),
+                self._process_single_image_cached(image_path, stylists, coupons, template_count, use_cache=use_cache)
+            )
+        finally:
+            # この画像のAPI呼び出しは終わったため、準備済みの画像データを破棄する
+            self.image_analyzer.gemini_service.release_prepared_image(image_path)
+        
+        # キャッシュは画像の内容で共有されるため、別名でアップロードされた画像の結果はファイル名を差し替える
+        if isinstance(result, ProcessResult):
+            result = self._renamed_result(result, image_path)
+        
+        return result
+    
+    @cacheable(lambda self, image_path, *args, **kwargs: self._process_result_cache_key(image_path, *args, **kwargs))
+    async def _process_single_image_cached(self, image_path: Path, stylists=None, coupons=None, template_count: int = 3) -> Optional[ProcessResultProtocol]:
+        """
+        単一の画像を処理します（キャッシュ対象の本体）。
+        
+        パイプラインと同じ各段階の処理を1枚の画像に対して実行します。画像分析の後、テンプレートマッチングと
+        スタイリスト・クーポン選択は互いに依存しないため並行して実行します。
+        
         Args:
             image_path: 画像ファイルのパス
             stylists: スタイリスト情報のリスト（オプション）
@@ -157,64 +293,13 @@ class MainProcessor(MainProcessorProtocol):
             ImageError: 画像が無効な場合
         """
         self.logger.info(f"画像処理開始: {image_path.name}")
+        job = _ImageJob(image_path, stylists=stylists, coupons=coupons, template_count=template_count)
         
         try:
-            # 0. 画像読み込み段階
             self._update_progress(0, 5, "画像読み込み中")
-            
-            # 1. スタイル分析と属性分析を並列実行
-            self._update_progress(1, 5, "スタイル分析中")
-            categories = self.template_matcher.template_manager.get_all_categories()
-            style_analysis, attribute_analysis = await self.image_analyzer.analyze_full(image_path, categories)
-            
-            if not style_analysis or not attribute_analysis:
-                self.logger.error(f"画像分析に失敗しました: {image_path.name}")
-                return None
-            
-            # 2. テンプレートマッチング
-            self._update_progress(2, 5, "テンプレートマッチング中")
-            
-            # 2.1 単一テンプレートマッチング（従来の機能）
-            template, template_reason = await self._match_template(image_path, style_analysis)
-            
-            if not template:
-                self.logger.error(f"テンプレートマッチングに失敗しました: {image_path.name}")
-                return None
-                
-            # 2.2 複数テンプレートマッチング（新機能）
-            self.logger.info(f"複数テンプレートマッチングを実行します（候補数: {template_count}）")
-            template_candidates = await self._match_multiple_templates(image_path, style_analysis, template_count)
-            
-            if not template_candidates:
-                self.logger.warning(f"複数テンプレートマッチングに失敗しました。単一テンプレートのみを使用します: {image_path.name}")
-                # 単一テンプレートから候補リストを作成（フォールバック）
-                template_candidates = [(template, template_reason, 1.0)]
-            
-            # 3-4. スタイリストとクーポン選択
-            self._update_progress(3, 5, "スタイリスト選択中")
-            stylist_result = await self._select_stylist(image_path, stylists, style_analysis)
-            selected_stylist, stylist_reason = stylist_result if stylist_result else (None, None)
-            
-            self._update_progress(4, 5, "クーポン選択中")
-            coupon_result = await self._select_coupon(image_path, coupons, style_analysis)
-            selected_coupon, coupon_reason = coupon_result if coupon_result else (None, None)
-            
-            # 5. 処理結果作成
-            self._update_progress(5, 5, "タイトル生成中")
-            result = self._create_process_result(
-                image_path=image_path,
-                style_analysis=style_analysis,
-                attribute_analysis=attribute_analysis,
-                template=template,
-                template_reason=template_reason,
-                stylist=selected_stylist,
-                stylist_reason=stylist_reason,
-                coupon=selected_coupon,
-                coupon_reason=coupon_reason,
-                template_candidates=template_candidates
-            )
-            
-            return result
+            await self._workflow_graph(job, analyze=True).run()
+            self._build_job(job)
+            return job.result
             
         except (ProcessingError, GeminiAPIError, ImageError) as e:
             self.logger.error(f"画像処理エラー: {str(e)}")
@@ -223,51 +308,242 @@ class MainProcessor(MainProcessorProtocol):
         except Exception as e:
             self.logger.error(f"予期しないエラー: {str(e)}")
             return None
-    async def _match_template(self, image_path: Path, style_analysis: StyleAnalysisProtocol) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    
+    async def _run_with_deadline(self, job: _ImageJob, step: Awaitable[Any]) -> Any:
         """
-        テンプレートマッチングを実行し、最適なテンプレートを1つ選択します。
+        画像の処理の制限時間内で処理を実行します。
+        
+        制限時間は画像の最初の処理の開始時から数え、パイプラインの各段階で残り時間を引き継ぎます。
+        制限時間を超えた処理はキャンセルされ、実行中のAPI呼び出しも中断されます。
         
         Args:
-            image_path: 画像ファイルのパス
-            style_analysis: スタイル分析結果
+            job: 画像の処理状態
+            step: 実行する処理
             
         Returns:
-            (選択されたテンプレート, 選択理由)のタプル
+            処理の結果
+            
+        Raises:
+            DeadlineExceededError: 処理が制限時間を超えた場合
+        """
+        if self.image_timeout_seconds is None:
+            return await step
+        
+        loop = asyncio.get_running_loop()
+        if job.deadline is None:
+            job.deadline = loop.time() + self.image_timeout_seconds
+        try:
+            return await asyncio.wait_for(step, max(0.0, job.deadline - loop.time()))
+        except asyncio.TimeoutError as e:
+            self.logger.error(f"画像の処理が制限時間（{self.image_timeout_seconds}秒）を超えました: {job.image_path.name}")
+            raise DeadlineExceededError(
+                f"画像の処理が制限時間（{self.image_timeout_seconds}秒）を超えました",
+                image_path=str(job.image_path),
+                timeout_seconds=self.image_timeout_seconds
+            ) from e
+    
+    async def _prepare_job(self, job: _ImageJob, journal: Optional[RunJournal] = None) -> None:
+        """
+        画像読み込み段階: 実行ジャーナル・キャッシュに結果がある場合は復元し、ない場合は画像をAPI送信用に準備します。
+        
+        Args:
+            job: 画像の処理状態
+            journal: 実行ジャーナル（オプション）
+            
+        Raises:
+            ImageError: 画像の読み込みや変換に失敗した場合
+        """
+        use_cache = bool(job.use_cache and self.cache_manager)
+        if journal is not None or use_cache:
+            try:
+                job.cache_key = self._process_result_cache_key(job.image_path, job.stylists, job.coupons, job.template_count)
+            except Exception as e:
+                self.logger.warning(f"処理結果のキーを生成できないため、キャッシュ・実行ジャーナルを使用しません: {job.image_path.name} - {str(e)}")
+        
+        if job.cache_key is not None:
+            recorded = journal.get(job.cache_key) if journal is not None else None
+            if recorded is not None:
+                job.result = self._renamed_result(recorded, job.image_path)
+                job.restored = True
+                return
+            
+            cached = self.cache_manager.get(job.cache_key) if use_cache else None
+            if cached is not None:
+                self.logger.info(f"キャッシュから処理結果を取得: {job.image_path.name}")
+                job.result = self._renamed_result(cached, job.image_path) if isinstance(cached, ProcessResult) else cached
+                job.cached = True
+                return
+        
+        await self.image_analyzer.gemini_service.prepare_image(job.image_path)
+    
+    async def _analyze_job(self, job: _ImageJob) -> None:
+        """
+        画像分析段階: スタイル分析と属性分析を行います。
+        
+        統合分析モードでは1回のAPI呼び出しで全項目を取得し、失敗時は個別の分析にフォールバックします。
+        
+        Args:
+            job: 画像の処理状態
+            
+        Raises:
+            ProcessingError: 画像分析に失敗した場合
+        """
+        if self.image_analyzer.gemini_service.config.fused_analysis:
+            if await self._analyze_combined(job):
+                return
+            self.logger.warning(f"統合分析に失敗したため個別分析にフォールバックします: {job.image_path.name}")
+        
+        # スタイル分析と属性分析を並列実行
+        self._update_progress(1, 5, "スタイル分析中")
+        categories = self.template_matcher.template_manager.get_all_categories()
+        job.style_analysis, job.attribute_analysis = await self.image_analyzer.analyze_full(job.image_path, categories, use_cache=job.use_cache)
+        
+        if not job.style_analysis or not job.attribute_analysis:
+            self.logger.error(f"画像分析に失敗しました: {job.image_path.name}")
+            raise ProcessingError("画像分析に失敗しました", image_path=str(job.image_path))
+    
+    async def _analyze_combined(self, job: _ImageJob) -> bool:
+        """
+        統合分析（1画像1回のAPI呼び出し）で全項目を取得します。
+        
+        Args:
+            job: 画像の処理状態
+            
+        Returns:
+            統合分析で全項目を取得できた場合はTrue
+            
+        Raises:
+            ImageError: 画像が無効な場合
         """
-        # Gemini APIサービスを取得
         gemini_service = self.image_analyzer.gemini_service
+        template_manager = self.template_matcher.template_manager
         
-        # 設定からAIマッチングが有効かどうかを確認
-        ai_matching_enabled = gemini_service.config.template_matching.enabled
-        fallback_on_failure = gemini_service.config.template_matching.fallback_on_failure
-        use_category_filter = gemini_service.config.template_matching.use_category_filter
-        max_templates = gemini_service.config.template_matching.max_templates
-        
-        template = None
-        template_reason = None
-        ai_matching_success = False
-        
-        if ai_matching_enabled:
-            self.logger.info("AIベースのテンプレートマッチングを実行します")
-            template, template_reason, ai_matching_success = await self.template_matcher.find_best_template_with_ai(
-                image_path=image_path,
-                gemini_service=gemini_service,
-                analysis=style_analysis,
-                use_category_filter=use_category_filter,
-                max_templates=max_templates
+        self._update_progress(1, 5, "統合分析中")
+        try:
+            combined = await gemini_service.analyze_combined(
+                job.image_path,
+                template_manager.get_all_categories(),
+                template_manager.get_all_templates(),
+                stylists=job.stylists,
+                coupons=job.coupons,
+                template_count=job.template_count
             )
+        except ImageError:
+            raise
+        except Exception as e:
+            self.logger.warning(f"統合分析エラー: {str(e)}")
+            return False
+        
+        if not combined or not combined.template_candidates:
+            return False
+        
+        best = combined.template_candidates[0]
+        job.combined = combined
+        job.style_analysis = combined.style_analysis
+        job.attribute_analysis = combined.attribute_analysis
+        job.template = best.template
+        job.template_reason = best.reason
+        job.template_candidates = [(c.template, c.reason, c.score) for c in combined.template_candidates]
+        job.stylist, job.stylist_reason = combined.selected_stylist, combined.stylist_reason
+        job.coupon, job.coupon_reason = combined.selected_coupon, combined.coupon_reason
+        return True
+    
+    async def _match_job(self, job: _ImageJob) -> None:
+        """
+        テンプレートマッチング段階: テンプレート候補を順位付けし、順位1を選択テンプレートとします（統合分析済みの場合は何もしません）。
         
-        # AIマッチングが失敗または無効の場合、従来のスコアリングベースのマッチングを使用
-        if not ai_matching_success and (fallback_on_failure or not ai_matching_enabled):
-            self.logger.info("従来のスコアリングベースのテンプレートマッチングを実行します")
-            template = self.template_matcher.find_best_template(style_analysis)
-            template_reason = "スコアリングベースのマッチングにより選択されました"
+        Args:
+            job: 画像の処理状態
+            
+        Raises:
+            ProcessingError: テンプレートマッチングに失敗した場合
+        """
+        if job.combined is not None:
+            return
         
-        return template, template_reason
+        self._update_progress(2, 5, "テンプレートマッチング中")
+        job.template, job.template_reason, job.template_candidates = await self._rank_templates(
+            job.image_path, job.style_analysis, job.template_count
+        )
         
-    async def _match_multiple_templates(self, image_path: Path, style_analysis: StyleAnalysisProtocol, count: int = 3) -> List[Tuple[Dict[str, Any], str, float]]:
+        if not job.template:
+            self.logger.error(f"テンプレートマッチングに失敗しました: {job.image_path.name}")
+            raise ProcessingError("テンプレートマッチングに失敗しました", image_path=str(job.image_path))
+    
+    async def _select_stylist_job(self, job: _ImageJob) -> None:
+        """スタイリスト選択: スタイル分析結果からスタイリストを選択します（統合分析済みの場合は何もしません）。"""
+        if job.combined is not None:
+            return
+        
+        self._update_progress(3, 5, "スタイリスト選択中")
+        stylist_result = await self._select_stylist(job.image_path, job.stylists, job.style_analysis)
+        job.stylist, job.stylist_reason = stylist_result if stylist_result else (None, None)
+    
+    async def _select_coupon_job(self, job: _ImageJob) -> None:
+        """クーポン選択: スタイル分析結果からクーポンを選択します（統合分析済みの場合は何もしません）。"""
+        if job.combined is not None:
+            return
+        
+        self._update_progress(4, 5, "クーポン選択中")
+        coupon_result = await self._select_coupon(job.image_path, job.coupons, job.style_analysis)
+        job.coupon, job.coupon_reason = coupon_result if coupon_result else (None, None)
+    
+    def _workflow_graph(self, job: _ImageJob, analyze: bool = False) -> TaskGraph:
         """
-        複数のテンプレートマッチングを実行し、最適なテンプレートを複数選択します。
+        1枚の画像の処理の依存関係グラフを作成します。
+        
+        テンプレートマッチング・スタイリスト選択・クーポン選択はいずれもスタイル分析結果のみに依存するため、
+        分析の完了後に並行してAPIを呼び出します。
+        
+        Args:
+            job: 画像の処理状態
+            analyze: 画像分析もグラフに含めるかどうか（Falseの場合は分析済みであること）
+            
+        Returns:
+            依存関係グラフ
+        """
+        graph = TaskGraph()
+        depends_on: Tuple[str, ...] = ()
+        if analyze:
+            graph.add("analyze", lambda: self._analyze_job(job))
+            depends_on = ("analyze",)
+        graph.add("match", lambda: self._match_job(job), depends_on)
+        graph.add("stylist", lambda: self._select_stylist_job(job), depends_on)
+        graph.add("coupon", lambda: self._select_coupon_job(job), depends_on)
+        return graph
+    
+    def _build_job(self, job: _ImageJob) -> None:
+        """
+        処理結果作成段階: 各段階の結果から処理結果を作成します。
+        
+        Args:
+            job: 画像の処理状態
+        """
+        self._update_progress(5, 5, "タイトル生成中")
+        job.result = self._create_process_result(
+            image_path=job.image_path,
+            style_analysis=job.style_analysis,
+            attribute_analysis=job.attribute_analysis,
+            template=job.template,
+            template_reason=job.template_reason,
+            stylist=job.stylist,
+            stylist_reason=job.stylist_reason,
+            coupon=job.coupon,
+            coupon_reason=job.coupon_reason,
+            template_candidates=job.template_candidates
+        )
+    
+    async def _rank_templates(
+        self,
+        image_path: Path,
+        style_analysis: StyleAnalysisProtocol,
+        count: int = 3
+    ) -> Tuple[Optional[Template], Optional[str], List[Tuple[Template, str, float]]]:
+        """
+        テンプレート候補を順位付けし、順位1の候補を選択テンプレートとします。
+        
+        AIマッチングが有効な場合は1回のAPI呼び出しで候補を順位付けし、失敗・制限時間超過または無効の場合は
+        従来のスコアリングベースのマッチングで候補を作成します。
         
         Args:
             image_path: 画像ファイルのパス
@@ -275,55 +551,46 @@ class MainProcessor(MainProcessorProtocol):
             count: 選択するテンプレート数（デフォルト: 3）
             
         Returns:
-            [(テンプレート, 選択理由, スコア), ...] のリスト
+            (選択されたテンプレート, 選択理由, [(テンプレート, 選択理由, スコア), ...])のタプル
         """
-        # Gemini APIサービスを取得
-        gemini_service = self.image_analyzer.gemini_service
-        
-        # 設定からAIマッチングが有効かどうかを確認
-        ai_matching_enabled = gemini_service.config.template_matching.enabled
-        fallback_on_failure = gemini_service.config.template_matching.fallback_on_failure
-        use_category_filter = gemini_service.config.template_matching.use_category_filter
-        max_templates = gemini_service.config.template_matching.max_templates
+        # 設定からAIマッチングの設定を取得
+        matching_config = self.image_analyzer.gemini_service.config.template_matching
         
-        template_candidates = []
-        
-        if ai_matching_enabled:
-            self.logger.info(f"AIベースの複数テンプレートマッチングを実行します（候補数: {count}）")
+        if matching_config.enabled:
+            self.logger.info(f"AIベースのテンプレート順位付けを実行します（候補数: {count}）")
             try:
-                template_candidates = await self.template_matcher.find_multiple_templates_with_ai(
-                    image_path=image_path,
-                    gemini_service=gemini_service,
-                    count=count,
-                    analysis=style_analysis,
-                    use_category_filter=use_category_filter,
-                    max_templates=max_templates
+                candidates = await asyncio.wait_for(
+                    self.template_matcher.rank_templates_with_ai(
+                        image_path=image_path,
+                        gemini_service=self.image_analyzer.gemini_service,
+                        count=count,
+                        analysis=style_analysis,
+                        use_category_filter=matching_config.use_category_filter,
+                        max_templates=matching_config.max_templates
+                    ),
+                    matching_config.timeout_seconds
                 )
-                
-                if template_candidates:
-                    self.logger.info(f"AIによる複数テンプレート選択が成功しました: {len(template_candidates)}件")
-                    return [(t, r, s) for t, r, s in template_candidates]
-                    
+                if candidates:
+                    best = candidates[0]
+                    return best.template, best.reason, [(c.template, c.reason, c.score) for c in candidates]
+            except asyncio.TimeoutError:
+                self.logger.error(f"AIによるテンプレート順位付けが制限時間（{matching_config.timeout_seconds}秒）を超えました: {image_path.name}")
             except Exception as e:
-                self.logger.error(f"AIによる複数テンプレート選択中にエラーが発生しました: {str(e)}")
+                self.logger.error(f"AIによるテンプレート順位付け中にエラーが発生しました: {str(e)}")
         
         # AIマッチングが失敗または無効の場合、従来のスコアリングベースのマッチングを使用
-        if not template_candidates and (fallback_on_failure or not ai_matching_enabled):
-            self.logger.info("従来のスコアリングベースの複数テンプレートマッチングを実行します")
-            
-            # 代替テンプレートを検索
-            alternative_templates = self.template_matcher.find_alternative_templates(style_analysis, count)
-            
-            # 結果を整形
-            template_candidates = []
-            for template in alternative_templates:
-                template_candidates.append((
-                    template,
-                    "スコアリングベースのマッチングにより選択されました",
-                    0.5  # デフォルトスコア
-                ))
-        
-        return template_candidates
+        if matching_config.enabled and not matching_config.fallback_on_failure:
+            return None, None, []
+        
+        self.logger.info("従来のスコアリングベースのテンプレートマッチングを実行します")
+        template = self.template_matcher.find_best_template(style_analysis)
+        if not template:
+            return None, None, []
+        
+        reason = "スコアリングベースのマッチングにより選択されました"
+        alternatives = self.template_matcher.find_alternative_templates(style_analysis, count - 1) if count > 1 else []
+        template_candidates = [(template, reason, 1.0)] + [(alternative, reason, 0.5) for alternative in alternatives]
+        return template, reason, template_candidates
     
     async def _select_stylist(self, image_path: Path, stylists: List[StylistInfoProtocol], style_analysis: StyleAnalysisProtocol) -> Optional[Tuple[StylistInfoProtocol, str]]:
         """スタイリスト選択を実行"""
@@ -483,13 +750,344 @@ class MainProcessor(MainProcessorProtocol):
             user_selected_template=None  # 初期状態ではユーザー選択なし
         )
     
-    async def process_images(self, image_paths: List[Path], use_cache: Optional[bool] = None) -> List[ProcessResultProtocol]:
+    def _open_journal(self, run_id: Optional[str]) -> Optional[RunJournal]:
+        """
+        実行ジャーナルを開きます。
+        
+        Args:
+            run_id: 再開する実行ID（省略時は新しい実行IDを生成）
+            
+        Returns:
+            実行ジャーナル、journal_dirが指定されていない場合はNone
+        """
+        if self.journal_dir is None:
+            return None
+        self.run_id = run_id or RunJournal.new_run_id()
+        journal = RunJournal.open(self.journal_dir, self.run_id)
+        self.logger.info(f"実行ID: {self.run_id}（記録済み {len(journal)}件）")
+        return journal
+    
+    def _record_in_journal(self, journal: Optional[RunJournal], key: Optional[str], result: ProcessResultProtocol) -> None:
+        """処理結果を実行ジャーナルに記録します（記録に失敗しても処理は継続します）。"""
+        if journal is None or key is None or not isinstance(result, ProcessResult):
+            return
+        try:
+            journal.record(key, result)
+        except OSError as e:
+            self.logger.error(f"実行ジャーナルへの記録に失敗しました: {result.image_name} - {str(e)}")
+    
+    @staticmethod
+    def _renamed_result(result: ProcessResult, image_path: Path) -> ProcessResult:
+        """内容で共有される結果のファイル名を、処理対象の画像のファイル名に差し替えます。"""
+        if result.image_name != image_path.name:
+            return result.model_copy(update={"image_name": image_path.name, "image_path": str(image_path)})
+        return result
+    
+    async def _prefetch_analyses(self, image_paths: List[Path], use_cache: bool) -> None:
+        """
+        バッチ分析が有効な場合に、画像の分析を1回のリクエストにまとめて先に行います。
+        
+        統合分析モードでは画像ごとに1回の呼び出しで全項目を分析するため、何もしません。
+        分析結果はImageAnalyzerに保持され、各画像のanalyze_fullで使用されます。
+        
+        Args:
+            image_paths: 画像ファイルのパスリスト
+            use_cache: キャッシュを使用するかどうか
+        """
+        if self.image_analyzer.gemini_service.config.fused_analysis:
+            return
+        
+        try:
+            categories = self.template_matcher.template_manager.get_all_categories()
+            await self.image_analyzer.prefetch(image_paths, categories, use_cache=use_cache)
+        except Exception as e:
+            # 先に分析できなかった画像は、各画像の処理で個別に分析する
+            self.logger.warning(f"バッチ分析に失敗したため、画像ごとに分析します: {str(e)}")
+    
+    async def _prefetch_jobs(self, jobs: List[_ImageJob]) -> None:
+        """
+        画像分析段階の一括前処理: 取り出した画像の分析を1回のリクエストにまとめて先に行います。
+        
+        画像の処理の制限時間が設定されている場合は、まとめた画像のうち最も早い期限までに終わらない
+        リクエストを中断します（中断した場合、各画像は残り時間の範囲で個別に分析します）。
+        
+        Args:
+            jobs: 画像の処理状態のリスト
+        """
+        step = self._prefetch_analyses([job.image_path for job in jobs], jobs[0].use_cache)
+        deadlines = [job.deadline for job in jobs if job.deadline is not None]
+        if not deadlines:
+            await step
+            return
+        
+        remaining = max(0.0, min(deadlines) - asyncio.get_running_loop().time())
+        try:
+            await asyncio.wait_for(step, remaining)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"バッチ分析が画像の処理の制限時間を超えたため中断しました（{len(jobs)}枚）")
+    
+    def _create_pipeline(self, journal: Optional[RunJournal] = None) -> StagePipeline:
+        """
+        複数画像処理のパイプラインを作成します。
+        
+        画像読み込み → 画像分析 → テンプレートマッチング・スタイリスト/クーポン選択 → 処理結果作成 の段階を、
+        設定の同時実行数で並行して実行します。テンプレートマッチングとスタイリスト・クーポン選択は、
+        1枚の画像の中でも並行して実行します。バッチ分析が有効な場合、画像分析段階は届いている画像を
+        まとめて1回のリクエストで分析します。画像の処理の制限時間が設定されている場合は、各段階で残り時間を適用します。
+        
+        Args:
+            journal: 実行ジャーナル（オプション）
+            
+        Returns:
+            パイプライン
+        """
+        gemini_config = self.image_analyzer.gemini_service.config
+        batch_config = gemini_config.batch_analysis
+        analysis_batch_size = 1
+        batch_wait = 0.0
+        if not gemini_config.fused_analysis and batch_config.enabled:
+            analysis_batch_size = batch_config.batch_size
+            batch_wait = batch_config.max_wait_seconds
+        
+        # 同時に処理中とする画像数（段階間のキューの長さ）をメモリ使用量から決める
+        queue_size = calculate_optimal_batch_size(
+            memory_per_item_mb=5,  # 1画像あたりの推定メモリ使用量
+            max_batch_size=self.batch_size
+        )
+        
+        config = self.pipeline_config
+        return StagePipeline(
+            [
+                PipelineStage(
+                    "画像読み込み",
+                    lambda job: self._run_with_deadline(job, self._prepare_job(job, journal)),
+                    config.prepare_concurrency
+                ),
+                PipelineStage(
+                    "画像分析",
+                    lambda job: self._run_with_deadline(job, self._analyze_job(job)),
+                    config.analysis_concurrency,
+                    batch_size=analysis_batch_size,
+                    before_batch=self._prefetch_jobs,
+                    batch_wait=batch_wait
+                ),
+                PipelineStage(
+                    "テンプレートマッチング・スタイリスト/クーポン選択",
+                    lambda job: self._run_with_deadline(job, self._workflow_graph(job).run()),
+                    config.matching_concurrency
+                ),
+                PipelineStage("処理結果作成", self._finish_job)
+            ],
+            queue_size=max(queue_size, analysis_batch_size),
+            skip=lambda job: job.result is not None
+        )
+    
+    async def _finish_job(self, job: _ImageJob) -> None:
+        """処理結果作成段階: 処理結果を作成し、キャッシュを使用する場合は保存します。"""
+        self._build_job(job)
+        if job.use_cache and self.cache_manager and job.cache_key is not None:
+            self.cache_manager.set(job.cache_key, job.result)
+    
+    async def _iter_jobs(
+        self,
+        image_paths: List[Path],
+        use_cache: Optional[bool] = None,
+        run_id: Optional[str] = None,
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3,
+        on_event: Optional[Callable[[ProcessEvent], None]] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> AsyncIterator[_ImageJob]:
+        """
+        画像をパイプラインで処理し、処理が完了した画像の処理状態を完了した順に返します。
+        
+        失敗した画像は返さず、ログとon_eventで通知します。完了した画像は実行ジャーナルに記録します。
+        cancel_tokenがキャンセルされた場合、または実行の制限時間を超えた場合は、処理中の画像（実行中のAPI呼び出し）を
+        キャンセルし、未処理の画像を中止としてon_eventで通知して終了します。
+        
+        Args:
+            image_paths: 画像ファイルのパスリスト
+            use_cache: キャッシュを使用するかどうか（Noneの場合はインスタンスの設定を使用）
+            run_id: 再開する実行ID（省略時は新しい実行IDを生成し、self.run_idに設定）
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数（デフォルト: 3）
+            on_event: 画像ごとの進捗イベントを受け取る関数（オプション）
+            cancel_token: 処理を中止するためのキャンセルトークン（オプション）
+            
+        Yields:
+            処理が完了した画像の処理状態
+        """
+        journal = self._open_journal(run_id)
+        
+        # キャッシュを使用するかどうかの判定
+        should_use_cache = self.use_cache if use_cache is None else use_cache
+        
+        jobs = [
+            _ImageJob(image_path, index, stylists=stylists, coupons=coupons, template_count=template_count, use_cache=should_use_cache)
+            for index, image_path in enumerate(image_paths)
+        ]
+        
+        # 呼び出し元のキャンセルと実行の制限時間のいずれかで、この実行を中止する
+        run_token = CancellationToken()
+        unlink_token = None
+        if cancel_token is not None:
+            unlink_token = cancel_token.add_callback(lambda: run_token.cancel(cancel_token.reason))
+        run_timer = None
+        if self.run_timeout_seconds is not None:
+            run_timer = asyncio.get_running_loop().call_later(
+                self.run_timeout_seconds, run_token.cancel, f"実行の制限時間（{self.run_timeout_seconds}秒）を超えました"
+            )
+        
+        completed = 0
+        finished: Set[int] = set()
+        outcomes = self._create_pipeline(journal).run(jobs, cancel_token=run_token)
+        try:
+            async for job, error in outcomes:
+                completed += 1
+                finished.add(job.index)
+                # この画像のAPI呼び出しは終わったため、準備済みの画像データを破棄する
+                self.image_analyzer.gemini_service.release_prepared_image(job.image_path)
+                
+                if error is not None:
+                    self.logger.error(f"画像処理中にエラーが発生しました: {job.image_path.name} - {str(error)}")
+                    status = "failed"
+                elif job.restored:
+                    status = "restored"
+                else:
+                    # 完了した画像をジャーナルに記録
+                    self._record_in_journal(journal, job.cache_key, job.result)
+                    status = "cached" if job.cached else "processed"
+                
+                if on_event is not None:
+                    on_event(ProcessEvent(
+                        image_name=job.image_path.name,
+                        image_path=str(job.image_path),
+                        status=status,
+                        completed=completed,
+                        total=len(jobs),
+                        error=str(error) if error is not None else None
+                    ))
+                
+                if error is None:
+                    yield job
+            
+            if run_token.cancelled:
+                self.logger.warning(f"処理を中止しました（{run_token.reason}）: 完了 {completed}/{len(jobs)}枚")
+                for job in jobs:
+                    if job.index not in finished and on_event is not None:
+                        on_event(ProcessEvent(
+                            image_name=job.image_path.name,
+                            image_path=str(job.image_path),
+                            status="cancelled",
+                            completed=completed,
+                            total=len(jobs),
+                            error=run_token.reason
+                        ))
+        finally:
+            # 中断された場合は処理中の画像をキャンセルする
+            await outcomes.aclose()
+            if run_timer is not None:
+                run_timer.cancel()
+            if unlink_token is not None:
+                unlink_token()
+            
+            # 完了した画像の結果をキャッシュの永続層に書き込む（実行ジャーナルは記録時に書き込み済み）
+            flush = getattr(self.cache_manager, "flush", None)
+            if callable(flush):
+                try:
+                    flush()
+                except Exception as e:
+                    self.logger.error(f"キャッシュの書き込みに失敗しました: {str(e)}")
+            
+            # 処理中にメモ化した前処理済み画像と、使用されなかったバッチ分析の結果を破棄
+            self.image_analyzer.gemini_service.release_prepared_images()
+            self.image_analyzer.clear_prefetched()
+    
+    async def iter_process(
+        self,
+        image_paths: List[Path],
+        use_cache: Optional[bool] = None,
+        run_id: Optional[str] = None,
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3,
+        on_event: Optional[Callable[[ProcessEvent], None]] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> AsyncIterator[ProcessResultProtocol]:
+        """
+        複数の画像を処理し、処理結果を画像の処理が完了した順に返します。
+        
+        全画像の完了を待たずに結果を受け取れるため、表示や出力を先に始められます。
+        結果を受け取る側が次の結果を要求するまでは、段階間のキューが埋まった時点で新しい画像の処理を止めます。
+        途中でやめる場合は、ジェネレーターを閉じる（aclose()を呼び出す）か実行中のタスクをキャンセルすると、
+        処理中の画像をキャンセルします。cancel_tokenをキャンセルした場合（他のスレッドからも可能）や、
+        実行の制限時間を超えた場合も、処理中の画像をキャンセルして終了します。
+        完了した画像の結果はself.resultsと実行ジャーナルに残ります。
+        
+        Args:
+            image_paths: 画像ファイルのパスリスト
+            use_cache: キャッシュを使用するかどうか（Noneの場合はインスタンスの設定を使用）
+            run_id: 再開する実行ID（省略時は新しい実行IDを生成し、self.run_idに設定）
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数（デフォルト: 3）
+            on_event: 画像ごとの進捗イベント（失敗・中止を含む）を受け取る関数（オプション）
+            cancel_token: 処理を中止するためのキャンセルトークン（オプション）
+            
+        Yields:
+            処理結果
+        """
+        self.logger.info(f"複数画像処理開始: {len(image_paths)}枚")
+        
+        # 結果リストをクリア
+        self.results = []
+        
+        if not image_paths:
+            self.logger.warning("処理する画像がありません")
+            return
+        
+        jobs = self._iter_jobs(image_paths, use_cache, run_id, stylists, coupons, template_count, on_event, cancel_token)
+        try:
+            async for job in jobs:
+                self.results.append(job.result)
+                yield job.result
+        finally:
+            await jobs.aclose()
+        
+        self.logger.info(f"複数画像処理完了: {len(self.results)}/{len(image_paths)}枚")
+    
+    async def process_images(
+        self,
+        image_paths: List[Path],
+        use_cache: Optional[bool] = None,
+        run_id: Optional[str] = None,
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> List[ProcessResultProtocol]:
         """
         複数の画像を処理します。
         
+        画像は段階ごとのパイプラインで処理され、処理の遅い画像があっても他の画像は次の段階へ進みます。
+        スタイリスト・クーポン情報を指定した場合は、各画像でスタイリストとクーポンも選択します。
+        結果は入力の順に並べて返します（完了した順に受け取る場合はiter_processを使用します）。
+        
+        実行ジャーナルが有効な場合（journal_dirを指定した場合）は、画像ごとの処理結果を実行IDのジャーナルに記録します。
+        中断後に同じ実行IDで再実行すると、記録済みの画像は処理せずにジャーナルの結果を使用します。
+        cancel_tokenがキャンセルされた場合や実行の制限時間を超えた場合は、処理中の画像を中断し、
+        それまでに完了した画像の結果を返します。
+        
         Args:
             image_paths: 画像ファイルのパスリスト
             use_cache: キャッシュを使用するかどうか（Noneの場合はインスタンスの設定を使用）
+            run_id: 再開する実行ID（省略時は新しい実行IDを生成し、self.run_idに設定）
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数（デフォルト: 3）
+            cancel_token: 処理を中止するためのキャンセルトークン（オプション）
             
         Returns:
             処理結果のリスト
@@ -503,57 +1101,30 @@ class MainProcessor(MainProcessorProtocol):
             self.logger.warning("処理する画像がありません")
             return []
         
-        # 最適なバッチサイズを計算
-        optimal_batch_size = calculate_optimal_batch_size(
-            memory_per_item_mb=5,  # 1画像あたりの推定メモリ使用量
-            max_batch_size=self.batch_size
-        )
-        
-        self.logger.info(f"バッチサイズを設定: {optimal_batch_size}")
-        
-        # 画像をバッチに分割
         total_images = len(image_paths)
-        batch_count = (total_images + optimal_batch_size - 1) // optimal_batch_size
-        batches = [image_paths[i:i + optimal_batch_size] for i in range(0, total_images, optimal_batch_size)]
-        
-        # キャッシュを使用するかどうかの判定
-        should_use_cache = self.use_cache if use_cache is None else use_cache
+        results: List[Optional[ProcessResultProtocol]] = [None] * total_images
+        status_labels = {"processed": "処理", "cached": "キャッシュ", "restored": "記録済み", "failed": "エラー", "cancelled": "中止"}
         
         # 非同期コンテキストマネージャーを使用して進捗を追跡
         async def progress_handler(current, total, message):
             # このメソッドは、後方互換性のために進捗コールバックを呼び出します
             self._update_progress(current, total, message)
         
-        processed_count = 0
-        
         # 進捗トラッカーを使用して処理を実行
         async with progress_tracker(total_images, progress_handler) as tracker:
-            # バッチごとに処理
-            for batch_index, batch in enumerate(batches):
-                batch_message = f"バッチ {batch_index + 1}/{batch_count} 処理中"
-                self.logger.info(batch_message)
-                tracker.update(processed_count, batch_message)
-                
-                # バッチ内の画像を並列処理
-                tasks = [self.process_single_image(image_path, use_cache=should_use_cache) for image_path in batch]
-                batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # 結果の処理
-                for i, result in enumerate(batch_results):
-                    if isinstance(result, Exception):
-                        # エラーをログに記録
-                        self.logger.error(f"画像処理中にエラーが発生しました: {str(result)}")
-                        # エラーが発生した画像のパスを取得
-                        error_image = batch[i].name if i < len(batch) else "不明"
-                        tracker.update(processed_count + i + 1, f"エラー: {error_image}")
-                    elif result:
-                        # 正常な結果を追加
-                        self.results.append(result)
-                    
-                    processed_count += 1
-                    tracker.update(processed_count)
-        
-        # 結果を返す
+            def on_event(event: ProcessEvent) -> None:
+                tracker.update(event.completed, f"{status_labels[event.status]}: {event.image_name}")
+            
+            jobs = self._iter_jobs(image_paths, use_cache, run_id, stylists, coupons, template_count, on_event, cancel_token)
+            try:
+                async for job in jobs:
+                    results[job.index] = job.result
+            finally:
+                await jobs.aclose()
+        
+        self.results = [result for result in results if result]
+        
+        self.logger.info(f"複数画像処理完了: {len(self.results)}/{total_images}枚")
         return self.results
     
     async def process_images_with_external_data(
@@ -561,204 +1132,145 @@ class MainProcessor(MainProcessorProtocol):
         image_paths: List[Path],
         stylists: List[StylistInfoProtocol],
         coupons: List[CouponInfoProtocol],
-        use_cache: Optional[bool] = None
+        use_cache: Optional[bool] = None,
+        template_count: int = 3,
+        run_id: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None
     ) -> List[ProcessResultProtocol]:
         """
         外部データ（スタイリスト・クーポン情報）を使用して複数の画像を処理します。
         
+        process_imagesと同じパイプラインで処理し、各画像でスタイリストとクーポンも選択します。
+        
         Args:
             image_paths: 画像ファイルのパスリスト
             stylists: スタイリスト情報のリスト
             coupons: クーポン情報のリスト
+            use_cache: キャッシュを使用するかどうか（Noneの場合はインスタンスの設定を使用）
+            template_count: 選択するテンプレート数（デフォルト: 3）
+            run_id: 再開する実行ID（省略時は新しい実行IDを生成し、self.run_idに設定）
+            cancel_token: 処理を中止するためのキャンセルトークン（オプション）
             
         Returns:
             処理結果のリスト
         """
         self.logger.info(f"外部データを使用した複数画像処理開始: {len(image_paths)}枚")
         
-        # 結果リストをクリア
-        self.results = []
-        
-        if not image_paths:
-            self.logger.warning("処理する画像がありません")
-            return []
-        
         if not stylists:
             self.logger.warning("スタイリスト情報がありません")
+            self.results = []
             return []
         
         if not coupons:
             self.logger.warning("クーポン情報がありません")
+            self.results = []
             return []
         
-        # 最適なバッチサイズを計算
-        optimal_batch_size = calculate_optimal_batch_size(
-            memory_per_item_mb=5,  # 1画像あたりの推定メモリ使用量
-            max_batch_size=self.batch_size
+        return await self.process_images(
+            image_paths,
+            use_cache=use_cache,
+            run_id=run_id,
+            stylists=stylists,
+            coupons=coupons,
+            template_count=template_count,
+            cancel_token=cancel_token
         )
+    
+    async def process_images_offline(
+        self,
+        image_paths: List[Path],
+        job_dir: Path,
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3,
+        backend: Optional[BatchJobBackendProtocol] = None
+    ) -> List[ProcessResultProtocol]:
+        """
+        オフラインのバッチジョブで複数の画像を処理します。
         
-        self.logger.info(f"バッチサイズを設定: {optimal_batch_size}")
+        全画像の統合分析リクエストを1つのバッチジョブとして送信し、完了後に結果を処理結果に変換します。
+        応答時間は長くなりますが、通常の呼び出しより費用・クォータの消費を抑えられます。
+        ジョブの状態はjob_dirに保存され、プロセスが再起動しても同じjob_dirで再実行すると再開します。
+        バッチジョブで結果を取得できなかった画像は、設定に応じて通常の呼び出しで処理します。
         
-        # 画像をバッチに分割
-        total_images = len(image_paths)
-        batch_count = (total_images + optimal_batch_size - 1) // optimal_batch_size
-        batches = [image_paths[i:i + optimal_batch_size] for i in range(0, total_images, optimal_batch_size)]
+        Args:
+            image_paths: 画像ファイルのパスリスト
+            job_dir: ジョブディレクトリ
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数（デフォルト: 3）
+            backend: バッチジョブのバックエンド（省略時はGemini Batch APIを使用）
+            
+        Returns:
+            処理結果のリスト（入力順）
+            
+        Raises:
+            GeminiAPIError: ジョブが失敗した場合、または完了の待機時間を超過した場合
+        """
+        self.logger.info(f"バッチジョブによる複数画像処理開始: {len(image_paths)}枚")
         
-        # キャッシュを使用するかどうかの判定
-        should_use_cache = self.use_cache if use_cache is None else use_cache
+        # 結果リストをクリア
+        self.results = []
         
-        # 非同期コンテキストマネージャーを使用して進捗を追跡
-        async def progress_handler(current, total, message):
-            # このメソッドは、後方互換性のために進捗コールバックを呼び出します
-            self._update_progress(current, total, message)
+        if not image_paths:
+            self.logger.warning("処理する画像がありません")
+            return []
         
-        processed_count = 0
+        gemini_service = self.image_analyzer.gemini_service
+        template_manager = self.template_matcher.template_manager
+        config = gemini_service.config.batch_job
+        runner = BatchJobRunner(gemini_service, backend or GenAIBatchBackend(gemini_service.config.api_key), config)
         
-        # 進捗トラッカーを使用して処理を実行
-        async with progress_tracker(total_images, progress_handler) as tracker:
-            # バッチごとに処理
-            for batch_index, batch in enumerate(batches):
-                batch_message = f"バッチ {batch_index + 1}/{batch_count} 処理中"
-                self.logger.info(batch_message)
-                tracker.update(processed_count, batch_message)
+        # 結果ファイルの順序は入力順とは限らないため、入力順の位置に格納する
+        positions: Dict[Path, List[int]] = {}
+        for index, image_path in enumerate(image_paths):
+            positions.setdefault(image_path, []).append(index)
+        results: List[Optional[ProcessResultProtocol]] = [None] * len(image_paths)
+        
+        failed: List[Tuple[int, Path]] = []
+        try:
+            async for image_path, outcome in runner.run(
+                job_dir,
+                image_paths,
+                template_manager.get_all_categories(),
+                template_manager.get_all_templates(),
+                stylists=stylists,
+                coupons=coupons,
+                template_count=template_count
+            ):
+                index = positions[image_path].pop(0)
+                if isinstance(outcome, Exception):
+                    self.logger.warning(f"バッチジョブの結果を取得できませんでした: {image_path.name} - {str(outcome)}")
+                    failed.append((index, image_path))
+                    continue
                 
-                # バッチ内の各画像を順次処理
-                for image_path in batch:
+                best = outcome.template_candidates[0]
+                results[index] = self._create_process_result(
+                    image_path=image_path,
+                    style_analysis=outcome.style_analysis,
+                    attribute_analysis=outcome.attribute_analysis,
+                    template=best.template,
+                    template_reason=best.reason,
+                    stylist=outcome.selected_stylist,
+                    stylist_reason=outcome.stylist_reason,
+                    coupon=outcome.selected_coupon,
+                    coupon_reason=outcome.coupon_reason,
+                    template_candidates=[(c.template, c.reason, c.score) for c in outcome.template_candidates]
+                )
+            
+            if failed and config.fallback_online:
+                self.logger.info(f"バッチジョブで処理できなかった画像を通常の呼び出しで処理します: {len(failed)}枚")
+                for index, image_path in failed:
                     try:
-                        # キャッシュを使用するかどうかの判定
-                        should_use_cache = self.use_cache if use_cache is None else use_cache
-                        
-                        # キャッシュチェック（キャッシュを使用する場合のみ）
-                        if should_use_cache and self.cache_manager:
-                            cache_key = f"process_result_ext:{image_path.name}"
-                            cached_result = self.cache_manager.get(cache_key)
-                            if cached_result:
-                                self.logger.info(f"キャッシュから処理結果を取得: {image_path.name}")
-                                self.results.append(cached_result)
-                                processed_count += 1
-                                tracker.update(processed_count, f"キャッシュ: {image_path.name}")
-                                continue
-                        
-                        # 1. スタイル分析と属性分析を並列実行
-                        categories = self.template_matcher.template_manager.get_all_categories()
-                        style_analysis, attribute_analysis = await self.image_analyzer.analyze_full(image_path, categories, use_cache=should_use_cache)
-                        
-                        if not style_analysis or not attribute_analysis:
-                            self.logger.error(f"画像分析に失敗しました: {image_path.name}")
-                            processed_count += 1
-                            tracker.update(processed_count, f"分析失敗: {image_path.name}")
-                            continue
-                        
-                        # 2. テンプレートマッチング
-                        template = self.template_matcher.find_best_template(style_analysis)
-                        
-                        if not template:
-                            self.logger.error(f"テンプレートマッチングに失敗しました: {image_path.name}")
-                            processed_count += 1
-                            tracker.update(processed_count, f"マッチング失敗: {image_path.name}")
-                            continue
-                        
-                        # 3. スタイリスト選択
-                        stylist_result = await self.style_matcher.select_stylist(
-                            image_path, stylists, style_analysis
-                        )
-                        selected_stylist, stylist_reason = stylist_result
-                        
-                        # 4. クーポン選択
-                        coupon_result = await self.style_matcher.select_coupon(
-                            image_path, coupons, style_analysis
-                        )
-                        selected_coupon, coupon_reason = coupon_result
-                        
-                        # 5. 処理結果の作成
-                        try:
-                            # スタイル分析が辞書型の場合はStyleAnalysisに変換
-                            if isinstance(style_analysis, dict):
-                                from ..data.models import StyleAnalysis, StyleFeatures
-                                features = StyleFeatures(**style_analysis.get('features', {}))
-                                style_analysis = StyleAnalysis(
-                                    category=style_analysis.get('category', ''),
-                                    features=features,
-                                    keywords=style_analysis.get('keywords', [])
-                                )
-                            
-                            # 属性分析が辞書型の場合はAttributeAnalysisに変換
-                            if isinstance(attribute_analysis, dict):
-                                from ..data.models import AttributeAnalysis
-                                attribute_analysis = AttributeAnalysis(
-                                    sex=attribute_analysis.get('sex', ''),
-                                    length=attribute_analysis.get('length', '')
-                                )
-                            
-                            # スタイリストが辞書型の場合はStylistInfoに変換
-                            if isinstance(selected_stylist, dict):
-                                from ..data.models import StylistInfo
-                                selected_stylist = StylistInfo(
-                                    name=selected_stylist.get('name', 'サンプルスタイリスト'),
-                                    specialties=selected_stylist.get('specialties', ''),
-                                    description=selected_stylist.get('description', '')
-                                )
-                            
-                            # クーポンが辞書型の場合はCouponInfoに変換
-                            if isinstance(selected_coupon, dict):
-                                from ..data.models import CouponInfo
-                                selected_coupon = CouponInfo(
-                                    name=selected_coupon.get('name', 'サンプルクーポン'),
-                                    price=selected_coupon.get('price', 0),
-                                    description=selected_coupon.get('description', ''),
-                                    categories=selected_coupon.get('categories', []),
-                                    conditions=selected_coupon.get('conditions', {})
-                                )
-                            
-                            # テンプレートが辞書型の場合はTemplateに変換
-                            if isinstance(template, dict):
-                                from ..data.models import Template
-                                template = Template(
-                                    category=template.get('category', ''),
-                                    title=template.get('title', ''),
-                                    menu=template.get('menu', ''),
-                                    comment=template.get('comment', ''),
-                                    hashtag=template.get('hashtag', '')
-                                )
-                            
-                            result = ProcessResult(
-                                image_name=image_path.name,
-                                style_analysis=style_analysis,
-                                attribute_analysis=attribute_analysis,
-                                selected_template=template,
-                                selected_stylist=selected_stylist,
-                                selected_coupon=selected_coupon,
-                                processed_at=datetime.now()
-                            )
-                        except Exception as e:
-                            self.logger.error(f"処理結果の作成に失敗しました: {str(e)}")
-                        
-                        # 結果をキャッシュに保存
-                        if self.cache_manager:
-                            self.cache_manager.set(cache_key, result)
-                        
-                        # 結果を追加
-                        self.results.append(result)
-                        self.logger.info(f"画像処理完了: {image_path.name}")
-                        
+                        results[index] = await self.process_single_image(image_path, stylists, coupons, template_count)
                     except Exception as e:
                         self.logger.error(f"画像 {image_path.name} の処理中にエラーが発生しました: {str(e)}")
-                    
-                    # 進捗更新
-                    processed_count += 1
-                    tracker.update(processed_count, f"処理: {image_path.name}")
-                    
-                    # APIレート制限に対応するための遅延
-                    await asyncio.sleep(self.api_delay)
-                
-                # バッチ間の遅延
-                if batch_index < len(batches) - 1:
-                    await asyncio.sleep(self.api_delay * 2)
+        finally:
+            gemini_service.release_prepared_images()
         
-        # 最終進捗更新
-        tracker.update(total_images, total_images, f"処理完了: {len(self.results)}/{total_images}枚")
+        self.results = [result for result in results if result]
         
-        self.logger.info(f"外部データを使用した複数画像処理完了: {len(self.results)}/{total_images}枚")
+        self.logger.info(f"バッチジョブによる複数画像処理完了: {len(self.results)}/{len(image_paths)}枚")
         return self.results
     
     def export_to_excel(self, output_path: Path) -> Path:
@@ -11,10 +11,11 @@ import random
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Tuple, Set
 
-from ..data.models import Template
+from ..data.models import Template, TemplateCandidate
 from ..data.interfaces import StyleAnalysisProtocol, TemplateManagerProtocol
 from ..utils.errors import TemplateError, GeminiAPIError, with_error_handling
 from ..services.gemini.gemini_service import GeminiService
+from .template_ranker import TemplateRanker
 
 
 class TemplateMatcher:
@@ -34,6 +35,7 @@ class TemplateMatcher:
         """
         self.logger = logging.getLogger(__name__)
         self.template_manager = template_manager
+        self.ranker = TemplateRanker()
     
     @with_error_handling(TemplateError, "テンプレートマッチング処理でエラーが発生しました")
     def find_best_template(self, analysis: StyleAnalysisProtocol) -> Optional[Template]:
@@ -183,6 +185,30 @@ class TemplateMatcher:
             return random.choice(templates)
         return None
 
+    def _shortlist_templates(
+        self,
+        templates: List[Template],
+        analysis: Optional[StyleAnalysisProtocol],
+        max_templates: int
+    ) -> Tuple[List[Template], bool]:
+        """
+        AIに送信するテンプレートを、分析結果との関連度（BM25）の高い順にmax_templates件まで絞り込みます。
+        
+        Args:
+            templates: 候補のテンプレートリスト
+            analysis: 画像分析結果（オプション、ない場合は先頭からmax_templates件）
+            max_templates: AIに送信する最大テンプレート数
+            
+        Returns:
+            (絞り込んだテンプレートリスト, 画像ごとに順位付けしたかどうか)のタプル
+        """
+        if len(templates) <= max_templates:
+            return templates, False
+        
+        shortlist = self.ranker.shortlist(templates, analysis, max_templates)
+        self.logger.info(f"テンプレートを絞り込みました: {len(templates)}件 → {len(shortlist)}件")
+        return shortlist, analysis is not None
+    
     async def find_best_template_with_ai(
         self,
         image_path: Path,
@@ -206,46 +232,13 @@ class TemplateMatcher:
         """
         self.logger.info(f"AIによるテンプレートマッチング開始: 画像={image_path.name}")
         
-        # 利用可能なすべてのカテゴリを取得
-        available_categories = self.template_manager.get_all_categories()
-        
-        # 最適なカテゴリの決定
-        selected_category = None
-        
-        if analysis and use_category_filter:
-            # 既存の分析結果からカテゴリを取得
-            selected_category = analysis.category
-            self.logger.info(f"分析結果から取得したカテゴリ: {selected_category}")
-        
-        # カテゴリが不明または利用可能なカテゴリに含まれていない場合、AIに選んでもらう
-        if not selected_category or selected_category not in available_categories:
-            try:
-                selected_category = await gemini_service.get_matching_category(image_path, available_categories)
-                self.logger.info(f"AIが選択したカテゴリ: {selected_category}")
-            except Exception as e:
-                self.logger.error(f"カテゴリ選択中にエラーが発生しました: {str(e)}")
-                
-                # エラー時はデフォルトカテゴリまたは最初のカテゴリを使用
-                if available_categories:
-                    selected_category = available_categories[0]
-                    self.logger.warning(f"エラーによりデフォルトカテゴリを使用します: {selected_category}")
-                else:
-                    self.logger.error("利用可能なカテゴリがありません")
-                    return None, "利用可能なカテゴリがありません", False
-        
-        # 選択されたカテゴリのテンプレートを取得
-        templates = self.template_manager.get_templates_by_category(selected_category)
-        self.logger.info(f"カテゴリ '{selected_category}' で検索: {len(templates)}件のテンプレート")
-        
-        # カテゴリに一致するテンプレートがない場合は全テンプレートを使用
+        templates, error_message = await self._resolve_templates(image_path, gemini_service, analysis, use_category_filter)
         if not templates:
-            self.logger.warning(f"カテゴリ '{selected_category}' に一致するテンプレートがありません。全テンプレートを使用します。")
-            templates = self.template_manager.get_all_templates()
-            self.logger.info(f"全テンプレートを使用: {len(templates)}件")
+            self.logger.error(error_message)
+            return None, error_message, False
         
-        if not templates:
-            self.logger.error("テンプレートが見つかりません")
-            return None, "テンプレートが見つかりません", False
+        # AIに送信するテンプレートを関連度の高い上位max_templates件に絞り込む
+        templates, shortlisted = self._shortlist_templates(templates, analysis, max_templates)
         
         # GeminiServiceを使用してテンプレート選択
         try:
@@ -253,7 +246,8 @@ class TemplateMatcher:
                 image_path=image_path,
                 templates=templates,
                 analysis=analysis,
-                category_filter=use_category_filter
+                category_filter=use_category_filter,
+                cache_catalog=not shortlisted
             )
             
             selected_template = templates[template_id]
@@ -275,6 +269,87 @@ class TemplateMatcher:
             self.logger.error(f"AIによるテンプレート選択中に予期しないエラーが発生しました: {str(e)}")
             return None, f"予期しないエラー: {str(e)}", False
             
+    async def rank_templates_with_ai(
+        self,
+        image_path: Path,
+        gemini_service: GeminiService,
+        count: int = 3,
+        analysis: Optional[StyleAnalysisProtocol] = None,
+        use_category_filter: bool = True,
+        max_templates: int = 50
+    ) -> List[TemplateCandidate]:
+        """
+        Gemini AIを使って、1回の呼び出しでテンプレート候補を順位付けします。
+        
+        最適なテンプレートは順位1の候補（is_selected=True）であり、最適なテンプレートの選択と
+        複数候補の選択を別々に呼び出す必要はありません。
+        
+        Args:
+            image_path: 画像ファイルのパス
+            gemini_service: Gemini APIサービスインスタンス
+            count: 選択するテンプレート数（デフォルト: 3）
+            analysis: 画像分析結果（オプション、指定がない場合はAI選択のみで実行）
+            use_category_filter: カテゴリでテンプレートをフィルタするかどうか
+            max_templates: AIに送信する最大テンプレート数
+            
+        Returns:
+            スコアの降順に並んだテンプレート候補のリスト（テンプレートがない場合は空リスト）
+            
+        Raises:
+            TemplateError: テンプレート処理中にエラーが発生した場合
+        """
+        self.logger.info(f"AIによるテンプレート順位付け開始: 画像={image_path.name}, 候補数={count}")
+        
+        templates, error_message = await self._resolve_templates(image_path, gemini_service, analysis, use_category_filter)
+        if not templates:
+            self.logger.error(error_message)
+            return []
+        
+        # AIに送信するテンプレートを関連度の高い上位max_templates件（最低でも候補数）に絞り込む
+        templates, shortlisted = self._shortlist_templates(templates, analysis, max(max_templates, count))
+        
+        # GeminiServiceを使用して複数テンプレート選択
+        try:
+            template_results = await gemini_service.select_multiple_templates(
+                image_path=image_path,
+                templates=templates,
+                count=count,
+                analysis=analysis,
+                category_filter=use_category_filter,
+                cache_catalog=not shortlisted
+            )
+        except ValueError as e:
+            # テンプレートリストが空など、値関連のエラー
+            self.logger.error(f"値エラーが発生しました: {str(e)}")
+            raise TemplateError(f"テンプレート選択エラー: {str(e)}")
+            
+        except GeminiAPIError as e:
+            # GeminiAPI関連のエラー
+            self.logger.error(f"GeminiAPIエラーが発生しました: {str(e)}")
+            raise TemplateError(f"GeminiAPIエラー: {str(e)}")
+            
+        except Exception as e:
+            # その他の予期しないエラー
+            self.logger.error(f"AIによる複数テンプレート選択中に予期しないエラーが発生しました: {str(e)}")
+            raise TemplateError(f"予期しないエラー: {str(e)}")
+        
+        # 結果を整形
+        candidates = []
+        for template_id, reason, score in template_results:
+            # テンプレートIDの範囲チェック
+            if template_id < 0 or template_id >= len(templates):
+                self.logger.warning(f"無効なテンプレートID: {template_id}、スキップします")
+                continue
+            candidates.append(TemplateCandidate(template=templates[template_id], reason=reason, score=score))
+        
+        # スコアの降順（同点はAIの回答順）に並べ、順位1を選択状態にする
+        candidates.sort(key=lambda c: c.score, reverse=True)
+        if candidates:
+            candidates[0].is_selected = True
+        
+        self.logger.info(f"AIがテンプレートを順位付けしました: {len(candidates)}件")
+        return candidates
+    
     async def find_multiple_templates_with_ai(
         self,
         image_path: Path,
@@ -287,8 +362,7 @@ class TemplateMatcher:
         """
         Gemini AIを使って複数の最適なテンプレートを選択します。
         
-        このメソッドは、画像に最も適した複数のテンプレートを選択します。
-        画像分析結果が提供されている場合は、その情報も考慮されます。
+        rank_templates_with_aiの結果を(テンプレート, 選択理由, スコア)のタプルで返します。
         
         Args:
             image_path: 画像ファイルのパス
@@ -304,8 +378,33 @@ class TemplateMatcher:
         Raises:
             TemplateError: テンプレート処理中にエラーが発生した場合
         """
-        self.logger.info(f"AIによる複数テンプレート選択開始: 画像={image_path.name}, 候補数={count}")
+        candidates = await self.rank_templates_with_ai(
+            image_path, gemini_service, count, analysis, use_category_filter, max_templates
+        )
+        return [(candidate.template, candidate.reason, candidate.score) for candidate in candidates]
+    
+    async def _resolve_templates(
+        self,
+        image_path: Path,
+        gemini_service: GeminiService,
+        analysis: Optional[StyleAnalysisProtocol],
+        use_category_filter: bool
+    ) -> Tuple[List[Template], Optional[str]]:
+        """
+        AIによる選択の対象となるテンプレートを決定します。
+        
+        分析結果のカテゴリ（利用できない場合はAIが選んだカテゴリ）のテンプレートを対象とし、
+        該当するテンプレートがない場合は全テンプレートを対象とします。
         
+        Args:
+            image_path: 画像ファイルのパス
+            gemini_service: Gemini APIサービスインスタンス
+            analysis: 画像分析結果（オプション）
+            use_category_filter: 分析結果のカテゴリでフィルタするかどうか
+            
+        Returns:
+            (対象のテンプレートリスト, テンプレートがない場合のエラーメッセージ)のタプル
+        """
         # 利用可能なすべてのカテゴリを取得
         available_categories = self.template_manager.get_all_categories()
         
@@ -330,8 +429,7 @@ class TemplateMatcher:
                     selected_category = available_categories[0]
                     self.logger.warning(f"エラーによりデフォルトカテゴリを使用します: {selected_category}")
                 else:
-                    self.logger.error("利用可能なカテゴリがありません")
-                    return []
+                    return [], "利用可能なカテゴリがありません"
         
         # 選択されたカテゴリのテンプレートを取得
         templates = self.template_manager.get_templates_by_category(selected_category)
@@ -344,44 +442,5 @@ class TemplateMatcher:
             self.logger.info(f"全テンプレートを使用: {len(templates)}件")
         
         if not templates:
-            self.logger.error("テンプレートが見つかりません")
-            return []
-        
-        # GeminiServiceを使用して複数テンプレート選択
-        try:
-            template_results = await gemini_service.select_multiple_templates(
-                image_path=image_path,
-                templates=templates,
-                count=count,
-                analysis=analysis,
-                category_filter=use_category_filter
-            )
-            
-            # 結果を整形
-            results = []
-            for template_id, reason, score in template_results:
-                # テンプレートIDの範囲チェック
-                if template_id < 0 or template_id >= len(templates):
-                    self.logger.warning(f"無効なテンプレートID: {template_id}、スキップします")
-                    continue
-                
-                selected_template = templates[template_id]
-                results.append((selected_template, reason, score))
-            
-            self.logger.info(f"AIが複数テンプレートを選択しました: {len(results)}件")
-            return results
-            
-        except ValueError as e:
-            # テンプレートリストが空など、値関連のエラー
-            self.logger.error(f"値エラーが発生しました: {str(e)}")
-            raise TemplateError(f"テンプレート選択エラー: {str(e)}")
-            
-        except GeminiAPIError as e:
-            # GeminiAPI関連のエラー
-            self.logger.error(f"GeminiAPIエラーが発生しました: {str(e)}")
-            raise TemplateError(f"GeminiAPIエラー: {str(e)}")
-            
-        except Exception as e:
-            # その他の予期しないエラー
-            self.logger.error(f"AIによる複数テンプレート選択中に予期しないエラーが発生しました: {str(e)}")
-            raise TemplateError(f"予期しないエラー: {str(e)}")
+            return [], "テンプレートが見つかりません"
+        return templates, None
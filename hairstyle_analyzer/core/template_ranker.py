@@ -0,0 +1,172 @@
+"""
+テンプレート事前ランキングモジュール
+
+このモジュールでは、AIによるテンプレート選択の前に、画像分析結果との関連度でテンプレートを
+ローカルに順位付けするBM25ランキングを提供します。上位のテンプレートだけをAIに送信することで、
+テンプレート数が増えてもプロンプトの大きさを一定に保ちます。
+"""
+
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..data.models import Template
+from ..data.interfaces import StyleAnalysisProtocol
+
+
+# 単語の区切りとみなす文字（空白・句読点・記号）
+_SEPARATORS = re.compile(r"[\s,、。・/#＃()（）「」『』【】\[\]!！?？:：;；~〜★☆♪]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    テキストを検索用のトークンに分割します。
+
+    日本語は単語の区切りがないため、区切り文字で分けた語に加えて文字バイグラムもトークンとします。
+
+    Args:
+        text: テキスト
+
+    Returns:
+        トークンのリスト
+    """
+    tokens: List[str] = []
+    for word in _SEPARATORS.split(text.lower()):
+        if not word:
+            continue
+        tokens.append(word)
+        if len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class BM25Index:
+    """テンプレートのBM25索引
+
+    タイトル・コメント・ハッシュタグを索引付けします。ハッシュタグはテンプレートの特徴を
+    最もよく表すため、重みを付けて（2回出現したものとして）扱います。
+    """
+
+    K1 = 1.5
+    B = 0.75
+    HASHTAG_WEIGHT = 2
+
+    def __init__(self, templates: Sequence[Template]):
+        """
+        初期化
+
+        Args:
+            templates: 索引付けするテンプレートのリスト
+        """
+        self.templates = tuple(templates)
+        self._term_frequencies: List[Counter] = []
+        document_frequencies: Counter = Counter()
+        for template in self.templates:
+            tokens = tokenize(template.title) + tokenize(template.comment)
+            for hashtag in template.get_hashtags():
+                tokens.extend(tokenize(hashtag) * self.HASHTAG_WEIGHT)
+            frequencies = Counter(tokens)
+            self._term_frequencies.append(frequencies)
+            document_frequencies.update(frequencies.keys())
+
+        self._lengths = [sum(frequencies.values()) for frequencies in self._term_frequencies]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        count = len(self.templates)
+        self._idf: Dict[str, float] = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for term, df in document_frequencies.items()
+        }
+
+    def scores(self, query_tokens: Sequence[str]) -> List[float]:
+        """
+        クエリに対する各テンプレートのBM25スコアを計算します。
+
+        Args:
+            query_tokens: クエリのトークン
+
+        Returns:
+            テンプレートの順のスコアのリスト
+        """
+        terms = [term for term in set(query_tokens) if term in self._idf]
+        results = []
+        for frequencies, length in zip(self._term_frequencies, self._lengths):
+            norm = self.K1 * (1 - self.B + self.B * length / self._average_length) if self._average_length else self.K1
+            score = 0.0
+            for term in terms:
+                tf = frequencies.get(term, 0)
+                if tf:
+                    score += self._idf[term] * tf * (self.K1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+class TemplateRanker:
+    """テンプレート事前ランキングクラス
+
+    画像分析結果（キーワード・特徴）をクエリとして、テンプレートをBM25スコアで順位付けします。
+    索引は同じテンプレートリストに対して再利用します。
+    """
+
+    # 保持する索引の最大数（カテゴリごとに1つ作成される）
+    MAX_INDEXES = 64
+
+    def __init__(self):
+        """初期化"""
+        # テンプレートの識別子の組 → 索引（索引がテンプレートを参照し続けるため識別子は再利用されない）
+        self._indexes: Dict[Tuple[int, ...], BM25Index] = {}
+
+    def _get_index(self, templates: Sequence[Template]) -> BM25Index:
+        key = tuple(id(template) for template in templates)
+        index = self._indexes.get(key)
+        if index is None:
+            if len(self._indexes) >= self.MAX_INDEXES:
+                self._indexes.pop(next(iter(self._indexes)))
+            index = self._indexes[key] = BM25Index(templates)
+        return index
+
+    @staticmethod
+    def build_query(analysis: StyleAnalysisProtocol) -> List[str]:
+        """
+        画像分析結果から検索クエリのトークンを作成します。
+
+        Args:
+            analysis: 画像分析結果
+
+        Returns:
+            クエリのトークン
+        """
+        texts = list(analysis.keywords) + [
+            analysis.features.color,
+            analysis.features.cut_technique,
+            analysis.features.styling,
+            analysis.features.impression,
+        ]
+        return [token for text in texts for token in tokenize(text)]
+
+    def shortlist(
+        self,
+        templates: Sequence[Template],
+        analysis: Optional[StyleAnalysisProtocol],
+        limit: int
+    ) -> List[Template]:
+        """
+        テンプレートを関連度の高い順に最大limit件まで絞り込みます。
+
+        テンプレート数がlimit以下の場合や分析結果がない場合は、元の順序のまま先頭からlimit件を返します。
+        同じスコアのテンプレートは元の順序を保ちます。
+
+        Args:
+            templates: テンプレートのリスト
+            analysis: 画像分析結果（オプション）
+            limit: 最大件数
+
+        Returns:
+            絞り込んだテンプレートのリスト
+        """
+        if len(templates) <= limit or analysis is None:
+            return list(templates[:limit])
+
+        scores = self._get_index(templates).scores(self.build_query(analysis))
+        ranked = sorted(range(len(templates)), key=lambda i: (-scores[i], i))
+        return [templates[i] for i in ranked[:limit]]
@@ -0,0 +1,442 @@
+"""
+キャッシュストレージバックエンドモジュール
+
+このモジュールでは、CacheManagerが使用するキャッシュの永続化バックエンドを定義します。
+従来のJSONファイル全体を書き換えるバックエンドと、エントリ単位で読み書きする
+SQLite（WALモード）バックエンドを提供します。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import inspect
+import logging
+import threading
+import functools
+from abc import abstractmethod
+from collections.abc import MutableMapping
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from . import models
+from .models import CacheEntry
+
+
+# キャッシュエントリのメタデータ（キー, 作成タイムスタンプ, TTL）
+CacheMetadata = Tuple[str, float, Optional[float]]
+
+
+# カスタムJSONエンコーダ - Pydanticモデルをシリアライズするために使用
+class PydanticJSONEncoder(json.JSONEncoder):
+    """PydanticモデルをJSONシリアライズするためのカスタムエンコーダ"""
+    def default(self, obj):
+        if isinstance(obj, BaseModel):
+            return obj.model_dump()
+        if isinstance(obj, Path):
+            return str(obj)
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+@functools.lru_cache(maxsize=None)
+def _registered_models() -> Dict[str, Type[BaseModel]]:
+    """キャッシュで型を復元できるモデル（data.modelsで定義されたPydanticモデル）の一覧"""
+    return {
+        name: obj for name, obj in vars(models).items()
+        if inspect.isclass(obj) and issubclass(obj, BaseModel) and obj.__module__ == models.__name__
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _get_type_adapter(model_type: str) -> TypeAdapter:
+    """
+    型名に対応するTypeAdapterを取得します（型名ごとに1度だけ構築）。
+
+    Args:
+        model_type: 型名（"StyleAnalysis" または "list[StyleAnalysis]" の形式）
+
+    Returns:
+        TypeAdapter
+
+    Raises:
+        KeyError: 未登録の型名が指定された場合
+    """
+    if model_type.startswith("list[") and model_type.endswith("]"):
+        return TypeAdapter(List[_registered_models()[model_type[5:-1]]])
+    return TypeAdapter(_registered_models()[model_type])
+
+
+def describe_model_type(value: Any) -> Optional[str]:
+    """
+    キャッシュデータの型名を取得します。
+
+    Args:
+        value: キャッシュデータ
+
+    Returns:
+        登録済みモデル（またはそのリスト）の場合は型名、それ以外はNone
+    """
+    registered = _registered_models()
+    if isinstance(value, BaseModel):
+        name = type(value).__name__
+        return name if registered.get(name) is type(value) else None
+    if isinstance(value, list) and value and isinstance(value[0], BaseModel):
+        item_type = type(value[0])
+        if registered.get(item_type.__name__) is item_type and all(type(item) is item_type for item in value):
+            return f"list[{item_type.__name__}]"
+    return None
+
+
+def serialize_data(data: Any, model_type: Optional[str] = None) -> str:
+    """
+    キャッシュデータをJSON文字列に変換します。
+
+    Args:
+        data: キャッシュデータ
+        model_type: 型名（オプション）
+
+    Returns:
+        JSON文字列
+    """
+    if model_type:
+        return _get_type_adapter(model_type).dump_json(data).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, cls=PydanticJSONEncoder)
+
+
+def deserialize_data(text: str, model_type: Optional[str] = None) -> Any:
+    """
+    JSON文字列からキャッシュデータを復元します。
+    型名がある場合は、JSONから直接モデルを検証・構築します。
+
+    Args:
+        text: JSON文字列
+        model_type: 型名（オプション）
+
+    Returns:
+        キャッシュデータ
+    """
+    if model_type:
+        return _get_type_adapter(model_type).validate_json(text)
+    return json.loads(text)
+
+
+def rehydrate_data(data: Any, model_type: Optional[str] = None) -> Any:
+    """
+    JSONとして読み込み済みのデータをモデルに復元します。
+
+    Args:
+        data: JSONとして読み込み済みのデータ
+        model_type: 型名（オプション）
+
+    Returns:
+        キャッシュデータ
+    """
+    if model_type:
+        return _get_type_adapter(model_type).validate_python(data)
+    return data
+
+
+class CacheBackend(MutableMapping):
+    """キャッシュストレージバックエンドの基底クラス
+
+    キー → CacheEntry のマッピングとして振る舞い、CacheManagerから
+    辞書と同じ操作で利用できます。有効期限やサイズ制限の判定には、
+    データ本体を読み込まずに済むiter_metadataを使用します。
+    """
+
+    @property
+    @abstractmethod
+    def location(self) -> Path:
+        """データの保存先パス"""
+
+    @abstractmethod
+    def iter_metadata(self) -> Iterator[CacheMetadata]:
+        """
+        全エントリのメタデータを列挙します。
+
+        Returns:
+            (キー, 作成タイムスタンプ, TTL) のイテレータ
+        """
+
+    def flush(self) -> None:
+        """未保存の変更をストレージに書き込みます。"""
+
+    def close(self) -> None:
+        """ストレージを閉じます。"""
+
+
+class JSONFileCacheBackend(CacheBackend):
+    """JSONファイルバックエンド
+
+    全エントリをメモリ上に保持し、flush時にファイル全体を書き換えます。
+    書き込みのたびにO(N)のコストがかかるため、小規模なキャッシュ向けです。
+    """
+
+    def __init__(self, file_path: Union[str, Path]):
+        """
+        初期化
+
+        Args:
+            file_path: JSONキャッシュファイルのパス
+        """
+        self.logger = logging.getLogger(__name__)
+        self.file_path = Path(file_path)
+        self._entries: Dict[str, CacheEntry] = load_json_cache_file(self.file_path)
+
+    @property
+    def location(self) -> Path:
+        return self.file_path
+
+    def __getitem__(self, key: str) -> CacheEntry:
+        return self._entries[key]
+
+    def __setitem__(self, key: str, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+
+    def __delitem__(self, key: str) -> None:
+        del self._entries[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries = {}
+
+    def iter_metadata(self) -> Iterator[CacheMetadata]:
+        for key, entry in list(self._entries.items()):
+            yield key, entry.timestamp, entry.ttl
+
+    def flush(self) -> None:
+        """キャッシュデータをJSONファイルに保存します。"""
+        # ディレクトリが存在しない場合は作成
+        os.makedirs(self.file_path.parent, exist_ok=True)
+
+        cache_data = {
+            key: {'data': entry.data, 'timestamp': entry.timestamp, 'ttl': entry.ttl, 'model_type': entry.model_type}
+            for key, entry in self._entries.items()
+        }
+
+        # 一時ファイルに書き込んでから置き換える
+        temp_file = self.file_path.with_suffix('.tmp')
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(cache_data, f, ensure_ascii=False, indent=2, cls=PydanticJSONEncoder)
+            os.replace(temp_file, self.file_path)
+        except (IOError, OSError):
+            if temp_file.exists():
+                try:
+                    temp_file.unlink()
+                except OSError:
+                    pass
+            raise
+
+        self.logger.debug(f"キャッシュを保存しました: {len(self._entries)}件のエントリ")
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """SQLiteバックエンド
+
+    WALモードのSQLiteデータベースにエントリ単位で書き込むため、挿入・削除はO(1)です。
+    起動時にはキーとタイムスタンプのみを読み込み、データ本体は取得時に読み込みます。
+    同じ場所に従来のJSONキャッシュファイルがある場合は、初回起動時に取り込みます。
+    """
+
+    def __init__(self, db_path: Union[str, Path], legacy_json_path: Optional[Union[str, Path]] = None):
+        """
+        初期化
+
+        Args:
+            db_path: SQLiteデータベースファイルのパス
+            legacy_json_path: 移行元のJSONキャッシュファイルのパス（オプション）
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        # Streamlitなど別スレッドからのアクセスがあるため、ロックで直列化して共有する
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, data TEXT NOT NULL, timestamp REAL NOT NULL, ttl REAL, model_type TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache_entries)")}
+        if "model_type" not in columns:
+            self._conn.execute("ALTER TABLE cache_entries ADD COLUMN model_type TEXT")
+
+        if legacy_json_path is not None:
+            self._migrate_json(Path(legacy_json_path))
+
+        # メタデータのみをメモリに保持（データ本体は遅延読み込み）
+        self._index: Dict[str, Tuple[float, Optional[float]]] = {
+            key: (timestamp, ttl)
+            for key, timestamp, ttl in self._conn.execute("SELECT key, timestamp, ttl FROM cache_entries")
+        }
+
+    def _migrate_json(self, json_path: Path) -> None:
+        """
+        従来のJSONキャッシュファイルをデータベースに取り込みます。
+        取り込み後のファイルは再度読み込まれないよう、拡張子に.migratedを付けて退避します。
+
+        Args:
+            json_path: JSONキャッシュファイルのパス
+        """
+        if not json_path.exists():
+            return
+
+        entries = load_json_cache_file(json_path)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO cache_entries (key, data, timestamp, ttl, model_type) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (key, serialize_data(entry.data, entry.model_type), entry.timestamp, entry.ttl, entry.model_type)
+                        for key, entry in entries.items()
+                    ]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        migrated_path = json_path.with_name(json_path.name + ".migrated")
+        os.replace(json_path, migrated_path)
+        self.logger.info(f"JSONキャッシュをSQLiteに移行しました: {len(entries)}件のエントリ ({json_path} → {self.db_path})")
+
+    @property
+    def location(self) -> Path:
+        return self.db_path
+
+    def __getitem__(self, key: str) -> CacheEntry:
+        if key not in self._index:
+            raise KeyError(key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, timestamp, ttl, model_type FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            self._index.pop(key, None)
+            raise KeyError(key)
+        return CacheEntry(data=deserialize_data(row[0], row[3]), timestamp=row[1], ttl=row[2], model_type=row[3])
+
+    def __setitem__(self, key: str, entry: CacheEntry) -> None:
+        data = serialize_data(entry.data, entry.model_type)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, data, timestamp, ttl, model_type) VALUES (?, ?, ?, ?, ?)",
+                (key, data, entry.timestamp, entry.ttl, entry.model_type)
+            )
+        self._index[key] = (entry.timestamp, entry.ttl)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self._index:
+            raise KeyError(key)
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        del self._index[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._index))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries")
+        self._index = {}
+
+    def iter_metadata(self) -> Iterator[CacheMetadata]:
+        for key, (timestamp, ttl) in list(self._index.items()):
+            yield key, timestamp, ttl
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def load_json_cache_file(file_path: Path) -> Dict[str, CacheEntry]:
+    """
+    JSONキャッシュファイルを読み込みます。
+    ファイルが存在しない場合や読み込みエラーの場合は、空の辞書を返します。
+
+    Args:
+        file_path: JSONキャッシュファイルのパス
+
+    Returns:
+        キー → CacheEntry の辞書
+    """
+    logger = logging.getLogger(__name__)
+
+    if not file_path.exists():
+        logger.info(f"キャッシュファイルが見つかりません: {file_path}")
+        return {}
+
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            cache_data = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error(f"キャッシュファイルの読み込みエラー: {e}")
+        return {}
+
+    entries = {}
+    for key, entry_data in cache_data.items():
+        try:
+            model_type = entry_data.get('model_type')
+            entries[key] = CacheEntry(
+                data=rehydrate_data(entry_data.get('data'), model_type),
+                timestamp=entry_data.get('timestamp', time.time()),
+                ttl=entry_data.get('ttl'),
+                model_type=model_type
+            )
+        except (ValidationError, AttributeError, KeyError) as e:
+            logger.warning(f"無効なキャッシュエントリをスキップします: {key} - エラー: {e}")
+
+    return entries
+
+
+def create_cache_backend(backend: str, cache_file_path: Union[str, Path]) -> CacheBackend:
+    """
+    設定に応じたキャッシュバックエンドを作成します。
+
+    SQLiteバックエンドでは、設定されたキャッシュファイルパスの拡張子を
+    .sqlite3に変えたファイルをデータベースとして使用し、元のJSONファイルを移行元とします。
+
+    Args:
+        backend: バックエンド名（"sqlite" または "json"）
+        cache_file_path: 設定上のキャッシュファイルのパス
+
+    Returns:
+        キャッシュバックエンド
+
+    Raises:
+        ValueError: 未知のバックエンド名が指定された場合
+    """
+    cache_file_path = Path(cache_file_path)
+
+    if backend == "json":
+        return JSONFileCacheBackend(cache_file_path)
+
+    if backend == "sqlite":
+        if cache_file_path.suffix == ".json":
+            return SQLiteCacheBackend(cache_file_path.with_suffix(".sqlite3"), legacy_json_path=cache_file_path)
+        return SQLiteCacheBackend(cache_file_path)
+
+    raise ValueError(f"未知のキャッシュバックエンドです: {backend}")
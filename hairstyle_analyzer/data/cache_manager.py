@@ -5,18 +5,17 @@
 処理結果のキャッシュ、TTLベースの有効期限管理、サイズ制限機能などが含まれます。
 """
 
-import os
-import json
 import time
+import sqlite3
 import logging
 import hashlib
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Set, Union, TypeVar, Generic, Callable
 from datetime import datetime, timedelta
 
-from pydantic import ValidationError, BaseModel
-
 from .models import CacheEntry, CacheConfig
+from .cache_backends import CacheBackend, JSONFileCacheBackend, PydanticJSONEncoder, create_cache_backend, describe_model_type
+from .cache_policies import EvictionPolicy, create_eviction_policy
 from .interfaces import CacheManagerProtocol
 from ..utils.errors import AppError, with_error_handling
 
@@ -24,24 +23,13 @@ from ..utils.errors import AppError, with_error_handling
 T = TypeVar('T')
 
 
-# カスタムJSONエンコーダ - Pydanticモデルをシリアライズするために使用
-class PydanticJSONEncoder(json.JSONEncoder):
-    """PydanticモデルをJSONシリアライズするためのカスタムエンコーダ"""
-    def default(self, obj):
-        if isinstance(obj, BaseModel):
-            return obj.model_dump()
-        if isinstance(obj, Path):
-            return str(obj)
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
-
-
 class CacheManager(CacheManagerProtocol):
     """キャッシュ管理クラス
     
-    処理結果をファイルにキャッシュし、読み込む機能を提供します。
+    処理結果をストレージバックエンドにキャッシュし、読み込む機能を提供します。
     TTL（有効期限）ベースの管理、最大サイズ制限、クリーンアップ機能などがあります。
+    バックエンドはCacheConfig.backend、サイズ上限時の退避ポリシーは
+    CacheConfig.eviction_policyで選択します（既定はSQLite・LRU）。
     """
     
     def __init__(self, cache_file_path: Union[str, Path], config: CacheConfig):
@@ -56,88 +44,68 @@ class CacheManager(CacheManagerProtocol):
         self.cache_file_path = Path(cache_file_path)
         self.config = config
         
-        # キャッシュデータのロード
-        self.cache: Dict[str, CacheEntry] = {}
+        # キャッシュストレージのオープン
+        self.cache: CacheBackend
         self._load_cache()
     
     @with_error_handling(AppError, "キャッシュファイルの読み込みに失敗しました")
     def _load_cache(self) -> None:
         """
-        キャッシュファイルを読み込みます。
+        キャッシュストレージを開きます。
         ファイルが存在しない場合や読み込みエラーの場合は、空のキャッシュを使用します。
         """
-        if not self.cache_file_path.exists():
-            self.logger.info(f"キャッシュファイルが見つかりません: {self.cache_file_path}")
-            self.cache = {}
-            return
-        
         try:
-            with open(self.cache_file_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            
-            # キャッシュエントリを構築
-            self.cache = {}
-            for key, entry_data in cache_data.items():
-                try:
-                    # JSONからCacheEntryを構築
-                    self.cache[key] = CacheEntry(
-                        data=entry_data.get('data'),
-                        timestamp=entry_data.get('timestamp', time.time()),
-                        ttl=entry_data.get('ttl')
-                    )
-                except ValidationError as e:
-                    self.logger.warning(f"無効なキャッシュエントリをスキップします: {key} - エラー: {e}")
-            
-            self.logger.info(f"キャッシュを読み込みました: {len(self.cache)}件のエントリ")
-            
-            # 古いキャッシュエントリをクリーンアップ
-            self._cleanup_expired()
-            
-        except (json.JSONDecodeError, IOError) as e:
-            self.logger.error(f"キャッシュファイルの読み込みエラー: {e}")
-            self.cache = {}
+            self.cache = create_cache_backend(self.config.backend, self.cache_file_path)
+        except (sqlite3.Error, OSError) as e:
+            self.logger.error(f"キャッシュストレージのオープンエラー: {e}、JSONバックエンドを使用します")
+            self.cache = JSONFileCacheBackend(self.cache_file_path)
+        
+        self.logger.info(f"キャッシュを読み込みました: {len(self.cache)}件のエントリ ({self.cache.location})")
+        
+        # 退避ポリシーの初期化
+        self._policy: EvictionPolicy = create_eviction_policy(self.config.eviction_policy, self._default_ttl())
+        self._rebuild_policy()
+        
+        # 古いキャッシュエントリをクリーンアップ
+        if self._cleanup_expired():
+            self._save_cache()
+    
+    def _default_ttl(self) -> float:
+        """
+        デフォルトのTTL（秒単位）を取得します。
+        
+        Returns:
+            デフォルトTTL（秒）
+        """
+        return self.config.ttl_days * 24 * 60 * 60
+    
+    def _rebuild_policy(self) -> None:
+        """
+        ストレージ上のエントリから退避ポリシーの状態を再構築します。
+        参照履歴は永続化されないため、作成日時の古い順に登録します。
+        """
+        self._policy.clear()
+        for key, timestamp, ttl in sorted(self.cache.iter_metadata(), key=lambda m: m[1]):
+            self._policy.add(key, timestamp, ttl)
     
     @with_error_handling(AppError, "キャッシュファイルの保存に失敗しました")
     def _save_cache(self) -> None:
         """
-        キャッシュデータをファイルに保存します。
+        未保存のキャッシュデータをストレージに書き込みます。
         """
         try:
-            # ディレクトリが存在しない場合は作成
-            os.makedirs(self.cache_file_path.parent, exist_ok=True)
-            
-            # キャッシュデータをdict形式に変換
-            cache_data = {}
-            for key, entry in self.cache.items():
-                cache_data[key] = {
-                    'data': entry.data,
-                    'timestamp': entry.timestamp,
-                    'ttl': entry.ttl
-                }
-            
-            # 一時ファイルに書き込み
-            temp_file = self.cache_file_path.with_suffix('.tmp')
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2, cls=PydanticJSONEncoder)
-            
-            # 一時ファイルを正規のファイルに置き換え
-            if temp_file.exists():
-                if self.cache_file_path.exists():
-                    self.cache_file_path.unlink()
-                temp_file.rename(self.cache_file_path)
-                
-            self.logger.debug(f"キャッシュを保存しました: {len(self.cache)}件のエントリ")
-            
-        except (IOError, OSError) as e:
+            self.cache.flush()
+        except (IOError, OSError, sqlite3.Error) as e:
             self.logger.error(f"キャッシュファイルの保存エラー: {e}")
-            # 一時ファイルが存在する場合はクリーンアップ
-            if temp_file.exists():
-                try:
-                    temp_file.unlink()
-                except OSError:
-                    pass
             raise
     
+    def close(self) -> None:
+        """
+        キャッシュストレージを閉じます。
+        """
+        self._save_cache()
+        self.cache.close()
+    
     def _cleanup_expired(self) -> int:
         """
         期限切れのキャッシュエントリを削除します。
@@ -151,15 +119,16 @@ class CacheManager(CacheManagerProtocol):
         # デフォルトのTTL（秒単位）
         default_ttl = self.config.ttl_days * 24 * 60 * 60
         
-        # 期限切れのキーを収集
-        for key, entry in self.cache.items():
-            ttl = entry.ttl or default_ttl
-            if now - entry.timestamp > ttl:
+        # 期限切れのキーを収集（データ本体は読み込まない）
+        for key, timestamp, entry_ttl in self.cache.iter_metadata():
+            ttl = entry_ttl or default_ttl
+            if now - timestamp > ttl:
                 expired_keys.append(key)
         
         # 期限切れのエントリを削除
         for key in expired_keys:
             del self.cache[key]
+            self._policy.discard(key)
         
         if expired_keys:
             self.logger.info(f"{len(expired_keys)}件の期限切れキャッシュエントリを削除しました")
@@ -169,7 +138,7 @@ class CacheManager(CacheManagerProtocol):
     def _enforce_size_limit(self) -> int:
         """
         キャッシュサイズを制限値以下に保ちます。
-        最も古いエントリから順に削除します。
+        退避ポリシー（LRU/LFU/TTL）が選択したエントリから順に削除します。
         
         Returns:
             削除されたエントリの数
@@ -177,20 +146,22 @@ class CacheManager(CacheManagerProtocol):
         if len(self.cache) <= self.config.max_size:
             return 0
         
-        # 削除する必要があるエントリ数
-        excess = len(self.cache) - self.config.max_size
+        # ポリシーを経由せずに変更された場合は状態を再構築
+        if len(self._policy) != len(self.cache):
+            self._rebuild_policy()
         
-        # タイムスタンプでソートしたキーのリスト（古い順）
-        sorted_keys = sorted(self.cache.keys(), key=lambda k: self.cache[k].timestamp)
-        
-        # 最も古いエントリから削除
-        keys_to_remove = sorted_keys[:excess]
-        for key in keys_to_remove:
-            del self.cache[key]
+        removed = 0
+        while len(self.cache) > self.config.max_size:
+            key = self._policy.pop_victim()
+            if key is None:
+                break
+            if key in self.cache:
+                del self.cache[key]
+                removed += 1
         
-        self.logger.info(f"サイズ制限により{len(keys_to_remove)}件のキャッシュエントリを削除しました")
+        self.logger.info(f"サイズ制限により{removed}件のキャッシュエントリを削除しました（ポリシー: {self.config.eviction_policy}）")
         
-        return len(keys_to_remove)
+        return removed
     
     def get(self, key: str, context: str = "") -> Optional[Any]:
         """
@@ -203,6 +174,20 @@ class CacheManager(CacheManagerProtocol):
         Returns:
             キャッシュデータ、または存在しない場合はNone
         """
+        entry = self.get_entry(key, context)
+        return entry.data if entry is not None else None
+    
+    def get_entry(self, key: str, context: str = "") -> Optional[CacheEntry]:
+        """
+        指定されたキーのキャッシュエントリを取得します。
+        
+        Args:
+            key: キャッシュキー
+            context: キャッシュコンテキスト（オプション）
+            
+        Returns:
+            キャッシュエントリ、または存在しないか期限切れの場合はNone
+        """
         # コンテキストがある場合はキーに組み込む
         cache_key = self._make_cache_key(key, context)
         
@@ -210,8 +195,15 @@ class CacheManager(CacheManagerProtocol):
         if cache_key not in self.cache:
             return None
         
-        # キャッシュエントリを取得
-        entry = self.cache[cache_key]
+        # キャッシュエントリを取得（モデルとして復元できないエントリはキャッシュミスとして削除する）
+        try:
+            entry = self.cache[cache_key]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.logger.warning(f"無効なキャッシュエントリを削除します: {cache_key} - エラー: {e}")
+            if cache_key in self.cache:
+                del self.cache[cache_key]
+            self._policy.discard(cache_key)
+            return None
         
         # 期限切れかどうかをチェック
         now = time.time()
@@ -219,13 +211,14 @@ class CacheManager(CacheManagerProtocol):
         ttl = entry.ttl or default_ttl
         
         if now - entry.timestamp > ttl:
-            # 期限切れの場合はエントリを削除
+            # 期限切れの場合はエントリを削除（保存は次回の書き込み時にまとめて行う）
             del self.cache[cache_key]
-            self._save_cache()
+            self._policy.discard(cache_key)
             return None
         
+        self._policy.touch(cache_key)
         self.logger.debug(f"キャッシュヒット: {cache_key}")
-        return entry.data
+        return entry
     
     def set(self, key: str, value: Any, ttl: Optional[float] = None, context: str = "") -> None:
         """
@@ -244,11 +237,13 @@ class CacheManager(CacheManagerProtocol):
         entry = CacheEntry(
             data=value,
             timestamp=time.time(),
-            ttl=ttl
+            ttl=ttl,
+            model_type=describe_model_type(value)
         )
         
         # キャッシュに追加
         self.cache[cache_key] = entry
+        self._policy.add(cache_key, entry.timestamp, entry.ttl)
         
         # サイズ制限をチェック
         self._enforce_size_limit()
@@ -258,6 +253,26 @@ class CacheManager(CacheManagerProtocol):
         
         self.logger.debug(f"キャッシュに追加: {cache_key}")
     
+    def set_many(self, entries: Dict[str, CacheEntry]) -> None:
+        """
+        複数のキャッシュエントリをまとめて設定します。
+        サイズ制限の適用と保存は最後に1回だけ行います。
+        
+        Args:
+            entries: キャッシュキー → キャッシュエントリの辞書
+        """
+        if not entries:
+            return
+        
+        for cache_key, entry in entries.items():
+            self.cache[cache_key] = entry
+            self._policy.add(cache_key, entry.timestamp, entry.ttl)
+        
+        self._enforce_size_limit()
+        self._save_cache()
+        
+        self.logger.debug(f"キャッシュに一括追加: {len(entries)}件")
+    
     def _make_cache_key(self, key: str, context: str = "") -> str:
         """
         キャッシュキーを生成します。
@@ -289,7 +304,8 @@ class CacheManager(CacheManagerProtocol):
         if pattern is None:
             # 全てのキャッシュをクリア
             count = len(self.cache)
-            self.cache = {}
+            self.cache.clear()
+            self._policy.clear()
             self._save_cache()
             self.logger.info(f"キャッシュを全てクリアしました: {count}件のエントリ")
             return count
@@ -300,6 +316,7 @@ class CacheManager(CacheManagerProtocol):
         # マッチしたキーを削除
         for key in matched_keys:
             del self.cache[key]
+            self._policy.discard(key)
         
         # キャッシュを保存
         if matched_keys:
@@ -325,13 +342,14 @@ class CacheManager(CacheManagerProtocol):
         total_entries = len(self.cache)
         expired_entries = 0
         
-        for entry in self.cache.values():
-            ttl = entry.ttl or default_ttl
-            if now - entry.timestamp > ttl:
+        timestamps = []
+        for _, timestamp, entry_ttl in self.cache.iter_metadata():
+            ttl = entry_ttl or default_ttl
+            if now - timestamp > ttl:
                 expired_entries += 1
+            timestamps.append(timestamp)
         
         # 最も古いエントリと最も新しいエントリのタイムスタンプ
-        timestamps = [entry.timestamp for entry in self.cache.values()]
         oldest = min(timestamps) if timestamps else 0
         newest = max(timestamps) if timestamps else 0
         
@@ -343,7 +361,10 @@ class CacheManager(CacheManagerProtocol):
             'ttl_days': self.config.ttl_days,
             'oldest_entry_timestamp': oldest,
             'newest_entry_timestamp': newest,
-            'cache_file': str(self.cache_file_path)
+            'cache_file': str(self.cache_file_path),
+            'backend': self.config.backend,
+            'eviction_policy': self.config.eviction_policy,
+            'storage_path': str(self.cache.location)
         }
     
     def cleanup(self) -> int:
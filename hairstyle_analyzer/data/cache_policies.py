@@ -0,0 +1,239 @@
+"""
+キャッシュ退避ポリシーモジュール
+
+このモジュールでは、CacheManagerがサイズ上限に達したときに削除するエントリを
+決定する退避ポリシーを定義します。LRU・LFU・TTLの各ポリシーは、
+1操作あたりO(1)またはO(log N)で記録・選択を行います。
+"""
+
+import heapq
+import itertools
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+
+class EvictionPolicy(ABC):
+    """退避ポリシーの基底クラス
+
+    CacheManagerは、エントリの追加・参照・削除のたびにポリシーへ通知し、
+    サイズ上限を超えた場合はpop_victimで削除対象のキーを取得します。
+    """
+
+    @abstractmethod
+    def add(self, key: str, timestamp: float, ttl: Optional[float] = None) -> None:
+        """
+        エントリの追加（または上書き）を記録します。
+
+        Args:
+            key: キャッシュキー
+            timestamp: 作成タイムスタンプ
+            ttl: 有効期限（秒）（Noneの場合はデフォルトTTL）
+        """
+
+    @abstractmethod
+    def touch(self, key: str) -> None:
+        """
+        エントリの参照を記録します。
+
+        Args:
+            key: キャッシュキー
+        """
+
+    @abstractmethod
+    def discard(self, key: str) -> None:
+        """
+        エントリの削除を記録します。存在しないキーは無視します。
+
+        Args:
+            key: キャッシュキー
+        """
+
+    @abstractmethod
+    def pop_victim(self) -> Optional[str]:
+        """
+        次に削除すべきエントリを選択し、ポリシーの管理対象から外します。
+
+        Returns:
+            削除対象のキー、または管理対象が空の場合はNone
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """全ての記録を消去します。"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """管理対象のエントリ数"""
+
+
+class LRUPolicy(EvictionPolicy):
+    """LRU（最も長く参照されていないエントリを削除）ポリシー
+
+    参照順をOrderedDictで管理し、参照・追加・選択をO(1)で行います。
+    """
+
+    def __init__(self):
+        self._order: "OrderedDict[str, None]" = OrderedDict()
+
+    def add(self, key: str, timestamp: float, ttl: Optional[float] = None) -> None:
+        self._order[key] = None
+        self._order.move_to_end(key)
+
+    def touch(self, key: str) -> None:
+        if key in self._order:
+            self._order.move_to_end(key)
+
+    def discard(self, key: str) -> None:
+        self._order.pop(key, None)
+
+    def pop_victim(self) -> Optional[str]:
+        if not self._order:
+            return None
+        key, _ = self._order.popitem(last=False)
+        return key
+
+    def clear(self) -> None:
+        self._order.clear()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+
+class LFUPolicy(EvictionPolicy):
+    """LFU（参照回数が最も少ないエントリを削除）ポリシー
+
+    参照回数ごとのバケット（挿入順を保持）と最小参照回数を管理し、
+    参照・追加・選択をO(1)で行います。参照回数が同じ場合は最も長く参照されていないものを削除します。
+    """
+
+    def __init__(self):
+        self._freq: Dict[str, int] = {}
+        self._buckets: Dict[int, "OrderedDict[str, None]"] = defaultdict(OrderedDict)
+        self._min_freq = 0
+
+    def add(self, key: str, timestamp: float, ttl: Optional[float] = None) -> None:
+        if key in self._freq:
+            # 上書きは参照として扱い、参照回数を引き継ぐ
+            self.touch(key)
+            return
+        self._freq[key] = 1
+        self._buckets[1][key] = None
+        self._min_freq = 1
+
+    def touch(self, key: str) -> None:
+        freq = self._freq.get(key)
+        if freq is None:
+            return
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        self._freq[key] = freq + 1
+        self._buckets[freq + 1][key] = None
+
+    def discard(self, key: str) -> None:
+        freq = self._freq.pop(key, None)
+        if freq is None:
+            return
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+        # 最小参照回数は次のpop_victimで必要になった時点で補正する
+
+    def pop_victim(self) -> Optional[str]:
+        if not self._freq:
+            return None
+        if self._min_freq not in self._buckets:
+            self._min_freq = min(self._buckets)
+        bucket = self._buckets[self._min_freq]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self._buckets[self._min_freq]
+        del self._freq[key]
+        return key
+
+    def clear(self) -> None:
+        self._freq.clear()
+        self._buckets.clear()
+        self._min_freq = 0
+
+    def __len__(self) -> int:
+        return len(self._freq)
+
+
+class TTLPolicy(EvictionPolicy):
+    """TTL（有効期限が最も早いエントリを削除）ポリシー
+
+    有効期限のヒープで管理し、追加・選択をO(log N)で行います。
+    上書きや削除で無効になったヒープ要素は、選択時に読み飛ばします。
+    """
+
+    def __init__(self, default_ttl: float):
+        """
+        初期化
+
+        Args:
+            default_ttl: TTLが指定されていないエントリに適用するTTL（秒）
+        """
+        self.default_ttl = default_ttl
+        self._expires: Dict[str, float] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+
+    def add(self, key: str, timestamp: float, ttl: Optional[float] = None) -> None:
+        expires_at = timestamp + (ttl or self.default_ttl)
+        self._expires[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, next(self._counter), key))
+        # 無効な要素が増えすぎた場合はヒープを再構築する
+        if len(self._heap) > 2 * len(self._expires) + 64:
+            self._heap = [(expires, next(self._counter), k) for k, expires in self._expires.items()]
+            heapq.heapify(self._heap)
+
+    def touch(self, key: str) -> None:
+        # 参照しても有効期限は変わらない
+        pass
+
+    def discard(self, key: str) -> None:
+        self._expires.pop(key, None)
+
+    def pop_victim(self) -> Optional[str]:
+        while self._heap:
+            expires_at, _, key = heapq.heappop(self._heap)
+            if self._expires.get(key) == expires_at:
+                del self._expires[key]
+                return key
+        return None
+
+    def clear(self) -> None:
+        self._expires.clear()
+        self._heap = []
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+
+def create_eviction_policy(name: str, default_ttl: float) -> EvictionPolicy:
+    """
+    設定に応じた退避ポリシーを作成します。
+
+    Args:
+        name: ポリシー名（"lru" / "lfu" / "ttl"）
+        default_ttl: デフォルトTTL（秒）
+
+    Returns:
+        退避ポリシー
+
+    Raises:
+        ValueError: 未知のポリシー名が指定された場合
+    """
+    if name == "lru":
+        return LRUPolicy()
+    if name == "lfu":
+        return LFUPolicy()
+    if name == "ttl":
+        return TTLPolicy(default_ttl)
+    raise ValueError(f"未知のキャッシュ退避ポリシーです: {name}")
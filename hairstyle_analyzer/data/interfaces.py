@@ -5,7 +5,7 @@
 Python 3.8以降の typing.Protocol を使用して、構造的サブタイピングをサポートします。
 """
 
-from typing import Protocol, Dict, List, Optional, Any, TypeVar, Generic
+from typing import Protocol, Dict, List, Optional, Any, TypeVar, Generic, AsyncIterator
 from datetime import datetime
 from pathlib import Path
 
@@ -110,6 +110,15 @@ class TemplateManagerProtocol(Protocol):
         """
         ...
     
+    def get_catalog_hash(self) -> str:
+        """
+        テンプレート一覧の内容ハッシュを取得します。
+        
+        Returns:
+            テンプレート一覧のハッシュ値
+        """
+        ...
+    
     def find_best_template(self, analysis: StyleAnalysisProtocol) -> Optional[TemplateProtocol]:
         """
         分析結果に最も合うテンプレートを検索します。
@@ -167,6 +176,130 @@ class ScraperServiceProtocol(Protocol):
         ...
 
 
+# Gemini API クライアントのインターフェース
+class GeminiClientProtocol(Protocol):
+    """Gemini API クライアントのインターフェース
+    
+    GeminiServiceが使用するモデルの取得、ファイルのアップロード、コンテキストキャッシュの管理を抽象化します。
+    テストではローカルのフェイク実装に差し替えます。
+    """
+    
+    def get_model(self, model_name: str) -> Any:
+        """
+        生成モデルを取得します。
+        
+        Args:
+            model_name: モデル名
+            
+        Returns:
+            generate_content(contents, generation_config=...)を持つモデルオブジェクト
+        """
+        ...
+    
+    def upload_file(self, data: bytes, mime_type: str, display_name: Optional[str] = None) -> Any:
+        """
+        ファイルをファイルストアにアップロードします。
+        
+        Args:
+            data: ファイルの内容
+            mime_type: MIMEタイプ
+            display_name: 表示名（オプション）
+            
+        Returns:
+            アップロードしたファイルの参照（UploadedFile）
+        """
+        ...
+    
+    def create_cached_content(self, model_name: str, contents: List[str], display_name: str, ttl_seconds: int) -> Any:
+        """
+        コンテンツをコンテキストキャッシュに登録します。
+        
+        Args:
+            model_name: キャッシュを使用するモデル名
+            contents: キャッシュするコンテンツ
+            display_name: 表示名
+            ttl_seconds: 有効期間（秒）
+            
+        Returns:
+            登録したキャッシュの参照（CachedContext）
+        """
+        ...
+    
+    def get_cached_model(self, context: Any) -> Any:
+        """
+        コンテキストキャッシュを参照する生成モデルを取得します。
+        
+        Args:
+            context: キャッシュの参照（CachedContext）
+            
+        Returns:
+            generate_content(contents, generation_config=...)を持つモデルオブジェクト
+        """
+        ...
+    
+    def delete_cached_content(self, name: str) -> None:
+        """
+        コンテキストキャッシュを削除します。
+        
+        Args:
+            name: キャッシュ名
+        """
+        ...
+    
+    def reset_async_client(self, model: Any) -> None:
+        """
+        モデルの非同期クライアントを破棄し、次の非同期呼び出しで現在のイベントループに作成し直させます。
+        
+        Args:
+            model: 生成モデル
+        """
+        ...
+
+
+class BatchJobBackendProtocol(Protocol):
+    """オフラインのバッチジョブを実行するバックエンドのインターフェース
+    
+    リクエストのJSONLファイルの送信、ジョブの状態の確認、結果のJSONLファイルの取得を抽象化します。
+    テストではローカルのファイルを使用するフェイク実装に差し替えます。
+    """
+    
+    def submit(self, model_name: str, requests_path: Path, display_name: str) -> str:
+        """
+        リクエストのJSONLファイルをバッチジョブとして送信します。
+        
+        Args:
+            model_name: 使用するモデル名
+            requests_path: リクエストのJSONLファイル（1行に{"key": ..., "request": ...}）のパス
+            display_name: ジョブの表示名
+            
+        Returns:
+            ジョブ名
+        """
+        ...
+    
+    def get_state(self, job_name: str) -> str:
+        """
+        ジョブの状態を取得します。
+        
+        Args:
+            job_name: ジョブ名
+            
+        Returns:
+            状態（"PENDING"・"RUNNING"・"SUCCEEDED"・"FAILED"・"CANCELLED"・"EXPIRED"）
+        """
+        ...
+    
+    def download_results(self, job_name: str, destination: Path) -> None:
+        """
+        完了したジョブの結果のJSONLファイル（1行に{"key": ..., "response": ...}または{"key": ..., "error": ...}）を保存します。
+        
+        Args:
+            job_name: ジョブ名
+            destination: 保存先のパス
+        """
+        ...
+
+
 # Gemini API サービスのインターフェース
 class GeminiServiceProtocol(Protocol):
     """Gemini API サービスのインターフェース"""
@@ -284,6 +417,18 @@ class MainProcessorProtocol(Protocol):
             処理結果のリスト
         """
         ...
+    
+    def iter_process(self, image_paths: List[Path]) -> AsyncIterator[ProcessResultProtocol]:
+        """
+        複数の画像を処理し、処理結果を画像の処理が完了した順に返します。
+        
+        Args:
+            image_paths: 画像ファイルのパスリスト
+            
+        Returns:
+            処理結果の非同期イテレーター
+        """
+        ...
 
 
 # Excelエクスポーターのインターフェース
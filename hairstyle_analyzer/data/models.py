@@ -7,7 +7,7 @@ Pydanticを使用して、データの検証と型安全性を確保します。
 
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Literal
 from pydantic import BaseModel, Field
 
 
@@ -86,6 +86,22 @@ class TemplateCandidate(BaseModel):
     is_selected: bool = Field(default=False, description="ユーザーによる選択状態")
 
 
+class CombinedAnalysis(BaseModel):
+    """
+    統合分析結果を表すモデル
+
+    1回のAPI呼び出しで取得した、スタイル分析・属性分析・テンプレート候補・
+    スタイリスト選択・クーポン選択の結果をまとめて保持します。
+    """
+    style_analysis: StyleAnalysis = Field(description="スタイル分析結果")
+    attribute_analysis: AttributeAnalysis = Field(description="属性分析結果")
+    template_candidates: List[TemplateCandidate] = Field(default_factory=list, description="テンプレート候補リスト（スコア降順）")
+    selected_stylist: Optional[StylistInfo] = Field(default=None, description="選択されたスタイリスト")
+    stylist_reason: Optional[str] = Field(default=None, description="スタイリスト選択理由")
+    selected_coupon: Optional[CouponInfo] = Field(default=None, description="選択されたクーポン")
+    coupon_reason: Optional[str] = Field(default=None, description="クーポン選択理由")
+
+
 class ProcessResult(BaseModel):
     """処理結果を表すモデル"""
     image_name: str = Field(description="画像ファイル名")
@@ -104,21 +120,99 @@ class ProcessResult(BaseModel):
     user_selected_template: Optional[Template] = Field(default=None, description="ユーザーが選択したテンプレート")
 
 
+class ProcessEvent(BaseModel):
+    """複数画像処理で1枚の画像の処理が終わった際の進捗イベントを表すモデル"""
+    image_name: str = Field(description="画像ファイル名")
+    image_path: str = Field(description="画像ファイルパス")
+    status: Literal["processed", "cached", "restored", "failed", "cancelled"] = Field(description="処理の状態（processed: 処理済み / cached: キャッシュから取得 / restored: 実行ジャーナルから復元 / failed: 失敗 / cancelled: 中止により未処理）")
+    completed: int = Field(description="処理が終わった画像数（失敗を含み、中止により未処理の画像は含まない）")
+    total: int = Field(description="全画像数")
+    error: Optional[str] = Field(default=None, description="失敗した場合のエラーメッセージ")
+
+
+class UploadedFile(BaseModel):
+    """ファイルストアにアップロードしたファイルの参照を表すモデル"""
+    name: str = Field(description="ファイルストア上のファイル名")
+    uri: str = Field(description="プロンプトから参照するためのURI")
+    mime_type: str = Field(description="MIMEタイプ")
+    expires_at: float = Field(description="有効期限（UNIXタイムスタンプ）")
+
+
+class CachedContext(BaseModel):
+    """コンテキストキャッシュに登録したプロンプトの参照"""
+    name: str = Field(description="キャッシュ名")
+    model: str = Field(description="キャッシュを作成したモデル名")
+    expires_at: float = Field(description="有効期限（UNIXタイムスタンプ）")
+
+
+class BatchJobManifest(BaseModel):
+    """オフラインのバッチジョブの状態（ジョブディレクトリに保存し、再起動時に再開するために使用）"""
+    request_digest: str = Field(description="リクエスト内容（プロンプト・スキーマ・画像・モデル）のハッシュ")
+    model: str = Field(description="使用するモデル名")
+    images: List[str] = Field(description="画像ファイルのパスのリスト（リクエストのキーはこのリストのインデックス）")
+    job_name: Optional[str] = Field(default=None, description="送信したジョブ名（未送信の場合はNone）")
+    downloaded: bool = Field(default=False, description="結果ファイルをダウンロード済みかどうか")
+    created_at: datetime = Field(default_factory=datetime.now, description="作成日時")
+
+
 class CacheEntry(BaseModel):
     """キャッシュエントリーを表すモデル"""
     data: Any = Field(description="キャッシュデータ")
     timestamp: float = Field(description="作成タイムスタンプ")
     ttl: Optional[float] = Field(default=None, description="有効期限（秒単位）")
+    model_type: Optional[str] = Field(default=None, description="データのモデル型名（復元に使用）")
 
 
 class TemplateMatchingConfig(BaseModel):
     """テンプレートマッチング設定を表すモデル"""
     enabled: bool = Field(default=True, description="AIマッチングを有効にするかどうか")
-    max_templates: int = Field(default=50, description="一度に処理する最大テンプレート数")
+    max_templates: int = Field(default=50, description="AIに送信する最大テンプレート数（超える場合は分析結果との関連度で上位を絞り込む）")
     use_category_filter: bool = Field(default=True, description="カテゴリでフィルタリングするかどうか")
     fallback_on_failure: bool = Field(default=True, description="失敗時に従来のスコアリングを使用するかどうか")
     cache_results: bool = Field(default=True, description="結果をキャッシュするかどうか")
-    timeout_seconds: int = Field(default=30, description="APIタイムアウト（秒）")
+    timeout_seconds: int = Field(default=30, description="AIマッチングの制限時間（秒）（超過時はfallback_on_failureに従ってスコアリングで選択）")
+
+
+class ImagePreprocessConfig(BaseModel):
+    """API送信前の画像前処理設定を表すモデル"""
+    enabled: bool = Field(default=True, description="送信前に縮小・再エンコードするかどうか")
+    max_edge: int = Field(default=1024, ge=1, description="長辺の最大ピクセル数")
+    format: Literal["JPEG", "WEBP"] = Field(default="JPEG", description="再エンコード形式")
+    quality: int = Field(default=85, ge=1, le=100, description="エンコード品質（1〜100）")
+    memo_max_bytes: int = Field(default=64 * 1024 * 1024, ge=0, description="処理中に保持する準備済み画像データのメモリ上限（バイト）")
+
+
+class ContextCacheConfig(BaseModel):
+    """コンテキストキャッシュ設定"""
+    enabled: bool = Field(default=True, description="テンプレート一覧などの共通部分をコンテキストキャッシュに登録して再利用するかどうか")
+    ttl_seconds: int = Field(default=3600, gt=0, description="キャッシュの有効期間（秒）")
+    min_tokens: int = Field(default=4096, ge=0, description="キャッシュを作成する最小の見積もりトークン数（これより短い場合はプロンプトに含めて送信）")
+
+
+class BatchAnalysisConfig(BaseModel):
+    """複数画像のバッチ分析設定"""
+    enabled: bool = Field(default=True, description="複数の画像を1回のリクエストでまとめて分析するかどうか")
+    batch_size: int = Field(default=4, ge=1, le=16, description="1回のリクエストで分析する画像数")
+    max_wait_seconds: float = Field(default=0.5, ge=0, description="バッチを満たすために後続の画像を待機する最大時間（秒）")
+
+
+class BatchJobConfig(BaseModel):
+    """オフラインのバッチジョブ設定"""
+    poll_interval_seconds: float = Field(default=60.0, gt=0, description="ジョブの完了を確認する間隔（秒）")
+    max_wait_seconds: float = Field(default=86400.0, gt=0, description="ジョブの完了を待機する最大時間（秒）（超過時は同じジョブディレクトリで再実行すると再開する）")
+    fallback_online: bool = Field(default=True, description="バッチジョブで結果を取得できなかった画像を通常の呼び出しで処理するかどうか")
+
+
+class CircuitBreakerConfig(BaseModel):
+    """モデルごとのサーキットブレーカー設定を表すモデル"""
+    enabled: bool = Field(default=True, description="プライマリモデルの状態が悪化した場合にフォールバックモデルへ切り替えるかどうか")
+    window_size: int = Field(default=20, gt=0, description="エラー率・遅延率を計算する直近の呼び出し数")
+    min_calls: int = Field(default=5, gt=0, description="判定に必要な最小呼び出し数")
+    failure_rate_threshold: float = Field(default=0.5, gt=0, le=1, description="遮断するエラー率の閾値")
+    slow_call_seconds: float = Field(default=30.0, gt=0, description="遅延とみなす応答時間（秒）")
+    slow_call_rate_threshold: float = Field(default=0.8, gt=0, le=1, description="遮断する遅延率の閾値")
+    open_seconds: float = Field(default=30.0, ge=0, description="遮断してから回復確認を始めるまでの時間（秒）")
+    half_open_max_calls: int = Field(default=1, gt=0, description="回復確認中に許可する同時試行数")
 
 
 class GeminiConfig(BaseModel):
@@ -129,7 +223,13 @@ class GeminiConfig(BaseModel):
     max_tokens: int = Field(default=300, description="生成する最大トークン数")
     temperature: float = Field(default=0.7, description="生成の温度パラメータ")
     max_retries: int = Field(default=3, description="最大リトライ回数")
-    retry_delay: float = Field(default=1.0, description="リトライ間隔（秒）")
+    retry_delay: float = Field(default=1.0, description="リトライ間隔（秒）（指数バックオフの基準値）")
+    retry_max_delay: float = Field(default=60.0, description="リトライ間隔の上限（秒）")
+    requests_per_minute: int = Field(default=15, gt=0, description="1分あたりの最大リクエスト数")
+    tokens_per_minute: int = Field(default=1_000_000, gt=0, description="1分あたりの最大トークン数")
+    max_concurrent_requests: int = Field(default=16, gt=0, description="API呼び出しの最大同時実行数（送信中の呼び出し数の上限）")
+    request_timeout_seconds: Optional[float] = Field(default=60.0, gt=0, description="1回のAPI呼び出しの制限時間（秒）（超過した呼び出しは中断して再試行）")
+    transport: Literal["async", "thread"] = Field(default="async", description="API呼び出しの通信方式（async: SDKの非同期メソッド / thread: スレッドプール）")
     prompt_template: str = Field(description="プロンプトテンプレート")
     attribute_prompt_template: str = Field(description="属性分析用プロンプトテンプレート")
     stylist_prompt_template: str = Field(description="スタイリスト選択用プロンプトテンプレート")
@@ -137,6 +237,14 @@ class GeminiConfig(BaseModel):
     template_matching_prompt: str = Field(description="テンプレートマッチング用プロンプトテンプレート")
     length_choices: List[str] = Field(description="髪の長さの選択肢リスト")
     template_matching: TemplateMatchingConfig = Field(default_factory=TemplateMatchingConfig, description="テンプレートマッチング設定")
+    fused_analysis: bool = Field(default=False, description="1画像1回のAPI呼び出しで全項目を分析する統合分析モードを使用するかどうか")
+    image_preprocess: ImagePreprocessConfig = Field(default_factory=ImagePreprocessConfig, description="画像前処理設定")
+    circuit_breaker: CircuitBreakerConfig = Field(default_factory=CircuitBreakerConfig, description="サーキットブレーカー設定")
+    upload_images: bool = Field(default=False, description="画像をファイルストアに1度だけアップロードし、以降の呼び出しで参照するかどうか")
+    context_cache: ContextCacheConfig = Field(default_factory=ContextCacheConfig, description="コンテキストキャッシュ設定")
+    structured_output: bool = Field(default=True, description="応答モデルから生成したスキーマでJSON出力を制約するかどうか")
+    batch_analysis: BatchAnalysisConfig = Field(default_factory=BatchAnalysisConfig, description="複数画像のバッチ分析設定")
+    batch_job: BatchJobConfig = Field(default_factory=BatchJobConfig, description="オフラインのバッチジョブ設定")
 
 
 class ScraperConfig(BaseModel):
@@ -166,13 +274,24 @@ class TextConfig(BaseModel):
     newline: str = Field(default="\n", description="改行コード")
 
 
+class PipelineConfig(BaseModel):
+    """複数画像処理のパイプライン設定（段階ごとの同時実行数）"""
+    prepare_concurrency: int = Field(default=4, ge=1, description="画像読み込み段階の同時実行数")
+    analysis_concurrency: int = Field(default=4, ge=1, description="画像分析段階の同時実行数（バッチ分析が有効な場合は同時に送信するリクエスト数）")
+    matching_concurrency: int = Field(default=4, ge=1, description="テンプレートマッチング・スタイリスト/クーポン選択段階の同時実行数（画像ごとに3つの選択を並行して実行）")
+
+
 class ProcessingConfig(BaseModel):
     """処理設定を表すモデル"""
     batch_size: int = Field(default=5, description="バッチサイズ")
-    api_delay: float = Field(default=1.0, description="API呼び出し間の遅延（秒）")
+    api_delay: float = Field(default=1.0, description="API呼び出し間の遅延（秒）（非推奨: レート制限はgemini.requests_per_minute等で設定）")
     max_retries: int = Field(default=3, description="最大リトライ回数")
     retry_delay: float = Field(default=1.0, description="リトライ間隔（秒）")
     memory_per_image_mb: int = Field(default=5, description="画像あたりのメモリ使用量（MB）")
+    journal_dir: Optional[Path] = Field(default=None, description="実行ジャーナルを保存するディレクトリ（指定時は画像ごとの処理結果を記録し、中断後に実行IDで再開できる）")
+    pipeline: PipelineConfig = Field(default_factory=PipelineConfig, description="複数画像処理のパイプライン設定")
+    image_timeout_seconds: Optional[float] = Field(default=None, gt=0, description="1画像の処理の制限時間（秒）（超過した画像は中断して失敗とする。Noneで無制限）")
+    run_timeout_seconds: Optional[float] = Field(default=None, gt=0, description="複数画像処理の1回の実行の制限時間（秒）（超過時は処理中の画像を中断し、完了した結果を返す。Noneで無制限）")
 
 
 class PathsConfig(BaseModel):
@@ -188,6 +307,11 @@ class CacheConfig(BaseModel):
     """キャッシュ設定を表すモデル"""
     ttl_days: int = Field(default=30, description="キャッシュの有効期限（日数）")
     max_size: int = Field(default=10000, description="最大キャッシュエントリ数")
+    backend: Literal["sqlite", "json"] = Field(default="sqlite", description="キャッシュの保存バックエンド（sqlite/json）")
+    eviction_policy: Literal["lru", "lfu", "ttl"] = Field(default="lru", description="サイズ上限時の退避ポリシー（lru/lfu/ttl）")
+    memory_max_bytes: int = Field(default=64 * 1024 * 1024, description="メモリキャッシュ層の最大バイト数（0でメモリ層を無効化）")
+    write_behind_batch_size: int = Field(default=20, description="永続層へまとめて書き込む件数")
+    write_behind_interval_seconds: float = Field(default=5.0, description="永続層へ書き込む最大間隔（秒）")
 
 
 class LoggingConfig(BaseModel):
@@ -0,0 +1,131 @@
+"""
+実行ジャーナルモジュール
+
+このモジュールでは、複数画像の処理で画像ごとの処理結果をディスクに記録する実行ジャーナルを提供します。
+ジャーナルは実行IDごとのJSONLファイルに追記され、処理が中断しても同じ実行IDで再実行すると
+記録済みの画像を処理せずに結果を復元するため、Gemini APIの呼び出しが重複しません。
+"""
+
+import os
+import re
+import json
+import uuid
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Optional
+
+from pydantic import ValidationError as PydanticValidationError
+
+from .models import ProcessResult
+from ..utils.errors import ValidationError
+
+
+# 実行IDに使用できる文字（ファイル名として安全な文字のみ）
+_RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class RunJournal:
+    """実行ジャーナルクラス
+
+    1行に1画像の処理結果を{"key": キー, "result": 処理結果}の形式で追記します。
+    キーは画像の内容ハッシュと処理条件から生成するため、同じ画像を同じ条件で再処理することはありません。
+    書き込み途中で中断した最後の行は、読み込み時に無視します。
+    """
+
+    def __init__(self, path: Path):
+        """
+        初期化
+
+        Args:
+            path: ジャーナルファイルのパス
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self._entries: Dict[str, ProcessResult] = {}
+        # 中断により改行で終わっていない場合は、次の追記の前に改行を補う
+        self._needs_newline = False
+        self._load()
+
+    @classmethod
+    def open(cls, journal_dir: Path, run_id: str) -> "RunJournal":
+        """
+        実行IDのジャーナルを開きます（存在しない場合は新規に作成します）。
+
+        Args:
+            journal_dir: ジャーナルを保存するディレクトリ
+            run_id: 実行ID
+
+        Returns:
+            実行ジャーナル
+
+        Raises:
+            ValidationError: 実行IDにファイル名として使用できない文字が含まれる場合
+        """
+        if not _RUN_ID_PATTERN.match(run_id):
+            raise ValidationError("実行IDには英数字と「_.-」のみ使用できます", field="run_id", value=run_id)
+        journal_dir = Path(journal_dir)
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        return cls(journal_dir / f"{run_id}.jsonl")
+
+    @staticmethod
+    def new_run_id() -> str:
+        """
+        新しい実行IDを生成します。
+
+        Returns:
+            日時とランダムな接尾辞からなる実行ID（例: 20250101-120000-1a2b3c）
+        """
+        return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+
+        with open(self.path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                self._needs_newline = not line.endswith("\n")
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    self._entries[record["key"]] = ProcessResult.model_validate(record["result"])
+                except (ValueError, KeyError, TypeError, PydanticValidationError) as e:
+                    self.logger.warning(f"実行ジャーナルの{line_number}行目を読み込めないため無視します: {self.path.name} - {str(e)}")
+
+        if self._entries:
+            self.logger.info(f"実行ジャーナルを読み込みました: {self.path.name}（記録済み {len(self._entries)}件）")
+
+    def get(self, key: str) -> Optional[ProcessResult]:
+        """
+        記録済みの処理結果を取得します。
+
+        Args:
+            key: 画像のキー
+
+        Returns:
+            処理結果、未記録の場合はNone
+        """
+        return self._entries.get(key)
+
+    def record(self, key: str, result: ProcessResult) -> None:
+        """
+        処理結果をジャーナルに追記し、ディスクに書き込まれるまで待機します。
+
+        Args:
+            key: 画像のキー
+            result: 処理結果
+        """
+        line = json.dumps({"key": key, "result": result.model_dump(mode="json")}, ensure_ascii=False)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(("\n" if self._needs_newline else "") + line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._needs_newline = False
+        self._entries[key] = result
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
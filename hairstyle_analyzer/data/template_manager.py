@@ -6,10 +6,12 @@ CSVファイルからテンプレートを読み込み、最適なテンプレ
 """
 
 import csv
+import hashlib
+import json
 import logging
 import os
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple, Union, Any
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union, Any
 import difflib
 from collections import defaultdict
 
@@ -43,6 +45,10 @@ class TemplateManager(TemplateManagerProtocol):
         self.templates: List[Template] = []
         # カテゴリ名をキー、テンプレートのリストを値とする辞書
         self.templates_by_category: Dict[str, List[Template]] = defaultdict(list)
+        # 再読み込み時に呼び出すリスナー（テンプレート一覧のキャッシュの破棄など）
+        self._reload_listeners: List[Callable[[], None]] = []
+        # テンプレート一覧の内容ハッシュ（処理結果のキャッシュキーに使用）
+        self._catalog_hash = ""
         
         # テンプレートファイルを読み込む
         self._load_templates()
@@ -106,6 +112,9 @@ class TemplateManager(TemplateManagerProtocol):
                     except (IndexError, ValidationError) as e:
                         self.logger.warning(f"無効なテンプレート行をスキップします: {row} - エラー: {e}")
             
+            catalog = json.dumps([template.model_dump() for template in self.templates], ensure_ascii=False)
+            self._catalog_hash = hashlib.sha256(catalog.encode("utf-8")).hexdigest()[:16]
+            
             self.logger.info(f"テンプレートの読み込み完了: {len(self.templates)}件のテンプレート、"
                             f"{len(self.templates_by_category)}個のカテゴリ")
             
@@ -140,8 +149,23 @@ class TemplateManager(TemplateManagerProtocol):
             )
     
     def reload(self) -> None:
-        """テンプレートを再読み込みします。"""
+        """テンプレートを再読み込みし、登録されたリスナーに通知します。"""
         self._load_templates()
+        for listener in self._reload_listeners:
+            try:
+                listener()
+            except Exception as e:
+                self.logger.warning(f"テンプレート再読み込みの通知に失敗しました: {str(e)}")
+    
+    def add_reload_listener(self, listener: Callable[[], None]) -> None:
+        """
+        テンプレートの再読み込み時に呼び出すリスナーを登録します。
+        
+        Args:
+            listener: 引数なしで呼び出される関数
+        """
+        if listener not in self._reload_listeners:
+            self._reload_listeners.append(listener)
     
     def get_templates_by_category(self, category: str) -> List[Template]:
         """
@@ -173,6 +197,18 @@ class TemplateManager(TemplateManagerProtocol):
         """
         return self.templates.copy()
     
+    def get_catalog_hash(self) -> str:
+        """
+        テンプレート一覧の内容ハッシュを取得します。
+        
+        テンプレートのいずれかの項目が変わるとハッシュも変わるため、CSVの編集や再読み込みの前後で
+        キャッシュされた処理結果を区別できます。
+        
+        Returns:
+            テンプレート一覧のハッシュ値
+        """
+        return self._catalog_hash
+    
     def find_best_template(self, analysis: StyleAnalysisProtocol) -> Optional[Template]:
         """
         分析結果に最も合うテンプレートを検索します。
@@ -0,0 +1,351 @@
+"""
+2層キャッシュモジュール
+
+このモジュールでは、永続キャッシュ（CacheManager）の前段に置くメモリキャッシュ層を提供します。
+メモリ層はデシリアライズ済みのオブジェクトをバイト数上限付きのLRUで保持し、
+書き込みはまとめて永続層へ反映（ライトビハインド）します。
+"""
+
+import sys
+import json
+import time
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from .models import CacheEntry, CacheConfig
+from .interfaces import CacheManagerProtocol
+from .cache_manager import CacheManager
+from .cache_backends import PydanticJSONEncoder, describe_model_type
+
+
+class MemoryCacheTier:
+    """メモリキャッシュ層
+
+    値をデシリアライズ済みのまま保持し、推定バイト数の合計が上限を超えないよう
+    最も長く参照されていないエントリから削除します。
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        初期化
+
+        Args:
+            max_bytes: 保持するデータの推定バイト数の上限
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        # キー → (キャッシュエントリ, 推定バイト数)
+        self._entries: "OrderedDict[str, Tuple[CacheEntry, int]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        エントリを取得し、最近参照したものとして記録します。
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            キャッシュエントリ、または存在しない場合はNone
+        """
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        self._entries.move_to_end(key)
+        return item[0]
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        """
+        エントリを追加します。上限を超えた場合は古いエントリから削除します。
+
+        Args:
+            key: キャッシュキー
+            entry: キャッシュエントリ
+        """
+        self.discard(key)
+        size = estimate_size(entry.data)
+        if size > self.max_bytes:
+            # 単体で上限を超えるエントリはメモリ層に保持しない
+            return
+
+        self._entries[key] = (entry, size)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        """
+        エントリを削除します。存在しないキーは無視します。
+
+        Args:
+            key: キャッシュキー
+        """
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.current_bytes -= item[1]
+
+    def keys(self):
+        """保持しているキーの一覧"""
+        return list(self._entries.keys())
+
+    def clear(self) -> None:
+        """全てのエントリを削除します。"""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TieredCacheManager(CacheManagerProtocol):
+    """2層キャッシュマネージャー
+
+    メモリ層 → 永続層（CacheManager）の順に参照します。セッション内で繰り返される参照は
+    メモリ層で完結し、ディスクアクセスやJSONの再検証を行いません。
+    書き込みはメモリ層に即時反映し、永続層へは一定件数・一定時間ごとにまとめて書き込みます。
+    メモリ層で完結した参照も、永続層への書き込み時にまとめて永続層の退避ポリシーへ反映するため、
+    セッション内で頻繁に参照されるエントリが永続層から先に削除されることはありません。
+    """
+
+    def __init__(self, disk: CacheManager, config: CacheConfig):
+        """
+        初期化
+
+        Args:
+            disk: 永続層のキャッシュマネージャー
+            config: キャッシュ設定
+        """
+        self.logger = logging.getLogger(__name__)
+        self.disk = disk
+        self.config = config
+        self.memory = MemoryCacheTier(config.memory_max_bytes)
+
+        self._lock = threading.RLock()
+        self._pending: Dict[str, CacheEntry] = {}
+        # メモリ層で参照され、永続層の退避ポリシーに未反映のキー（参照順）
+        self._touched: "OrderedDict[str, None]" = OrderedDict()
+        self._last_flush = time.monotonic()
+        self._stats = {'memory_hits': 0, 'memory_misses': 0, 'disk_hits': 0, 'disk_misses': 0, 'flushes': 0}
+
+        # 未書き込みのデータが破棄時・終了時に失われないようにする
+        self._finalizer = weakref.finalize(self, _flush_pending, self._pending, self._lock, disk)
+
+    def _is_expired(self, entry: CacheEntry, now: float) -> bool:
+        ttl = entry.ttl or self.config.ttl_days * 24 * 60 * 60
+        return now - entry.timestamp > ttl
+
+    def get(self, key: str, context: str = "") -> Optional[Any]:
+        """
+        指定されたキーのキャッシュデータを取得します。
+
+        Args:
+            key: キャッシュキー
+            context: キャッシュコンテキスト（オプション）
+
+        Returns:
+            キャッシュデータ、または存在しない場合はNone
+        """
+        cache_key = self.disk._make_cache_key(key, context)
+        now = time.time()
+
+        with self._lock:
+            entry = self.memory.get(cache_key) or self._pending.get(cache_key)
+            if entry is not None:
+                if self._is_expired(entry, now):
+                    self.memory.discard(cache_key)
+                    self._pending.pop(cache_key, None)
+                else:
+                    self._stats['memory_hits'] += 1
+                    self._touched.pop(cache_key, None)
+                    self._touched[cache_key] = None
+                    return entry.data
+            self._stats['memory_misses'] += 1
+
+            disk_entry = self.disk.get_entry(cache_key)
+            if disk_entry is None:
+                self._stats['disk_misses'] += 1
+                return None
+
+            self._stats['disk_hits'] += 1
+            self.memory.put(cache_key, disk_entry)
+            return disk_entry.data
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, context: str = "") -> None:
+        """
+        キャッシュにデータを設定します。永続層への書き込みは遅延して行います。
+
+        Args:
+            key: キャッシュキー
+            value: キャッシュするデータ
+            ttl: 有効期限（秒）（オプション）
+            context: キャッシュコンテキスト（オプション）
+        """
+        cache_key = self.disk._make_cache_key(key, context)
+        entry = CacheEntry(data=value, timestamp=time.time(), ttl=ttl, model_type=describe_model_type(value))
+
+        with self._lock:
+            self.memory.put(cache_key, entry)
+            self._pending[cache_key] = entry
+
+            if (len(self._pending) >= self.config.write_behind_batch_size
+                    or time.monotonic() - self._last_flush >= self.config.write_behind_interval_seconds):
+                self.flush()
+
+    def flush(self) -> int:
+        """
+        メモリ層での参照を永続層の退避ポリシーに反映し、未書き込みのエントリを永続層にまとめて書き込みます。
+
+        Returns:
+            書き込んだエントリ数
+        """
+        with self._lock:
+            # 書き込み時のサイズ制限の適用より前に反映し、頻繁に参照されるエントリを残す
+            for cache_key in self._touched:
+                self.disk._policy.touch(cache_key)
+            self._touched.clear()
+            count = _flush_pending(self._pending, self._lock, self.disk)
+            self._last_flush = time.monotonic()
+            if count:
+                self._stats['flushes'] += 1
+                self.logger.debug(f"キャッシュを永続層に書き込みました: {count}件")
+            return count
+
+    def clear(self, pattern: Optional[str] = None) -> int:
+        """
+        キャッシュをクリアします。
+
+        Args:
+            pattern: クリアするキーのパターン（オプション）
+
+        Returns:
+            クリアされたエントリ数
+        """
+        with self._lock:
+            self.flush()
+            if pattern is None:
+                self.memory.clear()
+            else:
+                for cache_key in self.memory.keys():
+                    if pattern in cache_key:
+                        self.memory.discard(cache_key)
+            return self.disk.clear(pattern)
+
+    def cleanup(self) -> int:
+        """
+        期限切れのエントリを削除し、サイズ制限を適用します。
+
+        Returns:
+            永続層で削除されたエントリの総数
+        """
+        with self._lock:
+            self.flush()
+            now = time.time()
+            for cache_key in self.memory.keys():
+                entry = self.memory.get(cache_key)
+                if entry is not None and self._is_expired(entry, now):
+                    self.memory.discard(cache_key)
+            return self.disk.cleanup()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計情報を取得します。
+        永続層の統計に、層ごとのヒット・ミス数を加えたものを返します。
+
+        Returns:
+            統計情報を含む辞書
+        """
+        with self._lock:
+            self.flush()
+            stats = self.disk.get_statistics()
+            stats['tiers'] = {
+                'memory': {
+                    'entries': len(self.memory),
+                    'bytes': self.memory.current_bytes,
+                    'max_bytes': self.memory.max_bytes,
+                    'hits': self._stats['memory_hits'],
+                    'misses': self._stats['memory_misses'],
+                    'evictions': self.memory.evictions
+                },
+                'disk': {
+                    'entries': stats['total_entries'],
+                    'hits': self._stats['disk_hits'],
+                    'misses': self._stats['disk_misses'],
+                    'flushes': self._stats['flushes']
+                }
+            }
+            stats['pending_writes'] = len(self._pending)
+            return stats
+
+    def close(self) -> None:
+        """
+        未書き込みのエントリを書き込み、永続層を閉じます。
+        """
+        self.flush()
+        self._finalizer.detach()
+        self.disk.close()
+
+
+def _flush_pending(pending: Dict[str, CacheEntry], lock: threading.RLock, disk: CacheManager) -> int:
+    """
+    未書き込みのエントリを永続層に書き込みます（TieredCacheManagerのファイナライザからも呼ばれます）。
+
+    Args:
+        pending: 未書き込みのエントリ
+        lock: 排他ロック
+        disk: 永続層のキャッシュマネージャー
+
+    Returns:
+        書き込んだエントリ数
+    """
+    with lock:
+        if not pending:
+            return 0
+        entries = dict(pending)
+        pending.clear()
+        disk.set_many(entries)
+        return len(entries)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    キャッシュデータの推定バイト数を計算します。
+
+    Args:
+        value: キャッシュデータ
+
+    Returns:
+        推定バイト数（JSON表現のバイト数）
+    """
+    try:
+        if isinstance(value, BaseModel):
+            return len(value.model_dump_json().encode('utf-8'))
+        return len(json.dumps(value, ensure_ascii=False, cls=PydanticJSONEncoder).encode('utf-8'))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+def create_cache_manager(cache_file_path: Union[str, Path], config: CacheConfig) -> CacheManagerProtocol:
+    """
+    設定に応じたキャッシュマネージャーを作成します。
+    memory_max_bytesが0より大きい場合は、メモリ層を持つ2層キャッシュを返します。
+
+    Args:
+        cache_file_path: キャッシュファイルのパス
+        config: キャッシュ設定
+
+    Returns:
+        キャッシュマネージャー
+    """
+    disk = CacheManager(cache_file_path, config)
+    if config.memory_max_bytes <= 0:
+        return disk
+    return TieredCacheManager(disk, config)
@@ -0,0 +1,352 @@
+"""
+オフラインのバッチジョブモジュール
+
+このモジュールでは、大量の画像を応答時間より費用・クォータを優先して処理するために、
+全画像の統合分析リクエストをJSONLファイルにまとめてバッチジョブとして送信し、
+完了後に結果を統合分析結果として順次返すランナーと、Gemini Batch APIを使用するバックエンドを提供します。
+ジョブの状態はジョブディレクトリに保存するため、プロセスが再起動しても同じディレクトリで再実行すると再開します。
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import httpx
+import google.generativeai as genai
+
+from ...data.interfaces import BatchJobBackendProtocol, StylistInfoProtocol, CouponInfoProtocol
+from ...data.models import BatchJobConfig, BatchJobManifest, CombinedAnalysis, Template
+from ...utils.errors import GeminiAPIError, ImageError
+from ...utils.image_utils import compute_image_hash
+
+
+# ジョブの状態
+JOB_SUCCEEDED = "SUCCEEDED"
+JOB_FAILED_STATES = {"FAILED", "CANCELLED", "EXPIRED"}
+
+
+class GenAIBatchBackend(BatchJobBackendProtocol):
+    """Gemini Batch APIを使用するバッチジョブのバックエンド
+
+    リクエストファイルはファイルストアにアップロードし、REST APIでジョブを作成・確認します。
+    """
+
+    BASE_URL = "https://generativelanguage.googleapis.com"
+
+    def __init__(self, api_key: str, timeout: float = 60.0):
+        """
+        初期化
+
+        Args:
+            api_key: Gemini APIキー
+            timeout: REST APIのタイムアウト（秒）
+        """
+        self.logger = logging.getLogger(__name__)
+        self.api_key = api_key
+        self.timeout = timeout
+        genai.configure(api_key=api_key)
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        response = httpx.request(
+            method, f"{self.BASE_URL}/{path}",
+            headers={"x-goog-api-key": self.api_key}, timeout=self.timeout, **kwargs
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def submit(self, model_name: str, requests_path: Path, display_name: str) -> str:
+        """
+        リクエストのJSONLファイルをアップロードし、バッチジョブを作成します。
+
+        Args:
+            model_name: 使用するモデル名
+            requests_path: リクエストのJSONLファイルのパス
+            display_name: ジョブの表示名
+
+        Returns:
+            ジョブ名（"batches/..."）
+        """
+        uploaded = genai.upload_file(requests_path, mime_type="application/jsonl", display_name=display_name)
+        job = self._request("POST", f"v1beta/models/{model_name}:batchGenerateContent", json={
+            "batch": {"display_name": display_name, "input_config": {"file_name": uploaded.name}}
+        })
+        return job["name"]
+
+    def get_state(self, job_name: str) -> str:
+        """
+        ジョブの状態を取得します。
+
+        Args:
+            job_name: ジョブ名
+
+        Returns:
+            状態（"BATCH_STATE_SUCCEEDED"などの接頭辞を除いた値）
+        """
+        job = self._request("GET", f"v1beta/{job_name}")
+        state = job.get("metadata", {}).get("state") or job.get("state") or "PENDING"
+        return state.rsplit("_", 1)[-1]
+
+    def download_results(self, job_name: str, destination: Path) -> None:
+        """
+        完了したジョブの結果ファイルをダウンロードします。
+
+        Args:
+            job_name: ジョブ名
+            destination: 保存先のパス
+        """
+        job = self._request("GET", f"v1beta/{job_name}")
+        output = job.get("response") or job.get("metadata", {}).get("output") or {}
+        file_name = output.get("responsesFile")
+        if not file_name:
+            raise GeminiAPIError(f"バッチジョブの結果ファイルがありません: {job_name}", error_type="BATCH_JOB_ERROR")
+
+        with httpx.stream(
+            "GET", f"{self.BASE_URL}/download/v1beta/{file_name}:download",
+            params={"alt": "media"}, headers={"x-goog-api-key": self.api_key}, timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            with open(destination, "wb") as f:
+                for chunk in response.iter_bytes():
+                    f.write(chunk)
+
+
+def _rest_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """response_schemaの型名をREST APIの列挙値（大文字）に変換します。"""
+    converted = {}
+    for key, value in schema.items():
+        if key == "type":
+            converted[key] = value.upper()
+        elif key == "properties":
+            converted[key] = {name: _rest_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            converted[key] = _rest_schema(value)
+        else:
+            converted[key] = value
+    return converted
+
+
+def _image_hash_or_none(image_path: Path) -> Optional[str]:
+    """画像の内容ハッシュを返します（読み込めない画像はリクエストに含めないためNone）。"""
+    try:
+        return compute_image_hash(image_path)
+    except ValueError:
+        return None
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    temp_path.write_text(text, encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+class BatchJobRunner:
+    """オフラインのバッチジョブ実行クラス
+
+    ジョブディレクトリに、リクエストファイル（requests.jsonl）・ジョブの状態（manifest.json）・
+    結果ファイル（results.jsonl）を保存します。同じ内容で再実行した場合は、送信済みのジョブの完了待ち、
+    またはダウンロード済みの結果の読み込みから再開します。内容が異なる場合は新しいジョブを送信します。
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    REQUESTS_FILE = "requests.jsonl"
+    RESULTS_FILE = "results.jsonl"
+
+    def __init__(self, service, backend: BatchJobBackendProtocol, config: BatchJobConfig):
+        """
+        初期化
+
+        Args:
+            service: GeminiServiceのインスタンス（プロンプトの作成と応答の検証に使用）
+            backend: バッチジョブのバックエンド
+            config: バッチジョブ設定
+        """
+        self.logger = logging.getLogger(__name__)
+        self.service = service
+        self.backend = backend
+        self.config = config
+
+    async def run(
+        self,
+        job_dir: Path,
+        image_paths: List[Path],
+        categories: List[str],
+        templates: List[Template],
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3
+    ) -> AsyncIterator[Tuple[Path, Union[CombinedAnalysis, Exception]]]:
+        """
+        バッチジョブを送信（または再開）し、完了後に画像ごとの統合分析結果を結果ファイルの順に返します。
+
+        Args:
+            job_dir: ジョブディレクトリ
+            image_paths: 画像ファイルのパスのリスト
+            categories: カテゴリリスト
+            templates: テンプレートのリスト
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数
+
+        Yields:
+            (画像ファイルのパス, 統合分析結果または結果を取得できなかった理由の例外)のタプル
+
+        Raises:
+            GeminiAPIError: ジョブが失敗した場合、または完了の待機時間を超過した場合
+        """
+        job_dir.mkdir(parents=True, exist_ok=True)
+        model_name = self.service.config.model
+        prompt = self.service.build_combined_prompt(categories, templates, stylists, coupons, template_count)
+        schema = self.service.combined_response_schema(categories, stylists) if self.service.config.structured_output else None
+        # 同じ名前で保存された別の画像の結果を返さないよう、画像の内容ハッシュもダイジェストに含める
+        images = [[str(path), _image_hash_or_none(path)] for path in image_paths]
+        digest = hashlib.sha256(json.dumps(
+            [model_name, prompt, schema, images], ensure_ascii=False, sort_keys=True
+        ).encode("utf-8")).hexdigest()
+
+        manifest = self._load_manifest(job_dir)
+        if manifest is None or manifest.request_digest != digest:
+            if manifest is not None:
+                self.logger.warning(f"ジョブディレクトリのリクエスト内容が異なるため、新しいジョブを作成します: {job_dir}")
+            manifest = BatchJobManifest(request_digest=digest, model=model_name, images=[str(path) for path in image_paths])
+            await self._write_requests(job_dir, image_paths, prompt, schema)
+            self._save_manifest(job_dir, manifest)
+        elif manifest.job_name:
+            self.logger.info(f"バッチジョブを再開します: {manifest.job_name}")
+
+        if not manifest.downloaded:
+            if not manifest.job_name:
+                await self._submit(job_dir, manifest)
+            await self._wait(job_dir, manifest)
+
+        for item in self._read_results(job_dir, manifest, categories, templates, stylists, coupons, template_count):
+            yield item
+
+    async def _write_requests(self, job_dir: Path, image_paths: List[Path], prompt: str, schema: Optional[Dict[str, Any]]) -> None:
+        generation_config: Dict[str, Any] = {"temperature": 0.2, "max_output_tokens": 2048}
+        if schema is not None:
+            generation_config["response_mime_type"] = "application/json"
+            generation_config["response_schema"] = _rest_schema(schema)
+
+        lines = []
+        for index, image_path in enumerate(image_paths):
+            try:
+                image_part = await self.service._get_image_part(image_path)
+            except ImageError as e:
+                # リクエストに含めない画像は、結果の読み込み時に結果なしとして扱う
+                self.logger.error(f"バッチジョブに含められない画像です: {image_path.name} - {str(e)}")
+                continue
+            if "file_data" not in image_part:
+                image_part = {"inline_data": image_part}
+            lines.append(json.dumps({
+                "key": str(index),
+                "request": {
+                    "contents": [{"role": "user", "parts": [{"text": prompt}, image_part]}],
+                    "generation_config": generation_config
+                }
+            }, ensure_ascii=False))
+        _write_atomic(job_dir / self.REQUESTS_FILE, "\n".join(lines) + "\n")
+        self.logger.info(f"バッチジョブのリクエストファイルを作成しました: {len(lines)}件")
+
+    async def _submit(self, job_dir: Path, manifest: BatchJobManifest) -> None:
+        display_name = f"hairstyle-analyzer-{manifest.request_digest[:12]}"
+        manifest.job_name = await asyncio.to_thread(
+            self.backend.submit, manifest.model, job_dir / self.REQUESTS_FILE, display_name
+        )
+        self._save_manifest(job_dir, manifest)
+        self.logger.info(f"バッチジョブを送信しました: {manifest.job_name} ({len(manifest.images)}枚)")
+
+    async def _wait(self, job_dir: Path, manifest: BatchJobManifest) -> None:
+        deadline = time.monotonic() + self.config.max_wait_seconds
+        while True:
+            state = await asyncio.to_thread(self.backend.get_state, manifest.job_name)
+            if state == JOB_SUCCEEDED:
+                break
+            if state in JOB_FAILED_STATES:
+                job_name, manifest.job_name = manifest.job_name, None
+                # 次回の実行では新しいジョブとして再送信する
+                self._save_manifest(job_dir, manifest)
+                raise GeminiAPIError(f"バッチジョブが終了しました: {job_name} ({state})", error_type="BATCH_JOB_ERROR")
+            if time.monotonic() >= deadline:
+                raise GeminiAPIError(
+                    f"バッチジョブの完了待機時間を超過しました: {manifest.job_name}（同じジョブディレクトリで再実行すると再開します）",
+                    error_type="BATCH_JOB_TIMEOUT"
+                )
+            self.logger.debug(f"バッチジョブの完了を待機中: {manifest.job_name} ({state})")
+            await asyncio.sleep(self.config.poll_interval_seconds)
+
+        results_path = job_dir / self.RESULTS_FILE
+        temp_path = results_path.with_suffix(results_path.suffix + ".tmp")
+        await asyncio.to_thread(self.backend.download_results, manifest.job_name, temp_path)
+        os.replace(temp_path, results_path)
+        manifest.downloaded = True
+        self._save_manifest(job_dir, manifest)
+        self.logger.info(f"バッチジョブの結果をダウンロードしました: {manifest.job_name}")
+
+    def _read_results(
+        self,
+        job_dir: Path,
+        manifest: BatchJobManifest,
+        categories: List[str],
+        templates: List[Template],
+        stylists: Optional[List[StylistInfoProtocol]],
+        coupons: Optional[List[CouponInfoProtocol]],
+        template_count: int
+    ):
+        image_paths = [Path(path) for path in manifest.images]
+        seen = set()
+        # 結果ファイルは1行ずつ読み込み、全体をメモリに保持しない
+        with open(job_dir / self.RESULTS_FILE, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    index = int(record["key"])
+                    image_path = image_paths[index]
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    self.logger.warning(f"バッチジョブの結果の行を読み込めません: {str(e)}")
+                    continue
+                if index in seen:
+                    continue
+                seen.add(index)
+
+                try:
+                    if "error" in record or "response" not in record:
+                        raise GeminiAPIError(f"バッチジョブのリクエストが失敗しました: {record.get('error')}", error_type="BATCH_JOB_ERROR")
+                    result = self.service.parse_combined_response(
+                        self._response_text(record["response"]),
+                        categories, templates, stylists, coupons, template_count
+                    )
+                except Exception as e:
+                    # 1件の結果の不備は、その画像の結果なしとして扱う
+                    yield image_path, e
+                    continue
+                yield image_path, result
+
+        for index, image_path in enumerate(image_paths):
+            if index not in seen:
+                yield image_path, GeminiAPIError(f"バッチジョブの結果がありません: {image_path.name}", error_type="BATCH_JOB_ERROR")
+
+    @staticmethod
+    def _response_text(response: Dict[str, Any]) -> str:
+        candidates = response.get("candidates") or [{}]
+        parts = candidates[0].get("content", {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    def _load_manifest(self, job_dir: Path) -> Optional[BatchJobManifest]:
+        path = job_dir / self.MANIFEST_FILE
+        if not path.exists():
+            return None
+        try:
+            return BatchJobManifest.model_validate_json(path.read_text(encoding="utf-8"))
+        except ValueError as e:
+            self.logger.warning(f"ジョブの状態ファイルを読み込めないため、新しいジョブを作成します: {str(e)}")
+            return None
+
+    def _save_manifest(self, job_dir: Path, manifest: BatchJobManifest) -> None:
+        _write_atomic(job_dir / self.MANIFEST_FILE, manifest.model_dump_json(indent=2))
@@ -0,0 +1,138 @@
+"""
+サーキットブレーカーモジュール
+
+このモジュールでは、モデルごとのエラー率と応答時間を直近の呼び出しで監視する
+サーキットブレーカーを提供します。モデルの状態が悪化した場合は呼び出しを遮断し、
+一定時間後に少数の試行（ハーフオープン）で回復を確認します。
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Deque, Dict, Any, Tuple
+
+from ...data.models import CircuitBreakerConfig
+
+
+# サーキットブレーカーの状態
+CLOSED = "closed"          # 正常（全ての呼び出しを許可）
+OPEN = "open"              # 遮断中（呼び出しを許可しない）
+HALF_OPEN = "half_open"    # 回復確認中（少数の試行のみ許可）
+
+
+class CircuitBreaker:
+    """サーキットブレーカー
+
+    直近window_size回の呼び出しのうち、失敗または遅延した呼び出しの割合が閾値を超えると
+    遮断状態（OPEN）になります。open_seconds経過後はハーフオープン状態となり、
+    試行が成功すれば正常状態（CLOSED）に戻り、失敗すれば再び遮断します。
+    """
+
+    def __init__(self, name: str, config: CircuitBreakerConfig):
+        """
+        初期化
+
+        Args:
+            name: 監視対象の名前（モデル名）
+            config: サーキットブレーカー設定
+        """
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.config = config
+        self.state = CLOSED
+        # 直近の呼び出し結果（失敗したか, 遅延したか）
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=config.window_size)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.open_count = 0
+
+    def allow_request(self) -> bool:
+        """
+        呼び出しを許可するかどうかを判定します。ハーフオープン状態では試行枠を確保します。
+
+        Returns:
+            許可する場合はTrue
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.config.open_seconds:
+                return False
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.config.half_open_max_calls:
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def record_success(self, latency: float) -> None:
+        """
+        呼び出しの成功を記録します。
+
+        Args:
+            latency: 応答時間（秒）
+        """
+        slow = latency >= self.config.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if slow:
+                self._trip()
+            else:
+                self._transition(CLOSED)
+            return
+        self._record(False, slow)
+
+    def record_failure(self) -> None:
+        """呼び出しの失敗を記録します。"""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._trip()
+            return
+        self._record(True, False)
+
+    def release(self) -> None:
+        """結果を記録せずに呼び出しが終わった（キャンセルなど）場合に、試行枠を解放します。"""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        self._window.append((failed, slow))
+        if self.state != CLOSED or len(self._window) < self.config.min_calls:
+            return
+
+        calls = len(self._window)
+        failure_rate = sum(1 for failed, _ in self._window if failed) / calls
+        slow_rate = sum(1 for _, slow in self._window if slow) / calls
+        if failure_rate >= self.config.failure_rate_threshold or slow_rate >= self.config.slow_call_rate_threshold:
+            self.logger.warning(
+                f"モデル {self.name} の状態が悪化したため遮断します "
+                f"(エラー率: {failure_rate:.0%}, 遅延率: {slow_rate:.0%})"
+            )
+            self._trip()
+
+    def _trip(self) -> None:
+        self._opened_at = time.monotonic()
+        self.open_count += 1
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.logger.info(f"サーキットブレーカーの状態変更: {self.name} {self.state} → {state}")
+        self.state = state
+        if state in (CLOSED, HALF_OPEN):
+            self._window.clear()
+            self._probes_in_flight = 0
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        サーキットブレーカーの統計情報を取得します。
+
+        Returns:
+            状態・直近の呼び出し数・遮断回数を含む辞書
+        """
+        return {
+            'state': self.state,
+            'window_calls': len(self._window),
+            'window_failures': sum(1 for failed, _ in self._window if failed),
+            'open_count': self.open_count,
+        }
@@ -0,0 +1,132 @@
+"""
+Gemini APIクライアントモジュール
+
+このモジュールでは、GeminiServiceが使用するGemini APIクライアントの標準実装を提供します。
+google-generativeaiライブラリを使用し、モデルの取得、ファイルストアへのアップロード、
+コンテキストキャッシュの管理を行います。
+"""
+
+import io
+import time
+import logging
+import datetime
+from typing import Any, Dict, List, Optional
+
+import google.generativeai as genai
+from google.generativeai import caching
+from google.generativeai import client as genai_client
+
+from ...data.interfaces import GeminiClientProtocol
+from ...data.models import UploadedFile, CachedContext
+
+
+class GenAIClient(GeminiClientProtocol):
+    """google-generativeaiを使用するGemini APIクライアント"""
+
+    # 有効期限が返されなかった場合に使用する有効期間（ファイルストアの保持期間48時間より短くする）
+    DEFAULT_FILE_TTL_SECONDS = 47 * 60 * 60
+
+    def __init__(self, api_key: str):
+        """
+        初期化
+
+        Args:
+            api_key: Gemini APIキー
+        """
+        self.logger = logging.getLogger(__name__)
+        genai.configure(api_key=api_key)
+        # 作成したコンテキストキャッシュ（キャッシュ名 → CachedContent）
+        self._cached_contents: Dict[str, caching.CachedContent] = {}
+
+    def get_model(self, model_name: str) -> Any:
+        """
+        生成モデルを取得します。
+
+        Args:
+            model_name: モデル名
+
+        Returns:
+            genai.GenerativeModel
+        """
+        return genai.GenerativeModel(model_name)
+
+    def upload_file(self, data: bytes, mime_type: str, display_name: Optional[str] = None) -> UploadedFile:
+        """
+        ファイルをファイルストアにアップロードします。
+
+        Args:
+            data: ファイルの内容
+            mime_type: MIMEタイプ
+            display_name: 表示名（オプション）
+
+        Returns:
+            アップロードしたファイルの参照
+        """
+        file = genai.upload_file(io.BytesIO(data), mime_type=mime_type, display_name=display_name)
+
+        expiration_time = getattr(file, "expiration_time", None)
+        expires_at = expiration_time.timestamp() if expiration_time else time.time() + self.DEFAULT_FILE_TTL_SECONDS
+
+        self.logger.debug(f"ファイルをアップロードしました: {file.name} ({len(data)} bytes)")
+        return UploadedFile(name=file.name, uri=file.uri, mime_type=mime_type, expires_at=expires_at)
+
+    def create_cached_content(self, model_name: str, contents: List[str], display_name: str, ttl_seconds: int) -> CachedContext:
+        """
+        コンテンツをコンテキストキャッシュに登録します。
+
+        Args:
+            model_name: キャッシュを使用するモデル名
+            contents: キャッシュするコンテンツ
+            display_name: 表示名
+            ttl_seconds: 有効期間（秒）
+
+        Returns:
+            登録したキャッシュの参照
+        """
+        cached = caching.CachedContent.create(
+            model=model_name,
+            display_name=display_name,
+            contents=contents,
+            ttl=datetime.timedelta(seconds=ttl_seconds)
+        )
+        self._cached_contents[cached.name] = cached
+
+        expire_time = getattr(cached, "expire_time", None)
+        expires_at = expire_time.timestamp() if expire_time else time.time() + ttl_seconds
+        return CachedContext(name=cached.name, model=model_name, expires_at=expires_at)
+
+    def get_cached_model(self, context: CachedContext) -> Any:
+        """
+        コンテキストキャッシュを参照する生成モデルを取得します。
+
+        Args:
+            context: キャッシュの参照
+
+        Returns:
+            genai.GenerativeModel
+        """
+        cached = self._cached_contents.get(context.name) or context.name
+        return genai.GenerativeModel.from_cached_content(cached)
+
+    def delete_cached_content(self, name: str) -> None:
+        """
+        コンテキストキャッシュを削除します。
+
+        Args:
+            name: キャッシュ名
+        """
+        cached = self._cached_contents.pop(name, None) or caching.CachedContent.get(name)
+        cached.delete()
+
+    def reset_async_client(self, model: Any) -> None:
+        """
+        モデルの非同期クライアントを破棄し、次の非同期呼び出しで現在のイベントループに作成し直させます。
+
+        非同期クライアントは最初に使用したイベントループに紐づき、ライブラリ全体で共有されるため、
+        モデルの参照と共有のクライアントの両方を破棄します。
+
+        Args:
+            model: genai.GenerativeModel
+        """
+        model._async_client = None
+        genai_client._client_manager.clients.pop("generative_async", None)
@@ -0,0 +1,162 @@
+"""
+コンテキストキャッシュモジュール
+
+このモジュールでは、複数の画像で共通するプロンプトの前半（テンプレート一覧など）を
+Gemini APIのコンテキストキャッシュに1度だけ登録し、以降の呼び出しで再利用するレジストリを提供します。
+画像ごとの呼び出しでは、キャッシュしたコンテキストを参照するモデルに画像と分析結果のみを送信します。
+"""
+
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ...data.interfaces import GeminiClientProtocol
+from ...data.models import CachedContext, ContextCacheConfig
+
+
+# キャッシュキー（モデル名, 前半部分のハッシュ）
+ContextKey = Tuple[str, str]
+
+
+class ContextCacheRegistry:
+    """コンテキストキャッシュのレジストリ
+
+    モデル名とプロンプトの前半部分の内容からキャッシュを特定するため、内容が変わると
+    新しいキャッシュが作成されます。テンプレートの再読み込み時はinvalidateで古いキャッシュを削除します。
+    キャッシュの作成に失敗した場合や、前半部分が短すぎる場合はNoneを返し、呼び出し側でプロンプトに含めて送信します。
+    """
+
+    # 有効期限がこの秒数以内に迫っているキャッシュは作り直す
+    EXPIRY_MARGIN_SECONDS = 60
+
+    def __init__(
+        self,
+        client: GeminiClientProtocol,
+        config: ContextCacheConfig,
+        estimate_tokens: Callable[[str], int]
+    ):
+        """
+        初期化
+
+        Args:
+            client: Gemini APIクライアント
+            config: コンテキストキャッシュ設定
+            estimate_tokens: プロンプトのトークン数を見積もる関数
+        """
+        self.logger = logging.getLogger(__name__)
+        self.client = client
+        self.config = config
+        self.estimate_tokens = estimate_tokens
+        self._contexts: Dict[ContextKey, CachedContext] = {}
+        self._models: Dict[ContextKey, Any] = {}
+        self._pending: Dict[ContextKey, "asyncio.Task[Optional[Any]]"] = {}
+        # 作成に失敗した内容は、次の無効化まで再作成を試みない
+        self._failed: set = set()
+        self.hits = 0
+        self.creates = 0
+        self.failures = 0
+
+    @staticmethod
+    def make_key(model_name: str, prefix: str) -> ContextKey:
+        """
+        キャッシュキーを作成します。
+
+        Args:
+            model_name: モデル名
+            prefix: プロンプトの前半部分
+
+        Returns:
+            キャッシュキー
+        """
+        return model_name, hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    async def get_model(self, model_name: str, prefix: str) -> Optional[Any]:
+        """
+        前半部分をキャッシュしたコンテキストを参照するモデルを取得します。未登録の場合は登録します。
+
+        Args:
+            model_name: モデル名
+            prefix: プロンプトの前半部分
+
+        Returns:
+            キャッシュを参照するモデル、キャッシュを使用できない場合はNone
+        """
+        if not self.config.enabled or self.estimate_tokens(prefix) < self.config.min_tokens:
+            return None
+
+        key = self.make_key(model_name, prefix)
+        if key in self._failed:
+            return None
+
+        context = self._contexts.get(key)
+        if context is not None and context.expires_at - time.time() > self.EXPIRY_MARGIN_SECONDS:
+            self.hits += 1
+            return self._models[key]
+
+        # 同じ内容に対する並行した呼び出しでは、キャッシュの作成を1度だけ行う
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._create(key, prefix))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _create(self, key: ContextKey, prefix: str) -> Optional[Any]:
+        model_name, digest = key
+        try:
+            context = await asyncio.to_thread(
+                self.client.create_cached_content,
+                model_name,
+                [prefix],
+                f"hairstyle-analyzer-{digest[:12]}",
+                self.config.ttl_seconds
+            )
+            model = self.client.get_cached_model(context)
+        except Exception as e:
+            self.failures += 1
+            self._failed.add(key)
+            self.logger.warning(f"コンテキストキャッシュを作成できないため、プロンプトに含めて送信します: {e}")
+            return None
+
+        stale = self._contexts.get(key)
+        if stale is not None:
+            self._delete(stale)
+        self._contexts[key] = context
+        self._models[key] = model
+        self.creates += 1
+        self.logger.info(f"コンテキストキャッシュを作成しました: {context.name} (モデル: {model_name})")
+        return model
+
+    def invalidate(self) -> None:
+        """登録済みのキャッシュを全て削除します（テンプレートの再読み込み時に使用）。"""
+        contexts = list(self._contexts.values())
+        self._contexts.clear()
+        self._models.clear()
+        self._failed.clear()
+        for context in contexts:
+            self._delete(context)
+        if contexts:
+            self.logger.info(f"コンテキストキャッシュを無効化しました: {len(contexts)}件")
+
+    def _delete(self, context: CachedContext) -> None:
+        try:
+            self.client.delete_cached_content(context.name)
+        except Exception as e:
+            # 削除に失敗しても有効期限で自動的に削除される
+            self.logger.debug(f"コンテキストキャッシュの削除に失敗しました: {context.name} - {e}")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        コンテキストキャッシュの統計情報を取得します。
+
+        Returns:
+            登録数・ヒット数・作成数・失敗数を含む辞書
+        """
+        return {
+            'contexts': len(self._contexts),
+            'hits': self.hits,
+            'creates': self.creates,
+            'failures': self.failures,
+        }
@@ -12,18 +12,33 @@ import base64
 import logging
 import asyncio
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union, Tuple, AsyncGenerator
+from typing import Dict, List, Optional, Any, Union, Tuple, Type, AsyncGenerator, Sequence
 import re
 import random
+import hashlib
 
-import google.generativeai as genai
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 
-from ...data.models import StyleAnalysis, StyleFeatures, AttributeAnalysis, StylistInfo, CouponInfo, Template, GeminiConfig
-from ...data.interfaces import StyleAnalysisProtocol, AttributeAnalysisProtocol, StylistInfoProtocol, CouponInfoProtocol
+from ...data.models import (
+    StyleAnalysis, StyleFeatures, AttributeAnalysis, StylistInfo, CouponInfo, Template, GeminiConfig,
+    TemplateCandidate, CombinedAnalysis, UploadedFile
+)
+from ...data.interfaces import GeminiClientProtocol, StyleAnalysisProtocol, AttributeAnalysisProtocol, StylistInfoProtocol, CouponInfoProtocol
 from ...utils.errors import GeminiAPIError, ValidationError as AppValidationError, async_with_error_handling
-from ...utils.image_utils import encode_image, is_valid_image
+from ...utils.image_utils import encode_image, is_valid_image, resize_image_bytes
 from ...utils.async_context import AsyncResource, asynccontextmanager, Timer
+from .client import GenAIClient
+from .prepared_images import PreparedImageRegistry, ImageKey
+from .rate_limiter import AsyncRateLimiter
+from .circuit_breaker import CircuitBreaker
+from .transport import create_transport
+from .context_cache import ContextCacheRegistry
+from .response_schemas import (
+    response_schema_for, TemplateSelectionResponse, MultipleTemplateSelectionResponse,
+    StylistSelectionResponse, CouponSelectionResponse, CategorySelectionResponse, CombinedAnalysisResponse,
+    BatchAnalysisResponse
+)
+from .retry_policy import RetryPolicy, classify_error, ERROR_TYPES, PERMANENT, QUOTA, TRANSIENT
 
 # 必要なエラー定義をインポート
 from hairstyle_analyzer.utils.errors import ImageError
@@ -48,7 +63,10 @@ class APISession(AsyncResource):
         image_path: Optional[Path] = None, 
         use_fallback: bool = False,
         max_retries: int = 3, 
-        retry_delay: float = 1.0
+        retry_delay: float = 1.0,
+        response_schema: Optional[Dict[str, Any]] = None,
+        cached_prefix: Optional[str] = None,
+        image_paths: Sequence[Path] = ()
     ):
         """初期化
         
@@ -59,6 +77,9 @@ class APISession(AsyncResource):
             use_fallback: フォールバックモデルを使用するかどうか
             max_retries: 最大再試行回数
             retry_delay: 再試行間の遅延（秒）
+            response_schema: 応答JSONのスキーマ（指定時は構造化出力を要求する）
+            cached_prefix: 複数の呼び出しで共通するプロンプトの前半部分（コンテキストキャッシュに登録して再利用する）
+            image_paths: 1回のリクエストでまとめて送信する画像ファイルのパスのリスト（各画像の前に画像番号を付ける）
         """
         self.service = service
         self.prompt = prompt
@@ -66,6 +87,9 @@ class APISession(AsyncResource):
         self.use_fallback = use_fallback
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.response_schema = response_schema
+        self.cached_prefix = cached_prefix
+        self.image_paths = list(image_paths)
         self.attempt = 1
         self.logger = logging.getLogger(__name__)
         self.response = None
@@ -76,56 +100,121 @@ class APISession(AsyncResource):
     
     async def execute(self) -> str:
         """APIリクエストを実行し、結果を返す"""
-        while self.attempt <= self.max_retries:
+        policy = self.service.retry_policy
+        while True:
             try:
                 response = await self._execute_api_call()
                 self.response = response
                 return response
             except Exception as e:
+                category = classify_error(e)
+                
+                # 恒久的なエラーは再試行しない
+                if category == PERMANENT:
+                    self.logger.error(f"再試行できないエラーが発生しました（試行 {self.attempt}回目）: {str(e)}")
+                    raise GeminiAPIError(f"Gemini API呼び出しに失敗しました: {str(e)}", error_type=ERROR_TYPES[category]) from e
+                
                 # 最後の試行でエラーが発生した場合は例外を発生させる
-                if self.attempt >= self.max_retries:
+                if not policy.should_retry(category, self.attempt):
                     self.logger.error(f"最大再試行回数（{self.max_retries}回）に達しました: {str(e)}")
-                    raise GeminiAPIError(f"Gemini API呼び出しに失敗しました: {str(e)}")
+                    raise GeminiAPIError(f"Gemini API呼び出しに失敗しました: {str(e)}", error_type=ERROR_TYPES[category]) from e
+                
+                delay = policy.next_delay(self.attempt, category, e)
+                if category == QUOTA:
+                    # クォータ超過は全ての呼び出しに影響するため、共有のレートリミッターを停止する
+                    self.service.rate_limiter.pause(delay)
                 
                 # エラーを記録して再試行
-                self.logger.warning(f"API呼び出しエラー（試行 {self.attempt}/{self.max_retries}）: {str(e)}")
-                self.logger.info(f"{self.retry_delay}秒後に再試行します...")
+                self.logger.warning(f"API呼び出しエラー（{category}、試行 {self.attempt}/{self.max_retries}）: {str(e)}")
+                self.logger.info(f"{delay:.1f}秒後に再試行します...")
                 
-                # 遅延を設定して再試行する前に待機
-                await asyncio.sleep(self.retry_delay * self.attempt)
+                await asyncio.sleep(delay)
                 self.attempt += 1
     
     async def _execute_api_call(self) -> str:
         """実際のAPI呼び出しを実行する"""
         try:
-            # 使用するモデルを決定
-            model = self.service.fallback_model if self.use_fallback else self.service.model
-            
-            # 画像がある場合は追加
-            if self.image_path:
-                # 画像データを準備
-                image_data = self.service._prepare_image(self.image_path)
-                # Gemini APIはプロンプトと画像を組み合わせたコンテンツを受け取る
-                content = [self.prompt, image_data]
-            else:
-                # 画像なしの場合はテキストのみ
+            # 使用するモデルを決定（プライマリモデルが遮断中の場合はフォールバックモデル）
+            model_name, model, reserved = self.service._select_model(self.use_fallback)
+            # サーキットブレーカーが許可した呼び出しのみ結果を記録する
+            # （モデルの選択で確保した試行枠は、呼び出しの結果を記録するか解放するまで保持される）
+            breaker = self.service.circuit_breakers[model_name] if reserved else None
+            settled = breaker is None
+            try:
                 content = [self.prompt]
-            
-            # 現在の試行回数を考慮した温度を設定
-            # 再試行時には温度を少し上げると多様な出力になる可能性がある
-            temperature = min(0.2 * self.attempt, 0.8)
-            
-            self.logger.debug(f"API呼び出し実行 (試行 {self.attempt}, 温度: {temperature})")
-            
-            # Google API呼び出し - 正しいパラメータ名を使用
-            response = await asyncio.to_thread(
-                model.generate_content,
-                content,  # contentパラメータではなく直接コンテンツを渡す
-                generation_config={
+                if self.cached_prefix:
+                    # 共通部分はコンテキストキャッシュを参照するモデルで送信し、使用できない場合はプロンプトに含める
+                    cached_model = await self.service.context_caches.get_model(model_name, self.cached_prefix)
+                    if cached_model is not None:
+                        model = cached_model
+                    else:
+                        content = [self.cached_prefix, self.prompt]
+                
+                # 画像がある場合は追加
+                if self.image_path:
+                    # 画像データ（またはアップロード済みファイルの参照）を準備
+                    image_data = await self.service._get_image_part(self.image_path)
+                    # Gemini APIはプロンプトと画像を組み合わせたコンテンツを受け取る
+                    content.append(image_data)
+                
+                # 複数の画像は、応答と対応付けられるように画像番号を付けて追加
+                for index, path in enumerate(self.image_paths):
+                    content.append(f"画像{index}:")
+                    content.append(await self.service._get_image_part(path))
+                
+                # 現在の試行回数を考慮した温度を設定
+                # 再試行時には温度を少し上げると多様な出力になる可能性がある
+                temperature = min(0.2 * self.attempt, 0.8)
+                
+                self.logger.debug(f"API呼び出し実行 (試行 {self.attempt}, 温度: {temperature})")
+                
+                generation_config = {
                     "temperature": temperature,
                     "max_output_tokens": 2048,
                 }
-            )
+                if self.response_schema is not None:
+                    # スキーマで制約したJSONのみを出力させる
+                    generation_config["response_mime_type"] = "application/json"
+                    generation_config["response_schema"] = self.response_schema
+                
+                # 全てのAPI呼び出しは共有のレートリミッターを通過する
+                estimated_tokens = self.service.estimate_tokens(
+                    (self.cached_prefix or "") + self.prompt, has_image=self.image_path is not None
+                ) + self.service.IMAGE_TOKENS * len(self.image_paths)
+                async with self.service.rate_limiter.limit(estimated_tokens) as permit:
+                    started = time.monotonic()
+                    try:
+                        # 設定された通信方式（ネイティブ非同期またはスレッドプール）で呼び出す
+                        # 制限時間を超えた呼び出しは中断し、一時的なエラーとして再試行する
+                        timeout = self.service.config.request_timeout_seconds
+                        try:
+                            response = await asyncio.wait_for(
+                                self.service.transport.generate(model, content, generation_config), timeout
+                            )
+                        except asyncio.TimeoutError as e:
+                            raise asyncio.TimeoutError(f"API呼び出しが制限時間（{timeout}秒）を超えました") from e
+                    except Exception as e:
+                        if not settled:
+                            settled = True
+                            # リクエスト自体の誤りはモデルの状態として扱わない
+                            if classify_error(e) == PERMANENT:
+                                breaker.release()
+                            else:
+                                breaker.record_failure()
+                        raise
+                    if not settled:
+                        settled = True
+                        breaker.record_success(time.monotonic() - started)
+                    
+                    # 実際の使用トークン数を予算に反映する
+                    total_tokens = getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+                    if isinstance(total_tokens, int):
+                        permit.record_usage(total_tokens)
+            except BaseException:
+                # 呼び出し前の準備（画像の読み込み・レート制限の待機等）で失敗・キャンセルされた場合は試行枠を解放する
+                if not settled:
+                    breaker.release()
+                raise
             
             return response.text
             
@@ -148,12 +237,22 @@ class GeminiService:
     画像からヘアスタイルの特徴、カテゴリ、性別、髪の長さなどを抽出します。
     """
     
-    def __init__(self, config: GeminiConfig):
+    # コード内で組み立てるプロンプト（統合分析など）を変更した場合に更新するリビジョン番号
+    PROMPT_REVISION = 2
+    
+    # アップロード済みファイルの有効期限がこの秒数以内に迫っている場合は再アップロードする
+    UPLOAD_EXPIRY_MARGIN_SECONDS = 300
+    
+    # レート制限の見積もりに使用する画像1枚あたりのトークン数
+    IMAGE_TOKENS = 258
+    
+    def __init__(self, config: GeminiConfig, client: Optional[GeminiClientProtocol] = None):
         """
         初期化
         
         Args:
             config: Gemini API設定
+            client: Gemini APIクライアント（省略時はgoogle-generativeaiを使用するクライアント）
         """
         self.logger = logging.getLogger(__name__)
         self.config = config
@@ -164,25 +263,134 @@ class GeminiService:
             self.logger.error("プロジェクトルートに.envファイルを作成し、GEMINI_API_KEY=your_api_key_here を設定してください")
             raise GeminiAPIError("APIキーが設定されていません", error_type="AUTHENTICATION_ERROR")
         
-        # Gemini APIを設定
-        genai.configure(api_key=self.config.api_key)
+        # Gemini APIクライアントを設定
+        self.client = client or GenAIClient(self.config.api_key)
         
         # モデルの初期化
         self._init_models()
         
+        # API呼び出しの通信方式（同時実行数はレートリミッターと同じ上限）
+        self.transport = create_transport(
+            self.config.transport, self.config.max_concurrent_requests, self.client.reset_async_client
+        )
+        
+        # モデルごとのサーキットブレーカー
+        self.circuit_breakers = {
+            name: CircuitBreaker(name, self.config.circuit_breaker)
+            for name in dict.fromkeys([self.config.model, self.config.fallback_model])
+        }
+        
+        # API呼び出しの再試行ポリシー
+        self.retry_policy = RetryPolicy(self.config.max_retries, self.config.retry_delay, self.config.retry_max_delay)
+        
+        # 全てのAPI呼び出しで共有するレートリミッター
+        self.rate_limiter = AsyncRateLimiter(
+            self.config.requests_per_minute,
+            self.config.tokens_per_minute,
+            self.config.max_concurrent_requests
+        )
+        
+        # テンプレート一覧などの共通部分を登録するコンテキストキャッシュ
+        self.context_caches = ContextCacheRegistry(self.client, self.config.context_cache, self.estimate_tokens)
+        
+        # 前処理済み画像のレジストリ（処理中の画像を1度だけ検証・エンコードする）
+        self.prepared_images = PreparedImageRegistry(self.config.image_preprocess.memo_max_bytes)
+        
+        # アップロード済み画像の参照（画像キー → ファイル参照）と、アップロード中のタスク
+        self._uploaded_files: Dict[ImageKey, UploadedFile] = {}
+        self._pending_uploads: Dict[ImageKey, "asyncio.Task[Dict[str, Any]]"] = {}
+        
+        # 応答のパース方法ごとの件数（正規表現による抽出がどの程度使われているかの監視用）
+        self.parse_statistics = {"structured": 0, "structured_invalid": 0, "json_repair": 0, "regex": 0}
+        
         # プロンプトテンプレートの更新
         self._update_prompt_templates()
         
         self.logger.info(f"GeminiService初期化完了 (モデル: {self.config.model})")
     
+    @property
+    def prompt_version(self) -> str:
+        """
+        プロンプトのバージョンを取得します。
+        
+        設定のプロンプトテンプレート・画像前処理設定とPROMPT_REVISIONから算出したハッシュで、
+        モデルへの入力が変わると値が変わるため、キャッシュキーに含めて使用します。
+        
+        Returns:
+            プロンプトバージョン（12桁の16進数文字列）
+        """
+        prompts = [
+            str(self.PROMPT_REVISION),
+            self.config.prompt_template,
+            self.config.attribute_prompt_template,
+            self.config.stylist_prompt_template,
+            self.config.coupon_prompt_template,
+            self.config.template_matching_prompt,
+            "|".join(self.config.length_choices),
+            self.config.image_preprocess.model_dump_json(exclude={"memo_max_bytes"})
+        ]
+        return hashlib.sha256("\0".join(prompts).encode("utf-8")).hexdigest()[:12]
+    
+    def _select_model(self, use_fallback: bool = False) -> Tuple[str, Any, bool]:
+        """
+        API呼び出しに使用するモデルを選択します。
+        
+        プライマリモデルのサーキットブレーカーが遮断中の場合はフォールバックモデルを使用し、
+        遮断から一定時間が経過したらプライマリモデルへの試行（ハーフオープン）で回復を確認します。
+        
+        Args:
+            use_fallback: フォールバックモデルを明示的に使用するかどうか
+            
+        Returns:
+            (モデル名, モデル, サーキットブレーカーが呼び出しを許可したか)のタプル
+            （許可した場合のみ、呼び出しの結果を記録するか試行枠を解放する必要があります）
+            
+        Raises:
+            GeminiAPIError: 使用できるモデルが全て遮断中の場合（一時的なエラーとして再試行される）
+        """
+        primary = (self.config.model, self.model)
+        fallback = (self.config.fallback_model, self.fallback_model)
+        
+        if not self.config.circuit_breaker.enabled:
+            model_name, model = fallback if use_fallback else primary
+            return model_name, model, False
+        
+        candidates = [fallback] if use_fallback else [primary, fallback]
+        for model_name, model in candidates:
+            if self.circuit_breakers[model_name].allow_request():
+                if model_name != primary[0]:
+                    self.logger.info(f"プライマリモデルが遮断中のため、フォールバックモデルを使用します: {model_name}")
+                return model_name, model, True
+        # 全て遮断中の場合は呼び出さず、再試行ポリシーの待機を経て再度選択する
+        raise GeminiAPIError(
+            "全てのモデルのサーキットブレーカーが遮断中です",
+            error_type=ERROR_TYPES[TRANSIENT]
+        )
+    
+    def estimate_tokens(self, prompt: str, has_image: bool = False) -> int:
+        """
+        レート制限のために、API呼び出しの入力トークン数を見積もります。
+        
+        日本語は概ね1文字1トークンのため、プロンプトの文字数をそのまま見積もりとします
+        （英数字が多い場合は多めの見積もりになります）。実際の使用量は呼び出し後に反映されます。
+        
+        Args:
+            prompt: プロンプト
+            has_image: 画像を含むかどうか
+            
+        Returns:
+            見積もりトークン数
+        """
+        return len(prompt) + (self.IMAGE_TOKENS if has_image else 0)
+    
     def _init_models(self) -> None:
         """モデルを初期化します。"""
         try:
             # プライマリモデル
-            self.model = genai.GenerativeModel(self.config.model)
+            self.model = self.client.get_model(self.config.model)
             
             # フォールバックモデル（必要に応じて）
-            self.fallback_model = genai.GenerativeModel(self.config.fallback_model)
+            self.fallback_model = self.client.get_model(self.config.fallback_model)
             
         except Exception as e:
             self.logger.error(f"Gemini APIモデルの初期化エラー: {e}")
@@ -195,6 +403,150 @@ class GeminiService:
         """
         画像をAPI用に準備します。
         
+        前処理が有効な場合は、長辺を設定値以下に縮小して再エンコードします。
+        結果はパス・更新日時・サイズをキーにレジストリへ保持し、同じ画像に対する
+        複数回のAPI呼び出しではファイルの読み込み・検証・エンコードを行いません。
+        
+        Args:
+            image_path: 画像ファイルのパス
+            
+        Returns:
+            画像パーツデータ
+            
+        Raises:
+            ImageError: 画像の読み込みや変換に失敗した場合
+        """
+        try:
+            return self.prepared_images.get_or_prepare(image_path, self._encode_image_part)
+        except FileNotFoundError as e:
+            raise ImageError(f"無効な画像ファイル: {image_path}", str(image_path)) from e
+        except OSError as e:
+            raise ImageError(f"画像の準備に失敗しました: {str(e)}", str(image_path)) from e
+    
+    async def _get_image_part(self, image_path: Path) -> Dict[str, Any]:
+        """
+        API呼び出しに含める画像パーツを取得します。
+        
+        画像のアップロードが有効な場合は、画像をファイルストアに1度だけアップロードし、
+        有効期限内はその参照を使用します。アップロードに失敗した場合は画像データを直接送信します。
+        
+        Args:
+            image_path: 画像ファイルのパス
+            
+        Returns:
+            画像パーツデータ（画像データまたはファイル参照）
+            
+        Raises:
+            ImageError: 画像の読み込みや変換に失敗した場合
+        """
+        if not self.config.upload_images:
+            return self._prepare_image(image_path)
+        
+        try:
+            key = PreparedImageRegistry.make_key(image_path)
+        except OSError:
+            return self._prepare_image(image_path)
+        
+        uploaded = self._uploaded_files.get(key)
+        if uploaded is not None and uploaded.expires_at - time.time() > self.UPLOAD_EXPIRY_MARGIN_SECONDS:
+            return self._file_part(uploaded)
+        
+        # 同じ画像に対する並行した呼び出しでは、アップロードを1度だけ行う
+        task = self._pending_uploads.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._upload_image(key, image_path))
+            self._pending_uploads[key] = task
+            task.add_done_callback(lambda _: self._pending_uploads.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def _upload_image(self, key: ImageKey, image_path: Path) -> Dict[str, Any]:
+        """
+        画像をファイルストアにアップロードし、ファイル参照の画像パーツを返します。
+        
+        Args:
+            key: 画像キー
+            image_path: 画像ファイルのパス
+            
+        Returns:
+            画像パーツデータ（アップロードに失敗した場合は画像データ）
+        """
+        image_part = self._prepare_image(image_path)
+        try:
+            uploaded = await asyncio.to_thread(
+                self.client.upload_file,
+                base64.b64decode(image_part["data"]),
+                image_part["mime_type"],
+                image_path.name
+            )
+        except Exception as e:
+            self.logger.warning(f"画像のアップロードに失敗したため、画像データを直接送信します: {image_path.name} - {e}")
+            return image_part
+        
+        self._prune_uploaded_files()
+        self._uploaded_files[key] = uploaded
+        self.logger.debug(f"画像をアップロードしました: {image_path.name} → {uploaded.name}")
+        return self._file_part(uploaded)
+    
+    def _prune_uploaded_files(self) -> None:
+        """有効期限が迫ったアップロード済み画像の参照を破棄します（再利用されないため）。"""
+        threshold = time.time() + self.UPLOAD_EXPIRY_MARGIN_SECONDS
+        expired = [key for key, uploaded in self._uploaded_files.items() if uploaded.expires_at <= threshold]
+        for key in expired:
+            del self._uploaded_files[key]
+    
+    @staticmethod
+    def _file_part(uploaded: UploadedFile) -> Dict[str, Any]:
+        """アップロード済みファイルを参照する画像パーツを作成します。"""
+        return {"file_data": {"mime_type": uploaded.mime_type, "file_uri": uploaded.uri}}
+    
+    async def prepare_image(self, image_path: Path) -> None:
+        """
+        画像をAPI呼び出しの前に準備します。
+
+        画像の読み込み・縮小・エンコードをワーカースレッドで行ってレジストリに保持し、
+        アップロードが有効な場合はアップロードも済ませます。以降のAPI呼び出しでは準備済みのデータを使用します。
+
+        Args:
+            image_path: 画像ファイルのパス
+
+        Raises:
+            ImageError: 画像の読み込みや変換に失敗した場合
+        """
+        await asyncio.to_thread(self._prepare_image, image_path)
+        if self.config.upload_images:
+            await self._get_image_part(image_path)
+
+    def release_prepared_image(self, image_path: Path) -> None:
+        """
+        画像の処理が終わった際に、レジストリに保持している画像データとアップロード済みの参照を破棄します。
+        
+        Args:
+            image_path: 画像ファイルのパス
+        """
+        self.prepared_images.release(image_path)
+        try:
+            self._uploaded_files.pop(PreparedImageRegistry.make_key(image_path), None)
+        except OSError:
+            # 画像ファイルが削除された場合は、有効期限切れの際に破棄される
+            pass
+    
+    def invalidate_context_caches(self) -> None:
+        """
+        コンテキストキャッシュに登録した共通部分を全て破棄します。
+        
+        テンプレートの再読み込みでテンプレート一覧が変わった場合に呼び出します。
+        """
+        self.context_caches.invalidate()
+    
+    def release_prepared_images(self) -> None:
+        """レジストリに保持している全ての画像データとアップロード済みの参照を破棄します（1回の処理の終了時に呼び出します）。"""
+        self.prepared_images.clear()
+        self._uploaded_files.clear()
+    
+    def _encode_image_part(self, image_path: Path) -> Dict[str, str]:
+        """
+        画像を（必要に応じて縮小・再エンコードして）画像パーツデータに変換します。
+        
         Args:
             image_path: 画像ファイルのパス
             
@@ -207,9 +559,26 @@ class GeminiService:
         if not is_valid_image(image_path):
             raise ImageError(f"無効な画像ファイル: {image_path}", str(image_path))
         
+        preprocess = self.config.image_preprocess
+        if preprocess.enabled:
+            try:
+                image_bytes, mime_type = resize_image_bytes(
+                    image_path, preprocess.max_edge, preprocess.format, preprocess.quality
+                )
+                original_size = image_path.stat().st_size
+                self.logger.debug(
+                    f"画像を前処理しました: {image_path.name} ({original_size} → {len(image_bytes)} bytes)"
+                )
+                return {
+                    "mime_type": mime_type,
+                    "data": base64.b64encode(image_bytes).decode('utf-8')
+                }
+            except (ValueError, OSError) as e:
+                self.logger.warning(f"画像の前処理に失敗したため、元の画像を送信します: {image_path.name} - {e}")
+        
         try:
-            # 画像をBase64エンコード
-            image_data = encode_image(image_path)
+            # 画像をBase64エンコード（検証済みのため再検証しない）
+            image_data = encode_image(image_path, validate=False)
             
             # 画像のMIMEタイプを判定
             mime_type = "image/jpeg"  # デフォルト
@@ -261,7 +630,10 @@ class GeminiService:
         self, 
         prompt: str, 
         image_path: Optional[Path] = None, 
-        use_fallback: bool = False
+        use_fallback: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        cached_prefix: Optional[str] = None,
+        image_paths: Sequence[Path] = ()
     ) -> AsyncGenerator[AsyncResource, None]:
         """
         Gemini API呼び出し用の非同期コンテキストマネージャー
@@ -278,6 +650,9 @@ class GeminiService:
             prompt: Gemini APIに送信するプロンプト
             image_path: 画像ファイルのパス（オプション）
             use_fallback: フォールバックモデルを使用するかどうか
+            response_schema: 応答JSONのスキーマ（オプション）
+            cached_prefix: 複数の呼び出しで共通するプロンプトの前半部分（オプション）
+            image_paths: 1回のリクエストでまとめて送信する画像ファイルのパスのリスト（オプション）
             
         Yields:
             APISessionオブジェクト
@@ -288,7 +663,10 @@ class GeminiService:
             image_path, 
             use_fallback, 
             self.config.max_retries, 
-            self.config.retry_delay
+            self.config.retry_delay,
+            response_schema,
+            cached_prefix,
+            image_paths
         )
         
         await session.initialize()
@@ -301,7 +679,10 @@ class GeminiService:
                               prompt: str, 
                               image_path: Optional[Path] = None, 
                               use_fallback: bool = False,
-                              attempt: int = 1) -> str:
+                              attempt: int = 1,
+                              response_schema: Optional[Dict[str, Any]] = None,
+                              cached_prefix: Optional[str] = None,
+                              image_paths: Sequence[Path] = ()) -> str:
         """
         Gemini APIを呼び出します。
         
@@ -310,6 +691,9 @@ class GeminiService:
             image_path: 画像ファイルのパス（オプション）
             use_fallback: フォールバックモデルを使用するかどうか
             attempt: 現在の試行回数
+            response_schema: 応答JSONのスキーマ（オプション、構造化出力が無効な場合は無視する）
+            cached_prefix: 複数の呼び出しで共通するプロンプトの前半部分（オプション、コンテキストキャッシュで再利用する）
+            image_paths: 1回のリクエストでまとめて送信する画像ファイルのパスのリスト（オプション）
             
         Returns:
             APIレスポンステキスト
@@ -317,14 +701,74 @@ class GeminiService:
         Raises:
             GeminiAPIError: API呼び出しに失敗した場合
         """
+        if not self.config.structured_output:
+            response_schema = None
         try:
-            async with self.api_session(prompt, image_path, use_fallback) as session:
+            async with self.api_session(prompt, image_path, use_fallback, response_schema, cached_prefix, image_paths) as session:
                 response = await session.execute()
                 return response
+        except GeminiAPIError as e:
+            # 再試行の判定で設定されたエラー種別（クォータ超過等）を保ったまま送出する
+            self.logger.error(str(e))
+            raise
         except Exception as e:
             self.logger.error(f"Gemini API呼び出しに失敗しました: {str(e)}")
-            raise GeminiAPIError(f"Gemini API呼び出しに失敗しました: {str(e)}")
+            raise GeminiAPIError(f"Gemini API呼び出しに失敗しました: {str(e)}") from e
 
+    def _validate_structured_response(self, response_text: str, response_model: Type[BaseModel]) -> Optional[Dict[str, Any]]:
+        """
+        構造化出力の応答を応答モデルで1度だけ検証します。
+        
+        Args:
+            response_text: APIレスポンステキスト
+            response_model: 応答モデル
+            
+        Returns:
+            検証済みのデータ、構造化出力が無効な場合や検証に失敗した場合はNone
+        """
+        if not self.config.structured_output:
+            return None
+        try:
+            data = response_model.model_validate_json(response_text).model_dump(exclude_none=True)
+        except ValidationError as e:
+            self.parse_statistics["structured_invalid"] += 1
+            self.logger.warning(f"構造化出力の検証に失敗したため、JSONの修復を試みます: {e.error_count()}件のエラー")
+            return None
+        self.parse_statistics["structured"] += 1
+        return data
+    
+    def _parse_response(self, response_text: str, response_model: Type[BaseModel]) -> Dict[str, Any]:
+        """
+        APIレスポンスをパースします。
+        
+        構造化出力の検証に成功した場合はその結果を返し、失敗した場合のみ
+        JSONの修復・正規表現による抽出を使用します。
+        
+        Args:
+            response_text: APIレスポンステキスト
+            response_model: 応答モデル
+            
+        Returns:
+            パースされたJSONデータ
+        """
+        data = self._validate_structured_response(response_text, response_model)
+        if data is not None:
+            return data
+        return self._parse_json_response(response_text)
+    
+    def get_parse_statistics(self) -> Dict[str, Any]:
+        """
+        応答のパース方法ごとの件数を取得します。
+        
+        Returns:
+            構造化出力での検証成功数（structured）・検証失敗数（structured_invalid）・
+            JSON修復での成功数（json_repair）・正規表現での抽出数（regex）と、正規表現の使用率を含む辞書
+        """
+        stats: Dict[str, Any] = dict(self.parse_statistics)
+        total = stats["structured"] + stats["json_repair"] + stats["regex"]
+        stats["regex_rate"] = stats["regex"] / total if total else 0.0
+        return stats
+    
     def _parse_json_response(self, response_text: str) -> Dict[str, Any]:
         """
         APIレスポンスからJSONデータを抽出・パースします。
@@ -339,9 +783,12 @@ class GeminiService:
             GeminiAPIError: JSONのパースに失敗した場合
         """
         try:
-            return self._extract_json_from_response(response_text)
+            data = self._extract_json_from_response(response_text)
+            self.parse_statistics["json_repair"] += 1
+            return data
         except Exception as e:
             self.logger.error(f"JSONパースエラー: {str(e)}, テキスト: {response_text}")
+            self.parse_statistics["regex"] += 1
             return self._extract_data_with_regex(response_text)
             
     def _extract_json_from_response(self, response_text: str) -> Dict[str, Any]:
@@ -509,10 +956,13 @@ class GeminiService:
 """
         
         # API呼び出し
-        response_text = await self._call_gemini_api(improved_prompt, image_path)
+        response_text = await self._call_gemini_api(
+            improved_prompt, image_path,
+            response_schema=response_schema_for(StyleAnalysis, {"category": categories})
+        )
         
         # JSONとしてパース
-        json_data = self._parse_json_response(response_text)
+        json_data = self._parse_response(response_text, StyleAnalysis)
         
         try:
             # キーワードがない場合は空のリストを設定
@@ -589,10 +1039,13 @@ class GeminiService:
         )
         
         # API呼び出し
-        response_text = await self._call_gemini_api(prompt, image_path)
+        response_text = await self._call_gemini_api(
+            prompt, image_path,
+            response_schema=response_schema_for(AttributeAnalysis, {"length": self.config.length_choices})
+        )
         
         # JSONとしてパース
-        json_data = self._parse_json_response(response_text)
+        json_data = self._parse_response(response_text, AttributeAnalysis)
         
         try:
             # 属性分析結果を作成
@@ -612,6 +1065,163 @@ class GeminiService:
                 details={"json_data": json_data}
             ) from e
     
+    async def analyze_images_batch(
+        self,
+        image_paths: List[Path],
+        categories: List[str]
+    ) -> List[Tuple[Optional[StyleAnalysisProtocol], Optional[AttributeAnalysisProtocol]]]:
+        """
+        複数の画像のスタイル分析と属性分析を1回のリクエストでまとめて行います。
+        
+        応答の結果は画像番号で画像と対応付けます。リクエスト全体が失敗した場合や、応答に含まれない・
+        検証に失敗した画像は、その画像だけを個別の呼び出し（analyze_image・analyze_attributes）で分析します。
+        
+        Args:
+            image_paths: 画像ファイルのパスのリスト
+            categories: カテゴリリスト
+            
+        Returns:
+            画像の順の(スタイル分析結果, 属性分析結果)のリスト（分析できなかった項目はNone）
+        """
+        results: List[Tuple[Optional[StyleAnalysisProtocol], Optional[AttributeAnalysisProtocol]]] = [(None, None)] * len(image_paths)
+        
+        if len(image_paths) > 1:
+            try:
+                for index, analyses in (await self._request_batch_analysis(image_paths, categories)).items():
+                    results[index] = analyses
+            except (GeminiAPIError, ImageError) as e:
+                self.logger.warning(f"バッチ分析に失敗したため、画像ごとに分析します: {len(image_paths)}枚 - {str(e)}")
+        
+        missing = [index for index, (style, attributes) in enumerate(results) if style is None or attributes is None]
+        if missing and len(image_paths) > 1:
+            self.logger.info(f"バッチ分析の結果がない画像を個別に分析します: {len(missing)}/{len(image_paths)}枚")
+        
+        fallbacks = await asyncio.gather(*[self._analyze_single(image_paths[index], categories) for index in missing])
+        for index, analyses in zip(missing, fallbacks):
+            results[index] = analyses
+        return results
+    
+    async def _request_batch_analysis(
+        self,
+        image_paths: List[Path],
+        categories: List[str]
+    ) -> Dict[int, Tuple[StyleAnalysis, AttributeAnalysis]]:
+        """
+        複数の画像を1回のリクエストで分析し、検証に成功した結果を画像番号ごとに返します。
+        
+        Args:
+            image_paths: 画像ファイルのパスのリスト
+            categories: カテゴリリスト
+            
+        Returns:
+            画像番号 → (スタイル分析結果, 属性分析結果)の辞書（応答に含まれない・無効な画像は含まない）
+            
+        Raises:
+            GeminiAPIError: API呼び出しに失敗した場合
+            ImageError: 画像の読み込みや変換に失敗した場合
+        """
+        categories_str = "\n".join([f"- {category}" for category in categories])
+        length_choices_str = "\n".join([f"- {choice}" for choice in self.config.length_choices])
+        last_index = len(image_paths) - 1
+        
+        prompt = f"""
+以下の{len(image_paths)}枚の画像（画像0〜画像{last_index}）について、それぞれのヘアスタイルを分析してください。
+各画像の結果の"index"には画像番号（0〜{last_index}）を指定し、全ての画像の結果を1つずつ含めてください。
+
+1. カテゴリ (以下から1つだけ選択してください):
+{categories_str}
+
+2. 特徴とキーワード:
+   - 髪色: 色調や特徴を詳しく
+   - カット技法: レイヤー、グラデーション、ボブなど
+   - スタイリング: ストレート、ウェーブ、パーマなど
+   - 印象: フェミニン、クール、ナチュラルなど
+   - キーワード: ヘアスタイルを表す簡潔な単語や句を5つ
+
+3. 属性:
+   - 性別: 「レディース」または「メンズ」
+   - 髪の長さ (以下から1つ選択):
+{length_choices_str}
+
+必ず以下のJSON形式のみで出力してください：
+{{
+  "results": [
+    {{
+      "index": 画像番号（整数）,
+      "category": "カテゴリ名",
+      "features": {{
+        "color": "詳細な色の説明",
+        "cut_technique": "カット技法の説明",
+        "styling": "スタイリング方法の説明",
+        "impression": "全体的な印象"
+      }},
+      "keywords": ["キーワード1", "キーワード2", "キーワード3", "キーワード4", "キーワード5"],
+      "sex": "性別",
+      "length": "髪の長さ"
+    }}
+  ]
+}}
+"""
+        
+        response_text = await self._call_gemini_api(
+            prompt,
+            image_paths=image_paths,
+            response_schema=response_schema_for(BatchAnalysisResponse, {
+                "results.category": categories,
+                "results.length": self.config.length_choices
+            })
+        )
+        json_data = self._parse_response(response_text, BatchAnalysisResponse)
+        
+        items = json_data.get("results") if isinstance(json_data, dict) else None
+        if not isinstance(items, list):
+            raise GeminiAPIError("バッチ分析の応答に結果のリストがありません", error_type="DATA_VALIDATION_ERROR")
+        
+        # 結果は画像番号で対応付け、範囲外・重複・検証に失敗した結果は個別分析の対象とする
+        results: Dict[int, Tuple[StyleAnalysis, AttributeAnalysis]] = {}
+        for item in items:
+            try:
+                index = int(item["index"])
+                if not 0 <= index < len(image_paths) or index in results:
+                    raise ValueError(f"無効な画像番号: {index}")
+                results[index] = (
+                    StyleAnalysis(category=item["category"], features=item["features"], keywords=item.get("keywords") or []),
+                    AttributeAnalysis(sex=item["sex"], length=item["length"])
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                self.logger.warning(f"バッチ分析の結果を使用できません: {str(e)}")
+        
+        self.logger.info(f"バッチ分析完了: {len(results)}/{len(image_paths)}枚")
+        return results
+    
+    async def _analyze_single(
+        self,
+        image_path: Path,
+        categories: List[str]
+    ) -> Tuple[Optional[StyleAnalysisProtocol], Optional[AttributeAnalysisProtocol]]:
+        """
+        1枚の画像のスタイル分析と属性分析を個別の呼び出しで行います（バッチ分析のフォールバック）。
+        
+        Args:
+            image_path: 画像ファイルのパス
+            categories: カテゴリリスト
+            
+        Returns:
+            (スタイル分析結果, 属性分析結果)のタプル（失敗した項目はNone）
+        """
+        style, attributes = await asyncio.gather(
+            self.analyze_image(image_path, categories),
+            self.analyze_attributes(image_path),
+            return_exceptions=True
+        )
+        if isinstance(style, Exception):
+            self.logger.error(f"スタイル分析エラー: {image_path.name} - {str(style)}")
+            style = None
+        if isinstance(attributes, Exception):
+            self.logger.error(f"属性分析エラー: {image_path.name} - {str(attributes)}")
+            attributes = None
+        return style, attributes
+    
     def _update_prompt_templates(self):
         """
         プロンプトテンプレートを更新します。
@@ -706,10 +1316,7 @@ class GeminiService:
             return None, None
         
         # スタイリスト情報のテキスト形式作成
-        stylists_str = "\n".join([
-            f"{i+1}. {stylist.name}\n   得意な技術・特徴: {stylist.specialties}\n   説明文: {stylist.description}"
-            for i, stylist in enumerate(stylists)
-        ])
+        stylists_str = self._format_stylists(stylists)
         
         # プロンプトの作成
         prompt = self._format_prompt(
@@ -723,10 +1330,13 @@ class GeminiService:
         )
         
         # API呼び出し
-        response_text = await self._call_gemini_api(prompt, image_path)
+        response_text = await self._call_gemini_api(
+            prompt, image_path,
+            response_schema=response_schema_for(StylistSelectionResponse, {"stylist_name": [s.name for s in stylists]})
+        )
         
         # JSONとしてパース
-        json_data = self._parse_json_response(response_text)
+        json_data = self._parse_response(response_text, StylistSelectionResponse)
         
         try:
             # スタイリスト名取得
@@ -735,28 +1345,10 @@ class GeminiService:
             
             self.logger.info(f"スタイリスト選択理由: {reason}")
             
-            # 完全一致するスタイリストを検索
-            for stylist in stylists:
-                if stylist.name == stylist_name:
-                    self.logger.info(f"スタイリスト選択完了: {stylist_name}")
-                    return stylist, reason
-            
-            # 完全一致するスタイリストが見つからない場合は部分一致を試みる
-            best_match = None
-            highest_similarity = 0
-            
-            for stylist in stylists:
-                # 名前の一部が含まれているかチェック
-                if stylist_name in stylist.name or stylist.name in stylist_name:
-                    # 単純な文字列の長さの比率で類似度を計算
-                    similarity = min(len(stylist_name), len(stylist.name)) / max(len(stylist_name), len(stylist.name))
-                    if similarity > highest_similarity:
-                        highest_similarity = similarity
-                        best_match = stylist
-            
-            if best_match and highest_similarity > 0.3:  # 30%以上の類似度があれば採用
-                self.logger.info(f"部分一致するスタイリストを選択: {best_match.name} (類似度: {highest_similarity:.2f})")
-                return best_match, reason
+            # 名前が一致するスタイリストを検索
+            matched_stylist = self._find_stylist_by_name(stylists, stylist_name)
+            if matched_stylist:
+                return matched_stylist, reason
             
             self.logger.warning(f"選択されたスタイリスト '{stylist_name}' が見つかりません")
             # 見つからない場合は最初のスタイリストを返す
@@ -795,10 +1387,7 @@ class GeminiService:
             return None, None
         
         # クーポン情報のテキスト形式作成（詳細情報と番号を含む）
-        coupons_str = "\n".join([
-            f"{i+1}. 名前: {coupon.name}\n   価格: {coupon.price}円\n   説明: {coupon.description}\n   カテゴリ: {', '.join(coupon.categories)}\n   条件: {', '.join([f'{k}={v}' for k, v in coupon.conditions.items()])}"
-            for i, coupon in enumerate(coupons)
-        ])
+        coupons_str = self._format_coupons(coupons)
         
         # クーポン名と番号のマッピングを作成
         coupon_map = {i+1: coupon for i, coupon in enumerate(coupons)}
@@ -820,10 +1409,12 @@ class GeminiService:
         )
         
         # API呼び出し
-        response_text = await self._call_gemini_api(prompt, image_path)
+        response_text = await self._call_gemini_api(
+            prompt, image_path, response_schema=response_schema_for(CouponSelectionResponse)
+        )
         
         # JSONとしてパース
-        json_data = self._parse_json_response(response_text)
+        json_data = self._parse_response(response_text, CouponSelectionResponse)
         
         try:
             # クーポン番号と選択理由を取得
@@ -919,7 +1510,8 @@ class GeminiService:
         image_path: Path,
         templates: List[Template],
         analysis: Optional[StyleAnalysisProtocol] = None,
-        category_filter: bool = False
+        category_filter: bool = False,
+        cache_catalog: bool = True
     ) -> Tuple[int, str]:
         """
         画像と分析結果に基づいて最適なテンプレートをAIが選択します。
@@ -929,6 +1521,8 @@ class GeminiService:
             templates: テンプレートのリスト
             analysis: 事前実行された画像分析結果（オプション）
             category_filter: カテゴリでフィルタリングするかどうか
+            cache_catalog: テンプレート一覧をコンテキストキャッシュで再利用するかどうか
+                （画像ごとに絞り込んだ一覧など、他の画像と共通しない場合はFalse）
             
         Returns:
             (選択されたテンプレートのインデックス, 選択理由)のタプル
@@ -944,32 +1538,19 @@ class GeminiService:
         
         self.logger.info(f"AIによるテンプレート選択開始: {len(templates)}件のテンプレート")
         
-        # テンプレートリストのフォーマット
-        templates_text = self._format_templates_for_matching(templates)
+        # テンプレート一覧は画像によらず共通のため、コンテキストキャッシュで再利用する
+        catalog = self._format_template_catalog(templates)
         
         # 分析結果の情報をフォーマット
-        analysis_info = ""
-        if analysis:
-            analysis_info = f"""
-カテゴリ: {analysis.category}
-特徴:
-- 髪色: {analysis.features.color}
-- カット技法: {analysis.features.cut_technique}
-- スタイリング: {analysis.features.styling}
-- 印象: {analysis.features.impression}
-キーワード: {', '.join(analysis.keywords)}
-"""
+        analysis_info = self._format_analysis_info(analysis)
         
-        # プロンプトの改善
+        # 画像ごとのプロンプト
         improved_prompt = f"""
-あなたはヘアスタイルの専門家です。この画像のヘアスタイルに最適なテンプレートを選択してください。
+上記のテンプレート一覧から、この画像のヘアスタイルに最適なテンプレートを選択してください。
 
 【画像分析結果】
 {analysis_info}
 
-【テンプレート一覧】
-{templates_text}
-
 選択の際は以下の点を重視してください：
 1. 画像のヘアスタイル・髪色・カット技法・スタイリング方法が最も合うもの
 2. 雰囲気やイメージが画像と一致するもの
@@ -982,11 +1563,19 @@ class GeminiService:
 }}
 """
         
+        if not cache_catalog:
+            # 他の画像と共通しない一覧はキャッシュせず、プロンプトに含めて送信する
+            improved_prompt, catalog = catalog + improved_prompt, None
+        
         # Gemini APIの呼び出し
-        response_text = await self._call_gemini_api(improved_prompt, image_path)
+        response_text = await self._call_gemini_api(
+            improved_prompt, image_path,
+            response_schema=response_schema_for(TemplateSelectionResponse),
+            cached_prefix=catalog
+        )
         
         # JSONレスポンスの解析
-        result = self._parse_json_response(response_text)
+        result = self._parse_response(response_text, TemplateSelectionResponse)
         
         if not result or "template_id" not in result:
             error_msg = "AIからの応答が無効でした"
@@ -1024,7 +1613,8 @@ class GeminiService:
         templates: List[Template],
         count: int = 3,
         analysis: Optional[StyleAnalysisProtocol] = None,
-        category_filter: bool = False
+        category_filter: bool = False,
+        cache_catalog: bool = True
     ) -> List[Tuple[int, str, float]]:
         """
         画像に最適な複数のテンプレートを選択します。
@@ -1038,6 +1628,7 @@ class GeminiService:
             count: 選択するテンプレート数（デフォルト: 3）
             analysis: 画像分析結果（オプション）
             category_filter: カテゴリでフィルタするかどうか
+            cache_catalog: テンプレート一覧をコンテキストキャッシュで再利用するかどうか
             
         Returns:
             [(テンプレートインデックス, 選択理由, スコア), ...] のリスト
@@ -1061,31 +1652,18 @@ class GeminiService:
         self.logger.info(f"複数テンプレート選択開始: 画像={image_path.name}, 候補数={count}")
         
         # 分析結果の情報をフォーマット
-        analysis_info = ""
-        if analysis:
-            analysis_info = f"""
-カテゴリ: {analysis.category}
-特徴:
-- 髪色: {analysis.features.color}
-- カット技法: {analysis.features.cut_technique}
-- スタイリング: {analysis.features.styling}
-- 印象: {analysis.features.impression}
-キーワード: {', '.join(analysis.keywords)}
-"""
+        analysis_info = self._format_analysis_info(analysis)
 
-        # テンプレートリストのフォーマット
-        templates_text = self._format_templates_for_matching(templates)
+        # テンプレート一覧は画像によらず共通のため、コンテキストキャッシュで再利用する
+        catalog = self._format_template_catalog(templates)
         
-        # プロンプトの作成
+        # 画像ごとのプロンプト
         prompt = f"""
-この画像のヘアスタイルに最も適したテンプレートを{count}つ選んでください。
+上記のテンプレート一覧から、この画像のヘアスタイルに最も適したテンプレートを{count}つ選んでください。
 
 ## 画像分析結果
 {analysis_info}
 
-## 利用可能なテンプレート
-{templates_text}
-
 ## 指示
 1. 画像のヘアスタイルに最も適したテンプレートを{count}つ選んでください。
 2. それぞれのテンプレートについて、選んだ理由を簡潔に説明してください。
@@ -1106,11 +1684,19 @@ class GeminiService:
 ```
 """
 
+        if not cache_catalog:
+            # 他の画像と共通しない一覧はキャッシュせず、プロンプトに含めて送信する
+            prompt, catalog = catalog + prompt, None
+        
         # Gemini APIを呼び出し
-        response = await self._call_gemini_api(prompt, image_path)
+        response = await self._call_gemini_api(
+            prompt, image_path,
+            response_schema=response_schema_for(MultipleTemplateSelectionResponse),
+            cached_prefix=catalog
+        )
         
         # レスポンスからJSONデータを抽出
-        data = self._parse_json_response(response)
+        data = self._parse_response(response, MultipleTemplateSelectionResponse)
         
         if not data or "selected_templates" not in data:
             raise GeminiAPIError("APIレスポンスから選択テンプレート情報を抽出できませんでした")
@@ -1152,6 +1738,40 @@ class GeminiService:
         self.logger.info(f"複数テンプレート選択完了: {len(results)}件のテンプレートを選択")
         return results
     
+    def _format_template_catalog(self, templates: List[Template]) -> str:
+        """
+        テンプレート選択で画像によらず共通するプロンプトの前半部分（テンプレート一覧）を作成します。
+        
+        同じテンプレートリストからは常に同じ文字列を作成するため、コンテキストキャッシュのキーとして使用できます。
+        
+        Args:
+            templates: テンプレートのリスト（IDはリストのインデックス）
+            
+        Returns:
+            テンプレート一覧のプロンプト
+        """
+        return f"""
+あなたはヘアスタイルの専門家です。以下のテンプレート一覧から、画像のヘアスタイルに適したテンプレートを選択します。
+テンプレートはテンプレート番号（0から始まる整数）で指定してください。
+
+【テンプレート一覧】
+{self._format_templates_for_matching(templates)}"""
+    
+    @staticmethod
+    def _format_analysis_info(analysis: Optional[StyleAnalysisProtocol]) -> str:
+        """画像分析結果をプロンプト用にフォーマットします（分析結果がない場合は空文字列）。"""
+        if not analysis:
+            return ""
+        return f"""
+カテゴリ: {analysis.category}
+特徴:
+- 髪色: {analysis.features.color}
+- カット技法: {analysis.features.cut_technique}
+- スタイリング: {analysis.features.styling}
+- 印象: {analysis.features.impression}
+キーワード: {', '.join(analysis.keywords)}
+"""
+    
     def _format_templates_for_matching(self, templates: List[Template]) -> str:
         """
         テンプレートリストをAIマッチング用にフォーマットします。
@@ -1171,9 +1791,102 @@ class GeminiService:
             formatted_text += f"メニュー: {template.menu}\n"
             formatted_text += f"コメント: {template.comment}\n"
             formatted_text += f"ハッシュタグ: {template.hashtag}\n\n"
-        
+
         return formatted_text
 
+    def _format_templates_compact(self, templates: List[Template]) -> str:
+        """
+        テンプレートリストを統合分析用の簡潔な形式でフォーマットします。
+
+        カテゴリごとにまとめ、各テンプレートはID・タイトル・ハッシュタグのみを1行で表します。
+
+        Args:
+            templates: テンプレートのリスト
+
+        Returns:
+            フォーマットされたテンプレート情報テキスト
+        """
+        lines_by_category: Dict[str, List[str]] = {}
+        for i, template in enumerate(templates):
+            lines_by_category.setdefault(template.category, []).append(
+                f"{i}: {template.title} / {template.hashtag}"
+            )
+
+        sections = []
+        for category, lines in lines_by_category.items():
+            sections.append(f"■ {category}\n" + "\n".join(lines))
+
+        return "\n\n".join(sections)
+
+    def _format_stylists(self, stylists: List[StylistInfoProtocol]) -> str:
+        """
+        スタイリストリストをプロンプト用にフォーマットします。
+
+        Args:
+            stylists: スタイリスト情報のリスト
+
+        Returns:
+            フォーマットされたスタイリスト情報テキスト
+        """
+        return "\n".join([
+            f"{i+1}. {stylist.name}\n   得意な技術・特徴: {stylist.specialties}\n   説明文: {stylist.description}"
+            for i, stylist in enumerate(stylists)
+        ])
+
+    def _format_coupons(self, coupons: List[CouponInfoProtocol]) -> str:
+        """
+        クーポンリストを番号付きでプロンプト用にフォーマットします。
+
+        Args:
+            coupons: クーポン情報のリスト
+
+        Returns:
+            フォーマットされたクーポン情報テキスト
+        """
+        return "\n".join([
+            f"{i+1}. 名前: {coupon.name}\n   価格: {coupon.price}円\n   説明: {coupon.description}\n   カテゴリ: {', '.join(coupon.categories)}\n   条件: {', '.join([f'{k}={v}' for k, v in coupon.conditions.items()])}"
+            for i, coupon in enumerate(coupons)
+        ])
+
+    def _find_stylist_by_name(self, stylists: List[StylistInfoProtocol], stylist_name: str) -> Optional[StylistInfoProtocol]:
+        """
+        名前からスタイリストを検索します（完全一致、次に部分一致）。
+
+        Args:
+            stylists: スタイリスト情報のリスト
+            stylist_name: AIが返したスタイリスト名
+
+        Returns:
+            一致したスタイリスト、見つからない場合はNone
+        """
+        if not stylist_name:
+            return None
+
+        # 完全一致するスタイリストを検索
+        for stylist in stylists:
+            if stylist.name == stylist_name:
+                self.logger.info(f"スタイリスト選択完了: {stylist_name}")
+                return stylist
+
+        # 完全一致するスタイリストが見つからない場合は部分一致を試みる
+        best_match = None
+        highest_similarity = 0
+
+        for stylist in stylists:
+            # 名前の一部が含まれているかチェック
+            if stylist_name in stylist.name or stylist.name in stylist_name:
+                # 単純な文字列の長さの比率で類似度を計算
+                similarity = min(len(stylist_name), len(stylist.name)) / max(len(stylist_name), len(stylist.name))
+                if similarity > highest_similarity:
+                    highest_similarity = similarity
+                    best_match = stylist
+
+        if best_match and highest_similarity > 0.3:  # 30%以上の類似度があれば採用
+            self.logger.info(f"部分一致するスタイリストを選択: {best_match.name} (類似度: {highest_similarity:.2f})")
+            return best_match
+
+        return None
+
     @async_with_error_handling(GeminiAPIError, "カテゴリ選択に失敗しました")
     async def get_matching_category(self, image_path: Path, available_categories: List[str]) -> str:
         """
@@ -1213,10 +1926,13 @@ class GeminiService:
 """
         
         # API呼び出し
-        response_text = await self._call_gemini_api(prompt, image_path)
+        response_text = await self._call_gemini_api(
+            prompt, image_path,
+            response_schema=response_schema_for(CategorySelectionResponse, {"category": available_categories})
+        )
         
         # JSONとしてパース
-        json_data = self._parse_json_response(response_text)
+        json_data = self._parse_response(response_text, CategorySelectionResponse)
         
         selected_category = json_data.get("category")
         reason = json_data.get("reason", "理由なし")
@@ -1238,3 +1954,312 @@ class GeminiService:
         # 一致するものが見つからない場合は最初のカテゴリを返す
         self.logger.warning(f"一致するカテゴリが見つかりません: '{selected_category}'. 最初のカテゴリを使用します: '{available_categories[0]}'")
         return available_categories[0]
+
+    def build_combined_prompt(
+        self,
+        categories: List[str],
+        templates: List[Template],
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3
+    ) -> str:
+        """
+        統合分析用のプロンプトを作成します（共通部分と画像ごとの部分を連結した全文）。
+
+        Args:
+            categories: カテゴリリスト
+            templates: テンプレートのリスト（IDはリストのインデックス）
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数
+
+        Returns:
+            統合分析用のプロンプト
+        """
+        catalog, prompt = self.build_combined_prompt_parts(categories, templates, stylists, coupons, template_count)
+        return catalog + prompt
+
+    def build_combined_prompt_parts(
+        self,
+        categories: List[str],
+        templates: List[Template],
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3
+    ) -> Tuple[str, str]:
+        """
+        統合分析用のプロンプトを、画像によらず共通する前半部分と画像ごとの部分に分けて作成します。
+
+        カテゴリ・テンプレート一覧・スタイリスト・クーポン・出力形式は全ての画像で共通するため、
+        前半部分をコンテキストキャッシュに登録すると、画像ごとの呼び出しでは画像と短い指示のみを送信します。
+
+        Args:
+            categories: カテゴリリスト
+            templates: テンプレートのリスト（IDはリストのインデックス）
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数
+
+        Returns:
+            (共通部分, 画像ごとのプロンプト)のタプル
+        """
+        categories_str = "\n".join([f"- {category}" for category in categories])
+        length_choices_str = "\n".join([f"- {choice}" for choice in self.config.length_choices])
+        templates_text = self._format_templates_compact(templates)
+
+        stylist_section = ""
+        stylist_schema = ""
+        if stylists:
+            stylist_section = f"""
+5. スタイリスト: 以下のリストから、このヘアスタイルを最も得意とするスタイリストを1人選んでください（名前はリストと完全に一致させてください）。
+{self._format_stylists(stylists)}
+"""
+            stylist_schema = """,
+  "stylist_name": "選んだスタイリスト名",
+  "stylist_reason": "選んだ理由\""""
+
+        coupon_section = ""
+        coupon_schema = ""
+        if coupons:
+            coupon_section = f"""
+6. クーポン: 以下のリストから、このヘアスタイルを実現できるメニューを含むクーポンを1つ選び、番号（1〜{len(coupons)}）で答えてください。
+   「↓↓↓【★人気クーポンTOP5★】↓↓↓」のような見出しやセパレータはクーポンではありません。
+{self._format_coupons(coupons)}
+"""
+            coupon_schema = """,
+  "coupon_number": 選んだクーポンの番号（整数）,
+  "coupon_reason": "選んだ理由\""""
+
+        catalog = f"""
+あなたはヘアスタイルの専門家です。画像のヘアスタイルを分析し、以下の項目を1つのJSONでまとめて回答してください。
+
+1. カテゴリ (以下から1つだけ選択してください):
+{categories_str}
+
+2. 特徴とキーワード:
+   - 髪色: 色調や特徴を詳しく
+   - カット技法: レイヤー、グラデーション、ボブなど
+   - スタイリング: ストレート、ウェーブ、パーマなど
+   - 印象: フェミニン、クール、ナチュラルなど
+   - キーワード: ヘアスタイルを表す簡潔な単語や句を5つ
+
+3. 属性:
+   - 性別: 「レディース」または「メンズ」
+   - 髪の長さ (以下から1つ選択):
+{length_choices_str}
+
+4. テンプレート: 以下のテンプレート一覧（「ID: タイトル / ハッシュタグ」形式、カテゴリ別）から、
+   選んだカテゴリを優先して最も適したものを{template_count}つ選び、0.0〜1.0のスコアと理由を付けてください。
+{templates_text}
+{stylist_section}{coupon_section}
+必ず以下のJSON形式のみで出力してください：
+{{
+  "category": "カテゴリ名",
+  "features": {{
+    "color": "詳細な色の説明",
+    "cut_technique": "カット技法の説明",
+    "styling": "スタイリング方法の説明",
+    "impression": "全体的な印象"
+  }},
+  "keywords": ["キーワード1", "キーワード2", "キーワード3", "キーワード4", "キーワード5"],
+  "sex": "性別",
+  "length": "髪の長さ",
+  "selected_templates": [
+    {{"template_id": テンプレートID（整数）, "reason": "選択理由", "score": スコア（0.0〜1.0の小数）}}
+  ]{stylist_schema}{coupon_schema}
+}}
+"""
+        prompt = """
+上記の指示に従って、この画像のヘアスタイルを分析し、指定のJSON形式のみで回答してください。
+"""
+        return catalog, prompt
+
+    def combined_response_schema(
+        self,
+        categories: List[str],
+        stylists: Optional[List[StylistInfoProtocol]] = None
+    ) -> Dict[str, Any]:
+        """
+        統合分析の応答JSONのスキーマを作成します。
+
+        Args:
+            categories: カテゴリリスト
+            stylists: スタイリスト情報のリスト（オプション）
+
+        Returns:
+            response_schemaとして指定できるスキーマの辞書
+        """
+        return response_schema_for(CombinedAnalysisResponse, {
+            "category": categories,
+            "length": self.config.length_choices,
+            "stylist_name": [stylist.name for stylist in stylists or []]
+        })
+
+    def parse_combined_response(
+        self,
+        response_text: str,
+        categories: List[str],
+        templates: List[Template],
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3
+    ) -> CombinedAnalysis:
+        """
+        統合分析のレスポンスを検証し、結果モデルに変換します。
+
+        個別呼び出しとは異なり、欠損値をデフォルト値で補完せず、
+        不完全な応答は検証エラーとして扱います（呼び出し側で個別呼び出しにフォールバックするため）。
+
+        Args:
+            response_text: APIレスポンステキスト
+            categories: カテゴリリスト
+            templates: テンプレートのリスト
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数
+
+        Returns:
+            統合分析結果
+
+        Raises:
+            GeminiAPIError: 応答の検証に失敗した場合
+        """
+        json_data = self._validate_structured_response(response_text, CombinedAnalysisResponse)
+        try:
+            if json_data is None:
+                json_data = self._extract_json_from_response(response_text)
+                self.parse_statistics["json_repair"] += 1
+        except Exception as e:
+            raise GeminiAPIError(
+                f"統合分析の応答をJSONとして解析できませんでした: {str(e)}",
+                error_type="FUSED_VALIDATION_ERROR",
+                details={"response": response_text}
+            ) from e
+
+        def invalid(message: str) -> GeminiAPIError:
+            return GeminiAPIError(message, error_type="FUSED_VALIDATION_ERROR", details={"json_data": json_data})
+
+        # カテゴリの検証
+        category = json_data.get("category")
+        if category not in categories:
+            raise invalid(f"統合分析のカテゴリが無効です: {category}")
+
+        # スタイル分析・属性分析の検証
+        try:
+            style_analysis = StyleAnalysis(
+                category=category,
+                features=StyleFeatures(**json_data["features"]),
+                keywords=json_data.get("keywords") or []
+            )
+            attribute_analysis = AttributeAnalysis(sex=json_data["sex"], length=json_data["length"])
+        except (KeyError, TypeError, ValidationError) as e:
+            raise invalid(f"統合分析のスタイル・属性情報が不完全です: {str(e)}") from e
+
+        # テンプレート候補の検証
+        template_candidates = []
+        seen_ids = set()
+        for template_info in json_data.get("selected_templates") or []:
+            if not isinstance(template_info, dict):
+                continue
+            template_id = template_info.get("template_id")
+            if isinstance(template_id, str) and template_id.isdigit():
+                template_id = int(template_id)
+            if not isinstance(template_id, int) or not 0 <= template_id < len(templates) or template_id in seen_ids:
+                self.logger.warning(f"統合分析: 無効なテンプレートID: {template_id}、スキップします")
+                continue
+            seen_ids.add(template_id)
+            try:
+                score = float(template_info.get("score", 0.5))
+            except (TypeError, ValueError):
+                score = 0.5
+            template_candidates.append(TemplateCandidate(
+                template=templates[template_id],
+                reason=template_info.get("reason") or "理由が指定されていません",
+                score=score
+            ))
+
+        if not template_candidates:
+            raise invalid("統合分析に有効なテンプレート候補がありません")
+
+        template_candidates.sort(key=lambda c: c.score, reverse=True)
+        template_candidates = template_candidates[:template_count]
+        template_candidates[0].is_selected = True
+
+        # スタイリストの検証
+        selected_stylist = None
+        stylist_reason = None
+        if stylists:
+            selected_stylist = self._find_stylist_by_name(stylists, json_data.get("stylist_name") or "")
+            if selected_stylist is None:
+                raise invalid(f"統合分析のスタイリストが見つかりません: {json_data.get('stylist_name')}")
+            stylist_reason = json_data.get("stylist_reason") or "理由なし"
+
+        # クーポンの検証
+        selected_coupon = None
+        coupon_reason = None
+        if coupons:
+            coupon_number = json_data.get("coupon_number")
+            if isinstance(coupon_number, str) and coupon_number.isdigit():
+                coupon_number = int(coupon_number)
+            if not isinstance(coupon_number, int) or not 1 <= coupon_number <= len(coupons):
+                raise invalid(f"統合分析のクーポン番号が無効です: {coupon_number}")
+            selected_coupon = coupons[coupon_number - 1]
+            coupon_reason = json_data.get("coupon_reason") or "理由なし"
+
+        return CombinedAnalysis(
+            style_analysis=style_analysis,
+            attribute_analysis=attribute_analysis,
+            template_candidates=template_candidates,
+            selected_stylist=selected_stylist,
+            stylist_reason=stylist_reason,
+            selected_coupon=selected_coupon,
+            coupon_reason=coupon_reason
+        )
+
+    @async_with_error_handling(GeminiAPIError, "統合分析に失敗しました")
+    async def analyze_combined(
+        self,
+        image_path: Path,
+        categories: List[str],
+        templates: List[Template],
+        stylists: Optional[List[StylistInfoProtocol]] = None,
+        coupons: Optional[List[CouponInfoProtocol]] = None,
+        template_count: int = 3
+    ) -> CombinedAnalysis:
+        """
+        1回のAPI呼び出しで、スタイル分析・属性分析・テンプレート選択・スタイリスト選択・クーポン選択を行います。
+
+        Args:
+            image_path: 画像ファイルのパス
+            categories: カテゴリリスト
+            templates: テンプレートのリスト
+            stylists: スタイリスト情報のリスト（オプション）
+            coupons: クーポン情報のリスト（オプション）
+            template_count: 選択するテンプレート数（デフォルト: 3）
+
+        Returns:
+            統合分析結果
+
+        Raises:
+            GeminiAPIError: API呼び出しまたは応答の検証に失敗した場合
+            ImageError: 画像の読み込みや変換に失敗した場合
+        """
+        if not categories or not templates:
+            raise ValueError("統合分析にはカテゴリとテンプレートが必要です")
+
+        self.logger.info(f"統合分析開始: 画像={image_path.name}, テンプレート数={len(templates)}")
+
+        # 画像によらず共通する指示とテンプレート一覧は、コンテキストキャッシュで再利用する
+        catalog, prompt = self.build_combined_prompt_parts(categories, templates, stylists, coupons, template_count)
+        response_text = await self._call_gemini_api(
+            prompt, image_path,
+            response_schema=self.combined_response_schema(categories, stylists),
+            cached_prefix=catalog
+        )
+        result = self.parse_combined_response(response_text, categories, templates, stylists, coupons, template_count)
+
+        self.logger.info(
+            f"統合分析完了: カテゴリ={result.style_analysis.category}, "
+            f"テンプレート候補数={len(result.template_candidates)}"
+        )
+        return result
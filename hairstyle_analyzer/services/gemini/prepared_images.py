@@ -0,0 +1,149 @@
+"""
+前処理済み画像レジストリモジュール
+
+このモジュールでは、API送信用に検証・エンコードした画像を処理中に保持するレジストリを提供します。
+同じ画像に対する複数回のAPI呼び出しで、ファイルの読み込み・検証・エンコードを1度で済ませます。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+
+# 画像の識別キー（解決済みパス, 更新日時(ns), ファイルサイズ）
+ImageKey = Tuple[str, int, int]
+
+
+class PreparedImageRegistry:
+    """前処理済み画像レジストリ
+
+    画像パーツデータ（MIMEタイプとBase64データ）をパス・更新日時・サイズをキーに保持します。
+    保持するデータの合計バイト数が上限を超えた場合は、最も長く参照されていない画像から破棄します。
+    画像の処理が終わったらreleaseで明示的に破棄します。
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        初期化
+
+        Args:
+            max_bytes: 保持する画像データの合計バイト数の上限
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[ImageKey, Dict[str, str]]" = OrderedDict()
+        # 解決済みパス → 保持中のキー（release用）
+        self._keys_by_path: Dict[str, ImageKey] = {}
+
+    @staticmethod
+    def make_key(image_path: Path) -> ImageKey:
+        """
+        画像の識別キーを作成します。
+
+        Args:
+            image_path: 画像ファイルのパス
+
+        Returns:
+            (解決済みパス, 更新日時(ns), ファイルサイズ)のタプル
+
+        Raises:
+            OSError: ファイル情報の取得に失敗した場合
+        """
+        stat = image_path.stat()
+        return str(image_path.resolve()), stat.st_mtime_ns, stat.st_size
+
+    def get_or_prepare(self, image_path: Path, prepare: Callable[[Path], Dict[str, str]]) -> Dict[str, str]:
+        """
+        画像パーツデータを取得します。保持していない場合はprepareで作成して保持します。
+
+        Args:
+            image_path: 画像ファイルのパス
+            prepare: 画像パーツデータを作成する関数（検証・エンコードを行う）
+
+        Returns:
+            画像パーツデータ
+
+        Raises:
+            OSError: ファイル情報の取得に失敗した場合
+        """
+        key = self.make_key(image_path)
+        with self._lock:
+            image_part = self._entries.get(key)
+            if image_part is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image_part
+            self.misses += 1
+
+        image_part = prepare(image_path)
+        self._put(key, image_part)
+        return image_part
+
+    def _put(self, key: ImageKey, image_part: Dict[str, str]) -> None:
+        size = len(image_part.get("data", ""))
+        if size > self.max_bytes:
+            # 単体で上限を超える画像は保持しない
+            return
+
+        with self._lock:
+            # 同じパスの古いバージョン（更新前のファイル）は破棄する
+            old_key = self._keys_by_path.get(key[0])
+            if old_key is not None:
+                self._remove(old_key)
+
+            self._entries[key] = image_part
+            self._keys_by_path[key[0]] = key
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes and self._entries:
+                evicted_key = next(iter(self._entries))
+                self._remove(evicted_key)
+                self.evictions += 1
+
+    def _remove(self, key: ImageKey) -> None:
+        image_part = self._entries.pop(key, None)
+        if image_part is None:
+            return
+        self.current_bytes -= len(image_part.get("data", ""))
+        if self._keys_by_path.get(key[0]) == key:
+            del self._keys_by_path[key[0]]
+
+    def release(self, image_path: Path) -> bool:
+        """
+        画像の処理が終わった際に、保持しているデータを破棄します。
+
+        Args:
+            image_path: 画像ファイルのパス
+
+        Returns:
+            破棄した場合はTrue、保持していなかった場合はFalse
+        """
+        with self._lock:
+            key = self._keys_by_path.get(str(Path(image_path).resolve()))
+            if key is None:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self) -> None:
+        """保持している全てのデータを破棄します。"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_path.clear()
+            self.current_bytes = 0
+
+    def __contains__(self, image_path: object) -> bool:
+        if not isinstance(image_path, Path):
+            return False
+        with self._lock:
+            return str(image_path.resolve()) in self._keys_by_path
+
+    def __len__(self) -> int:
+        return len(self._entries)
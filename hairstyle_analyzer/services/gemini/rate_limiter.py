@@ -0,0 +1,227 @@
+"""
+レート制限モジュール
+
+このモジュールでは、Gemini APIの全ての呼び出しが通過する非同期レートリミッターを提供します。
+1分あたりのリクエスト数・トークン数をトークンバケットで、同時実行数をセマフォで制限し、
+固定の待機時間を挟まずに上限いっぱいのスループットで呼び出せるようにします。
+"""
+
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Optional
+
+from ...utils.async_context import asynccontextmanager
+
+
+class TokenBucket:
+    """トークンバケット
+
+    容量（1分あたりの上限）まで貯まり、毎秒 容量/60 ずつ補充されます。
+    """
+
+    def __init__(self, capacity_per_minute: float):
+        """
+        初期化
+
+        Args:
+            capacity_per_minute: 1分あたりの上限
+        """
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        指定量を取り出せるまでの待機時間を計算します。
+
+        Args:
+            amount: 取り出す量
+            now: 現在時刻（time.monotonic）
+
+        Returns:
+            待機時間（秒）。すぐに取り出せる場合は0
+        """
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.tokens
+        return max(0.0, deficit / self.rate)
+
+    def consume(self, amount: float) -> None:
+        """
+        指定量を取り出します（不足する場合は負の残量になります）。
+
+        Args:
+            amount: 取り出す量
+        """
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self, now: float) -> None:
+        """
+        残量を0にします（残量が負の場合はそのまま）。
+
+        Args:
+            now: 現在時刻（time.monotonic）
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+    def refund(self, amount: float) -> None:
+        """
+        取り出した量を戻します（見積もりより実際の使用量が少なかった場合）。
+
+        Args:
+            amount: 戻す量
+        """
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimitPermit:
+    """レートリミッターから取得した呼び出し許可
+
+    呼び出し後に実際の使用トークン数を記録すると、見積もりとの差分をバケットに反映します。
+    """
+
+    def __init__(self, limiter: "AsyncRateLimiter", estimated_tokens: int):
+        self._limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self.waited_seconds = 0.0
+
+    def record_usage(self, total_tokens: Optional[int]) -> None:
+        """
+        実際の使用トークン数を記録します。
+
+        Args:
+            total_tokens: 実際の使用トークン数（不明な場合はNone）
+        """
+        if total_tokens is None:
+            return
+        self._limiter.adjust_tokens(total_tokens - self.estimated_tokens)
+        self.estimated_tokens = total_tokens
+
+
+class AsyncRateLimiter:
+    """非同期レートリミッター
+
+    1分あたりのリクエスト数（RPM）・トークン数（TPM）の予算と同時実行数の上限を管理します。
+    待機中の呼び出しは到着順に処理されます。
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_concurrent_requests: int):
+        """
+        初期化
+
+        Args:
+            requests_per_minute: 1分あたりの最大リクエスト数
+            tokens_per_minute: 1分あたりの最大トークン数
+            max_concurrent_requests: 最大同時実行数
+        """
+        self.logger = logging.getLogger(__name__)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrent_requests = max_concurrent_requests
+        self.total_requests = 0
+        self.total_wait_seconds = 0.0
+        self.quota_signals = 0
+        # クォータ超過の通知を受けて、全ての呼び出しを停止する期限（time.monotonic）
+        self._paused_until = 0.0
+
+        # asyncioの同期プリミティブはイベントループに紐づくため、ループごとに作成する
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _ensure_primitives(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+
+    async def acquire(self, estimated_tokens: int = 0) -> float:
+        """
+        リクエスト1回分と見積もりトークン数を予算から取り出します。予算が足りない場合は補充まで待機します。
+
+        Args:
+            estimated_tokens: 見積もりトークン数
+
+        Returns:
+            待機した時間（秒）
+        """
+        self._ensure_primitives()
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                delay = max(
+                    self._paused_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(estimated_tokens, now)
+                )
+                if delay <= 0:
+                    break
+                self.logger.debug(f"レート制限のため待機します: {delay:.2f}秒")
+                await asyncio.sleep(delay)
+                waited += delay
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+
+        self.total_requests += 1
+        self.total_wait_seconds += waited
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """
+        クォータ超過（429）の通知を受けて、指定時間は全ての呼び出しを停止します。
+
+        リクエストの予算も使い切ったものとして扱い、再開後に呼び出しが集中しないようにします。
+
+        Args:
+            seconds: 停止する時間（秒）
+        """
+        self.quota_signals += 1
+        now = time.monotonic()
+        if now + seconds > self._paused_until:
+            self._paused_until = now + seconds
+            self.requests.drain(now)
+            self.logger.warning(f"クォータ超過のため、API呼び出しを{seconds:.1f}秒停止します")
+
+    def adjust_tokens(self, delta: int) -> None:
+        """
+        見積もりと実際の使用トークン数の差分を反映します。
+
+        Args:
+            delta: 実際の使用量 - 見積もり（正の場合は追加で消費、負の場合は返却）
+        """
+        if delta > 0:
+            self.tokens.consume(delta)
+        elif delta < 0:
+            self.tokens.refund(-delta)
+
+    @asynccontextmanager
+    async def limit(self, estimated_tokens: int = 0) -> AsyncIterator[RateLimitPermit]:
+        """
+        レート制限と同時実行数の制限の下でAPIを呼び出すためのコンテキストマネージャー
+
+        使用例:
+        ```python
+        async with limiter.limit(estimated_tokens) as permit:
+            response = await call_api()
+            permit.record_usage(response.usage_metadata.total_token_count)
+        ```
+
+        Args:
+            estimated_tokens: 見積もりトークン数
+
+        Yields:
+            呼び出し許可
+        """
+        self._ensure_primitives()
+        permit = RateLimitPermit(self, estimated_tokens)
+        async with self._semaphore:
+            permit.waited_seconds = await self.acquire(estimated_tokens)
+            yield permit
@@ -0,0 +1,151 @@
+"""
+構造化出力スキーマモジュール
+
+このモジュールでは、Gemini APIにスキーマで制約したJSONを出力させるための応答モデルと、
+Pydanticモデルから生成設定のresponse_schemaを作成する関数を提供します。
+応答は応答モデルで1度だけ検証し、正規表現による修復は検証に失敗した場合のみ使用します。
+"""
+
+import copy
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from pydantic import BaseModel, Field
+
+from ...data.models import StyleFeatures
+
+
+class TemplateSelectionResponse(BaseModel):
+    """テンプレート選択の応答"""
+    template_id: int = Field(description="選択したテンプレート番号")
+    reason: str = Field(description="選択理由")
+
+
+class TemplateChoice(BaseModel):
+    """複数テンプレート選択の各候補"""
+    template_id: int = Field(description="テンプレート番号")
+    reason: str = Field(description="選択理由")
+    score: float = Field(description="適合度スコア（0.0〜1.0）")
+
+
+class MultipleTemplateSelectionResponse(BaseModel):
+    """複数テンプレート選択の応答"""
+    selected_templates: List[TemplateChoice] = Field(description="選択したテンプレートのリスト")
+
+
+class StylistSelectionResponse(BaseModel):
+    """スタイリスト選択の応答"""
+    stylist_name: str = Field(description="選択したスタイリスト名")
+    reason: str = Field(description="選択理由")
+
+
+class CouponSelectionResponse(BaseModel):
+    """クーポン選択の応答"""
+    coupon_number: int = Field(description="選択したクーポン番号")
+    reason: str = Field(description="選択理由")
+
+
+class CategorySelectionResponse(BaseModel):
+    """カテゴリ選択の応答"""
+    category: str = Field(description="選択したカテゴリ名")
+    reason: str = Field(description="選択理由")
+
+
+class CombinedAnalysisResponse(BaseModel):
+    """統合分析の応答"""
+    category: str = Field(description="カテゴリ名")
+    features: StyleFeatures = Field(description="スタイルの特徴")
+    keywords: List[str] = Field(default_factory=list, description="キーワードリスト")
+    sex: str = Field(description="性別")
+    length: str = Field(description="髪の長さ")
+    selected_templates: List[TemplateChoice] = Field(description="選択したテンプレートのリスト")
+    stylist_name: Optional[str] = Field(default=None, description="選択したスタイリスト名")
+    stylist_reason: Optional[str] = Field(default=None, description="スタイリストの選択理由")
+    coupon_number: Optional[int] = Field(default=None, description="選択したクーポン番号")
+    coupon_reason: Optional[str] = Field(default=None, description="クーポンの選択理由")
+
+
+class BatchAnalysisItem(BaseModel):
+    """バッチ分析の画像ごとの結果"""
+    index: int = Field(description="画像番号（0始まり）")
+    category: str = Field(description="カテゴリ名")
+    features: StyleFeatures = Field(description="スタイルの特徴")
+    keywords: List[str] = Field(description="キーワードリスト")
+    sex: str = Field(description="性別")
+    length: str = Field(description="髪の長さ")
+
+
+class BatchAnalysisResponse(BaseModel):
+    """バッチ分析の応答"""
+    results: List[BatchAnalysisItem] = Field(description="画像ごとの分析結果のリスト")
+
+
+# response_schemaで使用できるキー（OpenAPIスキーマのサブセット）
+_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "properties", "required", "items"}
+
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        node = {**defs[node["$ref"].split("/")[-1]], **{k: v for k, v in node.items() if k != "$ref"}}
+
+    # Optional[X]はanyOf[X, null]になるため、nullableなXに変換する
+    variants = node.get("anyOf")
+    if variants:
+        non_null = [variant for variant in variants if variant.get("type") != "null"]
+        converted = _convert(non_null[0], defs)
+        if len(non_null) < len(variants):
+            converted["nullable"] = True
+        if "description" in node:
+            converted["description"] = node["description"]
+        return converted
+
+    schema: Dict[str, Any] = {}
+    for key, value in node.items():
+        if key not in _SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            schema[key] = {name: _convert(prop, defs) for name, prop in value.items()}
+        elif key == "items":
+            schema[key] = _convert(value, defs)
+        else:
+            schema[key] = value
+    return schema
+
+
+@lru_cache(maxsize=None)
+def _base_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    json_schema = model.model_json_schema()
+    schema = _convert(json_schema, json_schema.get("$defs", {}))
+    # 既定値があるフィールドも必ず出力させる
+    schema["required"] = list(schema.get("properties", {}))
+    return schema
+
+
+def response_schema_for(
+    model: Type[BaseModel],
+    enums: Optional[Dict[str, Sequence[str]]] = None
+) -> Dict[str, Any]:
+    """
+    Pydanticモデルから生成設定のresponse_schemaを作成します。
+
+    Args:
+        model: 応答モデル
+        enums: 選択肢を制約するフィールド名と選択肢のマッピング（オプション、
+            ネストしたフィールドは"results.category"のようにドット区切りで指定し、配列は要素のフィールドを指す）
+
+    Returns:
+        response_schemaとして指定できるスキーマの辞書
+    """
+    schema = copy.deepcopy(_base_schema(model))
+    for name, values in (enums or {}).items():
+        prop: Optional[Dict[str, Any]] = schema
+        for part in name.split("."):
+            if prop.get("type") == "array":
+                prop = prop["items"]
+            prop = prop.get("properties", {}).get(part)
+            if prop is None:
+                break
+        if prop is not None and values:
+            prop["enum"] = list(values)
+    return schema
+
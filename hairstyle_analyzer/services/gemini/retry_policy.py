@@ -0,0 +1,170 @@
+"""
+再試行ポリシーモジュール
+
+このモジュールでは、Gemini API呼び出しのエラーを分類し、再試行するかどうかと
+再試行までの待機時間を決定する再試行ポリシーを提供します。
+"""
+
+import re
+import random
+from typing import Optional
+
+from ...utils.errors import AppError, GeminiAPIError
+
+
+# エラーの分類
+TRANSIENT = "transient"   # 一時的なエラー（再試行する）
+QUOTA = "quota"           # レート制限・クォータ超過（サーバーの指示に従って待機して再試行する）
+PERMANENT = "permanent"   # 恒久的なエラー（再試行しない）
+
+# 分類ごとのGeminiAPIErrorのエラータイプ
+ERROR_TYPES = {
+    TRANSIENT: "TRANSIENT_ERROR",
+    QUOTA: "QUOTA_EXCEEDED",
+    PERMANENT: "PERMANENT_ERROR",
+}
+
+# 例外クラス名による分類（google.api_coreの例外に依存しないよう名前で判定する）
+_QUOTA_ERROR_NAMES = {"ResourceExhausted", "TooManyRequests"}
+_PERMANENT_ERROR_NAMES = {
+    "InvalidArgument", "BadRequest", "PermissionDenied", "Forbidden", "Unauthenticated", "Unauthorized",
+    "NotFound", "FailedPrecondition", "MethodNotImplemented", "BlockedPromptException", "StopCandidateException",
+}
+
+# エラーメッセージ中の再試行遅延（"retry_delay { seconds: 30 }" / "Please retry in 12.5s"）
+_RETRY_DELAY_PATTERNS = [
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),
+    re.compile(r"retry in\s*([\d.]+)\s*s", re.IGNORECASE),
+]
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    API呼び出しのエラーを分類します。
+
+    Args:
+        error: 発生した例外
+
+    Returns:
+        TRANSIENT / QUOTA / PERMANENT のいずれか
+    """
+    if isinstance(error, GeminiAPIError) and error.error_type in ERROR_TYPES.values():
+        return next(category for category, error_type in ERROR_TYPES.items() if error_type == error.error_type)
+
+    # アプリケーション内のエラー（画像の読み込み失敗など）は再試行しても解決しない
+    if isinstance(error, AppError):
+        return PERMANENT
+
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & _QUOTA_ERROR_NAMES:
+        return QUOTA
+    if names & _PERMANENT_ERROR_NAMES:
+        return PERMANENT
+
+    # HTTPステータスコードを持つエラー
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        if code == 429:
+            return QUOTA
+        if code == 408:
+            return TRANSIENT
+        if 400 <= code < 500:
+            return PERMANENT
+
+    # 5xx・タイムアウト・接続エラー・不明なエラーは一時的なものとして扱う
+    return TRANSIENT
+
+
+def server_retry_delay(error: BaseException) -> Optional[float]:
+    """
+    サーバーが指示した再試行までの待機時間を取得します。
+
+    Args:
+        error: 発生した例外
+
+    Returns:
+        待機時間（秒）、指示がない場合はNone
+    """
+    # gRPCのRetryInfo
+    for detail in getattr(error, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None:
+            seconds = getattr(retry_delay, "seconds", 0) + getattr(retry_delay, "nanos", 0) / 1e9
+            if seconds > 0:
+                return float(seconds)
+
+    # HTTPのRetry-Afterヘッダー
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+
+    # エラーメッセージ
+    message = str(error)
+    for pattern in _RETRY_DELAY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class RetryPolicy:
+    """再試行ポリシー
+
+    ジッター付きの指数バックオフ（フルジッター）で待機時間を決定します。
+    サーバーが待機時間を指示した場合は、その時間以上待機します。
+    """
+
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float):
+        """
+        初期化
+
+        Args:
+            max_retries: 最大試行回数
+            base_delay: バックオフの基準遅延（秒）
+            max_delay: バックオフの最大遅延（秒）
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, category: str, attempt: int) -> bool:
+        """
+        再試行するかどうかを判定します。
+
+        Args:
+            category: エラーの分類
+            attempt: 失敗した試行の回数（1始まり）
+
+        Returns:
+            再試行する場合はTrue
+        """
+        return category != PERMANENT and attempt < self.max_retries
+
+    def next_delay(self, attempt: int, category: str = TRANSIENT, error: Optional[BaseException] = None) -> float:
+        """
+        次の試行までの待機時間を計算します。
+
+        Args:
+            attempt: 失敗した試行の回数（1始まり）
+            category: エラーの分類
+            error: 発生した例外（オプション、サーバー指示の待機時間の取得に使用）
+
+        Returns:
+            待機時間（秒）
+        """
+        suggested = server_retry_delay(error) if error is not None else None
+        if suggested is not None:
+            # 指示された時間に少しジッターを加え、再試行が同時に集中しないようにする
+            return suggested + random.uniform(0, self.base_delay)
+
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        if category == QUOTA:
+            # クォータ超過ではすぐに再試行しても失敗するため、少なくとも上限の半分は待機する
+            return cap / 2 + random.uniform(0, cap / 2)
+        return random.uniform(0, cap)
@@ -0,0 +1,144 @@
+"""
+Gemini API通信方式モジュール
+
+このモジュールでは、GeminiServiceがモデルの生成APIを呼び出す通信方式（トランスポート）を定義します。
+SDKの非同期メソッドを直接awaitするネイティブ非同期方式と、同期メソッドを専用の
+スレッドプールで実行する方式を提供します。
+"""
+
+import asyncio
+import inspect
+import logging
+import weakref
+import functools
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class GeminiTransport(ABC):
+    """通信方式の基底クラス"""
+
+    name = "base"
+
+    @abstractmethod
+    async def generate(self, model: Any, contents: Any, generation_config: Dict[str, Any]) -> Any:
+        """
+        モデルの生成APIを呼び出します。
+
+        Args:
+            model: 生成モデル
+            contents: 送信するコンテンツ
+            generation_config: 生成設定
+
+        Returns:
+            APIレスポンス（textとusage_metadataを持つオブジェクト）
+        """
+
+    def close(self) -> None:
+        """通信方式が保持するリソースを解放します。"""
+
+
+class ThreadPoolTransport(GeminiTransport):
+    """スレッドプール方式
+
+    同期メソッドgenerate_contentを専用のスレッドプールで実行します。
+    既定のスレッドプールを共有しないため、同時実行数はmax_workersまで確保されます。
+    """
+
+    name = "thread"
+
+    def __init__(self, max_workers: int):
+        """
+        初期化
+
+        Args:
+            max_workers: スレッドプールのワーカー数（最大同時実行数）
+        """
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def generate(self, model: Any, contents: Any, generation_config: Dict[str, Any]) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gemini")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(model.generate_content, contents, generation_config=generation_config)
+        )
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class NativeAsyncTransport(GeminiTransport):
+    """ネイティブ非同期方式
+
+    SDKの非同期メソッドgenerate_content_asyncを直接awaitするため、スレッドを使用せず
+    1つのイベントループで多数の呼び出しを並行できます。非同期メソッドを持たないモデルはスレッドプール方式で実行します。
+    非同期クライアントは最初に使用したイベントループに紐づくため、モデルごとに使用したイベントループを記録し、
+    別のループ（Streamlitの再実行ごとのasyncio.runなど）で使用する際はクライアントを作成し直します。
+    作成し直す方法がない場合は、そのループでの呼び出しのみスレッドプール方式で実行します。
+    """
+
+    name = "async"
+
+    def __init__(self, fallback: ThreadPoolTransport, reset_async_client: Optional[Callable[[Any], None]] = None):
+        """
+        初期化
+
+        Args:
+            fallback: 非同期メソッドを使用できない場合の通信方式
+            reset_async_client: モデルの非同期クライアントを破棄する関数（オプション）
+        """
+        self.logger = logging.getLogger(__name__)
+        self.fallback = fallback
+        self.reset_async_client = reset_async_client
+        # モデル → 非同期クライアントが紐づいているイベントループ
+        self._model_loops: "weakref.WeakKeyDictionary[Any, asyncio.AbstractEventLoop]" = weakref.WeakKeyDictionary()
+
+    async def generate(self, model: Any, contents: Any, generation_config: Dict[str, Any]) -> Any:
+        generate_async = getattr(model, "generate_content_async", None)
+        if not inspect.iscoroutinefunction(generate_async):
+            return await self.fallback.generate(model, contents, generation_config)
+
+        loop = asyncio.get_running_loop()
+        bound_loop = self._model_loops.get(model)
+        if bound_loop is not None and bound_loop is not loop:
+            if self.reset_async_client is None:
+                return await self.fallback.generate(model, contents, generation_config)
+            self.logger.debug("イベントループが変わったため、非同期クライアントを作成し直します")
+            self.reset_async_client(model)
+        self._model_loops[model] = loop
+        return await generate_async(contents, generation_config=generation_config)
+
+    def close(self) -> None:
+        self.fallback.close()
+
+
+def create_transport(
+    name: str,
+    max_in_flight: int,
+    reset_async_client: Optional[Callable[[Any], None]] = None
+) -> GeminiTransport:
+    """
+    設定に応じた通信方式を作成します。
+
+    Args:
+        name: 通信方式名（"async" / "thread"）
+        max_in_flight: 最大同時実行数
+        reset_async_client: モデルの非同期クライアントを破棄する関数（ネイティブ非同期方式で使用）
+
+    Returns:
+        通信方式
+
+    Raises:
+        ValueError: 未知の通信方式名が指定された場合
+    """
+    if name == "async":
+        return NativeAsyncTransport(ThreadPoolTransport(max_in_flight), reset_async_client)
+    if name == "thread":
+        return ThreadPoolTransport(max_in_flight)
+    raise ValueError(f"未知の通信方式です: {name}")
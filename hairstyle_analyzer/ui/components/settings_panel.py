@@ -7,6 +7,7 @@ API設定、サロン設定、詳細設定などの入力フォームが含ま
 
 import logging
 import streamlit as st
+from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, Callable, Union, List, Tuple
 
@@ -354,6 +355,226 @@ class SettingsPanelComponent:
             
             advanced_settings["excel_headers"] = custom_headers
         
+        # キャッシュ設定タブ
+        with tabs[4]:
+            st.header("キャッシュ設定")
+            
+            # キャッシュファイルパス
+            cache_file = st.text_input(
+                "キャッシュファイルパス",
+                value=str(self.config_manager.paths.cache_file),
+                help="キャッシュファイルのパスを設定します。"
+            )
+            advanced_settings["cache_file"] = cache_file
+            
+            # キャッシュの表示
+            if st.button("キャッシュ統計を表示"):
+                try:
+                    self._display_cache_statistics()
+                except Exception as e:
+                    st.error(f"キャッシュ統計の取得に失敗しました: {str(e)}")
+        
+        # 設定の保存ボタン
+        if st.sidebar.button("設定を保存", type="primary"):
+            try:
+                # その他の設定を更新
+                config_updates = {
+                    "gemini": {
+                        "model": selected_model,
+                        "temperature": temperature,
+                        "max_tokens": max_tokens
+                    },
+                    "processing": {
+                        "batch_size": batch_size,
+                        "api_delay": api_delay
+                    }
+                }
+                
+                self.config_manager.update_config(config_updates)
+                
+                # 成功メッセージ
+                st.sidebar.success("設定を保存しました")
+                
+                # コールバック実行
+                if on_save:
+                    on_save()
+            
+            except Exception as e:
+                st.sidebar.error(f"設定の保存中にエラーが発生しました: {str(e)}")
+        
+        # キャッシュクリアボタン
+        if st.sidebar.button("キャッシュをクリア"):
+            try:
+                # コールバック関数の呼び出し
+                if on_clear_cache:
+                    on_clear_cache()
+                st.sidebar.success("キャッシュをクリアしました。")
+            except Exception as e:
+                st.sidebar.error(f"キャッシュのクリアに失敗しました: {str(e)}")
+                self.logger.error(f"キャッシュクリアエラー: {str(e)}")
+        
+        return settings
+    
+    def display_advanced_settings(self) -> Dict[str, Any]:
+        """
+        詳細設定パネルを表示します
+        
+        Returns:
+            更新された詳細設定値の辞書
+        """
+        st.title("詳細設定")
+        
+        advanced_settings = {}
+        
+        # タブで設定を整理
+        tabs = st.tabs(["API設定", "処理設定", "スクレイピング設定", "出力設定", "キャッシュ設定"])
+        
+        # API設定タブ
+        with tabs[0]:
+            st.header("Gemini API設定")
+            
+            # 温度パラメータ
+            temperature = st.slider(
+                "温度パラメータ",
+                min_value=0.0,
+                max_value=1.0,
+                value=self.config_manager.gemini.temperature,
+                step=0.05,
+                help="生成の多様性を制御します。低い値ではより決定論的な応答に、高い値ではよりランダムな応答になります。"
+            )
+            advanced_settings["gemini_temperature"] = temperature
+            
+            # 最大トークン数
+            max_tokens = st.slider(
+                "最大トークン数",
+                min_value=100,
+                max_value=1000,
+                value=self.config_manager.gemini.max_tokens,
+                step=50,
+                help="生成する最大トークン数を設定します。"
+            )
+            advanced_settings["gemini_max_tokens"] = max_tokens
+            
+            # カスタムプロンプトテンプレート
+            st.subheader("プロンプトテンプレート")
+            
+            # プロンプトテンプレート編集（折りたたみ可能）
+            with st.expander("カスタムプロンプトテンプレート", expanded=False):
+                prompt_template = st.text_area(
+                    "分析プロンプトテンプレート",
+                    value=self.config_manager.gemini.prompt_template,
+                    height=300,
+                    help="画像分析用のプロンプトテンプレートをカスタマイズできます。"
+                )
+                advanced_settings["prompt_template"] = prompt_template
+                
+                attribute_prompt_template = st.text_area(
+                    "属性分析プロンプトテンプレート",
+                    value=self.config_manager.gemini.attribute_prompt_template,
+                    height=200,
+                    help="性別・髪の長さ分析用のプロンプトテンプレートをカスタマイズできます。"
+                )
+                advanced_settings["attribute_prompt_template"] = attribute_prompt_template
+        
+        # 処理設定タブ
+        with tabs[1]:
+            st.header("処理設定")
+            
+            # リトライ設定
+            st.subheader("リトライ設定")
+            
+            retry_delay = st.slider(
+                "リトライ間隔（秒）",
+                min_value=0.5,
+                max_value=10.0,
+                value=self.config_manager.processing.retry_delay,
+                step=0.5,
+                help="リトライ間の待機時間を設定します。"
+            )
+            advanced_settings["retry_delay"] = retry_delay
+            
+            # メモリ使用量
+            memory_per_image = st.slider(
+                "画像あたりのメモリ使用量（MB）",
+                min_value=1,
+                max_value=50,
+                value=self.config_manager.processing.memory_per_image_mb,
+                help="処理時の画像あたりの推定メモリ使用量を設定します。"
+            )
+            advanced_settings["memory_per_image_mb"] = memory_per_image
+        
+        # スクレイピング設定タブ
+        with tabs[2]:
+            st.header("スクレイピング設定")
+            
+            # タイムアウト設定
+            timeout = st.slider(
+                "リクエストタイムアウト（秒）",
+                min_value=5,
+                max_value=60,
+                value=self.config_manager.scraper.timeout,
+                help="スクレイピングリクエストのタイムアウト時間を設定します。"
+            )
+            advanced_settings["scraper_timeout"] = timeout
+            
+            # クーポンページ設定
+            coupon_page_limit = st.slider(
+                "クーポンページ数上限",
+                min_value=1,
+                max_value=10,
+                value=self.config_manager.scraper.coupon_page_limit,
+                help="取得するクーポンページの最大数を設定します。"
+            )
+            advanced_settings["coupon_page_limit"] = coupon_page_limit
+            
+            # 詳細設定（上級者向け）
+            with st.expander("上級者向け設定", expanded=False):
+                st.warning("これらの設定を変更すると、スクレイピングが正常に動作しなくなる可能性があります。")
+                
+                stylist_link_selector = st.text_input(
+                    "スタイリストリンクセレクタ",
+                    value=self.config_manager.scraper.stylist_link_selector,
+                    help="スタイリストリンクを特定するためのCSSセレクタを設定します。"
+                )
+                advanced_settings["stylist_link_selector"] = stylist_link_selector
+                
+                stylist_name_selector = st.text_input(
+                    "スタイリスト名セレクタ",
+                    value=self.config_manager.scraper.stylist_name_selector,
+                    help="スタイリスト名を特定するためのCSSセレクタを設定します。"
+                )
+                advanced_settings["stylist_name_selector"] = stylist_name_selector
+                
+                coupon_class_name = st.text_input(
+                    "クーポン名クラス名",
+                    value=self.config_manager.scraper.coupon_class_name,
+                    help="クーポン名を特定するためのHTMLクラス名を設定します。"
+                )
+                advanced_settings["coupon_class_name"] = coupon_class_name
+        
+        # 出力設定タブ
+        with tabs[3]:
+            st.header("Excel出力設定")
+            
+            # ヘッダー設定
+            st.subheader("ヘッダー設定")
+            
+            excel_headers = self.config_manager.excel.headers
+            columns = ["A", "B", "C", "D", "E", "F", "G", "H", "I"]
+            
+            custom_headers = {}
+            
+            for col in columns:
+                default_value = excel_headers.get(col, "")
+                custom_header = st.text_input(
+                    f"{col}列のヘッダー",
+                    value=default_value,
+                    key=f"header_{col}"
+                )
+                custom_headers[col] = custom_header
+            
+            advanced_settings["excel_headers"] = custom_headers
+        
         # キャッシュ設定タブ
         with tabs[4]:
             st.header("キャッシュ設定")
@@ -433,3 +654,53 @@ class SettingsPanelComponent:
                 self.logger.error(f"詳細設定保存エラー: {str(e)}")
         
         return advanced_settings
+    
+    def _display_cache_statistics(self) -> None:
+        """
+        キャッシュ統計を表示する
+        
+        セッションのプロセッサーが使用しているキャッシュマネージャー（2層キャッシュの場合はメモリ層と
+        未書き込みのエントリを含む）から統計を取得します。プロセッサーが未作成の場合は、設定から作成します。
+        """
+        from ...data.tiered_cache import create_cache_manager
+        
+        processor = st.session_state.get("processor")
+        cache_manager = getattr(processor, "cache_manager", None)
+        owned = cache_manager is None
+        if owned:
+            cache_manager = create_cache_manager(self.config_manager.paths.cache_file, self.config_manager.cache)
+        
+        try:
+            stats = cache_manager.get_statistics()
+        finally:
+            if owned:
+                cache_manager.close()
+        
+        st.subheader("キャッシュ統計")
+        st.write(f"合計エントリ数: {stats['total_entries']}")
+        st.write(f"有効なエントリ数: {stats['valid_entries']}")
+        st.write(f"期限切れのエントリ数: {stats['expired_entries']}")
+        st.write(f"キャッシュサイズ制限: {stats['size_limit']}")
+        st.write(f"TTL (日): {stats['ttl_days']}")
+        
+        if stats['oldest_entry_timestamp'] > 0:
+            oldest_date = datetime.fromtimestamp(stats['oldest_entry_timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+            st.write(f"最も古いエントリ: {oldest_date}")
+        
+        if stats['newest_entry_timestamp'] > 0:
+            newest_date = datetime.fromtimestamp(stats['newest_entry_timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+            st.write(f"最も新しいエントリ: {newest_date}")
+        
+        # 2層キャッシュの場合は層ごとのヒット・ミス数を表示する
+        tiers = stats.get('tiers')
+        if tiers:
+            memory, disk = tiers['memory'], tiers['disk']
+            st.write(
+                f"メモリ層: {memory['entries']}件（{memory['bytes']:,} / {memory['max_bytes']:,} バイト）、"
+                f"ヒット {memory['hits']}回、ミス {memory['misses']}回、削除 {memory['evictions']}件"
+            )
+            st.write(
+                f"永続層: ヒット {disk['hits']}回、ミス {disk['misses']}回、"
+                f"まとめ書き込み {disk['flushes']}回"
+            )
+            st.write(f"未書き込みのエントリ数: {stats.get('pending_writes', 0)}")
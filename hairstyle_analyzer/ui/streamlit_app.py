@@ -32,11 +32,13 @@ SESSION_PROGRESS = "progress"
 SESSION_USE_CACHE = "use_cache"
 SESSION_CONFIG = "config"
 SESSION_PROCESSING_STAGES = "processing_stages"  # 処理段階を追跡するための新しいセッションキー
+SESSION_CANCEL_TOKEN = "cancel_token"  # 実行中の画像処理のキャンセルトークン
+SESSION_PARTIAL_RESULTS = "partial_results"  # 実行中の画像処理で完了した画像の結果（中止時に表示する）
 
 # モジュールのインポート
 from hairstyle_analyzer.data.config_manager import ConfigManager
 from hairstyle_analyzer.data.template_manager import TemplateManager
-from hairstyle_analyzer.data.cache_manager import CacheManager
+from hairstyle_analyzer.data.tiered_cache import create_cache_manager
 from hairstyle_analyzer.services.scraper.scraper_service import ScraperService
 
 # コアモジュール
@@ -60,7 +62,7 @@ from hairstyle_analyzer.core.text_exporter import TextExporter
 from hairstyle_analyzer.services.gemini.gemini_service import GeminiService
 
 # UI コンポーネント
-from hairstyle_analyzer.utils.async_context import progress_tracker
+from hairstyle_analyzer.utils.async_context import progress_tracker, CancellationToken
 
 from hairstyle_analyzer.data.models import ProcessResult, StyleAnalysis, AttributeAnalysis, Template, StylistInfo, CouponInfo, StyleFeatures
 
@@ -120,10 +122,73 @@ def update_progress(current, total, message="", stage_details=None):
         
         st.session_state[SESSION_PROGRESS] = progress
 
-async def process_images(processor, image_paths, stylists=None, coupons=None, use_cache=False, template_count=3):
+def apply_original_filename(result, path_obj, filename_mapping):
+    """
+    処理結果のファイル名を、アップロード時の元のファイル名に置き換える
+    
+    Args:
+        result: 処理結果（辞書またはProcessResultモデル）
+        path_obj: 処理した画像のパス
+        filename_mapping: 安全なファイル名から元のファイル名へのマッピング
+    """
+    image_name = path_obj.name
+    
+    # デバッグログ：マッピングの内容を確認
+    logging.debug(f"ファイル名マッピング: {filename_mapping}")
+    logging.debug(f"現在の画像名: {image_name}")
+    logging.debug(f"現在のパス: {str(path_obj)}")
+    
+    # 検索キーの候補リスト
+    search_keys = [
+        image_name.lower(),        # ファイル名のみ（小文字）
+        str(path_obj).lower(),     # 完全なパス（文字列、小文字）
+        path_obj.name.lower()      # パスから抽出したファイル名（小文字）
+    ]
+    
+    # 元のファイル名を検索
+    original_filename = None
+    for key in search_keys:
+        if key in filename_mapping:
+            original_filename = filename_mapping[key]
+            logging.debug(f"マッピング成功: {key} -> {original_filename}")
+            break
+    
+    if isinstance(result, dict):
+        if 'image_name' not in result:
+            # マッピングが見つかった場合は元のファイル名を使用
+            if original_filename:
+                result['image_name'] = original_filename
+                logging.info(f"元のファイル名を設定: {original_filename}")
+            else:
+                # マッピングがない場合は安全なファイル名を使用（従来の動作）
+                result['image_name'] = image_name
+                logging.warning(f"元のファイル名が見つからないため安全なファイル名を使用: {image_name}")
+            
+            result['image_path'] = str(path_obj)
+        return
+    
+    # オブジェクト型の結果の場合（ProcessResultモデルなど）
+    try:
+        # 元のファイル名が見つかった場合に属性を更新
+        if original_filename and hasattr(result, 'image_name') and hasattr(result.__class__, 'image_name'):
+            result.image_name = original_filename
+            logging.info(f"オブジェクトに元のファイル名を設定: {original_filename}")
+        
+        # image_path属性があれば更新
+        if hasattr(result, 'image_path') and hasattr(result.__class__, 'image_path'):
+            result.image_path = str(path_obj)
+    except Exception as e:
+        # 属性の更新に失敗した場合はログに記録（処理は続行）
+        logging.warning(f"結果オブジェクトの属性更新中にエラー: {str(e)}")
+
+
+async def process_images(processor, image_paths, stylists=None, coupons=None, use_cache=False, template_count=3, on_event=None, cancel_token=None):
     """
     画像を処理して結果を取得する非同期関数
     
+    画像はプロセッサーのパイプラインで並行して処理され、完了した画像から順に結果を受け取ります。
+    cancel_tokenがキャンセルされた場合は処理中の画像を中断し、それまでに完了した画像の結果を返します。
+    
     Args:
         processor: 画像処理プロセッサー
         image_paths: 画像ファイルのパスリスト
@@ -131,11 +196,12 @@ async def process_images(processor, image_paths, stylists=None, coupons=None, us
         coupons: クーポン情報のリスト（オプション）
         use_cache: キャッシュを使用するかどうか（デフォルト: False）
         template_count: 選択するテンプレート数（デフォルト: 3）
+        on_event: 画像ごとの進捗イベント（ProcessEvent）を受け取る関数（オプション）
+        cancel_token: 処理を中止するためのキャンセルトークン（オプション）
         
     Returns:
         処理結果のリスト
     """
-    """画像を処理して結果を取得する非同期関数"""
     results = []
     total = len(image_paths)
     
@@ -160,15 +226,6 @@ async def process_images(processor, image_paths, stylists=None, coupons=None, us
         logging.error("画像パスが空です")
         return []
     
-    # 処理段階の定義
-    processing_stages = [
-        "画像読み込み",
-        "スタイル分析",
-        "テンプレートマッチング",
-        "スタイリスト選択",
-        "タイトル生成"
-    ]
-    
     # 進捗状況の初期化
     progress = {
         "current": 0,
@@ -176,149 +233,65 @@ async def process_images(processor, image_paths, stylists=None, coupons=None, us
         "message": "初期化中...",
         "start_time": time.time(),
         "complete": False,
-        "stage_details": f"準備中: {processing_stages[0]}"
+        "stage_details": "準備中: 画像読み込み"
     }
     st.session_state[SESSION_PROGRESS] = progress
     
+    status_labels = {"processed": "処理完了", "cached": "キャッシュから取得", "restored": "前回の実行から復元", "failed": "エラー", "cancelled": "中止"}
+    
+    def handle_event(event):
+        # 画像の処理が終わるたびに進捗状況を更新する
+        progress["current"] = event.completed
+        progress["message"] = f"画像 {event.completed}/{event.total} を処理しました"
+        stage_details = f"{status_labels[event.status]}: {event.image_name}"
+        if event.error:
+            logging.error(f"画像処理エラー ({event.image_name}): {event.error}")
+            stage_details += f"\nエラー: {event.error}\n次の画像に進みます"
+        progress["stage_details"] = stage_details
+        st.session_state[SESSION_PROGRESS] = progress
+        
+        if on_event is not None:
+            on_event(event)
+    
     try:
-        # キャッシュ設定を適用
-        processor.use_cache = use_cache
+        # スタイリストとクーポンの両方がある場合のみ選択を行う
+        if not (stylists and coupons):
+            stylists = coupons = None
         
-        # 各画像を処理
-        for i, image_path in enumerate(image_paths):
-            try:
-                # 進捗状況の更新
-                progress["current"] = i
-                progress["message"] = f"画像 {i+1}/{total} を処理中..."
-                
-                # 文字列パスをPathオブジェクトに変換
-                path_obj = Path(image_path) if isinstance(image_path, str) else image_path
-                
-                # ログに記録
-                image_name = path_obj.name
-                logging.info(f"画像 {image_name} の処理を開始します")
-                
-                # 処理段階の詳細情報を更新
-                stage_details = f"処理中: 画像 {i+1}/{total}\n"
-                stage_details += f"現在の段階: {processing_stages[0]}\n"
-                stage_details += f"次の段階: {processing_stages[1]}"
-                progress["stage_details"] = stage_details
-                
-                # セッションステートを更新して進捗表示を更新
-                st.session_state[SESSION_PROGRESS] = progress
-                
-                # 明示的な遅延を入れて、UIの更新を確実にする
-                await asyncio.sleep(0.1)
-                
-                # 画像処理
-                if stylists and coupons:
-                    # スタイリストとクーポンのデータを渡して処理
-                    result = await processor.process_single_image(path_obj, stylists, coupons, use_cache=use_cache, template_count=template_count)
-                else:
-                    # 基本処理
-                    result = await processor.process_single_image(path_obj, use_cache=use_cache, template_count=template_count)
-                
-                # 処理段階の詳細情報を更新（完了）
-                stage_details = f"処理完了: 画像 {i+1}/{total}\n"
-                stage_details += f"完了した段階: {', '.join(processing_stages)}"
-                progress["stage_details"] = stage_details
-                st.session_state[SESSION_PROGRESS] = progress
-                
-                # 明示的な遅延を入れて、UIの更新を確実にする
-                await asyncio.sleep(0.1)
-                
+        # セッション状態からファイル名マッピングを取得
+        filename_mapping = st.session_state.get("filename_mapping", {})
+        path_objs = [Path(image_path) if isinstance(image_path, str) else image_path for image_path in image_paths]
+        
+        # 完了した画像から順に結果を受け取る
+        stream = processor.iter_process(
+            path_objs,
+            use_cache=use_cache,
+            stylists=stylists,
+            coupons=coupons,
+            template_count=template_count,
+            on_event=handle_event,
+            cancel_token=cancel_token
+        )
+        try:
+            async for result in stream:
                 # 結果にファイル名を追加
-                if result:
-                    # セッション状態からファイル名マッピングを取得
-                    filename_mapping = st.session_state.get("filename_mapping", {})
-                    
-                    # デバッグログ：マッピングの内容を確認
-                    logging.debug(f"ファイル名マッピング: {filename_mapping}")
-                    logging.debug(f"現在の画像名: {image_name}")
-                    logging.debug(f"現在のパス: {str(path_obj)}")
-                    
-                    if isinstance(result, dict):
-                        if 'image_name' not in result:
-                            # 検索キーの候補リスト
-                            search_keys = [
-                                image_name.lower(),        # ファイル名のみ（小文字）
-                                str(path_obj).lower(),     # 完全なパス（文字列、小文字）
-                                path_obj.name.lower()      # パスから抽出したファイル名（小文字）
-                            ]
-                            
-                            # 元のファイル名を検索
-                            original_filename = None
-                            for key in search_keys:
-                                if key in filename_mapping:
-                                    original_filename = filename_mapping[key]
-                                    logging.debug(f"マッピング成功: {key} -> {original_filename}")
-                                    break
-                            
-                            # マッピングが見つかった場合は元のファイル名を使用
-                            if original_filename:
-                                result['image_name'] = original_filename
-                                logging.info(f"元のファイル名を設定: {original_filename}")
-                            else:
-                                # マッピングがない場合は安全なファイル名を使用（従来の動作）
-                                result['image_name'] = image_name
-                                logging.warning(f"元のファイル名が見つからないため安全なファイル名を使用: {image_name}")
-                            
-                            result['image_path'] = str(path_obj)
-                    else:
-                        # オブジェクト型の結果の場合（ProcessResultモデルなど）
-                        try:
-                            # 検索キーの候補リスト
-                            search_keys = [
-                                image_name.lower(),        # ファイル名のみ（小文字）
-                                str(path_obj).lower(),     # 完全なパス（文字列、小文字）
-                                path_obj.name.lower()      # パスから抽出したファイル名（小文字）
-                            ]
-                            
-                            # 元のファイル名を検索
-                            original_filename = None
-                            for key in search_keys:
-                                if key in filename_mapping:
-                                    original_filename = filename_mapping[key]
-                                    logging.debug(f"オブジェクト用マッピング成功: {key} -> {original_filename}")
-                                    break
-                            
-                            # 元のファイル名が見つかった場合に属性を更新
-                            if original_filename and hasattr(result, 'image_name') and hasattr(result.__class__, 'image_name'):
-                                result.image_name = original_filename
-                                logging.info(f"オブジェクトに元のファイル名を設定: {original_filename}")
-                            
-                            # image_path属性があれば更新
-                            if hasattr(result, 'image_path') and hasattr(result.__class__, 'image_path'):
-                                result.image_path = str(path_obj)
-                        except Exception as e:
-                            # 属性の更新に失敗した場合はログに記録（処理は続行）
-                            logging.warning(f"結果オブジェクトの属性更新中にエラー: {str(e)}")
-                    
-                    results.append(result)
-                
-            except Exception as e:
-                # 個別の画像処理中のエラーをログに記録（処理は続行）
-                logging.error(f"画像処理エラー ({image_name}): {str(e)}")
-                import traceback
-                logging.error(traceback.format_exc())
-                
-                # エラー情報を進捗詳細に追加
-                stage_details = f"エラー発生: 画像 {i+1}/{total}\n"
-                stage_details += f"エラー: {str(e)}\n"
-                stage_details += "次の画像に進みます"
-                progress["stage_details"] = stage_details
-                st.session_state[SESSION_PROGRESS] = progress
-                
-                # 明示的な遅延を入れて、UIの更新を確実にする
-                await asyncio.sleep(0.1)
-                
-                continue
+                path_obj = Path(result.image_path) if getattr(result, "image_path", None) else Path(result.image_name)
+                apply_original_filename(result, path_obj, filename_mapping)
+                results.append(result)
+                # スクリプトの停止で中断された場合も表示できるように、完了した結果をセッションに保存
+                st.session_state[SESSION_PARTIAL_RESULTS] = list(results)
+        finally:
+            await stream.aclose()
         
         # 進捗状況の更新
         progress["current"] = total
-        progress["message"] = "処理完了"
         progress["complete"] = True
-        progress["stage_details"] = f"全ての画像処理が完了しました。合計: {total}画像"
+        if cancel_token is not None and cancel_token.cancelled:
+            progress["message"] = "処理中止"
+            progress["stage_details"] = f"画像処理を中止しました（{cancel_token.reason}）。合計: {total}画像（完了: {len(results)}画像）"
+        else:
+            progress["message"] = "処理完了"
+            progress["stage_details"] = f"全ての画像処理が完了しました。合計: {total}画像（成功: {len(results)}画像）"
         st.session_state[SESSION_PROGRESS] = progress
         
         return results
@@ -336,12 +309,32 @@ async def process_images(processor, image_paths, stylists=None, coupons=None, us
             progress["stage_details"] = f"処理中にエラーが発生しました:\n{str(e)}"
             st.session_state[SESSION_PROGRESS] = progress
         
-        # UIの更新を確実にするための遅延
-        await asyncio.sleep(0.1)
-        
         return []
 
 
+def cancel_processing():
+    """
+    処理の中止ボタンのコールバック
+    
+    Streamlitはボタンが押されると実行中のスクリプトを停止し、このコールバックを次の再実行の開始時に呼び出します。
+    実行中の画像処理は、スクリプトの停止（進捗表示の更新時に送出される例外）でiter_processが閉じられることで中断され、
+    実行中のAPI呼び出しもキャンセルされます。このコールバックは、処理がまだ続いている場合に備えてキャンセルトークンを
+    キャンセルし、それまでに完了した画像の結果（実行ジャーナルとキャッシュにも記録済み）を結果画面に表示します。
+    """
+    cancel_token = st.session_state.pop(SESSION_CANCEL_TOKEN, None)
+    if cancel_token is not None:
+        cancel_token.cancel("ユーザーが処理を中止しました")
+    
+    partial_results = st.session_state.pop(SESSION_PARTIAL_RESULTS, [])
+    logging.info(f"ユーザーが処理を中止しました（完了: {len(partial_results)}枚）")
+    if partial_results:
+        st.session_state[SESSION_RESULTS] = partial_results
+        st.session_state["workflow_state"] = "processing_complete"
+        st.session_state["processing_complete"] = True
+        if "templates_selected" in st.session_state:
+            del st.session_state["templates_selected"]
+
+
 def create_processor(config_manager):
     """プロセッサーを作成する関数"""
     try:
@@ -375,7 +368,7 @@ def create_processor(config_manager):
             return None
         
         # キャッシュマネージャーの初期化
-        cache_manager = CacheManager(config_manager.paths.cache_file, config_manager.cache)
+        cache_manager = create_cache_manager(config_manager.paths.cache_file, config_manager.cache)
         logging.info(f"キャッシュファイル: {config_manager.paths.cache_file}")
         
         # APIキーの確認と取得
@@ -417,7 +410,11 @@ def create_processor(config_manager):
             batch_size=config_manager.processing.batch_size,
             api_delay=config_manager.processing.api_delay,
             use_cache=use_cache,
-            filename_mapping=filename_mapping
+            filename_mapping=filename_mapping,
+            journal_dir=config_manager.processing.journal_dir,
+            pipeline_config=config_manager.processing.pipeline,
+            image_timeout_seconds=config_manager.processing.image_timeout_seconds,
+            run_timeout_seconds=config_manager.processing.run_timeout_seconds
         )
         
         logging.info("プロセッサーの作成が完了しました")
@@ -1494,82 +1491,77 @@ def render_main_content():
                         col1, col2 = st.columns(2)
                         status_text = col1.empty()
                         time_text = col2.empty()
+                        
+                        # 中止ボタン（処理中の画像のAPI呼び出しを中断し、完了した画像の結果を表示する。仕組みはcancel_processingを参照）
+                        cancel_token = CancellationToken()
+                        st.session_state[SESSION_CANCEL_TOKEN] = cancel_token
+                        st.session_state[SESSION_PARTIAL_RESULTS] = []
+                        st.button("処理を中止", key="cancel_processing_button", on_click=cancel_processing)
                     
                     # 初期化
                     processor = st.session_state[SESSION_PROCESSOR]
                     
                     # 非同期処理を実行
                     with st.spinner("画像を処理中..."):
-                        # 進捗コールバック関数
-                        def update_progress_callback(current, total, message=""):
-                            # セッションから最新の進捗情報を取得
-                            if SESSION_PROGRESS in st.session_state:
-                                progress_data = st.session_state[SESSION_PROGRESS]
-                                # 処理中の画像のインデックス
-                                img_index = progress_data.get("current", 0)
-                                # 総画像数
-                                total_images = progress_data.get("total", 1)
-                                
-                                # 各画像の進捗を5ステップに分割
-                                # 画像ごとの処理進捗を計算（0-1の範囲）
-                                image_progress = float(current) / float(total) if total > 0 else 0
-                                
-                                # 全体の進捗を計算（0-1の範囲）
-                                # 前の画像はすでに完了（各1.0）、現在の画像は部分的に完了（0.0-1.0）
-                                overall_progress = (img_index + image_progress) / total_images
+                        # 進捗イベント（画像1枚の処理が終わるたびに呼び出される）
+                        def update_progress_callback(event):
+                            # 全体の進捗を計算（0-1の範囲）
+                            completed_images = event.completed
+                            total_images = event.total if event.total > 0 else 1
+                            overall_progress = completed_images / total_images
+                            
+                            # プログレスバーの更新
+                            progress_bar.progress(overall_progress)
+                            
+                            # 進捗状況のテキスト表示
+                            percentage = int(overall_progress * 100)
+                            message = st.session_state.get(SESSION_PROGRESS, {}).get("stage_details", "")
+                            status_text.markdown(f"**処理中**: 画像 {completed_images}/{total_images} ({percentage}%)<br>**状態**: {message}", unsafe_allow_html=True)
+                            
+                            # 経過時間と推定残り時間の表示
+                            progress_data = st.session_state.get(SESSION_PROGRESS, {})
+                            if "start_time" in progress_data:
+                                elapsed = time.time() - progress_data["start_time"]
                                 
-                                # プログレスバーの更新
-                                progress_bar.progress(overall_progress)
+                                # 経過時間のフォーマット
+                                if elapsed < 60:
+                                    elapsed_str = f"{elapsed:.1f}秒"
+                                else:
+                                    minutes = int(elapsed // 60)
+                                    seconds = int(elapsed % 60)
+                                    elapsed_str = f"{minutes}分{seconds}秒"
                                 
-                                # 進捗状況のテキスト表示
-                                percentage = int(overall_progress * 100)
-                                status_text.markdown(f"**処理中**: 画像 {img_index+1}/{total_images} ({percentage}%)<br>**状態**: {message}", unsafe_allow_html=True)
+                                time_info = f"**経過時間**: {elapsed_str}<br>"
                                 
-                                # 経過時間と推定残り時間の表示
-                                if "start_time" in progress_data:
-                                    elapsed = time.time() - progress_data["start_time"]
+                                # 処理速度と残り時間の計算
+                                if completed_images > 0 and elapsed > 0:
+                                    # 1画像あたりの平均秒数
+                                    avg_seconds_per_image = elapsed / completed_images
+                                    # 残りの画像数
+                                    remaining_images = total_images - completed_images
+                                    # 残り時間の予測
+                                    remaining = avg_seconds_per_image * remaining_images
                                     
-                                    # 経過時間のフォーマット
-                                    if elapsed < 60:
-                                        elapsed_str = f"{elapsed:.1f}秒"
+                                    # 処理速度の表示
+                                    images_per_minute = 60 / avg_seconds_per_image
+                                    if images_per_minute < 1:
+                                        speed_str = f"{images_per_minute*60:.1f} 画像/時間"
                                     else:
-                                        minutes = int(elapsed // 60)
-                                        seconds = int(elapsed % 60)
-                                        elapsed_str = f"{minutes}分{seconds}秒"
+                                        speed_str = f"{images_per_minute:.1f} 画像/分"
                                     
-                                    time_info = f"**経過時間**: {elapsed_str}<br>"
+                                    time_info += f"**処理速度**: {speed_str}<br>"
                                     
-                                    # 処理速度と残り時間の計算（現在の画像も考慮）
-                                    # 完了した画像 + 現在の画像の進捗
-                                    completed_progress = img_index + image_progress
-                                    if completed_progress > 0:
-                                        # 1画像あたりの平均秒数
-                                        avg_seconds_per_image = elapsed / completed_progress
-                                        # 残りの画像数
-                                        remaining_images = total_images - completed_progress
-                                        # 残り時間の予測
-                                        remaining = avg_seconds_per_image * remaining_images
-                                        
-                                        # 処理速度の表示
-                                        images_per_minute = 60 / avg_seconds_per_image
-                                        if images_per_minute < 1:
-                                            speed_str = f"{images_per_minute*60:.1f} 画像/時間"
-                                        else:
-                                            speed_str = f"{images_per_minute:.1f} 画像/分"
-                                        
-                                        time_info += f"**処理速度**: {speed_str}<br>"
-                                        
-                                        # 残り時間の表示
-                                        if remaining < 60:
-                                            remaining_str = f"{remaining:.1f}秒"
-                                        else:
-                                            minutes = int(remaining // 60)
-                                            seconds = int(remaining % 60)
-                                            remaining_str = f"{minutes}分{seconds}秒"
-                                        
-                                        time_info += f"**推定残り時間**: {remaining_str}"
+                                    # 残り時間の表示
+                                    if remaining < 60:
+                                        remaining_str = f"{remaining:.1f}秒"
+                                    else:
+                                        minutes = int(remaining // 60)
+                                        seconds = int(remaining % 60)
+                                        remaining_str = f"{minutes}分{seconds}秒"
                                     
-                                    time_text.markdown(time_info, unsafe_allow_html=True)
+                                    time_info += f"**推定残り時間**: {remaining_str}"
+                                
+                                time_text.markdown(time_info, unsafe_allow_html=True)
                         
                         # スタイリストとクーポンのデータを取得
                         stylists = st.session_state.get(SESSION_STYLISTS, [])
@@ -1584,12 +1576,15 @@ def render_main_content():
                         # キャッシュ使用設定の取得
                         use_cache = st.session_state.get(SESSION_USE_CACHE, True)
                         
-                        # 処理の実行（スタイリストとクーポンのデータとキャッシュ設定を渡す）
-                        # 進捗コールバック関数をセット
-                        processor.set_progress_callback(lambda current, total, message: update_progress_callback(current, total, message))
+                        # 処理の実行（スタイリストとクーポンのデータとキャッシュ設定、進捗イベントの受け取り先を渡す）
                         # テンプレート候補数の設定（デフォルト: 3）
                         template_count = 3
-                        results = asyncio.run(process_images(processor, image_paths, stylists, coupons, use_cache, template_count))
+                        results = asyncio.run(process_images(
+                            processor, image_paths, stylists, coupons, use_cache, template_count,
+                            on_event=update_progress_callback, cancel_token=cancel_token
+                        ))
+                        st.session_state.pop(SESSION_CANCEL_TOKEN, None)
+                        st.session_state.pop(SESSION_PARTIAL_RESULTS, None)
                         
                         # 処理完了
                         progress_bar.progress(1.0)
@@ -1,4 +1,4 @@
 """ユーティリティパッケージ"""
 
-from .cache_decorators import cacheable, memoize
-from .async_context import AsyncResource, asynccontextmanager, progress_tracker, async_safe, Timer
+from .cache_decorators import cacheable, memoize, content_cache_key
+from .async_context import AsyncResource, asynccontextmanager, progress_tracker, async_safe, Timer, CancellationToken
@@ -11,7 +11,8 @@ import asyncio
 import inspect
 import logging
 import functools
-from typing import Any, AsyncGenerator, Callable, TypeVar, cast, Optional
+import threading
+from typing import Any, AsyncGenerator, Callable, List, TypeVar, cast, Optional
 
 # Python 3.7以上では標準ライブラリの asynccontextmanager を使用
 if sys.version_info >= (3, 7):
@@ -157,4 +158,102 @@ async def progress_tracker(total: int, callback: Callable[[int, int, str], None]
         if tracker.current < total:
             callback(total, total, "完了（エラーあり）")
         else:
-            callback(total, total, "完了") 
\ No newline at end of file
+            callback(total, total, "完了")
+
+
+class CancellationToken:
+    """
+    協調的なキャンセルのためのトークン
+
+    処理を中止したい側がcancel()を呼び出し、処理する側がcancelledの確認やwait()での待機により中止を検知します。
+    cancel()は他のスレッド（UIのイベント処理等）から呼び出すこともできます。
+
+    使用例:
+    ```python
+    token = CancellationToken()
+    results = await processor.process_images(image_paths, cancel_token=token)
+
+    # 別の処理から
+    token.cancel("ユーザーが中止しました")
+    ```
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._reason: Optional[str] = None
+        self._callbacks: List[Callable[[], None]] = []
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def cancelled(self) -> bool:
+        """キャンセルされているかどうか"""
+        return self._cancelled
+
+    @property
+    def reason(self) -> Optional[str]:
+        """キャンセルの理由（キャンセルされていない場合はNone）"""
+        return self._reason
+
+    def cancel(self, reason: str = "処理がキャンセルされました") -> None:
+        """
+        キャンセルを要求します。2回目以降の呼び出しは無視されます。
+
+        Args:
+            reason: キャンセルの理由
+        """
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            self._reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.warning(f"キャンセル時のコールバックでエラーが発生しました: {str(e)}")
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        キャンセル時に呼び出す関数を登録します。既にキャンセルされている場合は直ちに呼び出します。
+
+        Args:
+            callback: キャンセル時に呼び出す関数
+
+        Returns:
+            登録を解除する関数
+        """
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                registered = True
+            else:
+                registered = False
+        if not registered:
+            callback()
+
+        def remove() -> None:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+        return remove
+
+    async def wait(self) -> None:
+        """キャンセルされるまで待機します。"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+            except RuntimeError:
+                # イベントループが既に終了している場合
+                pass
+
+        remove = self.add_callback(wake)
+        try:
+            await future
+        finally:
+            remove()
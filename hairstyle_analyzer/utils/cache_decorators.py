@@ -5,9 +5,14 @@
 関数やメソッドのキャッシュを簡単に実装するためのユーティリティを提供します。
 """
 
+import json
+import hashlib
 import functools
 import logging
-from typing import Any, Callable, Optional, TypeVar, cast, Dict
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar, cast, Dict, Union
+
+from .image_utils import compute_image_hash
 
 # 型変数の定義
 T = TypeVar('T')
@@ -29,7 +34,8 @@ def cacheable(cache_key_fn: CacheKeyFunction):
         
     使用例:
     ```python
-    @cacheable(lambda self, image_path, *args, **kwargs: f"analysis:{image_path.name}")
+    @cacheable(lambda self, image_path, categories, *args, **kwargs:
+               content_cache_key("analysis", image_path, categories))
     async def analyze_image(self, image_path, ...):
         # 実際の処理
     ```
@@ -37,12 +43,14 @@ def cacheable(cache_key_fn: CacheKeyFunction):
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
         @functools.wraps(func)
         async def async_wrapper(self, *args, **kwargs) -> T:
+            # キャッシュ使用の指定（関数本体には渡さない）
+            use_cache = kwargs.pop('use_cache', None)
+            
             # キャッシュマネージャーの存在確認
             if not hasattr(self, 'cache_manager') or self.cache_manager is None:
                 return await func(self, *args, **kwargs)
                 
             # キャッシュ使用の判定
-            use_cache = kwargs.pop('use_cache', None)
             should_use_cache = getattr(self, 'use_cache', False) if use_cache is None else use_cache
             
             # キャッシュを使用しない場合は直接関数を実行
@@ -50,8 +58,13 @@ def cacheable(cache_key_fn: CacheKeyFunction):
                 return await func(self, *args, **kwargs)
             
             # キャッシュキーの生成
-            cache_key = cache_key_fn(self, *args, **kwargs)
             logger = logging.getLogger(__name__)
+            try:
+                cache_key = cache_key_fn(self, *args, **kwargs)
+            except Exception as e:
+                # キーを生成できない場合（画像が読めない等）はキャッシュを使わずに実行
+                logger.warning(f"キャッシュキーの生成に失敗したため、キャッシュを使用しません: {str(e)}")
+                return await func(self, *args, **kwargs)
             
             # キャッシュから結果を取得
             cached_result = self.cache_manager.get(cache_key)
@@ -71,12 +84,14 @@ def cacheable(cache_key_fn: CacheKeyFunction):
         
         @functools.wraps(func)
         def sync_wrapper(self, *args, **kwargs) -> T:
+            # キャッシュ使用の指定（関数本体には渡さない）
+            use_cache = kwargs.pop('use_cache', None)
+            
             # キャッシュマネージャーの存在確認
             if not hasattr(self, 'cache_manager') or self.cache_manager is None:
                 return func(self, *args, **kwargs)
                 
             # キャッシュ使用の判定
-            use_cache = kwargs.pop('use_cache', None)
             should_use_cache = getattr(self, 'use_cache', False) if use_cache is None else use_cache
             
             # キャッシュを使用しない場合は直接関数を実行
@@ -84,8 +99,13 @@ def cacheable(cache_key_fn: CacheKeyFunction):
                 return func(self, *args, **kwargs)
             
             # キャッシュキーの生成
-            cache_key = cache_key_fn(self, *args, **kwargs)
             logger = logging.getLogger(__name__)
+            try:
+                cache_key = cache_key_fn(self, *args, **kwargs)
+            except Exception as e:
+                # キーを生成できない場合（画像が読めない等）はキャッシュを使わずに実行
+                logger.warning(f"キャッシュキーの生成に失敗したため、キャッシュを使用しません: {str(e)}")
+                return func(self, *args, **kwargs)
             
             # キャッシュから結果を取得
             cached_result = self.cache_manager.get(cache_key)
@@ -159,4 +179,30 @@ def memoize(func: Callable[..., T]) -> Callable[..., T]:
         cache[key] = result
         return result
     
-    return wrapper 
\ No newline at end of file
+    return wrapper 
+
+
+def content_cache_key(namespace: str, image_path: Union[str, Path], *components: Any) -> str:
+    """
+    画像の内容ハッシュに基づくキャッシュキーを生成します。
+    
+    ファイル名ではなく画像のバイト列のハッシュを使用するため、同じ画像を別名で
+    アップロードしてもキャッシュが再利用され、異なる画像のキーが衝突することはありません。
+    モデル名・プロンプトバージョン・カテゴリリストなど、結果に影響する要素は
+    componentsとして渡すことでキーに反映されます。
+    
+    Args:
+        namespace: キーの名前空間（例: "style_analysis"）
+        image_path: 画像ファイルのパス
+        *components: キーに含める追加要素（JSONシリアライズ可能な値）
+        
+    Returns:
+        "{namespace}:{画像ハッシュ}:{コンテキストハッシュ}" 形式のキャッシュキー
+        
+    Raises:
+        ValueError: 画像ファイルの読み込みに失敗した場合
+    """
+    image_hash = compute_image_hash(image_path)
+    context = json.dumps(components, ensure_ascii=False, sort_keys=True, default=str)
+    context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()[:16]
+    return f"{namespace}:{image_hash}:{context_hash}"
@@ -221,6 +221,26 @@ class AnalysisError(ProcessingError):
         self.analysis_type = analysis_type
 
 
+class DeadlineExceededError(ProcessingError):
+    """処理の制限時間超過のエラー"""
+
+    def __init__(self, message: str, image_path: Optional[str] = None, timeout_seconds: Optional[float] = None, details: Optional[Dict[str, Any]] = None):
+        """
+        初期化
+
+        Args:
+            message: エラーメッセージ
+            image_path: 画像パス（オプション）
+            timeout_seconds: 制限時間（秒）（オプション）
+            details: 追加の詳細情報（オプション）
+        """
+        details = details or {}
+        if timeout_seconds is not None:
+            details['timeout_seconds'] = timeout_seconds
+        super().__init__(message, image_path, details)
+        self.timeout_seconds = timeout_seconds
+
+
 # 入力検証関連の例外
 class ValidationError(AppError):
     """入力検証関連のエラー"""
@@ -5,16 +5,19 @@
 画像のロード、エンコード、リサイズ、検証などの機能が含まれます。
 """
 
+import io
 import os
 import base64
+import hashlib
 import logging
+import functools
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Union, Any
 import imghdr
 
 # Pillowをインポート
 try:
-    from PIL import Image
+    from PIL import Image, ImageOps
 except ImportError:
     logging.warning("Pillowがインストールされていません。画像処理機能が制限されます。")
 
@@ -51,12 +54,13 @@ def is_valid_image(file_path: Union[str, Path]) -> bool:
         return False
 
 
-def encode_image(file_path: Union[str, Path]) -> str:
+def encode_image(file_path: Union[str, Path], validate: bool = True) -> str:
     """
     画像をBase64でエンコードする
     
     Args:
         file_path: 画像ファイルのパス
+        validate: エンコード前に画像を検証するかどうか（検証済みの場合はFalse）
         
     Returns:
         Base64エンコードされた画像データ
@@ -67,7 +71,7 @@ def encode_image(file_path: Union[str, Path]) -> str:
     file_path = Path(file_path)
     
     # 画像の検証
-    if not is_valid_image(file_path):
+    if validate and not is_valid_image(file_path):
         raise ValueError(f"無効な画像ファイル: {file_path}")
     
     try:
@@ -77,6 +81,41 @@ def encode_image(file_path: Union[str, Path]) -> str:
         raise ValueError(f"画像のエンコードに失敗: {e}")
 
 
+def compute_image_hash(file_path: Union[str, Path]) -> str:
+    """
+    画像ファイルの内容からSHA-256ハッシュを計算する
+    
+    ファイル名ではなく内容に基づくため、同じ画像を別名で保存しても同じ値になります。
+    パス・更新日時・サイズが同じファイルについては計算結果をメモ化します。
+    
+    Args:
+        file_path: 画像ファイルのパス
+        
+    Returns:
+        16進数表記のSHA-256ハッシュ
+        
+    Raises:
+        ValueError: ファイルの読み込みに失敗した場合
+    """
+    file_path = Path(file_path)
+    
+    try:
+        stat = file_path.stat()
+        return _compute_file_hash(str(file_path.resolve()), stat.st_mtime_ns, stat.st_size)
+    except OSError as e:
+        raise ValueError(f"画像ハッシュの計算に失敗: {e}")
+
+
+@functools.lru_cache(maxsize=1024)
+def _compute_file_hash(path: str, mtime_ns: int, size: int) -> str:
+    """ファイル内容のSHA-256ハッシュを計算する（compute_image_hashのメモ化用）"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
 def get_image_size(file_path: Union[str, Path]) -> Tuple[int, int]:
     """
     画像のサイズを取得する
@@ -119,29 +158,16 @@ def resize_image(file_path: Union[str, Path], max_size: int = 1024, output_path:
     
     try:
         with Image.open(file_path) as img:
-            # 現在のサイズを取得
-            width, height = img.size
-            
             # リサイズが必要かどうかを判定
-            if width <= max_size and height <= max_size:
+            if _scaled_size(img.size, max_size) is None:
                 # リサイズ不要の場合は、output_pathが入力と異なる場合のみコピー
                 if output_path != file_path:
                     import shutil
                     shutil.copy2(file_path, output_path)
                 return output_path
             
-            # アスペクト比を維持したままリサイズ
-            if width > height:
-                new_width = max_size
-                new_height = int(height * (max_size / width))
-            else:
-                new_height = max_size
-                new_width = int(width * (max_size / height))
-            
-            # リサイズ
-            resized_img = img.resize((new_width, new_height), Image.LANCZOS)
-            
-            # 保存
+            # リサイズして保存
+            resized_img = _downscale(img, max_size)
             resized_img.save(output_path, quality=90)
             
             return output_path
@@ -149,6 +175,66 @@ def resize_image(file_path: Union[str, Path], max_size: int = 1024, output_path:
         raise ValueError(f"画像のリサイズに失敗: {e}")
 
 
+# 再エンコード形式ごとのMIMEタイプ
+ENCODE_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+def resize_image_bytes(file_path: Union[str, Path], max_size: int = 1024,
+                       image_format: str = "JPEG", quality: int = 85) -> Tuple[bytes, str]:
+    """
+    画像をメモリ上でリサイズし、指定形式で再エンコードする
+    
+    resize_imageと同じ方法で縮小しますが、ファイルには書き込みません。
+    再エンコードではEXIFの向き情報が失われるため、向き情報に従って回転した画像を縮小します。
+    
+    Args:
+        file_path: 画像ファイルのパス
+        max_size: 最大サイズ（幅または高さの最大値）
+        image_format: 再エンコード形式（'JPEG'または'WEBP'）
+        quality: エンコード品質（1〜100）
+        
+    Returns:
+        (エンコード済みのバイト列, MIMEタイプ)のタプル
+        
+    Raises:
+        ValueError: 画像の変換に失敗した場合
+    """
+    image_format = image_format.upper()
+    if image_format not in ENCODE_MIME_TYPES:
+        raise ValueError(f"サポートされていない再エンコード形式: {image_format}")
+    
+    try:
+        with Image.open(file_path) as img:
+            resized_img = _downscale(ImageOps.exif_transpose(img), max_size)
+            # JPEGは透過に対応していないため、RGBに変換する
+            if image_format == "JPEG" and resized_img.mode != "RGB":
+                resized_img = resized_img.convert("RGB")
+            
+            buffer = io.BytesIO()
+            resized_img.save(buffer, format=image_format, quality=quality)
+            return buffer.getvalue(), ENCODE_MIME_TYPES[image_format]
+    except Exception as e:
+        raise ValueError(f"画像の再エンコードに失敗: {e}")
+
+
+def _scaled_size(size: Tuple[int, int], max_size: int) -> Optional[Tuple[int, int]]:
+    """アスペクト比を維持して長辺をmax_sizeに収めたサイズ（縮小不要の場合はNone）"""
+    width, height = size
+    if width <= max_size and height <= max_size:
+        return None
+    if width > height:
+        return max_size, max(1, int(height * (max_size / width)))
+    return max(1, int(width * (max_size / height))), max_size
+
+
+def _downscale(img: "Image.Image", max_size: int) -> "Image.Image":
+    """画像の長辺がmax_sizeを超える場合に縮小する（超えない場合はそのまま返す）"""
+    new_size = _scaled_size(img.size, max_size)
+    if new_size is None:
+        return img
+    return img.resize(new_size, Image.LANCZOS)
+
+
 def get_image_format(file_path: Union[str, Path]) -> str:
     """
     画像の形式を取得する
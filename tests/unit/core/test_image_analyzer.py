@@ -9,7 +9,8 @@ from unittest.mock import patch, MagicMock, AsyncMock
 
 from hairstyle_analyzer.core.image_analyzer import ImageAnalyzer
 from hairstyle_analyzer.services.gemini import GeminiService
-from hairstyle_analyzer.data.models import StyleAnalysis, AttributeAnalysis, StyleFeatures
+from hairstyle_analyzer.data.models import StyleAnalysis, AttributeAnalysis, StyleFeatures, BatchAnalysisConfig
+from hairstyle_analyzer.utils.cache_decorators import content_cache_key
 
 
 @pytest.fixture
@@ -119,7 +120,7 @@ async def test_analyze_full(image_analyzer):
 
 
 @pytest.mark.asyncio
-async def test_cache_hit(image_analyzer, mock_cache_manager):
+async def test_cache_hit(image_analyzer, mock_gemini_service, mock_cache_manager, tmp_path):
     """キャッシュヒットのテスト"""
     # キャッシュヒットのモック設定
     mock_style_analysis = StyleAnalysis(
@@ -133,16 +134,20 @@ async def test_cache_hit(image_analyzer, mock_cache_manager):
         keywords=["キャッシュキーワード"]
     )
     mock_cache_manager.get.return_value = mock_style_analysis
+    mock_gemini_service.config = MagicMock(model="gemini-2.0-flash")
+    mock_gemini_service.prompt_version = "v1"
     
-    # テスト用のパスとカテゴリ
-    test_path = Path("test/path/cache_image.jpg")
+    # テスト用の画像とカテゴリ
+    test_path = tmp_path / "cache_image.jpg"
+    test_path.write_bytes(b"image bytes")
     test_categories = ["カテゴリ1", "カテゴリ2"]
     
     # 画像分析を実行
-    result = await image_analyzer.analyze_image(test_path, test_categories)
+    result = await image_analyzer.analyze_image(test_path, test_categories, use_cache=True)
     
-    # キャッシュが確認されたことを確認
-    mock_cache_manager.get.assert_called_once_with(f"style_analysis:{test_path.name}")
+    # 内容ハッシュに基づくキーでキャッシュが確認されたことを確認
+    expected_key = content_cache_key("style_analysis", test_path, "gemini-2.0-flash", "v1", test_categories)
+    mock_cache_manager.get.assert_called_once_with(expected_key)
     
     # Gemini APIが呼ばれなかったことを確認
     image_analyzer.gemini_service.analyze_image.assert_not_awaited()
@@ -153,6 +158,58 @@ async def test_cache_hit(image_analyzer, mock_cache_manager):
     assert "キャッシュキーワード" in result.keywords
 
 
+@pytest.mark.asyncio
+async def test_prefetch_used_by_analyze_full(image_analyzer, mock_gemini_service):
+    """バッチ分析の結果が設定の画像数ごとに取得され、analyze_fullで使用されるかのテスト"""
+    mock_gemini_service.config = MagicMock()
+    mock_gemini_service.config.batch_analysis = BatchAnalysisConfig(batch_size=2)
+    
+    async def analyze_batch(image_paths, categories):
+        return [
+            (StyleAnalysis(category=path.stem, features=StyleFeatures(color="色", cut_technique="カット", styling="スタイリング", impression="印象"), keywords=[]),
+             AttributeAnalysis(sex="レディース", length="ショート"))
+            for path in image_paths
+        ]
+    
+    mock_gemini_service.analyze_images_batch = AsyncMock(side_effect=analyze_batch)
+    image_paths = [Path(f"test/path/image{i}.jpg") for i in range(3)]
+    
+    await image_analyzer.prefetch(image_paths, ["カテゴリ1"])
+    style_analysis, attribute_analysis = await image_analyzer.analyze_full(image_paths[2], ["カテゴリ1"])
+    
+    # 2枚と1枚のリクエストに分割され、個別の分析は行われないことを確認
+    assert [len(call.args[0]) for call in mock_gemini_service.analyze_images_batch.await_args_list] == [2, 1]
+    mock_gemini_service.analyze_image.assert_not_awaited()
+    assert style_analysis.category == "image2"
+    assert attribute_analysis.length == "ショート"
+    
+    # 使用されなかった結果は破棄できることを確認
+    image_analyzer.clear_prefetched()
+    await image_analyzer.analyze_full(image_paths[0], ["カテゴリ1"])
+    mock_gemini_service.analyze_image.assert_awaited_once()
+
+
+def test_content_cache_key(tmp_path):
+    """内容ハッシュに基づくキャッシュキーのテスト"""
+    original = tmp_path / "styleimg_1.png"
+    renamed = tmp_path / "another_name.png"
+    different = tmp_path / "styleimg_2.png"
+    original.write_bytes(b"same image")
+    renamed.write_bytes(b"same image")
+    different.write_bytes(b"different image")
+    
+    key = content_cache_key("style_analysis", original, "model", "v1", ["カテゴリ1"])
+    
+    # 同じ内容の画像は名前が違っても同じキー
+    assert content_cache_key("style_analysis", renamed, "model", "v1", ["カテゴリ1"]) == key
+    # 内容が違う画像は同じ名前でも別のキー
+    assert content_cache_key("style_analysis", different, "model", "v1", ["カテゴリ1"]) != key
+    # モデル・プロンプトバージョン・カテゴリが変わると別のキー
+    assert content_cache_key("style_analysis", original, "other-model", "v1", ["カテゴリ1"]) != key
+    assert content_cache_key("style_analysis", original, "model", "v2", ["カテゴリ1"]) != key
+    assert content_cache_key("style_analysis", original, "model", "v1", ["カテゴリ2"]) != key
+
+
 @pytest.mark.asyncio
 async def test_api_error(image_analyzer, mock_gemini_service):
     """API呼び出しエラーのテスト"""
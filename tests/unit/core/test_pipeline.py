@@ -0,0 +1,238 @@
+"""
+StagePipelineのユニットテスト
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from hairstyle_analyzer.core.pipeline import PipelineStage, StagePipeline, TaskGraph
+from hairstyle_analyzer.utils.async_context import CancellationToken
+
+
+class _Item:
+    def __init__(self, value):
+        self.value = value
+        self.trace = []
+        self.done = False
+
+
+async def _collect(pipeline, items):
+    return [(item, error) async for item, error in pipeline.run(items)]
+
+
+@pytest.mark.asyncio
+async def test_stage_concurrency_limit():
+    """各段階の同時実行数が設定値を超えないことのテスト"""
+    running = {"analyze": 0}
+    peak = {"analyze": 0}
+
+    async def analyze(item):
+        running["analyze"] += 1
+        peak["analyze"] = max(peak["analyze"], running["analyze"])
+        await asyncio.sleep(0.01)
+        running["analyze"] -= 1
+        item.trace.append("analyze")
+
+    async def build(item):
+        item.trace.append("build")
+
+    pipeline = StagePipeline([PipelineStage("analyze", analyze, 3), PipelineStage("build", build)], queue_size=2)
+    outcomes = await _collect(pipeline, [_Item(i) for i in range(10)])
+
+    assert len(outcomes) == 10
+    assert all(error is None and item.trace == ["analyze", "build"] for item, error in outcomes)
+    assert peak["analyze"] == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_and_skipped_items_bypass_later_stages():
+    """例外が発生した項目と完了済みの項目が、以降の段階を実行せずに出力されることのテスト"""
+    async def first(item):
+        if item.value == 1:
+            raise ValueError("失敗")
+        if item.value == 2:
+            item.done = True
+        item.trace.append("first")
+
+    async def second(item):
+        item.trace.append("second")
+
+    pipeline = StagePipeline(
+        [PipelineStage("first", first, 2), PipelineStage("second", second, 2)],
+        skip=lambda item: item.done
+    )
+    outcomes = {item.value: (item, error) for item, error in await _collect(pipeline, [_Item(i) for i in range(3)])}
+
+    assert isinstance(outcomes[1][1], ValueError)
+    assert outcomes[1][0].trace == []
+    assert outcomes[2][0].trace == ["first"]
+    assert outcomes[0][0].trace == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_batch_stage_groups_available_items():
+    """バッチ段階が届いている項目をまとめて一括処理することのテスト"""
+    batches = []
+
+    async def before_batch(items):
+        batches.append([item.value for item in items])
+
+    async def handler(item):
+        item.trace.append("batch")
+
+    pipeline = StagePipeline(
+        [PipelineStage("batch", handler, 1, batch_size=3, before_batch=before_batch)],
+        queue_size=8
+    )
+    outcomes = await _collect(pipeline, [_Item(i) for i in range(7)])
+
+    assert len(outcomes) == 7
+    assert all(len(batch) <= 3 for batch in batches)
+    assert sorted(value for batch in batches for value in batch) == list(range(7))
+    assert len(batches) < 7
+
+
+@pytest.mark.asyncio
+async def test_batch_stage_waits_to_fill_batches():
+    """項目が1件ずつ届く場合も、batch_waitの間は後続の項目を待ってバッチを満たすことのテスト"""
+    batches = []
+
+    async def upstream(item):
+        await asyncio.sleep(0.01)
+
+    async def before_batch(items):
+        batches.append(len(items))
+
+    async def handler(item):
+        pass
+
+    pipeline = StagePipeline(
+        [
+            PipelineStage("upstream", upstream, 1),
+            PipelineStage("batch", handler, 4, batch_size=4, before_batch=before_batch, batch_wait=0.5)
+        ],
+        queue_size=8
+    )
+    outcomes = await _collect(pipeline, [_Item(i) for i in range(8)])
+
+    assert len(outcomes) == 8
+    assert batches == [4, 4]
+
+
+@pytest.mark.asyncio
+async def test_stop_consuming_cancels_pipeline():
+    """出力の受け取りをやめると処理中の項目がキャンセルされることのテスト"""
+    cancelled = []
+
+    async def slow(item):
+        try:
+            if item.value > 0:
+                await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(item.value)
+            raise
+
+    pipeline = StagePipeline([PipelineStage("slow", slow, 4)])
+    outcomes = pipeline.run([_Item(i) for i in range(4)])
+    async for item, error in outcomes:
+        break
+    await outcomes.aclose()
+
+    assert sorted(cancelled) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_cancel_token_stops_pipeline():
+    """別のスレッドからキャンセルトークンをキャンセルすると、処理中の項目がキャンセルされ出力が終わることのテスト"""
+    cancelled = []
+    token = CancellationToken()
+
+    async def slow(item):
+        try:
+            if item.value > 0:
+                await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(item.value)
+            raise
+
+    pipeline = StagePipeline([PipelineStage("slow", slow, 4)])
+    outcomes = []
+    async for item, error in pipeline.run([_Item(i) for i in range(4)], cancel_token=token):
+        outcomes.append(item.value)
+        threading.Thread(target=token.cancel, args=("テスト中止",)).start()
+
+    assert outcomes == [0]
+    assert sorted(cancelled) == [1, 2, 3]
+    assert token.cancelled and token.reason == "テスト中止"
+
+
+def test_cancel_token_callbacks():
+    """キャンセル時にコールバックが1度だけ呼ばれ、登録の解除とキャンセル後の登録が機能することのテスト"""
+    token = CancellationToken()
+    calls = []
+    token.add_callback(lambda: calls.append("a"))
+    remove = token.add_callback(lambda: calls.append("b"))
+    remove()
+
+    token.cancel()
+    token.cancel("2回目")
+    token.add_callback(lambda: calls.append("c"))
+
+    assert calls == ["a", "c"]
+    assert token.reason == "処理がキャンセルされました"
+
+
+@pytest.mark.asyncio
+async def test_task_graph_runs_independent_tasks_concurrently():
+    """依存関係のない処理が並行して開始され、依存する処理は完了後に開始されることのテスト"""
+    started = []
+    release = asyncio.Event()
+
+    async def analyze():
+        started.append("analyze")
+        return "分析結果"
+
+    async def branch(name):
+        started.append(name)
+        # 3つの処理が全て開始されるまで完了しない
+        if len(started) == 4:
+            release.set()
+        await asyncio.wait_for(release.wait(), timeout=5)
+        return name
+
+    graph = TaskGraph()
+    graph.add("analyze", analyze)
+    for name in ("match", "stylist", "coupon"):
+        graph.add(name, lambda name=name: branch(name), depends_on=["analyze"])
+    results = await graph.run()
+
+    assert started[0] == "analyze"
+    assert sorted(started[1:]) == ["coupon", "match", "stylist"]
+    assert results["analyze"] == "分析結果"
+    assert results["coupon"] == "coupon"
+
+
+@pytest.mark.asyncio
+async def test_task_graph_failure_cancels_siblings():
+    """処理の失敗時に、実行中の他の処理がキャンセルされ例外が送出されることのテスト"""
+    cancelled = []
+
+    async def fail():
+        raise ValueError("失敗")
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    graph = TaskGraph().add("slow", slow).add("fail", fail)
+    with pytest.raises(ValueError):
+        await graph.run()
+    assert cancelled == ["slow"]
+
+    with pytest.raises(ValueError):
+        TaskGraph().add("match", fail, depends_on=["analyze"])
@@ -15,9 +15,11 @@ from hairstyle_analyzer.core.style_matching import StyleMatchingService
 from hairstyle_analyzer.core.excel_exporter import ExcelExporter
 from hairstyle_analyzer.data.models import (
     StyleAnalysis, AttributeAnalysis, StyleFeatures, 
-    Template, StylistInfo, CouponInfo, ProcessResult
+    Template, StylistInfo, CouponInfo, ProcessResult,
+    TemplateCandidate, CombinedAnalysis
 )
-from hairstyle_analyzer.utils.errors import ProcessingError, ImageError, GeminiAPIError
+from hairstyle_analyzer.utils.errors import ProcessingError, ImageError, GeminiAPIError, TemplateError, DeadlineExceededError
+from hairstyle_analyzer.utils.async_context import CancellationToken
 from hairstyle_analyzer.data.interfaces import TextExporterProtocol
 
 
@@ -56,8 +58,13 @@ def mock_image_analyzer():
     mock_config.template_matching.fallback_on_failure = True
     mock_config.template_matching.use_category_filter = True
     mock_config.template_matching.max_templates = 50
+    mock_config.template_matching.timeout_seconds = 30
+    mock_config.fused_analysis = False
+    mock_config.batch_analysis.enabled = False
+    mock_config.batch_analysis.max_wait_seconds = 0.0
     
     mock_gemini_service.config = mock_config
+    mock_gemini_service.prepare_image = AsyncMock()
     
     return mock_analyzer
 
@@ -78,12 +85,15 @@ def mock_template_matcher():
     
     mock_matcher.find_best_template = MagicMock(return_value=template)
     
-    # find_best_template_with_ai のモック
-    mock_matcher.find_best_template_with_ai = AsyncMock(return_value=(template, "AIによる選択理由", True))
+    # rank_templates_with_ai のモック
+    mock_matcher.rank_templates_with_ai = AsyncMock(return_value=[
+        TemplateCandidate(template=template, reason="AIによる選択理由", score=0.9, is_selected=True)
+    ])
     
     # template_manager のモック
     mock_matcher.template_manager = MagicMock()
     mock_matcher.template_manager.get_all_categories = MagicMock(return_value=["テストカテゴリ1", "テストカテゴリ2"])
+    mock_matcher.template_manager.get_catalog_hash = MagicMock(return_value="catalog-v1")
     
     return mock_matcher
 
@@ -165,8 +175,13 @@ def mock_gemini_service():
     mock_config.template_matching.fallback_on_failure = True
     mock_config.template_matching.use_category_filter = True
     mock_config.template_matching.max_templates = 50
+    mock_config.template_matching.timeout_seconds = 30
+    mock_config.fused_analysis = False
+    mock_config.batch_analysis.enabled = False
+    mock_config.batch_analysis.max_wait_seconds = 0.0
     
     mock_service.config = mock_config
+    mock_service.prepare_image = AsyncMock()
     
     return mock_service
 
@@ -361,6 +376,50 @@ async def test_process_single_image_cache_hit(processor, mock_image_analyzer, mo
         processor.process_single_image = original_method
 
 
+@pytest.mark.asyncio
+async def test_process_single_image_selects_concurrently(processor, mock_template_matcher, mock_style_matcher):
+    """テンプレートマッチングとスタイリスト・クーポン選択が並行して実行されることのテスト"""
+    stylists = [StylistInfo(name="テストスタイリスト", description="説明", specialties="得意技術")]
+    coupons = [CouponInfo(name="テストクーポン", price=1000, description="説明")]
+    selections_started = asyncio.Event()
+    candidates = mock_template_matcher.rank_templates_with_ai.return_value
+    stylist_result = mock_style_matcher.select_stylist.return_value
+    coupon_result = mock_style_matcher.select_coupon.return_value
+    started = []
+    
+    def mark(name):
+        started.append(name)
+        if len(started) == 3:
+            selections_started.set()
+    
+    async def rank_templates(image_path, **kwargs):
+        mark("match")
+        # スタイリスト・クーポン選択が開始されるまでテンプレートマッチングは完了しない
+        await asyncio.wait_for(selections_started.wait(), timeout=5)
+        return candidates
+    
+    async def select_stylist(*args):
+        mark("stylist")
+        await asyncio.wait_for(selections_started.wait(), timeout=5)
+        return stylist_result
+    
+    async def select_coupon(*args):
+        mark("coupon")
+        await asyncio.wait_for(selections_started.wait(), timeout=5)
+        return coupon_result
+    
+    mock_template_matcher.rank_templates_with_ai = AsyncMock(side_effect=rank_templates)
+    mock_style_matcher.select_stylist = AsyncMock(side_effect=select_stylist)
+    mock_style_matcher.select_coupon = AsyncMock(side_effect=select_coupon)
+    
+    result = await processor.process_single_image(Path("test/path/image.jpg"), stylists, coupons, use_cache=False)
+    
+    assert sorted(started) == ["coupon", "match", "stylist"]
+    assert result.selected_template.title == "テストタイトル"
+    assert result.selected_stylist.name == "テストスタイリスト"
+    assert result.selected_coupon.name == "テストクーポン"
+
+
 @pytest.mark.asyncio
 async def test_process_single_image_error(processor, mock_image_analyzer):
     """エラー発生時のprocess_single_imageメソッドのテスト"""
@@ -385,52 +444,45 @@ async def test_process_images(processor, mock_image_analyzer):
         Path("test/path/image3.jpg")
     ]
     
-    # モックの戻り値を設定
-    mock_result = ProcessResult(
-        image_name="test.jpg",
-        style_analysis=StyleAnalysis(
-            category="テストカテゴリ",
-            features=StyleFeatures(
-                color="テスト色",
-                cut_technique="テストカット",
-                styling="テストスタイリング",
-                impression="テスト印象"
-            ),
-            keywords=["テストキーワード"]
-        ),
-        attribute_analysis=AttributeAnalysis(
-            sex="レディース",
-            length="ミディアム"
-        ),
-        selected_template=Template(
-            category="テストカテゴリ",
-            title="テストタイトル",
-            menu="テストメニュー",
-            comment="テストコメント",
-            hashtag="テストタグ"
-        ),
-        selected_stylist=StylistInfo(
-            name="テストスタイリスト",
-            description="テスト説明",
-            specialties="テスト得意技術"
-        ),
-        selected_coupon=CouponInfo(
-            name="テストクーポン",
-            price=1000,
-            description="テスト説明"
-        ),
-        processed_at=datetime.now()
-    )
+    # 画像処理を実行
+    results = await processor.process_images(test_paths)
     
-    # process_single_imageの戻り値を設定
-    processor.process_single_image = AsyncMock(return_value=mock_result)
+    # 各画像が全段階を通過し、入力の順に結果が並ぶことを確認
+    assert [result.image_name for result in results] == ["image1.jpg", "image2.jpg", "image3.jpg"]
+    assert mock_image_analyzer.analyze_full.call_count == 3
+    assert processor.template_matcher.rank_templates_with_ai.call_count == 3
+    assert results[0].selected_template.title == "テストタイトル"
+
+
+@pytest.mark.asyncio
+async def test_process_images_slow_image_does_not_block(processor, mock_image_analyzer, mock_template_matcher):
+    """処理の遅い画像があっても、他の画像が次の段階へ進むことのテスト"""
+    test_paths = [Path(f"test/path/image{i}.jpg") for i in range(5)]
+    analyses = mock_image_analyzer.analyze_full.return_value
+    others_matched = asyncio.Event()
+    rank = mock_template_matcher.rank_templates_with_ai
+    matched = []
+    candidates = rank.return_value
+    
+    async def analyze_full(image_path, categories, use_cache=None):
+        # 1枚目の分析は、他の全画像のテンプレートマッチングが終わるまで完了しない
+        if image_path == test_paths[0]:
+            await asyncio.wait_for(others_matched.wait(), timeout=5)
+        return analyses
+    
+    async def rank_templates(image_path, **kwargs):
+        matched.append(image_path)
+        if len(matched) == len(test_paths) - 1:
+            others_matched.set()
+        return candidates
+    
+    mock_image_analyzer.analyze_full = AsyncMock(side_effect=analyze_full)
+    mock_template_matcher.rank_templates_with_ai = AsyncMock(side_effect=rank_templates)
     
-    # 画像処理を実行
     results = await processor.process_images(test_paths)
     
-    # 結果が正しいことを確認
-    assert len(results) == 3
-    assert processor.process_single_image.call_count == 3
+    assert matched[-1] == test_paths[0]
+    assert [result.image_name for result in results] == [path.name for path in test_paths]
 
 
 @pytest.mark.asyncio
@@ -455,61 +507,18 @@ async def test_process_images_with_external_data(
         CouponInfo(name="テストクーポン2", price=2000, description="テスト説明2")
     ]
     
-    # モックの結果を設定
-    mock_result = ProcessResult(
-        image_name="test1.jpg",
-        style_analysis=StyleAnalysis(
-            category="テストカテゴリ",
-            features=StyleFeatures(
-                color="テスト色",
-                cut_technique="テストカット",
-                styling="テストスタイリング",
-                impression="テスト印象"
-            ),
-            keywords=["テストキーワード"]
-        ),
-        attribute_analysis=AttributeAnalysis(
-            sex="レディース",
-            length="ミディアム"
-        ),
-        selected_template=Template(
-            category="テストカテゴリ",
-            title="テストタイトル",
-            menu="テストメニュー",
-            comment="テストコメント",
-            hashtag="テストタグ"
-        ),
-        selected_stylist=stylists[0],
-        selected_coupon=coupons[0],
-        processed_at=datetime.now()
-    )
-    
-    # 元のメソッドを保存
-    original_method = processor.process_images_with_external_data
+    results = await processor.process_images_with_external_data(test_paths, stylists, coupons)
     
-    # モックメソッドを作成
-    async def mock_process_ext(self, paths, styls, coups, use_cache=None):
-        # 結果リストにモック結果を追加
-        results = [mock_result] * len(paths)
-        self.results = results
-        return results
+    # 外部データの経路でもAIによるテンプレート順位付けとスタイリスト・クーポン選択が行われることを確認
+    assert [result.image_name for result in results] == ["image1.jpg", "image2.jpg"]
+    assert processor.template_matcher.rank_templates_with_ai.call_count == 2
+    mock_style_matcher.select_stylist.assert_any_await(test_paths[0], stylists, mock_image_analyzer.analyze_full.return_value[0])
+    assert mock_style_matcher.select_coupon.await_count == 2
+    assert results[0].selected_stylist.name == "テストスタイリスト"
+    assert results[0].selected_coupon.name == "テストクーポン"
     
-    try:
-        # モックメソッドを設定
-        processor.process_images_with_external_data = mock_process_ext.__get__(processor, type(processor))
-        
-        # 処理実行
-        results = await processor.process_images_with_external_data(
-            test_paths, stylists, coupons
-        )
-        
-        # 結果が正しいことを確認
-        assert len(results) == 2
-        assert results[0].image_name == "test1.jpg"
-        assert results[1].image_name == "test1.jpg"
-    finally:
-        # 元のメソッドを復元
-        processor.process_images_with_external_data = original_method
+    # 外部データがない場合は処理しない
+    assert await processor.process_images_with_external_data(test_paths, [], coupons) == []
 
 
 def test_export_to_excel(processor, mock_excel_exporter):
@@ -677,7 +686,9 @@ async def test_process_single_image_with_ai(processor_with_gemini, mock_template
         hashtag="テストタグ"
     )
     
-    mock_template_matcher.find_best_template_with_ai = AsyncMock(return_value=(mock_template, "AIテスト理由", True))
+    mock_template_matcher.rank_templates_with_ai = AsyncMock(return_value=[
+        TemplateCandidate(template=mock_template, reason="AIテスト理由", score=0.9, is_selected=True)
+    ])
     
     # 結果用のオブジェクト
     mock_result = ProcessResult(
@@ -717,7 +728,7 @@ async def test_process_single_image_with_ai(processor_with_gemini, mock_template
     result = await processor_with_gemini.process_single_image(image_path)
     
     # AIベースのテンプレートマッチングが呼ばれたことを確認
-    mock_template_matcher.find_best_template_with_ai.assert_called_once()
+    mock_template_matcher.rank_templates_with_ai.assert_called_once()
     
     # 従来のテンプレートマッチングが呼ばれていないことを確認
     mock_template_matcher.find_best_template.assert_not_called()
@@ -734,7 +745,7 @@ async def test_process_single_image_ai_fallback(processor_with_gemini, mock_temp
     image_path = Path("test.jpg")
     
     # AIベースのテンプレートマッチングが失敗するようにモック
-    mock_template_matcher.find_best_template_with_ai = AsyncMock(return_value=(None, "AIエラー", False))
+    mock_template_matcher.rank_templates_with_ai = AsyncMock(side_effect=TemplateError("AIエラー"))
     
     # 従来のテンプレートマッチングの結果を設定
     mock_template = Template(
@@ -784,7 +795,7 @@ async def test_process_single_image_ai_fallback(processor_with_gemini, mock_temp
     result = await processor_with_gemini.process_single_image(image_path)
     
     # AIベースのテンプレートマッチングが呼ばれたことを確認
-    mock_template_matcher.find_best_template_with_ai.assert_called_once()
+    mock_template_matcher.rank_templates_with_ai.assert_called_once()
     
     # 従来のテンプレートマッチングが呼ばれたことを確認
     mock_template_matcher.find_best_template.assert_called_once()
@@ -792,3 +803,395 @@ async def test_process_single_image_ai_fallback(processor_with_gemini, mock_temp
     # 結果が正しいことを確認
     assert result is not None
     assert result.image_name == "test.jpg"
+
+
+@pytest.mark.asyncio
+async def test_process_single_image_fused(processor_with_gemini, mock_gemini_service, mock_template_matcher, mock_image_analyzer):
+    """統合分析モードで1回の呼び出しで処理されることのテスト"""
+    image_path = Path("test.jpg")
+    mock_gemini_service.config.fused_analysis = True
+    
+    template = Template(
+        category="テストカテゴリ1",
+        title="統合タイトル",
+        menu="テストメニュー",
+        comment="テストコメント",
+        hashtag="テストタグ"
+    )
+    stylist = StylistInfo(name="テストスタイリスト", specialties="テスト得意技術", description="テスト説明")
+    coupon = CouponInfo(name="テストクーポン", price=1000, description="テスト説明")
+    mock_template_matcher.template_manager.get_all_templates = MagicMock(return_value=[template])
+    mock_gemini_service.analyze_combined = AsyncMock(return_value=CombinedAnalysis(
+        style_analysis=StyleAnalysis(
+            category="テストカテゴリ1",
+            features=StyleFeatures(color="色", cut_technique="カット", styling="スタイリング", impression="印象"),
+            keywords=["キーワード"]
+        ),
+        attribute_analysis=AttributeAnalysis(sex="レディース", length="ミディアム"),
+        template_candidates=[TemplateCandidate(template=template, reason="統合理由", score=0.9, is_selected=True)],
+        selected_stylist=stylist,
+        stylist_reason="スタイリスト理由",
+        selected_coupon=coupon,
+        coupon_reason="クーポン理由"
+    ))
+    
+    result = await processor_with_gemini.process_single_image(image_path, [stylist], [coupon])
+    
+    # 統合分析のみが呼ばれ、個別呼び出しは行われないことを確認
+    mock_gemini_service.analyze_combined.assert_called_once()
+    mock_image_analyzer.analyze_full.assert_not_called()
+    mock_template_matcher.rank_templates_with_ai.assert_not_called()
+    
+    assert result is not None
+    assert result.selected_template.title == "統合タイトル"
+    assert result.template_reason == "統合理由"
+    assert result.selected_stylist.name == "テストスタイリスト"
+    assert result.selected_coupon.name == "テストクーポン"
+    assert len(result.template_candidates) == 1
+
+
+@pytest.mark.asyncio
+async def test_process_single_image_fused_fallback(processor_with_gemini, mock_gemini_service, mock_template_matcher, mock_image_analyzer):
+    """統合分析の検証失敗時に個別呼び出しへフォールバックすることのテスト"""
+    image_path = Path("test.jpg")
+    mock_gemini_service.config.fused_analysis = True
+    mock_template_matcher.template_manager.get_all_templates = MagicMock(return_value=[])
+    mock_gemini_service.analyze_combined = AsyncMock(
+        side_effect=GeminiAPIError("検証エラー", error_type="FUSED_VALIDATION_ERROR")
+    )
+    processor_with_gemini._create_process_result = MagicMock(return_value=MagicMock(image_name="test.jpg"))
+    
+    result = await processor_with_gemini.process_single_image(image_path)
+    
+    mock_gemini_service.analyze_combined.assert_called_once()
+    mock_image_analyzer.analyze_full.assert_called_once()
+    mock_template_matcher.rank_templates_with_ai.assert_called_once()
+    assert result is not None
+
+
+@pytest.mark.asyncio
+async def test_process_single_image_cache_hit_renamed(processor, mock_image_analyzer, mock_cache_manager, tmp_path):
+    """別名で再アップロードされた同一画像がキャッシュから返されることのテスト"""
+    mock_image_analyzer.get_cache_context = MagicMock(return_value=["gemini-2.0-flash", "v1"])
+    cached_result = ProcessResult(
+        image_name="styleimg_1.png",
+        image_path="/old/styleimg_1.png",
+        style_analysis=StyleAnalysis(
+            category="キャッシュカテゴリ",
+            features=StyleFeatures(color="色", cut_technique="カット", styling="スタイリング", impression="印象"),
+            keywords=[]
+        ),
+        attribute_analysis=AttributeAnalysis(sex="レディース", length="ミディアム"),
+        selected_template=Template(category="キャッシュカテゴリ", title="タイトル", menu="メニュー", comment="コメント", hashtag="タグ")
+    )
+    mock_cache_manager.get.return_value = cached_result
+    
+    test_path = tmp_path / "styleimg_7.png"
+    test_path.write_bytes(b"same image")
+    
+    result = await processor.process_single_image(test_path, use_cache=True)
+    
+    # 分析は実行されず、ファイル名は現在の画像に差し替えられる
+    mock_image_analyzer.analyze_full.assert_not_called()
+    cache_key = mock_cache_manager.get.call_args[0][0]
+    assert cache_key.startswith("process_result:")
+    assert "styleimg" not in cache_key
+    assert result.image_name == "styleimg_7.png"
+    assert result.image_path == str(test_path)
+    assert result.style_analysis.category == "キャッシュカテゴリ"
+
+
+@pytest.mark.asyncio
+async def test_process_images_offline(processor_with_gemini, mock_gemini_service, mock_template_matcher, tmp_path):
+    """バッチジョブの結果が処理結果に変換され、取得できなかった画像は通常の呼び出しで処理されることのテスト"""
+    image_paths = [Path("ok.jpg"), Path("failed.jpg")]
+    mock_gemini_service.config.batch_job.fallback_online = True
+    template = Template(category="テストカテゴリ1", title="バッチタイトル", menu="テストメニュー", comment="テストコメント", hashtag="テストタグ")
+    combined = CombinedAnalysis(
+        style_analysis=StyleAnalysis(
+            category="テストカテゴリ1",
+            features=StyleFeatures(color="色", cut_technique="カット", styling="スタイリング", impression="印象"),
+            keywords=["キーワード"]
+        ),
+        attribute_analysis=AttributeAnalysis(sex="レディース", length="ミディアム"),
+        template_candidates=[TemplateCandidate(template=template, reason="バッチ理由", score=0.9, is_selected=True)]
+    )
+    
+    async def run(*args, **kwargs):
+        yield image_paths[0], combined
+        yield image_paths[1], GeminiAPIError("結果なし", error_type="BATCH_JOB_ERROR")
+    
+    fallback_result = MagicMock(image_name="failed.jpg")
+    processor_with_gemini.process_single_image = AsyncMock(return_value=fallback_result)
+    
+    with patch("hairstyle_analyzer.core.processor.BatchJobRunner") as runner_class:
+        runner_class.return_value.run = run
+        results = await processor_with_gemini.process_images_offline(image_paths, tmp_path, backend=MagicMock())
+    
+    assert results[0].selected_template.title == "バッチタイトル"
+    assert results[0].template_reason == "バッチ理由"
+    assert results[1] is fallback_result
+    processor_with_gemini.process_single_image.assert_awaited_once_with(image_paths[1], None, None, 3)
+    assert processor_with_gemini.get_results() == results
+
+
+@pytest.mark.asyncio
+async def test_process_images_offline_keeps_input_order(processor_with_gemini, mock_gemini_service, tmp_path):
+    """結果ファイルの順序や通常の呼び出しでの処理にかかわらず、処理結果が入力順になることのテスト"""
+    image_paths = [Path("failed.jpg"), Path("first.jpg"), Path("second.jpg")]
+    mock_gemini_service.config.batch_job.fallback_online = True
+    
+    def combined(title):
+        template = Template(category="テストカテゴリ1", title=title, menu="テストメニュー", comment="テストコメント", hashtag="テストタグ")
+        return CombinedAnalysis(
+            style_analysis=StyleAnalysis(
+                category="テストカテゴリ1",
+                features=StyleFeatures(color="色", cut_technique="カット", styling="スタイリング", impression="印象"),
+                keywords=[]
+            ),
+            attribute_analysis=AttributeAnalysis(sex="レディース", length="ミディアム"),
+            template_candidates=[TemplateCandidate(template=template, reason="理由", score=0.9, is_selected=True)]
+        )
+    
+    async def run(*args, **kwargs):
+        yield image_paths[2], combined("second")
+        yield image_paths[0], GeminiAPIError("結果なし", error_type="BATCH_JOB_ERROR")
+        yield image_paths[1], combined("first")
+    
+    fallback_result = MagicMock(image_name="failed.jpg")
+    processor_with_gemini.process_single_image = AsyncMock(return_value=fallback_result)
+    
+    with patch("hairstyle_analyzer.core.processor.BatchJobRunner") as runner_class:
+        runner_class.return_value.run = run
+        results = await processor_with_gemini.process_images_offline(image_paths, tmp_path, backend=MagicMock())
+    
+    assert results[0] is fallback_result
+    assert [result.selected_template.title for result in results[1:]] == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_process_images_offline_releases_images_on_error(processor_with_gemini, mock_gemini_service, tmp_path):
+    """ジョブが失敗した場合も、準備済みの画像データが破棄されることのテスト"""
+    async def run(*args, **kwargs):
+        raise GeminiAPIError("ジョブの待機時間を超過しました", error_type="BATCH_JOB_TIMEOUT")
+        yield
+    
+    with patch("hairstyle_analyzer.core.processor.BatchJobRunner") as runner_class:
+        runner_class.return_value.run = run
+        with pytest.raises(GeminiAPIError):
+            await processor_with_gemini.process_images_offline([Path("image.jpg")], tmp_path, backend=MagicMock())
+    
+    mock_gemini_service.release_prepared_images.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_process_images_resume_with_run_id(processor, tmp_path):
+    """実行ジャーナルに記録済みの画像が、同じ実行IDでの再実行時に処理されないことのテスト"""
+    image_paths = [Path(f"image{i}.jpg") for i in range(3)]
+    processor.journal_dir = tmp_path
+    processor._process_result_cache_key = lambda image_path, *args, **kwargs: f"process_result:{image_path.name}"
+    
+    analyses = processor.image_analyzer.analyze_full.return_value
+    
+    async def analyze_full(image_path, categories, use_cache=None):
+        if image_path.name == "image2.jpg":
+            raise GeminiAPIError("中断")
+        return analyses
+    
+    processor.image_analyzer.analyze_full = AsyncMock(side_effect=analyze_full)
+    first = await processor.process_images(image_paths)
+    run_id = processor.run_id
+    assert [result.image_name for result in first] == ["image0.jpg", "image1.jpg"]
+    
+    processor.image_analyzer.analyze_full = AsyncMock(return_value=analyses)
+    resumed = await processor.process_images(image_paths, run_id=run_id)
+    
+    # 記録済みの2枚はAPIを呼び出さず、未完了の1枚のみ処理されることを確認
+    processor.image_analyzer.analyze_full.assert_awaited_once()
+    assert processor.image_analyzer.analyze_full.await_args.args[0] == image_paths[2]
+    assert [result.image_name for result in resumed] == ["image0.jpg", "image1.jpg", "image2.jpg"]
+    assert processor.run_id == run_id
+
+
+@pytest.mark.asyncio
+async def test_iter_process_yields_in_completion_order(processor, mock_image_analyzer):
+    """iter_processが完了した順に結果を返し、失敗を含む進捗イベントを通知することのテスト"""
+    image_paths = [Path(f"image{i}.jpg") for i in range(3)]
+    analyses = mock_image_analyzer.analyze_full.return_value
+    others_done = asyncio.Event()
+    events = []
+    
+    async def analyze_full(image_path, categories, use_cache=None):
+        if image_path.name == "image0.jpg":
+            await asyncio.wait_for(others_done.wait(), timeout=5)
+        if image_path.name == "image1.jpg":
+            raise GeminiAPIError("分析エラー")
+        return analyses
+    
+    def on_event(event):
+        events.append(event)
+        if event.completed == 2:
+            others_done.set()
+    
+    mock_image_analyzer.analyze_full = AsyncMock(side_effect=analyze_full)
+    
+    results = [result async for result in processor.iter_process(image_paths, on_event=on_event)]
+    
+    assert [result.image_name for result in results] == ["image2.jpg", "image0.jpg"]
+    assert [(event.image_name, event.status, event.completed) for event in events] == [
+        ("image1.jpg", "failed", 1), ("image2.jpg", "processed", 2), ("image0.jpg", "processed", 3)
+    ]
+    assert "分析エラー" in events[0].error
+    assert processor.get_results() == results
+
+
+@pytest.mark.asyncio
+async def test_iter_process_back_pressure_and_cancel(processor, mock_image_analyzer):
+    """結果を受け取らない間は処理が進まず、途中で閉じると残りの画像が処理されないことのテスト"""
+    image_paths = [Path(f"image{i}.jpg") for i in range(40)]
+    
+    stream = processor.iter_process(image_paths)
+    first = await stream.__anext__()
+    await asyncio.sleep(0.05)
+    started = mock_image_analyzer.analyze_full.call_count
+    
+    # 段階間のキューが埋まった時点で、新しい画像の分析は止まる
+    assert first.image_name in {path.name for path in image_paths}
+    assert started < len(image_paths)
+    
+    await stream.aclose()
+    await asyncio.sleep(0.05)
+    assert mock_image_analyzer.analyze_full.call_count == started
+    processor.image_analyzer.gemini_service.release_prepared_images.assert_called()
+
+
+@pytest.mark.asyncio
+async def test_iter_process_cancel_aborts_in_flight(processor, mock_image_analyzer):
+    """キャンセルトークンで中止すると、実行中の分析がキャンセルされ未処理の画像が通知されることのテスト"""
+    image_paths = [Path(f"image{i}.jpg") for i in range(3)]
+    analyses = mock_image_analyzer.analyze_full.return_value
+    aborted = []
+    events = []
+    token = CancellationToken()
+    
+    async def analyze_full(image_path, categories, use_cache=None):
+        if image_path.name == "image0.jpg":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                aborted.append(image_path.name)
+                raise
+        return analyses
+    
+    def on_event(event):
+        events.append(event)
+        if event.completed == 2:
+            token.cancel("ユーザーが中止しました")
+    
+    mock_image_analyzer.analyze_full = AsyncMock(side_effect=analyze_full)
+    
+    results = [result async for result in processor.iter_process(image_paths, on_event=on_event, cancel_token=token)]
+    
+    assert sorted(result.image_name for result in results) == ["image1.jpg", "image2.jpg"]
+    assert aborted == ["image0.jpg"]
+    assert (events[-1].image_name, events[-1].status, events[-1].error) == ("image0.jpg", "cancelled", "ユーザーが中止しました")
+    processor.cache_manager.flush.assert_called()
+
+
+@pytest.mark.asyncio
+async def test_process_images_run_timeout_returns_partial_results(processor, mock_image_analyzer):
+    """実行の制限時間を超えると、完了した画像の結果だけを返すことのテスト"""
+    image_paths = [Path(f"image{i}.jpg") for i in range(3)]
+    analyses = mock_image_analyzer.analyze_full.return_value
+    
+    async def analyze_full(image_path, categories, use_cache=None):
+        if image_path.name == "image1.jpg":
+            await asyncio.sleep(10)
+        return analyses
+    
+    mock_image_analyzer.analyze_full = AsyncMock(side_effect=analyze_full)
+    processor.run_timeout_seconds = 0.2
+    
+    results = await processor.process_images(image_paths)
+    
+    assert [result.image_name for result in results] == ["image0.jpg", "image2.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_process_images_image_timeout(processor, mock_image_analyzer):
+    """画像の処理の制限時間を超えた画像だけが失敗することのテスト"""
+    image_paths = [Path(f"image{i}.jpg") for i in range(3)]
+    analyses = mock_image_analyzer.analyze_full.return_value
+    
+    async def analyze_full(image_path, categories, use_cache=None):
+        if image_path.name == "image1.jpg":
+            await asyncio.sleep(10)
+        return analyses
+    
+    mock_image_analyzer.analyze_full = AsyncMock(side_effect=analyze_full)
+    processor.image_timeout_seconds = 0.1
+    
+    results = await processor.process_images(image_paths)
+    assert [result.image_name for result in results] == ["image0.jpg", "image2.jpg"]
+    
+    with pytest.raises(DeadlineExceededError):
+        await processor.process_single_image(image_paths[1])
+
+
+@pytest.mark.asyncio
+async def test_rank_templates_timeout_falls_back_to_scoring(processor, mock_image_analyzer, mock_template_matcher):
+    """AIによるテンプレート順位付けが制限時間を超えた場合に、スコアリングで選択することのテスト"""
+    async def rank_templates(image_path, **kwargs):
+        await asyncio.sleep(10)
+    
+    mock_template_matcher.rank_templates_with_ai = AsyncMock(side_effect=rank_templates)
+    mock_template_matcher.find_alternative_templates = MagicMock(return_value=[])
+    mock_image_analyzer.gemini_service.config.template_matching.timeout_seconds = 0.05
+    
+    result = await processor.process_single_image(Path("test/path/image.jpg"))
+    
+    mock_template_matcher.find_best_template.assert_called_once()
+    assert result.template_reason == "スコアリングベースのマッチングにより選択されました"
+
+
+@pytest.mark.asyncio
+async def test_batch_prefetch_bounded_by_image_timeout(processor, mock_image_analyzer):
+    """バッチ分析のリクエストが、画像の処理の制限時間で中断されることのテスト"""
+    image_paths = [Path(f"image{i}.jpg") for i in range(3)]
+    aborted = []
+    
+    async def prefetch(image_paths, categories, use_cache=None):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            aborted.append(len(image_paths))
+            raise
+    
+    mock_image_analyzer.prefetch = AsyncMock(side_effect=prefetch)
+    mock_image_analyzer.gemini_service.config.batch_analysis.enabled = True
+    mock_image_analyzer.gemini_service.config.batch_analysis.batch_size = 4
+    mock_image_analyzer.gemini_service.config.batch_analysis.max_wait_seconds = 0.0
+    processor.image_timeout_seconds = 0.2
+    
+    await asyncio.wait_for(processor.process_images(image_paths), timeout=5)
+    
+    assert aborted and sum(aborted) <= len(image_paths)
+
+
+def test_process_result_cache_key_covers_catalog_and_records(processor, mock_image_analyzer, mock_template_matcher, tmp_path):
+    """テンプレート一覧やスタイリストの内容が変わると処理結果のキャッシュキーが変わることのテスト"""
+    mock_image_analyzer.get_cache_context = MagicMock(return_value=["gemini-2.0-flash", "v1"])
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"image")
+    stylists = [StylistInfo(name="テストスタイリスト", description="説明", specialties="得意技術")]
+    
+    key = processor._process_result_cache_key(image_path, stylists)
+    assert processor._process_result_cache_key(image_path, stylists) == key
+    
+    # 名前が同じでも説明が変われば別のキーになる
+    edited = [StylistInfo(name="テストスタイリスト", description="新しい説明", specialties="得意技術")]
+    assert processor._process_result_cache_key(image_path, edited) != key
+    
+    # テンプレートCSVの再読み込み後も別のキーになる
+    mock_template_matcher.template_manager.get_catalog_hash.return_value = "catalog-v2"
+    assert processor._process_result_cache_key(image_path, stylists) != key
@@ -250,14 +250,14 @@ def mock_gemini_service():
     mock_service = AsyncMock()
     mock_service.config = config
     # select_best_templateメソッドのモック
-    async def mock_select_best_template(image_path, templates, analysis=None, category_filter=False):
+    async def mock_select_best_template(image_path, templates, analysis=None, category_filter=False, cache_catalog=True):
         # 成功時は最初のテンプレートのインデックスと理由を返す
         return 0, "AIによる選択理由"
     
     mock_service.select_best_template.side_effect = mock_select_best_template
     
     # select_multiple_templatesメソッドのモック
-    async def mock_select_multiple_templates(image_path, templates, count=3, analysis=None, category_filter=False):
+    async def mock_select_multiple_templates(image_path, templates, count=3, analysis=None, category_filter=False, cache_catalog=True):
         # 成功時は複数のテンプレートインデックス、理由、スコアのリストを返す
         return [
             (0, "第1候補の理由", 0.9),
@@ -500,3 +500,82 @@ async def test_find_multiple_templates_with_ai_failure(template_matcher, mock_ge
 
 
 # _sample_templatesメソッドは存在しないため、このテストケースは削除します
+
+
+@pytest.mark.asyncio
+async def test_find_best_template_with_ai_shortlist(template_matcher, mock_gemini_service):
+    """find_best_template_with_aiメソッドがmax_templates件に絞り込んでAIに送信するかのテスト"""
+    analysis = StyleAnalysis(
+        category="テストカテゴリ1",
+        features=StyleFeatures(
+            color="アッシュ",
+            cut_technique="レイヤー",
+            styling="ストレート",
+            impression="クール"
+        ),
+        keywords=["ウルフ", "外ハネ"]
+    )
+    
+    templates = [
+        Template(
+            category="テストカテゴリ1",
+            title=f"ナチュラルボブ{i}",
+            menu="カット",
+            comment="ふんわりボブ",
+            hashtag="ボブ,ナチュラル"
+        )
+        for i in range(20)
+    ]
+    templates[13] = Template(
+        category="テストカテゴリ1",
+        title="外ハネウルフ",
+        menu="カット",
+        comment="レイヤーを入れたクールなウルフ",
+        hashtag="ウルフ,外ハネ,アッシュ"
+    )
+    
+    mock_template_manager = MagicMock()
+    mock_template_manager.get_templates_by_category.return_value = templates
+    mock_template_manager.get_all_categories.return_value = ["テストカテゴリ1"]
+    template_matcher.template_manager = mock_template_manager
+    
+    template, reason, success = await template_matcher.find_best_template_with_ai(
+        image_path=Path("dummy.jpg"),
+        gemini_service=mock_gemini_service,
+        analysis=analysis,
+        use_category_filter=True,
+        max_templates=5
+    )
+    
+    # 関連度の最も高いテンプレートが先頭になり、絞り込んだ一覧はキャッシュしない
+    kwargs = mock_gemini_service.select_best_template.call_args.kwargs
+    assert len(kwargs["templates"]) == 5
+    assert kwargs["templates"][0].title == "外ハネウルフ"
+    assert kwargs["cache_catalog"] is False
+    assert success is True
+    assert template.title == "外ハネウルフ"
+
+
+@pytest.mark.asyncio
+async def test_rank_templates_with_ai(template_matcher, mock_gemini_service):
+    """rank_templates_with_aiメソッドが1回の呼び出しでスコア順の候補を返し、順位1を選択とするかのテスト"""
+    templates = template_matcher.template_manager.get_all_templates()
+    
+    async def unordered(image_path, templates, count=3, analysis=None, category_filter=False, cache_catalog=True):
+        return [(1, "第2候補の理由", 0.4), (0, "第1候補の理由", 0.9)]
+    
+    mock_gemini_service.select_multiple_templates.side_effect = unordered
+    
+    candidates = await template_matcher.rank_templates_with_ai(
+        image_path=Path("dummy.jpg"),
+        gemini_service=mock_gemini_service,
+        count=2,
+        use_category_filter=False
+    )
+    
+    mock_gemini_service.select_multiple_templates.assert_called_once()
+    mock_gemini_service.select_best_template.assert_not_called()
+    assert [candidate.score for candidate in candidates] == [0.9, 0.4]
+    assert candidates[0].template is templates[0]
+    assert candidates[0].reason == "第1候補の理由"
+    assert [candidate.is_selected for candidate in candidates] == [True, False]
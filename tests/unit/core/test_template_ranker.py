@@ -0,0 +1,61 @@
+"""
+TemplateRankerのユニットテスト
+"""
+
+from hairstyle_analyzer.core.template_ranker import TemplateRanker, BM25Index, tokenize
+from hairstyle_analyzer.data.models import Template, StyleAnalysis, StyleFeatures
+
+
+def _template(title, comment, hashtag):
+    return Template(category="テスト", title=title, menu="カット", comment=comment, hashtag=hashtag)
+
+
+def _analysis(keywords):
+    return StyleAnalysis(
+        category="テスト",
+        features=StyleFeatures(color="ベージュ", cut_technique="ワンレン", styling="内巻き", impression="上品"),
+        keywords=keywords
+    )
+
+
+def test_tokenize():
+    """日本語の語と文字バイグラム、英単語が分割されるかのテスト"""
+    tokens = tokenize("透明感ボブ, Short #ウルフ")
+    assert "透明感ボブ" in tokens
+    assert "ボブ" in tokens
+    assert "short" in tokens
+    assert "ウルフ" in tokens
+
+
+def test_bm25_prefers_matching_hashtags():
+    """クエリに一致するテンプレートのスコアが高くなるかのテスト"""
+    index = BM25Index([
+        _template("ふんわりボブ", "柔らかい質感", "ボブ,ナチュラル"),
+        _template("外ハネウルフ", "動きのあるスタイル", "ウルフ,外ハネ"),
+    ])
+    scores = index.scores(tokenize("ウルフ"))
+    assert scores[1] > scores[0]
+    assert index.scores([]) == [0.0, 0.0]
+
+
+def test_shortlist_orders_by_relevance():
+    """関連度順に上位limit件へ絞り込み、同点は元の順序を保つかのテスト"""
+    templates = [_template(f"スタイル{i}", "コメント", "定番") for i in range(10)]
+    templates[7] = _template("上品ワンレン", "ベージュカラーの内巻き", "ワンレン,内巻き")
+    ranker = TemplateRanker()
+
+    shortlist = ranker.shortlist(templates, _analysis(["ワンレン"]), 3)
+
+    assert [t.title for t in shortlist] == ["上品ワンレン", "スタイル0", "スタイル1"]
+    # 同じリストに対しては索引を再利用する
+    ranker.shortlist(templates, _analysis(["内巻き"]), 3)
+    assert len(ranker._indexes) == 1
+
+
+def test_shortlist_without_analysis_keeps_order():
+    """分析結果がない場合や件数が上限以下の場合は元の順序のまま返すかのテスト"""
+    templates = [_template(f"スタイル{i}", "コメント", "定番") for i in range(4)]
+    ranker = TemplateRanker()
+
+    assert ranker.shortlist(templates, None, 2) == templates[:2]
+    assert ranker.shortlist(templates, _analysis(["定番"]), 10) == templates
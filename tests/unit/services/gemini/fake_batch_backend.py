@@ -0,0 +1,49 @@
+"""
+テスト用のバッチジョブのバックエンド（ローカルのファイルを使用するフェイク実装）
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from hairstyle_analyzer.data.interfaces import BatchJobBackendProtocol
+
+
+class LocalFileBatchBackend(BatchJobBackendProtocol):
+    """送信されたリクエストファイルを保存し、完了時にrespondの戻り値から結果ファイルを作成するフェイクバックエンド
+
+    statesは状態の確認ごとに先頭から返す状態のリストで、最後の状態を以降も返し続けます。
+    """
+
+    def __init__(self, storage_dir: Path, respond: Callable[[Dict[str, Any]], Optional[str]], states: Optional[List[str]] = None):
+        self.storage_dir = storage_dir
+        self.respond = respond
+        self.states = list(states or ["SUCCEEDED"])
+        self.submitted: List[str] = []
+        self.downloads: List[str] = []
+
+    def submit(self, model_name: str, requests_path: Path, display_name: str) -> str:
+        name = f"batches/fake-{len(self.submitted) + 1}"
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copy(requests_path, self._requests_path(name))
+        self.submitted.append(name)
+        return name
+
+    def get_state(self, job_name: str) -> str:
+        return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+
+    def download_results(self, job_name: str, destination: Path) -> None:
+        self.downloads.append(job_name)
+        lines = []
+        for line in self._requests_path(job_name).read_text(encoding="utf-8").splitlines():
+            record = json.loads(line)
+            text = self.respond(record["request"])
+            if text is None:
+                lines.append({"key": record["key"], "error": {"code": 500, "message": "internal"}})
+            else:
+                lines.append({"key": record["key"], "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}})
+        destination.write_text("\n".join(json.dumps(line, ensure_ascii=False) for line in lines), encoding="utf-8")
+
+    def _requests_path(self, job_name: str) -> Path:
+        return self.storage_dir / (job_name.replace("/", "_") + ".jsonl")
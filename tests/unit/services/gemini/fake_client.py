@@ -0,0 +1,73 @@
+"""
+テスト用のGemini APIクライアント（ローカルのフェイク実装）
+"""
+
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from hairstyle_analyzer.data.interfaces import GeminiClientProtocol
+from hairstyle_analyzer.data.models import UploadedFile, CachedContext
+
+
+class FakeModel:
+    """呼び出しを記録し、respondの戻り値をレスポンステキストとして返すフェイクモデル"""
+
+    def __init__(self, name: str, respond: Callable[[List[Any]], str]):
+        self.name = name
+        self.respond = respond
+        self.calls: List[Dict[str, Any]] = []
+
+    def generate_content(self, contents, generation_config=None, **kwargs):
+        self.calls.append({"contents": contents, "generation_config": generation_config, **kwargs})
+        return SimpleNamespace(text=self.respond(contents))
+
+
+class FakeGeminiClient(GeminiClientProtocol):
+    """ファイルストアへのアップロードとコンテキストキャッシュをメモリ上で再現するフェイククライアント"""
+
+    def __init__(self, respond: Optional[Callable[[List[Any]], str]] = None, file_ttl_seconds: float = 3600):
+        self.respond = respond or (lambda contents: "{}")
+        self.file_ttl_seconds = file_ttl_seconds
+        self.models: Dict[str, FakeModel] = {}
+        self.uploads: List[Dict[str, Any]] = []
+        self.cached_contents: Dict[str, Dict[str, Any]] = {}
+        self.cached_models: Dict[str, FakeModel] = {}
+        self.deleted_caches: List[str] = []
+        self.cache_error: Optional[Exception] = None
+
+    def get_model(self, model_name: str) -> FakeModel:
+        model = self.models.get(model_name)
+        if model is None:
+            model = self.models[model_name] = FakeModel(model_name, lambda contents: self.respond(contents))
+        return model
+
+    def upload_file(self, data: bytes, mime_type: str, display_name: Optional[str] = None) -> UploadedFile:
+        number = len(self.uploads) + 1
+        self.uploads.append({"data": data, "mime_type": mime_type, "display_name": display_name})
+        return UploadedFile(
+            name=f"files/fake-{number}",
+            uri=f"fake://files/fake-{number}",
+            mime_type=mime_type,
+            expires_at=time.time() + self.file_ttl_seconds
+        )
+
+    def create_cached_content(self, model_name: str, contents: List[str], display_name: str, ttl_seconds: int) -> CachedContext:
+        if self.cache_error is not None:
+            raise self.cache_error
+        name = f"cachedContents/fake-{len(self.cached_contents) + 1}"
+        self.cached_contents[name] = {"model": model_name, "contents": contents, "display_name": display_name}
+        return CachedContext(name=name, model=model_name, expires_at=time.time() + ttl_seconds)
+
+    def get_cached_model(self, context: CachedContext) -> FakeModel:
+        model = self.cached_models.get(context.name)
+        if model is None:
+            model = self.cached_models[context.name] = FakeModel(context.model, lambda contents: self.respond(contents))
+        return model
+
+    def delete_cached_content(self, name: str) -> None:
+        self.cached_contents.pop(name, None)
+        self.deleted_caches.append(name)
+
+    def reset_async_client(self, model: FakeModel) -> None:
+        pass
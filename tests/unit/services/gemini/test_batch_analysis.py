@@ -0,0 +1,111 @@
+"""
+複数画像のバッチ分析のテスト
+"""
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from hairstyle_analyzer.services.gemini.gemini_service import GeminiService
+from hairstyle_analyzer.data.models import GeminiConfig
+
+from .fake_client import FakeGeminiClient
+
+
+def _item(index: int, category: str) -> dict:
+    return {
+        "index": index,
+        "category": category,
+        "features": {"color": "黒", "cut_technique": "レイヤー", "styling": "ストレート", "impression": "ナチュラル"},
+        "keywords": ["軽い"],
+        "sex": "レディース",
+        "length": "ショート"
+    }
+
+
+class TestBatchAnalysis(unittest.TestCase):
+    """GeminiService.analyze_images_batchのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.image_paths = []
+        for i in range(3):
+            path = Path(self.temp_dir.name) / f"style{i}.png"
+            Image.new("RGB", (32, 32), (i * 40, 20, 30)).save(path)
+            self.image_paths.append(path)
+
+        self.batch_response = "{}"
+        self.client = FakeGeminiClient(respond=self._respond)
+        config = GeminiConfig(
+            api_key="test_api_key",
+            prompt_template="テスト{categories}",
+            attribute_prompt_template="属性{length_choices}",
+            stylist_prompt_template="テスト",
+            coupon_prompt_template="テスト",
+            template_matching_prompt="テスト",
+            length_choices=["ショート", "ロング"]
+        )
+        self.service = GeminiService(config, client=self.client)
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.temp_dir.cleanup()
+
+    def _respond(self, contents) -> str:
+        if "画像0:" in contents:
+            return self.batch_response
+        if contents[0].startswith("属性"):
+            return json.dumps({"sex": "メンズ", "length": "ロング"}, ensure_ascii=False)
+        return json.dumps(_item(0, "個別"), ensure_ascii=False)
+
+    def _calls(self):
+        return self.client.models["gemini-2.0-flash"].calls
+
+    def _analyze(self):
+        return asyncio.run(self.service.analyze_images_batch(self.image_paths, ["ボブ", "ショート", "個別"]))
+
+    def test_results_matched_by_index(self):
+        """1回のリクエストで全画像を送信し、応答の順序によらず画像番号で対応付けるかテスト"""
+        self.batch_response = json.dumps(
+            {"results": [_item(2, "ショート"), _item(0, "ボブ"), _item(1, "ボブ")]}, ensure_ascii=False
+        )
+
+        results = self._analyze()
+
+        self.assertEqual([style.category for style, _ in results], ["ボブ", "ボブ", "ショート"])
+        self.assertEqual(len(self._calls()), 1)
+        contents = self._calls()[0]["contents"]
+        self.assertEqual([part for part in contents if isinstance(part, str)][1:], ["画像0:", "画像1:", "画像2:"])
+        self.assertEqual(len([part for part in contents if isinstance(part, dict)]), 3)
+        items = self._calls()[0]["generation_config"]["response_schema"]["properties"]["results"]["items"]
+        self.assertEqual(items["properties"]["length"]["enum"], ["ショート", "ロング"])
+
+    def test_missing_item_analyzed_individually(self):
+        """応答に含まれない・画像番号が無効な結果の画像だけを個別に分析するかテスト"""
+        self.batch_response = json.dumps(
+            {"results": [_item(0, "ボブ"), _item(2, "ショート"), _item(7, "ボブ")]}, ensure_ascii=False
+        )
+
+        results = self._analyze()
+
+        self.assertEqual([style.category for style, _ in results], ["ボブ", "個別", "ショート"])
+        self.assertEqual(results[1][1].sex, "メンズ")
+        self.assertEqual(len(self._calls()), 3)
+
+    def test_invalid_response_falls_back_for_all(self):
+        """応答全体が無効な場合は全ての画像を個別に分析するかテスト"""
+        self.batch_response = "分析できませんでした"
+
+        results = self._analyze()
+
+        self.assertEqual([style.category for style, _ in results], ["個別", "個別", "個別"])
+        self.assertEqual(len(self._calls()), 1 + 2 * len(self.image_paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
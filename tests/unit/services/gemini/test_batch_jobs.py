@@ -0,0 +1,144 @@
+"""
+オフラインのバッチジョブのテスト
+"""
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from hairstyle_analyzer.services.gemini.gemini_service import GeminiService
+from hairstyle_analyzer.services.gemini.batch_jobs import BatchJobRunner
+from hairstyle_analyzer.data.models import GeminiConfig, BatchJobConfig, CombinedAnalysis, Template
+from hairstyle_analyzer.utils.errors import GeminiAPIError
+
+from .fake_client import FakeGeminiClient
+from .fake_batch_backend import LocalFileBatchBackend
+
+
+COMBINED_RESPONSE = json.dumps({
+    "category": "ボブ",
+    "features": {"color": "黒", "cut_technique": "レイヤー", "styling": "ストレート", "impression": "ナチュラル"},
+    "keywords": ["軽い"],
+    "sex": "レディース",
+    "length": "ショート",
+    "selected_templates": [{"template_id": 1, "reason": "最適", "score": 0.9}]
+}, ensure_ascii=False)
+
+
+class TestBatchJobRunner(unittest.TestCase):
+    """BatchJobRunnerのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.job_dir = root / "job"
+        self.image_paths = []
+        for i in range(3):
+            path = root / f"style{i}.png"
+            Image.new("RGB", (32, 32), (i * 40, 20, 30)).save(path)
+            self.image_paths.append(path)
+        self.templates = [
+            Template(category="ボブ", title=f"ボブ{i}", menu="カット", comment="コメント", hashtag="ボブ")
+            for i in range(3)
+        ]
+
+        self.client = FakeGeminiClient()
+        config = GeminiConfig(
+            api_key="test_api_key",
+            prompt_template="テスト{categories}",
+            attribute_prompt_template="テスト{length_choices}",
+            stylist_prompt_template="テスト",
+            coupon_prompt_template="テスト",
+            template_matching_prompt="テスト",
+            length_choices=["ショート", "ロング"]
+        )
+        self.service = GeminiService(config, client=self.client)
+        self.backend = LocalFileBatchBackend(root / "backend", respond=lambda request: COMBINED_RESPONSE)
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.temp_dir.cleanup()
+
+    def _run(self, max_wait_seconds: float = 60.0):
+        runner = BatchJobRunner(
+            self.service, self.backend, BatchJobConfig(poll_interval_seconds=0.01, max_wait_seconds=max_wait_seconds)
+        )
+
+        async def collect():
+            return [item async for item in runner.run(self.job_dir, self.image_paths, ["ボブ"], self.templates)]
+        return asyncio.run(collect())
+
+    def test_job_submitted_and_results_streamed(self):
+        """全画像のリクエストを1つのジョブで送信し、完了後に画像ごとの結果を返すかテスト"""
+        self.backend.states = ["PENDING", "RUNNING", "SUCCEEDED"]
+
+        results = self._run()
+
+        self.assertEqual([path for path, _ in results], self.image_paths)
+        for _, outcome in results:
+            self.assertIsInstance(outcome, CombinedAnalysis)
+            self.assertEqual(outcome.template_candidates[0].template.title, "ボブ1")
+        self.assertEqual(len(self.backend.submitted), 1)
+        self.assertEqual(self.client.models["gemini-2.0-flash"].calls, [])
+
+        lines = (self.job_dir / BatchJobRunner.REQUESTS_FILE).read_text(encoding="utf-8").splitlines()
+        request = json.loads(lines[0])["request"]
+        self.assertEqual(len(lines), 3)
+        self.assertIn("inline_data", request["contents"][0]["parts"][1])
+        self.assertEqual(request["generation_config"]["response_schema"]["type"], "OBJECT")
+
+    def test_resume_after_restart(self):
+        """待機中に中断した場合、再実行で同じジョブの完了待ちから再開するかテスト"""
+        self.backend.states = ["RUNNING"]
+        with self.assertRaises(GeminiAPIError) as context:
+            self._run(max_wait_seconds=0.01)
+        self.assertEqual(context.exception.error_type, "BATCH_JOB_TIMEOUT")
+
+        self.backend.states = ["SUCCEEDED"]
+        results = self._run()
+        self.assertEqual(len(results), 3)
+
+        # ダウンロード済みの結果は、再実行時にジョブを確認せず読み込む
+        self.backend.states = ["FAILED"]
+        self.assertEqual(len(self._run()), 3)
+        self.assertEqual(self.backend.submitted, ["batches/fake-1"])
+        self.assertEqual(self.backend.downloads, ["batches/fake-1"])
+
+    def test_failed_items_reported(self):
+        """失敗したリクエスト・無効な応答の画像は、例外とともに返すかテスト"""
+        responses = iter([COMBINED_RESPONSE, None, "{}"])
+        self.backend.respond = lambda request: next(responses)
+
+        results = self._run()
+
+        self.assertIsInstance(results[0][1], CombinedAnalysis)
+        self.assertIsInstance(results[1][1], GeminiAPIError)
+        self.assertIsInstance(results[2][1], GeminiAPIError)
+
+    def test_failed_job_resubmitted(self):
+        """ジョブが失敗した場合は、次回の実行で新しいジョブとして再送信するかテスト"""
+        self.backend.states = ["FAILED"]
+        with self.assertRaises(GeminiAPIError):
+            self._run()
+
+        self.backend.states = ["SUCCEEDED"]
+        self.assertEqual(len(self._run()), 3)
+        self.assertEqual(self.backend.submitted, ["batches/fake-1", "batches/fake-2"])
+
+    def test_replaced_image_resubmitted(self):
+        """同じパスの画像の内容が変わった場合は、前回の結果を返さず新しいジョブを送信するかテスト"""
+        self.assertEqual(len(self._run()), 3)
+
+        Image.new("RGB", (48, 48), (200, 100, 50)).save(self.image_paths[0])
+        self.assertEqual(len(self._run()), 3)
+
+        self.assertEqual(self.backend.submitted, ["batches/fake-1", "batches/fake-2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
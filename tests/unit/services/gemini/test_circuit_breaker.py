@@ -0,0 +1,195 @@
+"""
+サーキットブレーカーとモデルの自動切り替えのユニットテスト
+"""
+
+import asyncio
+import unittest
+from pathlib import Path
+from unittest.mock import patch, AsyncMock
+
+from google.api_core import exceptions as google_exceptions
+
+from hairstyle_analyzer.services.gemini.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from hairstyle_analyzer.services.gemini.gemini_service import GeminiService
+from hairstyle_analyzer.services.gemini.retry_policy import ERROR_TYPES, TRANSIENT
+from hairstyle_analyzer.data.models import CircuitBreakerConfig, GeminiConfig
+from hairstyle_analyzer.utils.errors import GeminiAPIError
+
+from .fake_client import FakeGeminiClient
+
+
+class FakeClock:
+    """手動で進める疑似時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """CircuitBreakerのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.clock = FakeClock()
+        patch('hairstyle_analyzer.services.gemini.circuit_breaker.time.monotonic', self.clock.monotonic).start()
+        self.config = CircuitBreakerConfig(
+            window_size=4, min_calls=4, failure_rate_threshold=0.5,
+            slow_call_seconds=10, slow_call_rate_threshold=0.75, open_seconds=30
+        )
+        self.breaker = CircuitBreaker("primary", self.config)
+
+    def tearDown(self):
+        """テストの後処理"""
+        patch.stopall()
+
+    def test_opens_on_error_rate(self):
+        """エラー率が閾値を超えると遮断されることのテスト"""
+        self.breaker.record_success(1.0)
+        self.breaker.record_failure()
+        self.breaker.record_success(1.0)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_opens_on_slow_calls(self):
+        """遅延した呼び出しの割合が閾値を超えると遮断されることのテスト"""
+        for _ in range(3):
+            self.breaker.record_success(15.0)
+        self.breaker.record_success(1.0)
+
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_probe(self):
+        """遮断後は一定時間で回復確認を行い、成功すれば正常に戻ることのテスト"""
+        for _ in range(4):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.clock.now += 31
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        # 試行中は他の呼び出しを許可しない
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.clock.now += 31
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_success(1.0)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.get_statistics()['open_count'], 2)
+
+
+class TestModelFailover(unittest.TestCase):
+    """プライマリモデルからフォールバックモデルへの切り替えのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.clock = FakeClock()
+        patch('hairstyle_analyzer.services.gemini.circuit_breaker.time.monotonic', self.clock.monotonic).start()
+        patch('hairstyle_analyzer.services.gemini.gemini_service.asyncio.sleep', new=AsyncMock()).start()
+
+        config = GeminiConfig(
+            api_key="test_api_key",
+            prompt_template="テスト",
+            attribute_prompt_template="テスト",
+            stylist_prompt_template="テスト",
+            coupon_prompt_template="テスト",
+            template_matching_prompt="テスト",
+            length_choices=["ショート"],
+            max_retries=2,
+            circuit_breaker=CircuitBreakerConfig(window_size=4, min_calls=4, open_seconds=30)
+        )
+        self.primary_down = True
+        self.client = FakeGeminiClient()
+        self.service = GeminiService(config, client=self.client)
+        self.client.models["gemini-2.0-flash"].respond = self._primary
+        self.client.models["gemini-2.0-flash-lite"].respond = lambda contents: "fallback"
+
+    def tearDown(self):
+        """テストの後処理"""
+        patch.stopall()
+
+    def _primary(self, contents):
+        if self.primary_down:
+            raise google_exceptions.ServiceUnavailable("overloaded")
+        return "primary"
+
+    def _call(self):
+        return asyncio.run(self.service._call_gemini_api("プロンプト"))
+
+    def test_failover_and_recovery(self):
+        """プライマリモデルの障害中はフォールバックモデルを使い、回復後に戻ることのテスト"""
+        primary_calls = self.client.models["gemini-2.0-flash"].calls
+
+        # 2回の呼び出し（各2回の試行）が失敗し、遮断される
+        for _ in range(2):
+            with self.assertRaises(GeminiAPIError):
+                self._call()
+        self.assertEqual(len(primary_calls), 4)
+        self.assertEqual(self.service.circuit_breakers["gemini-2.0-flash"].state, OPEN)
+
+        # 遮断中はプライマリモデルを呼び出さない
+        self.assertEqual(self._call(), "fallback")
+        self.assertEqual(len(primary_calls), 4)
+
+        # 回復後は試行を経てプライマリモデルに戻る
+        self.primary_down = False
+        self.clock.now += 31
+        self.assertEqual(self._call(), "primary")
+        self.assertEqual(self.service.circuit_breakers["gemini-2.0-flash"].state, CLOSED)
+
+    def test_probe_released_when_call_fails_before_request(self):
+        """送信前の準備で失敗した回復確認の試行枠が解放され、以降もプライマリモデルを試行することのテスト"""
+        for _ in range(2):
+            with self.assertRaises(GeminiAPIError):
+                self._call()
+        breaker = self.service.circuit_breakers["gemini-2.0-flash"]
+        self.assertEqual(breaker.state, OPEN)
+
+        # 回復確認の試行が、存在しない画像の読み込みで失敗する
+        self.primary_down = False
+        self.clock.now += 31
+        with self.assertRaises(GeminiAPIError):
+            asyncio.run(self.service._call_gemini_api("プロンプト", image_path=Path("missing.jpg")))
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertEqual(breaker._probes_in_flight, 0)
+
+        # 次の呼び出しでプライマリモデルの回復を確認できる
+        self.assertEqual(self._call(), "primary")
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_all_models_blocked_sheds_load(self):
+        """全てのモデルが遮断中の場合は呼び出さず、他の呼び出しの試行枠にも影響しないことのテスト"""
+        primary = self.service.circuit_breakers["gemini-2.0-flash"]
+        fallback = self.service.circuit_breakers["gemini-2.0-flash-lite"]
+        for breaker in (primary, fallback):
+            for _ in range(4):
+                breaker.record_failure()
+            self.assertEqual(breaker.state, OPEN)
+
+        with self.assertRaises(GeminiAPIError) as context:
+            self._call()
+        self.assertEqual(context.exception.error_type, ERROR_TYPES[TRANSIENT])
+        self.assertEqual(self.client.models["gemini-2.0-flash"].calls, [])
+        self.assertEqual(self.client.models["gemini-2.0-flash-lite"].calls, [])
+
+        # 回復確認の試行枠が他の呼び出しで使用中の場合も、その枠を変更しない
+        self.clock.now += 31
+        self.assertTrue(primary.allow_request())
+        self.assertTrue(fallback.allow_request())
+        with self.assertRaises(GeminiAPIError):
+            self._call()
+        self.assertEqual((primary.state, primary._probes_in_flight), (HALF_OPEN, 1))
+        self.assertEqual((fallback.state, fallback._probes_in_flight), (HALF_OPEN, 1))
+        self.assertEqual(self.client.models["gemini-2.0-flash"].calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
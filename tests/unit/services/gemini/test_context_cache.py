@@ -0,0 +1,123 @@
+"""
+テンプレート一覧のコンテキストキャッシュのテスト
+"""
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from hairstyle_analyzer.services.gemini.gemini_service import GeminiService
+from hairstyle_analyzer.data.models import GeminiConfig, ContextCacheConfig, Template
+from hairstyle_analyzer.data.template_manager import TemplateManager
+
+from .fake_client import FakeGeminiClient
+
+
+class TestContextCache(unittest.TestCase):
+    """コンテキストキャッシュのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.image_paths = []
+        for i in range(3):
+            path = Path(self.temp_dir.name) / f"style{i}.png"
+            Image.new("RGB", (32, 32), (i * 40, 20, 30)).save(path)
+            self.image_paths.append(path)
+
+        self.templates = [
+            Template(category="ボブ", title=f"ボブ{i}", menu="カット", comment="コメント", hashtag="ボブ")
+            for i in range(5)
+        ]
+        self.client = FakeGeminiClient(
+            respond=lambda contents: json.dumps({"template_id": 1, "reason": "最適"}, ensure_ascii=False)
+        )
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.temp_dir.cleanup()
+
+    def _service(self, min_tokens: int = 0) -> GeminiService:
+        config = GeminiConfig(
+            api_key="test_api_key",
+            prompt_template="テスト{categories}",
+            attribute_prompt_template="テスト{length_choices}",
+            stylist_prompt_template="テスト",
+            coupon_prompt_template="テスト",
+            template_matching_prompt="テスト",
+            length_choices=["ショート"],
+            context_cache=ContextCacheConfig(min_tokens=min_tokens)
+        )
+        return GeminiService(config, client=self.client)
+
+    def _select_all(self, service: GeminiService):
+        async def run():
+            return await asyncio.gather(*[
+                service.select_best_template(path, self.templates) for path in self.image_paths
+            ])
+        return asyncio.run(run())
+
+    def test_catalog_cached_once(self):
+        """テンプレート一覧が1度だけ登録され、画像ごとの呼び出しには含まれないかテスト"""
+        service = self._service()
+
+        results = self._select_all(service)
+
+        self.assertEqual([template_id for template_id, _ in results], [1, 1, 1])
+        self.assertEqual(len(self.client.cached_contents), 1)
+        cached = next(iter(self.client.cached_contents.values()))
+        self.assertIn("ボブ4", cached["contents"][0])
+
+        model = next(iter(self.client.cached_models.values()))
+        self.assertEqual(len(model.calls), 3)
+        for call in model.calls:
+            self.assertEqual(len(call["contents"]), 2)
+            self.assertNotIn("ボブ4", call["contents"][0])
+        self.assertEqual(self.client.models["gemini-2.0-flash"].calls, [])
+
+    def test_short_catalog_sent_inline(self):
+        """見積もりトークン数が最小値未満の場合はキャッシュせずプロンプトに含めるかテスト"""
+        service = self._service(min_tokens=100_000)
+
+        self._select_all(service)
+
+        self.assertEqual(self.client.cached_contents, {})
+        calls = self.client.models["gemini-2.0-flash"].calls
+        self.assertEqual(len(calls), 3)
+        self.assertIn("ボブ4", calls[0]["contents"][0])
+
+    def test_cache_failure_falls_back_to_inline(self):
+        """キャッシュの作成に失敗した場合はプロンプトに含めて送信し、再作成を試みないかテスト"""
+        self.client.cache_error = RuntimeError("caching not supported")
+        service = self._service()
+
+        results = self._select_all(service)
+
+        self.assertEqual([template_id for template_id, _ in results], [1, 1, 1])
+        self.assertEqual(len(self.client.models["gemini-2.0-flash"].calls), 3)
+        self.assertEqual(service.context_caches.get_statistics()["failures"], 1)
+
+    def test_invalidated_on_template_reload(self):
+        """テンプレートの再読み込みでキャッシュが削除され、次の呼び出しで作り直されるかテスト"""
+        csv_path = Path(self.temp_dir.name) / "templates.csv"
+        csv_path.write_text("category,title,menu,comment,hashtag\nボブ,ボブ0,カット,コメント,ボブ\n", encoding="utf-8")
+        manager = TemplateManager(csv_path)
+        service = self._service()
+        manager.add_reload_listener(service.invalidate_context_caches)
+
+        self._select_all(service)
+        (name,) = self.client.cached_contents
+
+        manager.reload()
+        self.assertEqual(self.client.deleted_caches, [name])
+
+        self._select_all(service)
+        self.assertEqual(service.context_caches.get_statistics()["creates"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
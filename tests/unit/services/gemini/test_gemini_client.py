@@ -0,0 +1,126 @@
+"""
+Gemini APIクライアントの差し替えと画像アップロードの再利用のテスト
+"""
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from hairstyle_analyzer.services.gemini.gemini_service import GeminiService
+from hairstyle_analyzer.data.models import GeminiConfig
+
+from .fake_client import FakeGeminiClient
+
+
+class TestGeminiServiceWithFakeClient(unittest.TestCase):
+    """フェイククライアントを使用したGeminiServiceのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.image_path = Path(self.temp_dir.name) / "style.png"
+        Image.new("RGB", (64, 64), (10, 20, 30)).save(self.image_path)
+
+        self.config = GeminiConfig(
+            api_key="test_api_key",
+            prompt_template="テスト{categories}",
+            attribute_prompt_template="テスト{length_choices}",
+            stylist_prompt_template="テスト",
+            coupon_prompt_template="テスト",
+            template_matching_prompt="テスト",
+            length_choices=["ショート"],
+            upload_images=True
+        )
+        self.client = FakeGeminiClient(respond=lambda contents: "応答")
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.temp_dir.cleanup()
+
+    def _file_uris(self, model_name: str):
+        return [
+            part["file_data"]["file_uri"]
+            for call in self.client.models[model_name].calls
+            for part in call["contents"] if isinstance(part, dict) and "file_data" in part
+        ]
+
+    def test_models_from_client(self):
+        """モデルが注入したクライアントから取得されることのテスト"""
+        service = GeminiService(self.config, client=self.client)
+
+        self.assertIs(service.model, self.client.models["gemini-2.0-flash"])
+        self.assertIs(service.fallback_model, self.client.models["gemini-2.0-flash-lite"])
+
+    def test_upload_once_and_reuse(self):
+        """同じ画像は1度だけアップロードされ、以降の呼び出しで参照されることのテスト"""
+        service = GeminiService(self.config, client=self.client)
+
+        async def run():
+            # 並行した呼び出しでもアップロードは1度だけ
+            await asyncio.gather(*(service._call_gemini_api(f"プロンプト{i}", self.image_path) for i in range(3)))
+            await service._call_gemini_api("プロンプト", self.image_path)
+
+        asyncio.run(run())
+
+        self.assertEqual(len(self.client.uploads), 1)
+        self.assertEqual(self.client.uploads[0]["mime_type"], "image/jpeg")
+        self.assertEqual(self._file_uris("gemini-2.0-flash"), ["fake://files/fake-1"] * 4)
+
+    def test_expired_upload_is_refreshed(self):
+        """有効期限が近いアップロードは再アップロードされることのテスト"""
+        self.client.file_ttl_seconds = GeminiService.UPLOAD_EXPIRY_MARGIN_SECONDS
+        service = GeminiService(self.config, client=self.client)
+
+        async def run():
+            await service._call_gemini_api("プロンプト", self.image_path)
+            await service._call_gemini_api("プロンプト", self.image_path)
+
+        asyncio.run(run())
+
+        self.assertEqual(len(self.client.uploads), 2)
+        self.assertEqual(self._file_uris("gemini-2.0-flash"), ["fake://files/fake-1", "fake://files/fake-2"])
+
+    def test_uploaded_files_are_pruned(self):
+        """処理が終わった画像や有効期限が迫った画像の参照が破棄されることのテスト"""
+        service = GeminiService(self.config, client=self.client)
+        other_path = Path(self.temp_dir.name) / "other.png"
+        Image.new("RGB", (64, 64), (40, 50, 60)).save(other_path)
+
+        asyncio.run(service.prepare_image(self.image_path))
+        self.assertEqual(len(service._uploaded_files), 1)
+
+        # 処理が終わった画像の参照は破棄され、次の呼び出しでは再アップロードされる
+        service.release_prepared_image(self.image_path)
+        self.assertEqual(len(service._uploaded_files), 0)
+        asyncio.run(service.prepare_image(self.image_path))
+        self.assertEqual(len(self.client.uploads), 2)
+
+        # 有効期限が迫った参照は、次のアップロードの際に破棄される
+        key = next(iter(service._uploaded_files))
+        service._uploaded_files[key] = service._uploaded_files[key].model_copy(update={"expires_at": 0})
+        asyncio.run(service.prepare_image(other_path))
+        self.assertEqual(len(service._uploaded_files), 1)
+
+        service.release_prepared_images()
+        self.assertEqual(len(service._uploaded_files), 0)
+
+    def test_upload_failure_falls_back_to_inline(self):
+        """アップロードに失敗した場合は画像データを直接送信することのテスト"""
+        def fail_upload(*args, **kwargs):
+            raise ConnectionError("upload failed")
+
+        self.client.upload_file = fail_upload
+        service = GeminiService(self.config, client=self.client)
+
+        asyncio.run(service._call_gemini_api("プロンプト", self.image_path))
+
+        contents = self.client.models["gemini-2.0-flash"].calls[0]["contents"]
+        self.assertEqual(contents[1]["mime_type"], "image/jpeg")
+        self.assertIn("data", contents[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
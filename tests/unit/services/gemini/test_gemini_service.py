@@ -72,7 +72,7 @@ class TestGeminiService(AsyncioTestCase):
             f.write(b'dummy image data')
         
         # GenAIモジュールのモック
-        self.genai_mock = patch('hairstyle_analyzer.services.gemini.gemini_service.genai').start()
+        self.genai_mock = patch('hairstyle_analyzer.services.gemini.client.genai').start()
         self.model_mock = MagicMock()
         self.fallback_model_mock = MagicMock()
         self.genai_mock.GenerativeModel.side_effect = [self.model_mock, self.fallback_model_mock]
@@ -166,6 +166,67 @@ class TestGeminiService(AsyncioTestCase):
                 "data": "base64_encoded_data"
             })
     
+    def test_prepare_image_downscaled(self):
+        """画像が縮小・再エンコードされ、メモ化されることのテスト"""
+        from PIL import Image
+        import base64
+        import io
+        
+        png_path = Path(self.temp_dir.name) / "large.png"
+        Image.new("RGBA", (2000, 1000), (255, 0, 0, 128)).save(png_path)
+        self.service.config.image_preprocess.max_edge = 500
+        
+        result = self.service._prepare_image(png_path)
+        
+        self.assertEqual(result["mime_type"], "image/jpeg")
+        with Image.open(io.BytesIO(base64.b64decode(result["data"]))) as img:
+            self.assertEqual(img.size, (500, 250))
+            self.assertEqual(img.format, "JPEG")
+        
+        # 2回目はメモから返される
+        with patch('hairstyle_analyzer.services.gemini.gemini_service.resize_image_bytes') as mock_resize:
+            self.assertIs(self.service._prepare_image(png_path), result)
+            mock_resize.assert_not_called()
+        
+        # 破棄後は再度前処理される
+        self.service.release_prepared_images()
+        self.assertIsNot(self.service._prepare_image(png_path), result)
+    
+    def test_prepare_image_applies_exif_orientation(self):
+        """EXIFの向き情報を持つ画像が、表示される向きに回転して再エンコードされることのテスト"""
+        from PIL import Image
+        import base64
+        import io
+        
+        jpeg_path = Path(self.temp_dir.name) / "portrait.jpg"
+        exif = Image.Exif()
+        exif[0x0112] = 6  # 90度回転して表示する（スマートフォンの縦向き写真）
+        Image.new("RGB", (400, 200), (0, 0, 255)).save(jpeg_path, exif=exif)
+        
+        result = self.service._prepare_image(jpeg_path)
+        
+        with Image.open(io.BytesIO(base64.b64decode(result["data"]))) as img:
+            self.assertEqual(img.size, (200, 400))
+            self.assertNotIn(0x0112, img.getexif())
+    
+    def test_prepare_image_validated_once(self):
+        """同じ画像の2回目以降の準備では検証・エンコードを行わないことのテスト"""
+        self.service.config.image_preprocess.enabled = False
+        with patch('hairstyle_analyzer.services.gemini.gemini_service.encode_image',
+                  return_value="base64_encoded_data") as mock_encode, \
+             patch('hairstyle_analyzer.services.gemini.gemini_service.is_valid_image',
+                  return_value=True) as mock_valid:
+            
+            self.service._prepare_image(self.temp_image)
+            self.service._prepare_image(self.temp_image)
+            
+            mock_valid.assert_called_once()
+            mock_encode.assert_called_once_with(self.temp_image, validate=False)
+        
+        # 画像の処理が終わったら破棄される
+        self.service.release_prepared_image(self.temp_image)
+        self.assertNotIn(self.temp_image, self.service.prepared_images)
+    
     def test_prepare_image_invalid(self):
         """無効な画像の準備テスト"""
         # 無効な画像としてモック
@@ -525,10 +586,12 @@ class TestGeminiService(AsyncioTestCase):
             # APIが正しく呼び出されたことを確認
             mock_call_api.assert_called_once()
             
-            # プロンプトに必要な情報が含まれていることを確認
+            # テンプレート一覧は共通部分として、分析結果は画像ごとのプロンプトとして渡されることを確認
             prompt = mock_call_api.call_args[0][0]
-            self.assertIn("透明感ボブ", prompt)
-            self.assertIn("ナチュラルショート", prompt)
+            catalog = mock_call_api.call_args.kwargs["cached_prefix"]
+            self.assertIn("透明感ボブ", catalog)
+            self.assertIn("ナチュラルショート", catalog)
+            self.assertNotIn("透明感ボブ", prompt)
             self.assertIn("ボブ", prompt)
     
     def test_select_best_template_invalid_response(self):
@@ -598,6 +661,91 @@ class TestGeminiService(AsyncioTestCase):
         self.assertIn("メニュー: カット+カラー", result)
         self.assertIn("コメント: 透明感のあるボブスタイル", result)
         self.assertIn("ハッシュタグ: ボブ,透明感,ナチュラル", result)
+    
+    def _combined_fixtures(self):
+        """統合分析テスト用のテンプレート・スタイリスト・クーポンを作成"""
+        templates = [
+            Template(category="ボブ", title="透明感ボブ", menu="カット+カラー",
+                     comment="透明感のあるボブスタイル", hashtag="ボブ,透明感"),
+            Template(category="ショート", title="ナチュラルショート", menu="カット",
+                     comment="ナチュラルなショートスタイル", hashtag="ショート,ナチュラル")
+        ]
+        stylists = [
+            StylistInfo(name="山田花子", specialties="ボブ", description="説明1"),
+            StylistInfo(name="鈴木一郎", specialties="ショート", description="説明2")
+        ]
+        coupons = [
+            CouponInfo(name="カット", price=3000, description=""),
+            CouponInfo(name="カット+カラー", price=8000, description="")
+        ]
+        return templates, stylists, coupons
+    
+    def test_analyze_combined(self):
+        """analyze_combinedメソッドのテスト"""
+        templates, stylists, coupons = self._combined_fixtures()
+        mock_response = json.dumps({
+            "category": "ボブ",
+            "features": {"color": "アッシュ", "cut_technique": "ワンレン", "styling": "ストレート", "impression": "透明感"},
+            "keywords": ["ボブ", "透明感"],
+            "sex": "レディース",
+            "length": "ミディアム",
+            "selected_templates": [
+                {"template_id": 1, "reason": "次点", "score": 0.4},
+                {"template_id": 0, "reason": "最適", "score": 0.9},
+                {"template_id": 99, "reason": "無効", "score": 1.0}
+            ],
+            "stylist_name": "山田花子",
+            "stylist_reason": "ボブが得意",
+            "coupon_number": 2,
+            "coupon_reason": "カラーを含む"
+        }, ensure_ascii=False)
+        
+        with patch.object(self.service, '_call_gemini_api', new_callable=AsyncMock) as mock_call_api:
+            mock_call_api.return_value = mock_response
+            
+            result = self.run_async(self.service.analyze_combined(
+                self.temp_image, ["ボブ", "ショート"], templates, stylists, coupons, template_count=3
+            ))
+            
+            # API呼び出しは1回のみ
+            mock_call_api.assert_called_once()
+            # テンプレート一覧などの共通部分はコンテキストキャッシュ用に分けて渡され、画像ごとのプロンプトには含まれない
+            prompt = mock_call_api.call_args[0][0]
+            catalog = mock_call_api.call_args[1]["cached_prefix"]
+            self.assertIn("透明感ボブ", catalog)
+            self.assertIn("山田花子", catalog)
+            self.assertIn("カット+カラー", catalog)
+            self.assertNotIn("透明感ボブ", prompt)
+            self.assertEqual(catalog, self.service.build_combined_prompt_parts(
+                ["ボブ", "ショート"], templates, stylists, coupons, 3
+            )[0])
+            
+            self.assertEqual(result.style_analysis.category, "ボブ")
+            self.assertEqual(result.attribute_analysis.length, "ミディアム")
+            # 無効なIDは除外され、スコア降順に並ぶ
+            self.assertEqual([c.template.title for c in result.template_candidates], ["透明感ボブ", "ナチュラルショート"])
+            self.assertTrue(result.template_candidates[0].is_selected)
+            self.assertEqual(result.selected_stylist.name, "山田花子")
+            self.assertEqual(result.selected_coupon.name, "カット+カラー")
+    
+    def test_analyze_combined_invalid_response(self):
+        """analyze_combinedメソッドの検証失敗テスト"""
+        templates, stylists, coupons = self._combined_fixtures()
+        mock_response = json.dumps({
+            "category": "存在しないカテゴリ",
+            "features": {"color": "アッシュ", "cut_technique": "ワンレン", "styling": "ストレート", "impression": "透明感"},
+            "sex": "レディース",
+            "length": "ミディアム",
+            "selected_templates": [{"template_id": 0, "reason": "最適", "score": 0.9}]
+        }, ensure_ascii=False)
+        
+        with patch.object(self.service, '_call_gemini_api', new_callable=AsyncMock) as mock_call_api:
+            mock_call_api.return_value = mock_response
+            
+            with self.assertRaises(GeminiAPIError):
+                self.run_async(self.service.analyze_combined(
+                    self.temp_image, ["ボブ", "ショート"], templates, stylists, coupons
+                ))
 
 
 if __name__ == '__main__':
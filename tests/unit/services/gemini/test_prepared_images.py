@@ -0,0 +1,83 @@
+"""
+PreparedImageRegistryのユニットテスト
+"""
+
+import os
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from hairstyle_analyzer.services.gemini.prepared_images import PreparedImageRegistry
+
+
+class TestPreparedImageRegistry(unittest.TestCase):
+    """PreparedImageRegistryのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.images = []
+        for i in range(3):
+            path = Path(self.temp_dir.name) / f"image{i}.png"
+            path.write_bytes(b"image data")
+            self.images.append(path)
+        self.prepare = MagicMock(side_effect=lambda path: {"mime_type": "image/png", "data": "x" * 100})
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.temp_dir.cleanup()
+
+    def test_prepare_once(self):
+        """同じ画像は1度だけ準備されることのテスト"""
+        registry = PreparedImageRegistry(max_bytes=1000)
+
+        first = registry.get_or_prepare(self.images[0], self.prepare)
+        second = registry.get_or_prepare(self.images[0], self.prepare)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.prepare.call_count, 1)
+        self.assertEqual((registry.hits, registry.misses), (1, 1))
+
+    def test_file_change_invalidates(self):
+        """ファイルが更新された場合は再度準備され、古いデータは破棄されることのテスト"""
+        registry = PreparedImageRegistry(max_bytes=1000)
+        registry.get_or_prepare(self.images[0], self.prepare)
+
+        self.images[0].write_bytes(b"updated image data")
+        stat = self.images[0].stat()
+        os.utime(self.images[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        registry.get_or_prepare(self.images[0], self.prepare)
+
+        self.assertEqual(self.prepare.call_count, 2)
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(registry.current_bytes, 100)
+
+    def test_byte_limit(self):
+        """上限を超えると最も長く参照されていない画像から破棄されることのテスト"""
+        registry = PreparedImageRegistry(max_bytes=200)
+
+        registry.get_or_prepare(self.images[0], self.prepare)
+        registry.get_or_prepare(self.images[1], self.prepare)
+        registry.get_or_prepare(self.images[0], self.prepare)
+        registry.get_or_prepare(self.images[2], self.prepare)
+
+        self.assertIn(self.images[0], registry)
+        self.assertNotIn(self.images[1], registry)
+        self.assertIn(self.images[2], registry)
+        self.assertEqual(registry.current_bytes, 200)
+        self.assertEqual(registry.evictions, 1)
+
+    def test_release(self):
+        """releaseで画像データが破棄されることのテスト"""
+        registry = PreparedImageRegistry(max_bytes=1000)
+        registry.get_or_prepare(self.images[0], self.prepare)
+
+        self.assertTrue(registry.release(self.images[0]))
+        self.assertFalse(registry.release(self.images[0]))
+        self.assertEqual(len(registry), 0)
+        self.assertEqual(registry.current_bytes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+AsyncRateLimiterのユニットテスト
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from hairstyle_analyzer.services.gemini.rate_limiter import AsyncRateLimiter, TokenBucket
+
+
+class FakeClock:
+    """asyncio.sleepで進む疑似時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestAsyncRateLimiter(unittest.TestCase):
+    """AsyncRateLimiterのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.clock = FakeClock()
+        patch('hairstyle_analyzer.services.gemini.rate_limiter.time.monotonic', self.clock.monotonic).start()
+        patch('hairstyle_analyzer.services.gemini.rate_limiter.asyncio.sleep', self.clock.sleep).start()
+
+    def tearDown(self):
+        """テストの後処理"""
+        patch.stopall()
+
+    def test_requests_per_minute(self):
+        """RPMの予算を使い切ると補充まで待機することのテスト"""
+        limiter = AsyncRateLimiter(requests_per_minute=60, tokens_per_minute=1_000_000, max_concurrent_requests=10)
+
+        async def run():
+            for _ in range(62):
+                await limiter.acquire()
+
+        asyncio.run(run())
+
+        # 60回はすぐに通過し、以降は1秒に1回
+        self.assertEqual(len(self.clock.sleeps), 2)
+        self.assertAlmostEqual(sum(self.clock.sleeps), 2.0)
+        self.assertEqual(limiter.total_requests, 62)
+
+    def test_tokens_per_minute(self):
+        """TPMの予算を超える見積もりでは補充まで待機し、実績の差分が反映されることのテスト"""
+        limiter = AsyncRateLimiter(requests_per_minute=1000, tokens_per_minute=600, max_concurrent_requests=10)
+
+        async def run():
+            async with limiter.limit(500) as permit:
+                # 実際の使用量は見積もりより少なかった
+                permit.record_usage(200)
+            # 残り400トークンのため待機なし
+            await limiter.acquire(400)
+            # 残り0トークンのため、100トークン分（10秒）待機
+            await limiter.acquire(100)
+
+        asyncio.run(run())
+
+        self.assertEqual(len(self.clock.sleeps), 1)
+        self.assertAlmostEqual(self.clock.sleeps[0], 10.0)
+
+    def test_max_concurrent_requests(self):
+        """同時実行数が上限を超えないことのテスト"""
+        limiter = AsyncRateLimiter(requests_per_minute=1000, tokens_per_minute=1_000_000, max_concurrent_requests=2)
+        in_flight = 0
+        peak = 0
+
+        async def call():
+            nonlocal in_flight, peak
+            async with limiter.limit():
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0)
+                in_flight -= 1
+
+        async def run():
+            await asyncio.gather(*(call() for _ in range(6)))
+
+        patch.stopall()
+        asyncio.run(run())
+
+        self.assertEqual(peak, 2)
+
+    def test_bucket_oversized_request(self):
+        """容量を超える量の要求は容量までに制限されることのテスト"""
+        bucket = TokenBucket(60)
+        self.assertEqual(bucket.wait_time(1000, bucket._updated), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+構造化出力（スキーマで制約したJSON出力）のテスト
+"""
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+from google.generativeai.types import generation_types
+
+from hairstyle_analyzer.services.gemini.gemini_service import GeminiService
+from hairstyle_analyzer.services.gemini.response_schemas import (
+    response_schema_for, CombinedAnalysisResponse, MultipleTemplateSelectionResponse
+)
+from hairstyle_analyzer.data.models import GeminiConfig, StyleAnalysis
+
+from .fake_client import FakeGeminiClient
+
+
+class TestResponseSchema(unittest.TestCase):
+    """response_schema_forのテストケース"""
+
+    def test_nested_model_inlined(self):
+        """ネストしたモデルが展開され、全フィールドが必須になるかテスト"""
+        schema = response_schema_for(StyleAnalysis, {"category": ["ボブ", "ショート"]})
+
+        self.assertEqual(schema["type"], "object")
+        self.assertEqual(schema["properties"]["category"]["enum"], ["ボブ", "ショート"])
+        self.assertEqual(schema["properties"]["features"]["type"], "object")
+        self.assertIn("color", schema["properties"]["features"]["properties"])
+        self.assertEqual(schema["properties"]["keywords"]["items"], {"type": "string"})
+        self.assertEqual(set(schema["required"]), {"category", "features", "keywords"})
+        self.assertNotIn("$defs", json.dumps(schema))
+        self.assertNotIn("title", json.dumps(schema))
+
+    def test_optional_fields_nullable(self):
+        """Optionalのフィールドがnullableに変換され、空の選択肢は無視されるかテスト"""
+        schema = response_schema_for(CombinedAnalysisResponse, {"stylist_name": []})
+
+        self.assertEqual(schema["properties"]["coupon_number"], {
+            "type": "integer", "nullable": True, "description": "選択したクーポン番号"
+        })
+        self.assertNotIn("enum", schema["properties"]["stylist_name"])
+
+    def test_schema_accepted_by_sdk(self):
+        """生成したスキーマがSDKのSchemaに変換できるかテスト"""
+        for model in (StyleAnalysis, CombinedAnalysisResponse, MultipleTemplateSelectionResponse):
+            generation_config = {"response_schema": response_schema_for(model)}
+            generation_types._normalize_schema(generation_config)
+            self.assertEqual(generation_config["response_schema"].type_.name, "OBJECT")
+
+    def test_enums_do_not_leak_between_calls(self):
+        """選択肢の指定が他の呼び出しのスキーマに影響しないかテスト"""
+        response_schema_for(StyleAnalysis, {"category": ["ボブ"]})
+        self.assertNotIn("enum", response_schema_for(StyleAnalysis)["properties"]["category"])
+
+
+class TestStructuredOutput(unittest.TestCase):
+    """GeminiServiceの構造化出力のテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.image_path = Path(self.temp_dir.name) / "style.png"
+        Image.new("RGB", (64, 64), (10, 20, 30)).save(self.image_path)
+        self.response = "{}"
+        self.client = FakeGeminiClient(respond=lambda contents: self.response)
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.temp_dir.cleanup()
+
+    def _service(self, structured_output: bool = True) -> GeminiService:
+        config = GeminiConfig(
+            api_key="test_api_key",
+            prompt_template="テスト{categories}",
+            attribute_prompt_template="テスト{length_choices}",
+            stylist_prompt_template="テスト",
+            coupon_prompt_template="テスト",
+            template_matching_prompt="テスト",
+            length_choices=["ショート", "ロング"],
+            structured_output=structured_output
+        )
+        return GeminiService(config, client=self.client)
+
+    def test_schema_sent_and_validated(self):
+        """スキーマが生成設定に指定され、応答が1回の検証でパースされるかテスト"""
+        service = self._service()
+        self.response = json.dumps({"sex": "レディース", "length": "ショート"}, ensure_ascii=False)
+
+        result = asyncio.run(service.analyze_attributes(self.image_path))
+
+        self.assertEqual((result.sex, result.length), ("レディース", "ショート"))
+        generation_config = self.client.models["gemini-2.0-flash"].calls[0]["generation_config"]
+        self.assertEqual(generation_config["response_mime_type"], "application/json")
+        self.assertEqual(generation_config["response_schema"]["properties"]["length"]["enum"], ["ショート", "ロング"])
+
+        stats = service.get_parse_statistics()
+        self.assertEqual((stats["structured"], stats["json_repair"], stats["regex"]), (1, 0, 0))
+
+    def test_regex_fallback_counted(self):
+        """検証に失敗した応答は修復・正規表現で抽出され、件数が記録されるかテスト"""
+        service = self._service()
+        self.response = 'category は "ボブ" です。"category": "ボブ", "keywords": ["軽い"]'
+
+        result = asyncio.run(service.analyze_image(self.image_path, ["ボブ"]))
+
+        self.assertEqual(result.category, "ボブ")
+        stats = service.get_parse_statistics()
+        self.assertEqual(stats["structured_invalid"], 1)
+        self.assertEqual(stats["regex"], 1)
+        self.assertEqual(stats["regex_rate"], 1.0)
+
+    def test_structured_output_disabled(self):
+        """構造化出力が無効な場合はスキーマを指定せず、従来のJSON修復でパースするかテスト"""
+        service = self._service(structured_output=False)
+        self.response = '```json\n{sex: "メンズ", length: "ロング"}\n```'
+
+        result = asyncio.run(service.analyze_attributes(self.image_path))
+
+        self.assertEqual((result.sex, result.length), ("メンズ", "ロング"))
+        generation_config = self.client.models["gemini-2.0-flash"].calls[0]["generation_config"]
+        self.assertNotIn("response_schema", generation_config)
+        self.assertEqual(service.get_parse_statistics()["json_repair"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
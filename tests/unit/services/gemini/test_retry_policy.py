@@ -0,0 +1,148 @@
+"""
+再試行ポリシーのユニットテスト
+"""
+
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+
+from google.api_core import exceptions as google_exceptions
+
+from hairstyle_analyzer.services.gemini.gemini_service import GeminiService
+from hairstyle_analyzer.services.gemini.retry_policy import (
+    RetryPolicy, classify_error, server_retry_delay, TRANSIENT, QUOTA, PERMANENT, ERROR_TYPES
+)
+from hairstyle_analyzer.data.models import GeminiConfig
+from hairstyle_analyzer.utils.errors import GeminiAPIError, ImageError
+
+from .fake_client import FakeGeminiClient
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """RetryPolicyのテストケース"""
+
+    def test_classify_error(self):
+        """エラーが一時的・クォータ・恒久的に分類されることのテスト"""
+        self.assertEqual(classify_error(google_exceptions.ResourceExhausted("quota")), QUOTA)
+        self.assertEqual(classify_error(google_exceptions.ServiceUnavailable("busy")), TRANSIENT)
+        self.assertEqual(classify_error(google_exceptions.DeadlineExceeded("timeout")), TRANSIENT)
+        self.assertEqual(classify_error(google_exceptions.InvalidArgument("bad")), PERMANENT)
+        self.assertEqual(classify_error(google_exceptions.PermissionDenied("key")), PERMANENT)
+        self.assertEqual(classify_error(ImageError("無効な画像", "a.png")), PERMANENT)
+        self.assertEqual(classify_error(ConnectionError("reset")), TRANSIENT)
+
+    def test_server_retry_delay(self):
+        """サーバーが指示した待機時間が取得されることのテスト"""
+        retry_info = SimpleNamespace(retry_delay=SimpleNamespace(seconds=12, nanos=500_000_000))
+        self.assertEqual(server_retry_delay(google_exceptions.ResourceExhausted("quota", details=[retry_info])), 12.5)
+        self.assertEqual(server_retry_delay(Exception("429 Please retry in 7.25s.")), 7.25)
+        self.assertEqual(
+            server_retry_delay(Exception("429 quota\nretry_delay {\n  seconds: 30\n}")),
+            30.0
+        )
+        self.assertIsNone(server_retry_delay(Exception("500 internal")))
+
+    def test_next_delay(self):
+        """ジッター付き指数バックオフの範囲に収まることのテスト"""
+        policy = RetryPolicy(max_retries=5, base_delay=1.0, max_delay=8.0)
+        for attempt, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (5, 8.0)]:
+            for _ in range(20):
+                self.assertTrue(0 <= policy.next_delay(attempt) <= cap)
+                self.assertTrue(cap / 2 <= policy.next_delay(attempt, QUOTA) <= cap)
+
+        suggested = policy.next_delay(1, QUOTA, Exception("Please retry in 20s"))
+        self.assertTrue(20 <= suggested <= 21)
+
+        self.assertFalse(policy.should_retry(PERMANENT, 1))
+        self.assertTrue(policy.should_retry(TRANSIENT, 4))
+        self.assertFalse(policy.should_retry(TRANSIENT, 5))
+
+
+class TestAPISessionRetry(unittest.TestCase):
+    """APISessionの再試行のテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.config = GeminiConfig(
+            api_key="test_api_key",
+            prompt_template="テスト",
+            attribute_prompt_template="テスト",
+            stylist_prompt_template="テスト",
+            coupon_prompt_template="テスト",
+            template_matching_prompt="テスト",
+            length_choices=["ショート"],
+            max_retries=3
+        )
+        self.errors = []
+        self.client = FakeGeminiClient(respond=self._respond)
+        self.service = GeminiService(self.config, client=self.client)
+        self.sleep = patch('hairstyle_analyzer.services.gemini.gemini_service.asyncio.sleep', new=AsyncMock()).start()
+
+    def tearDown(self):
+        """テストの後処理"""
+        patch.stopall()
+
+    def _respond(self, contents):
+        if self.errors:
+            raise self.errors.pop(0)
+        return "応答"
+
+    def _calls(self):
+        return len(self.client.models["gemini-2.0-flash"].calls)
+
+    def test_permanent_error_not_retried(self):
+        """恒久的なエラーでは再試行しないことのテスト"""
+        self.errors = [google_exceptions.InvalidArgument("bad request")]
+
+        with self.assertRaises(GeminiAPIError) as cm:
+            asyncio.run(self.service._call_gemini_api("プロンプト"))
+
+        self.assertEqual(self._calls(), 1)
+        self.sleep.assert_not_called()
+        self.assertIn("bad request", str(cm.exception))
+        # 再試行の判定で設定されたエラー種別が保たれ、メッセージが二重にならない
+        self.assertEqual(cm.exception.error_type, ERROR_TYPES[PERMANENT])
+        self.assertEqual(str(cm.exception).count("Gemini API呼び出しに失敗しました"), 1)
+
+    def test_transient_error_retried(self):
+        """一時的なエラーは再試行されることのテスト"""
+        self.errors = [google_exceptions.ServiceUnavailable("busy"), google_exceptions.ServiceUnavailable("busy")]
+
+        self.assertEqual(asyncio.run(self.service._call_gemini_api("プロンプト")), "応答")
+        self.assertEqual(self._calls(), 3)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_quota_error_pauses_limiter(self):
+        """クォータ超過ではサーバーの指示に従って待機し、レートリミッターが停止されることのテスト"""
+        self.errors = [google_exceptions.ResourceExhausted("Please retry in 30s")]
+
+        with patch.object(self.service.rate_limiter, 'pause') as mock_pause:
+            self.assertEqual(asyncio.run(self.service._call_gemini_api("プロンプト")), "応答")
+
+        delay = self.sleep.call_args[0][0]
+        self.assertTrue(30 <= delay <= 31)
+        mock_pause.assert_called_once_with(delay)
+
+    def test_request_timeout_retried(self):
+        """制限時間を超えた呼び出しが中断され、再試行されることのテスト"""
+        self.config.request_timeout_seconds = 0.05
+        calls = []
+
+        async def generate(model, content, generation_config):
+            calls.append(model)
+            if len(calls) == 1:
+                # 応答が返らない呼び出し
+                await asyncio.Event().wait()
+            return SimpleNamespace(text="応答")
+
+        with patch.object(self.service.transport, 'generate', new=generate):
+            self.assertEqual(asyncio.run(self.service._call_gemini_api("プロンプト")), "応答")
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.sleep.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Gemini API通信方式のユニットテスト
+"""
+
+import asyncio
+import threading
+import unittest
+from types import SimpleNamespace
+
+from hairstyle_analyzer.services.gemini.transport import (
+    NativeAsyncTransport, ThreadPoolTransport, create_transport
+)
+from .fake_client import FakeModel
+
+
+class AsyncFakeModel(FakeModel):
+    """非同期メソッドgenerate_content_asyncを持つフェイクモデル"""
+
+    def __init__(self, name, respond, delay=0.0, error=None):
+        super().__init__(name, respond)
+        self.delay = delay
+        self.error = error
+        self.threads = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content_async(self, contents, generation_config=None, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.threads.add(threading.get_ident())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        self.calls.append({"contents": contents, "generation_config": generation_config, **kwargs})
+        return SimpleNamespace(text=self.respond(contents))
+
+
+class TestTransport(unittest.TestCase):
+    """通信方式のテストケース"""
+
+    def test_native_async_runs_on_event_loop(self):
+        """非同期メソッドを持つモデルはスレッドを使用せずに呼び出されるかテスト"""
+        model = AsyncFakeModel("native", lambda contents: "ok", delay=0.01)
+        transport = create_transport("async", max_in_flight=2)
+
+        async def run():
+            results = await asyncio.gather(*[
+                transport.generate(model, ["prompt"], {"temperature": 0.2}) for _ in range(50)
+            ])
+            return results, threading.get_ident()
+
+        results, loop_thread = asyncio.run(run())
+
+        self.assertTrue(all(result.text == "ok" for result in results))
+        self.assertEqual(model.threads, {loop_thread})
+        # スレッドプールのワーカー数に制限されずに並行して呼び出される
+        self.assertEqual(model.max_in_flight, 50)
+        self.assertEqual(model.calls[0]["generation_config"], {"temperature": 0.2})
+        self.assertIsNone(transport.fallback._executor)
+
+    def test_sync_model_uses_thread_pool(self):
+        """非同期メソッドを持たないモデルはスレッドプールで呼び出されるかテスト"""
+        model = FakeModel("sync", lambda contents: "sync")
+        transport = create_transport("async", max_in_flight=2)
+
+        result = asyncio.run(transport.generate(model, ["prompt"], {"temperature": 0.1}))
+
+        self.assertEqual(result.text, "sync")
+        self.assertEqual(model.calls[0]["generation_config"], {"temperature": 0.1})
+        self.assertIsNotNone(transport.fallback._executor)
+        transport.close()
+
+    def test_async_client_rebuilt_on_new_loop(self):
+        """別のイベントループで使用する場合は非同期クライアントを作成し直し、ネイティブ非同期方式を使い続けるかテスト"""
+        model = AsyncFakeModel("native", lambda contents: "ok")
+        resets = []
+        transport = create_transport("async", max_in_flight=1, reset_async_client=resets.append)
+
+        async def run():
+            # 同じループ内の2回目の呼び出しでは作成し直さない
+            await transport.generate(model, [], {})
+            return await transport.generate(model, [], {})
+
+        # Streamlitの再実行と同様に、実行ごとに新しいイベントループを使用する
+        for _ in range(3):
+            self.assertEqual(asyncio.run(run()).text, "ok")
+
+        self.assertEqual(len(model.calls), 6)
+        self.assertEqual(resets, [model, model])
+        self.assertIsNone(transport.fallback._executor)
+
+    def test_new_loop_without_reset_uses_thread_pool(self):
+        """非同期クライアントを作成し直せない場合は、別のループでの呼び出しのみスレッドプールで実行するかテスト"""
+        model = AsyncFakeModel("bound", lambda contents: "ok")
+        transport = NativeAsyncTransport(ThreadPoolTransport(max_workers=1))
+
+        asyncio.run(transport.generate(model, [], {}))
+        self.assertIsNone(transport.fallback._executor)
+
+        asyncio.run(transport.generate(model, [], {}))
+        self.assertEqual(len(model.calls), 2)
+        self.assertIsNotNone(transport.fallback._executor)
+
+        # 新しいループで初めて使用するモデルは、引き続きネイティブ非同期方式で呼び出す
+        other = AsyncFakeModel("other", lambda contents: "ok")
+        asyncio.run(transport.generate(other, [], {}))
+        self.assertEqual(other.max_in_flight, 1)
+        transport.close()
+
+    def test_other_runtime_errors_propagate(self):
+        """イベントループ以外のRuntimeErrorはそのまま送出されるかテスト"""
+        model = AsyncFakeModel("error", lambda contents: "", error=RuntimeError("boom"))
+        transport = create_transport("async", max_in_flight=1)
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(transport.generate(model, [], {}))
+
+    def test_thread_pool_limits_workers(self):
+        """スレッドプール方式のワーカー数が最大同時実行数に制限されるかテスト"""
+        transport = create_transport("thread", max_in_flight=3)
+        asyncio.run(transport.generate(FakeModel("sync", lambda contents: ""), [], {}))
+
+        self.assertIsInstance(transport, ThreadPoolTransport)
+        self.assertEqual(transport._executor._max_workers, 3)
+        transport.close()
+        self.assertIsNone(transport._executor)
+
+    def test_unknown_transport(self):
+        """未知の通信方式名でValueErrorが発生するかテスト"""
+        with self.assertRaises(ValueError):
+            create_transport("grpc", max_in_flight=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
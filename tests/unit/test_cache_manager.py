@@ -6,18 +6,25 @@ import os
 import json
 import time
 import unittest
+import sqlite3
 import tempfile
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 from hairstyle_analyzer.data.cache_manager import CacheManager
-from hairstyle_analyzer.data.models import CacheConfig, CacheEntry
+from hairstyle_analyzer.data.cache_backends import JSONFileCacheBackend, SQLiteCacheBackend
+from hairstyle_analyzer.data.cache_policies import LRUPolicy, LFUPolicy, TTLPolicy
+from hairstyle_analyzer.data.models import (
+    CacheConfig, CacheEntry, StyleAnalysis, StyleFeatures, AttributeAnalysis, Template, ProcessResult
+)
 from hairstyle_analyzer.utils.errors import AppError
 
 
 class TestCacheManager(unittest.TestCase):
     """CacheManagerのテストケース"""
     
+    backend = "sqlite"
+    
     def setUp(self):
         """テストの前処理"""
         # 一時ディレクトリの作成
@@ -27,7 +34,8 @@ class TestCacheManager(unittest.TestCase):
         # キャッシュ設定
         self.config = CacheConfig(
             ttl_days=1,
-            max_size=10
+            max_size=10,
+            backend=self.backend
         )
         
         # テスト対象のインスタンス作成
@@ -187,6 +195,39 @@ class TestCacheManager(unittest.TestCase):
         self.assertEqual(new_manager.get("key1"), "value1")
         self.assertEqual(new_manager.get("key2"), {"nested": "value2"})
     
+    def test_save_and_load_typed_models(self):
+        """Pydanticモデルが型付きで保存・復元されることのテスト"""
+        analysis = StyleAnalysis(
+            category="ボブ",
+            features=StyleFeatures(color="ブラウン", cut_technique="レイヤー", styling="ストレート", impression="ナチュラル"),
+            keywords=["ボブ", "ナチュラル"]
+        )
+        result = ProcessResult(
+            image_name="test.jpg",
+            style_analysis=analysis,
+            attribute_analysis=AttributeAnalysis(sex="レディース", length="ボブ"),
+            selected_template=Template(category="ボブ", title="タイトル", menu="カット", comment="コメント", hashtag="ボブ,ナチュラル")
+        )
+        self.cache_manager.set("style", analysis)
+        self.cache_manager.set("result", result)
+        self.cache_manager.set("keywords", [analysis, analysis])
+        self.cache_manager._save_cache()
+        
+        new_manager = CacheManager(self.cache_file_path, self.config)
+        
+        restored_analysis = new_manager.get("style")
+        self.assertIsInstance(restored_analysis, StyleAnalysis)
+        self.assertEqual(restored_analysis, analysis)
+        
+        restored_result = new_manager.get("result")
+        self.assertIsInstance(restored_result, ProcessResult)
+        self.assertIsInstance(restored_result.selected_template, Template)
+        self.assertEqual(restored_result.processed_at, result.processed_at)
+        
+        restored_list = new_manager.get("keywords")
+        self.assertEqual(restored_list, [analysis, analysis])
+        self.assertIsInstance(restored_list[0], StyleAnalysis)
+    
     def test_make_cache_key(self):
         """キャッシュキー生成テスト"""
         # 通常のキー
@@ -246,6 +287,179 @@ class TestCacheManager(unittest.TestCase):
         # キャッシュサイズが制限内に収まっていることを確認
         self.assertEqual(len(self.cache_manager.cache), self.config.max_size)
 
+    
+    def test_backend_type(self):
+        """設定に応じたバックエンドが使用されることのテスト"""
+        expected = SQLiteCacheBackend if self.backend == "sqlite" else JSONFileCacheBackend
+        self.assertIsInstance(self.cache_manager.cache, expected)
+        self.assertEqual(self.cache_manager.get_statistics()['backend'], self.backend)
+
+
+class TestCacheManagerJSONBackend(TestCacheManager):
+    """JSONファイルバックエンドでのCacheManagerのテストケース"""
+    
+    backend = "json"
+
+
+class TestSQLiteCacheBackend(unittest.TestCase):
+    """SQLiteバックエンドのテストケース"""
+    
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_file_path = Path(self.temp_dir.name) / "analysis_cache.json"
+        self.config = CacheConfig(ttl_days=1, max_size=10, backend="sqlite")
+    
+    def tearDown(self):
+        """テストの後処理"""
+        self.temp_dir.cleanup()
+    
+    def test_migrate_json_cache(self):
+        """既存のJSONキャッシュが初回起動時に移行されることのテスト"""
+        now = time.time()
+        with open(self.cache_file_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "key1": {"data": "value1", "timestamp": now, "ttl": None},
+                "key2": {"data": {"nested": "value2"}, "timestamp": now, "ttl": None}
+            }, f)
+        
+        cache_manager = CacheManager(self.cache_file_path, self.config)
+        
+        # データが移行されていることを確認
+        self.assertEqual(cache_manager.get("key1"), "value1")
+        self.assertEqual(cache_manager.get("key2"), {"nested": "value2"})
+        self.assertEqual(cache_manager.cache.location, self.cache_file_path.with_suffix(".sqlite3"))
+        
+        # 移行元のファイルは退避され、再度取り込まれない
+        self.assertFalse(self.cache_file_path.exists())
+        self.assertTrue(self.cache_file_path.with_name("analysis_cache.json.migrated").exists())
+        cache_manager.close()
+        
+        reopened = CacheManager(self.cache_file_path, self.config)
+        self.assertEqual(len(reopened.cache), 2)
+        reopened.close()
+    
+    def test_lazy_loading(self):
+        """起動時にデータ本体を読み込まないことのテスト"""
+        cache_manager = CacheManager(self.cache_file_path, self.config)
+        cache_manager.set("key1", {"large": "x" * 1000})
+        cache_manager.close()
+        
+        backend = SQLiteCacheBackend(self.cache_file_path.with_suffix(".sqlite3"))
+        with patch('hairstyle_analyzer.data.cache_backends.json.loads') as mock_loads:
+            # メタデータのみで件数やキーの有無が分かる
+            self.assertEqual(len(backend), 1)
+            self.assertIn("key1", backend)
+            self.assertEqual([m[0] for m in backend.iter_metadata()], ["key1"])
+            mock_loads.assert_not_called()
+        
+        self.assertEqual(backend["key1"].data, {"large": "x" * 1000})
+        backend.close()
+    
+    def test_invalid_typed_entry_is_miss(self):
+        """モデルとして復元できなくなったエントリが、キャッシュミスとして削除されることのテスト"""
+        analysis = StyleAnalysis(
+            category="ボブ",
+            features=StyleFeatures(color="ブラウン", cut_technique="レイヤー", styling="ストレート", impression="ナチュラル"),
+            keywords=["ボブ"]
+        )
+        cache_manager = CacheManager(self.cache_file_path, self.config)
+        cache_manager.set("style", analysis)
+        cache_manager.close()
+        
+        # 保存済みのデータを、モデルの検証に通らない内容に書き換える
+        db_path = self.cache_file_path.with_suffix(".sqlite3")
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE cache_entries SET data = ? WHERE key = ?", ('{"category": "ボブ"}', "style"))
+        
+        reopened = CacheManager(self.cache_file_path, self.config)
+        self.assertIsNone(reopened.get("style"))
+        self.assertNotIn("style", reopened.cache)
+        reopened.close()
+
+
+
+class TestEvictionPolicies(unittest.TestCase):
+    """キャッシュ退避ポリシーのテストケース"""
+    
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_file_path = Path(self.temp_dir.name) / "test_cache.json"
+    
+    def tearDown(self):
+        """テストの後処理"""
+        self.temp_dir.cleanup()
+    
+    def _create_manager(self, policy: str) -> CacheManager:
+        return CacheManager(self.cache_file_path, CacheConfig(ttl_days=1, max_size=3, eviction_policy=policy))
+    
+    def test_lru_keeps_recently_used(self):
+        """LRU: 参照されたエントリが残ることのテスト"""
+        cache_manager = self._create_manager("lru")
+        for key in ["a", "b", "c"]:
+            cache_manager.set(key, key)
+        
+        # aを参照してから新しいエントリを追加すると、最も参照の古いbが削除される
+        cache_manager.get("a")
+        cache_manager.set("d", "d")
+        
+        self.assertEqual(cache_manager.get("a"), "a")
+        self.assertIsNone(cache_manager.get("b"))
+        self.assertEqual(cache_manager.get("c"), "c")
+        self.assertEqual(cache_manager.get("d"), "d")
+        cache_manager.close()
+    
+    def test_lfu_keeps_frequently_used(self):
+        """LFU: 参照回数の多いエントリが残ることのテスト"""
+        cache_manager = self._create_manager("lfu")
+        for key in ["hot", "warm", "cold"]:
+            cache_manager.set(key, key)
+        for _ in range(3):
+            cache_manager.get("hot")
+        cache_manager.get("warm")
+        
+        cache_manager.set("new", "new")
+        
+        self.assertIsNone(cache_manager.get("cold"))
+        self.assertEqual(cache_manager.get("hot"), "hot")
+        self.assertEqual(cache_manager.get("warm"), "warm")
+        cache_manager.close()
+    
+    def test_ttl_evicts_earliest_expiry(self):
+        """TTL: 有効期限が最も近いエントリが削除されることのテスト"""
+        cache_manager = self._create_manager("ttl")
+        cache_manager.set("long", "long", ttl=1000)
+        cache_manager.set("short", "short", ttl=10)
+        cache_manager.set("default", "default")
+        
+        cache_manager.set("new", "new", ttl=500)
+        
+        self.assertIsNone(cache_manager.get("short"))
+        self.assertEqual(cache_manager.get("long"), "long")
+        self.assertEqual(cache_manager.get("default"), "default")
+        cache_manager.close()
+    
+    def test_policy_bookkeeping(self):
+        """ポリシー単体の記録・削除のテスト"""
+        lru = LRUPolicy()
+        lfu = LFUPolicy()
+        ttl = TTLPolicy(default_ttl=100)
+        for policy in (lru, lfu, ttl):
+            policy.add("a", 0.0)
+            policy.add("b", 1.0)
+            policy.discard("a")
+            self.assertEqual(len(policy), 1)
+            self.assertEqual(policy.pop_victim(), "b")
+            self.assertIsNone(policy.pop_victim())
+        
+        # TTLは上書き後の有効期限で判定する
+        ttl.add("a", 0.0, ttl=10)
+        ttl.add("b", 0.0, ttl=20)
+        ttl.add("a", 0.0, ttl=30)
+        self.assertEqual(ttl.pop_victim(), "b")
+        self.assertEqual(ttl.pop_victim(), "a")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+"""
+RunJournalのユニットテスト
+"""
+
+import unittest
+import tempfile
+from pathlib import Path
+
+from hairstyle_analyzer.data.run_journal import RunJournal
+from hairstyle_analyzer.data.models import ProcessResult, StyleAnalysis, StyleFeatures, AttributeAnalysis, Template
+from hairstyle_analyzer.utils.errors import ValidationError
+
+
+def _result(image_name: str) -> ProcessResult:
+    return ProcessResult(
+        image_name=image_name,
+        style_analysis=StyleAnalysis(
+            category="ボブ",
+            features=StyleFeatures(color="色", cut_technique="カット", styling="スタイリング", impression="印象"),
+            keywords=["ボブ"]
+        ),
+        attribute_analysis=AttributeAnalysis(sex="レディース", length="ショート"),
+        selected_template=Template(category="ボブ", title="タイトル", menu="カット", comment="コメント", hashtag="ボブ")
+    )
+
+
+class TestRunJournal(unittest.TestCase):
+    """RunJournalのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.journal_dir = Path(self.temp_dir.name) / "runs"
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.temp_dir.cleanup()
+
+    def test_records_restored_on_reopen(self):
+        """記録した処理結果が、同じ実行IDで開き直した際に復元されることのテスト"""
+        journal = RunJournal.open(self.journal_dir, "run-1")
+        journal.record("key-a", _result("a.jpg"))
+        journal.record("key-b", _result("b.jpg"))
+
+        reopened = RunJournal.open(self.journal_dir, "run-1")
+
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.get("key-b").image_name, "b.jpg")
+        self.assertIsNone(RunJournal.open(self.journal_dir, "run-2").get("key-a"))
+
+    def test_truncated_line_ignored(self):
+        """書き込み途中で中断した行は無視され、以降の追記は読み込めることのテスト"""
+        journal = RunJournal.open(self.journal_dir, "run-1")
+        journal.record("key-a", _result("a.jpg"))
+        with open(journal.path, "a", encoding="utf-8") as f:
+            f.write('{"key": "key-b", "result": {"image_na')
+
+        reopened = RunJournal.open(self.journal_dir, "run-1")
+        self.assertEqual(len(reopened), 1)
+        reopened.record("key-c", _result("c.jpg"))
+
+        self.assertIn("key-c", RunJournal.open(self.journal_dir, "run-1"))
+
+    def test_invalid_run_id(self):
+        """ファイル名として使用できない実行IDが拒否されることのテスト"""
+        with self.assertRaises(ValidationError):
+            RunJournal.open(self.journal_dir, "../outside")
+        self.assertRegex(RunJournal.new_run_id(), r"^\d{8}-\d{6}-[0-9a-f]{6}$")
+
+
+if __name__ == "__main__":
+    unittest.main()
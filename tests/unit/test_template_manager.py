@@ -238,6 +238,22 @@ class TestTemplateManager(unittest.TestCase):
         
         # 新しいカテゴリが追加されていることを確認
         self.assertIn('メンズ', self.template_manager.get_all_categories())
+    
+    def test_catalog_hash_changes_on_edit(self):
+        """テンプレートの内容を編集するとカタログのハッシュが変わることのテスト"""
+        initial_hash = self.template_manager.get_catalog_hash()
+        self.assertTrue(initial_hash)
+        
+        # 同じ内容の再読み込みではハッシュは変わらない
+        self.template_manager.reload()
+        self.assertEqual(self.template_manager.get_catalog_hash(), initial_hash)
+        
+        # カテゴリを変えずにコメントだけを編集
+        with open(self.temp_csv_path, 'w', encoding='utf-8') as f:
+            f.write(self.csv_content.replace("テストコメント2", "編集したコメント"))
+        self.template_manager.reload()
+        
+        self.assertNotEqual(self.template_manager.get_catalog_hash(), initial_hash)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,148 @@
+"""
+TieredCacheManagerのユニットテスト
+"""
+
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from hairstyle_analyzer.data.cache_manager import CacheManager
+from hairstyle_analyzer.data.tiered_cache import TieredCacheManager, MemoryCacheTier, create_cache_manager, estimate_size
+from hairstyle_analyzer.data.models import CacheConfig, CacheEntry, StyleAnalysis, StyleFeatures
+
+
+class TestTieredCacheManager(unittest.TestCase):
+    """TieredCacheManagerのテストケース"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_file_path = Path(self.temp_dir.name) / "test_cache.json"
+        self.config = CacheConfig(
+            ttl_days=1,
+            max_size=100,
+            memory_max_bytes=10_000,
+            write_behind_batch_size=3,
+            write_behind_interval_seconds=3600
+        )
+        self.cache_manager = create_cache_manager(self.cache_file_path, self.config)
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.cache_manager.close()
+        self.temp_dir.cleanup()
+
+    def test_create_cache_manager(self):
+        """設定に応じたキャッシュマネージャーが作成されることのテスト"""
+        self.assertIsInstance(self.cache_manager, TieredCacheManager)
+
+        disk_only = create_cache_manager(
+            Path(self.temp_dir.name) / "other.json",
+            CacheConfig(memory_max_bytes=0)
+        )
+        self.assertIsInstance(disk_only, CacheManager)
+        disk_only.close()
+
+    def test_memory_hit_returns_same_object(self):
+        """メモリ層のヒットではディスクを参照せず、同じオブジェクトが返ることのテスト"""
+        analysis = StyleAnalysis(
+            category="ボブ",
+            features=StyleFeatures(color="色", cut_technique="カット", styling="スタイリング", impression="印象"),
+            keywords=["ボブ"]
+        )
+        self.cache_manager.set("style_analysis:abc", analysis)
+
+        with patch.object(self.cache_manager.disk, 'get_entry') as mock_disk_get:
+            result = self.cache_manager.get("style_analysis:abc")
+            mock_disk_get.assert_not_called()
+
+        self.assertIs(result, analysis)
+        stats = self.cache_manager.get_statistics()
+        self.assertEqual(stats['tiers']['memory']['hits'], 1)
+        self.assertEqual(stats['tiers']['disk']['hits'], 0)
+
+    def test_write_behind(self):
+        """書き込みがまとめて永続層に反映されることのテスト"""
+        self.cache_manager.set("key1", "value1")
+        self.cache_manager.set("key2", "value2")
+
+        # バッチサイズに達するまでは永続層に書き込まれない
+        self.assertEqual(len(self.cache_manager.disk.cache), 0)
+        self.assertEqual(self.cache_manager.get("key1"), "value1")
+
+        self.cache_manager.set("key3", "value3")
+        self.assertEqual(len(self.cache_manager.disk.cache), 3)
+
+        # closeで残りが書き込まれ、再起動後に永続層から読み込める
+        self.cache_manager.set("key4", "value4")
+        self.cache_manager.close()
+
+        self.cache_manager = create_cache_manager(self.cache_file_path, self.config)
+        self.assertEqual(self.cache_manager.get("key4"), "value4")
+        stats = self.cache_manager.get_statistics()
+        self.assertEqual(stats['tiers']['memory']['misses'], 1)
+        self.assertEqual(stats['tiers']['disk']['hits'], 1)
+
+        # 2回目はメモリ層から返される
+        self.assertEqual(self.cache_manager.get("key4"), "value4")
+        self.assertEqual(self.cache_manager.get_statistics()['tiers']['memory']['hits'], 1)
+
+    def test_memory_hits_update_disk_eviction_order(self):
+        """メモリ層で参照したエントリが、永続層のサイズ制限で先に削除されないことのテスト"""
+        self.cache_manager.close()
+        config = CacheConfig(max_size=3, memory_max_bytes=10_000, write_behind_batch_size=1)
+        self.cache_manager = create_cache_manager(Path(self.temp_dir.name) / "lru.json", config)
+        for i in range(3):
+            self.cache_manager.set(f"key{i}", f"value{i}")
+
+        # 最も古いkey0をメモリ層で参照してから、上限を超える書き込みを行う
+        self.assertEqual(self.cache_manager.get("key0"), "value0")
+        self.cache_manager.set("key3", "value3")
+
+        self.assertIn("key0", self.cache_manager.disk.cache)
+        self.assertNotIn("key1", self.cache_manager.disk.cache)
+
+    def test_clear(self):
+        """パターン指定のクリアが両方の層に反映されることのテスト"""
+        self.cache_manager.set("prefix1_key1", "value1")
+        self.cache_manager.set("prefix2_key1", "value2")
+
+        cleared_count = self.cache_manager.clear(pattern="prefix1")
+
+        self.assertEqual(cleared_count, 1)
+        self.assertIsNone(self.cache_manager.get("prefix1_key1"))
+        self.assertEqual(self.cache_manager.get("prefix2_key1"), "value2")
+
+
+class TestMemoryCacheTier(unittest.TestCase):
+    """MemoryCacheTierのテストケース"""
+
+    def test_byte_limit(self):
+        """バイト数の上限を超えると古いエントリから削除されることのテスト"""
+        value = "x" * 100
+        size = estimate_size(value)
+        tier = MemoryCacheTier(max_bytes=size * 2)
+
+        tier.put("a", CacheEntry(data=value, timestamp=0))
+        tier.put("b", CacheEntry(data=value, timestamp=0))
+        tier.get("a")
+        tier.put("c", CacheEntry(data=value, timestamp=0))
+
+        self.assertIsNone(tier.get("b"))
+        self.assertIsNotNone(tier.get("a"))
+        self.assertIsNotNone(tier.get("c"))
+        self.assertEqual(tier.current_bytes, size * 2)
+        self.assertEqual(tier.evictions, 1)
+
+    def test_oversized_entry(self):
+        """上限を超える単体のエントリは保持されないことのテスト"""
+        tier = MemoryCacheTier(max_bytes=10)
+        tier.put("big", CacheEntry(data="x" * 100, timestamp=0))
+
+        self.assertIsNone(tier.get("big"))
+        self.assertEqual(tier.current_bytes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()